@@ -9,7 +9,7 @@ from typing import List, Dict, Any, Optional
 import os
 from datetime import datetime
 
-from services.advanced_navigation_service import AdvancedNavigationService
+from services.service_registry import service_registry
 
 router = APIRouter()
 security = HTTPBearer()
@@ -27,7 +27,7 @@ class ComplexQueryRequest(BaseModel):
     context: Optional[Dict] = Field(None, description="Additional context for processing")
 
 # Initialize service
-navigation_service = AdvancedNavigationService()
+navigation_service = service_registry.lazy("advanced_navigation")
 
 @router.post("/natural-language-navigation")
 async def natural_language_navigation(
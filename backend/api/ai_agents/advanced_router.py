@@ -6,16 +6,15 @@ Next-generation AI features that enhance the existing hybrid system
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from models.user import User
-from services.auth_service import AuthService
-from services.advanced_hybrid_orchestrator import AdvancedHybridOrchestrator
+from services.service_registry import service_registry
 from services.performance_service import performance_service
 from database.connection import get_database
 from typing import List, Optional, Dict, Any
 import time
 
 router = APIRouter()
-auth_service = AuthService()
-advanced_ai = AdvancedHybridOrchestrator()
+auth_service = service_registry.get("auth")
+advanced_ai = service_registry.lazy("advanced_hybrid_ai")
 
 # =============================================================================
 # 🎯 REQUEST MODELS FOR ADVANCED AI CAPABILITIES  
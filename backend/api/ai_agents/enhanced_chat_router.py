@@ -1,15 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from models.user import User
-from services.auth_service import AuthService
-from services.enhanced_ai_orchestrator import EnhancedAIOrchestratorService
+from services.service_registry import service_registry
 from database.connection import get_database
 from typing import Optional, Dict, Any
 import time
 
 router = APIRouter()
-auth_service = AuthService()
-enhanced_ai = EnhancedAIOrchestratorService()
+auth_service = service_registry.get("auth")
+enhanced_ai = service_registry.lazy("enhanced_ai_orchestrator")
 
 class ChatRequest(BaseModel):
     message: str
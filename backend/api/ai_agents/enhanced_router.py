@@ -2,16 +2,15 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from models.user import User
 from models.ai_task import AITask, AITaskCreate, AITaskType
-from services.auth_service import AuthService
-from services.enhanced_ai_orchestrator import EnhancedAIOrchestratorService
+from services.service_registry import service_registry
 from services.performance_service import performance_service
 from database.connection import get_database
 from typing import List, Optional, Dict, Any
 import time
 
 router = APIRouter()
-auth_service = AuthService()
-enhanced_ai = EnhancedAIOrchestratorService()
+auth_service = service_registry.get("auth")
+enhanced_ai = service_registry.lazy("enhanced_ai_orchestrator")
 # Use the singleton instance from performance_service module
 
 # Request models to ensure correct JSON body parsing
@@ -147,25 +146,22 @@ async def enhanced_chat_with_ai(
     start_time = time.time()
 
     try:
-        # Check cache first
+        # Process with enhanced AI, cached for 5 minutes; identical requests in flight share one call
         cache_key = f"chat_{current_user.id}_{hash(req.message)}_{hash(str(req.context))}"
-        cached_response = await performance_service.get_cached_data(cache_key)
+        response, cached = await performance_service.get_or_compute(
+            cache_key,
+            lambda: enhanced_ai.process_chat_message(req.message, current_user.id, req.context, db),
+            ttl_seconds=300,
+            namespace="chat"
+        )
 
-        if cached_response:
+        if cached:
             return {
-                "response": cached_response,
+                "response": response,
                 "cached": True,
                 "response_time": time.time() - start_time
             }
 
-        # Process with enhanced AI
-        response = await enhanced_ai.process_chat_message(
-            req.message, current_user.id, req.context, db
-        )
-
-        # Cache the response
-        await performance_service.optimize_caching(cache_key, response, 300)  # 5 minutes
-
         # Monitor performance
         await performance_service.monitor_response_times("enhanced_chat", start_time)
 
@@ -190,20 +186,17 @@ async def smart_content_analysis(
     start_time = time.time()
 
     try:
-        # Check cache
+        # Perform smart analysis, cached for 10 minutes
         cache_key = f"analysis_{hash(req.url)}_{req.analysis_type}"
-        cached_result = await performance_service.get_cached_data(cache_key)
-
-        if cached_result:
-            return {**cached_result, "cached": True}
-
-        # Perform smart analysis
-        result = await enhanced_ai.smart_content_analysis(
-            req.url, req.analysis_type, current_user.id, db
+        result, cached = await performance_service.get_or_compute(
+            cache_key,
+            lambda: enhanced_ai.smart_content_analysis(req.url, req.analysis_type, current_user.id, db),
+            ttl_seconds=600,
+            namespace="analysis"
         )
 
-        # Cache result for 10 minutes
-        await performance_service.optimize_caching(cache_key, result, 600)
+        if cached:
+            return {**result, "cached": True}
 
         # Monitor performance
         await performance_service.monitor_response_times("content_analysis", start_time)
@@ -279,20 +272,17 @@ async def advanced_document_analysis(
     start_time = time.time()
 
     try:
-        # Check cache
+        # Perform document analysis, cached for 15 minutes
         cache_key = f"doc_analysis_{hash(req.file_content)}_{req.file_type}"
-        cached_result = await performance_service.get_cached_data(cache_key)
-
-        if cached_result:
-            return {**cached_result, "cached": True}
-
-        # Perform document analysis
-        result = await enhanced_ai.advanced_document_analysis(
-            req.file_content, req.file_type, current_user.id, req.context
+        result, cached = await performance_service.get_or_compute(
+            cache_key,
+            lambda: enhanced_ai.advanced_document_analysis(req.file_content, req.file_type, current_user.id, req.context),
+            ttl_seconds=900,
+            namespace="documents"
         )
 
-        # Cache result for 15 minutes
-        await performance_service.optimize_caching(cache_key, result, 900)
+        if cached:
+            return {**result, "cached": True}
 
         # Monitor performance
         await performance_service.monitor_response_times("document_analysis", start_time)
@@ -661,10 +651,7 @@ async def get_ai_performance_metrics(
         return {
             "performance_summary": performance_summary,
             "response_analytics": response_analytics,
-            "cache_status": {
-                "enabled": performance_service.optimization_settings["cache_enabled"],
-                "entries": len(performance_service.performance_cache)
-            }
+            "cache_status": performance_service.get_cache_stats()
         }
 
     except Exception as e:
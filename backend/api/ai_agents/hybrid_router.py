@@ -6,16 +6,15 @@ Exposes hybrid AI capabilities through RESTful API while preserving existing fun
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from models.user import User
-from services.auth_service import AuthService
-from services.enhanced_hybrid_ai_orchestrator import EnhancedHybridAIOrchestratorService
+from services.service_registry import service_registry
 from services.performance_service import performance_service
 from database.connection import get_database
 from typing import List, Optional, Dict, Any
 import time
 
 router = APIRouter()
-auth_service = AuthService()
-hybrid_ai = EnhancedHybridAIOrchestratorService()
+auth_service = service_registry.get("auth")
+hybrid_ai = service_registry.lazy("enhanced_hybrid_ai")
 
 # =============================================================================
 # 🎯 REQUEST MODELS FOR HYBRID AI CAPABILITIES
@@ -1,14 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from models.user import User
 from models.ai_task import AITask, AITaskCreate, AITaskType
-from services.auth_service import AuthService
-from services.ai_orchestrator import AIOrchestratorService
+from services.service_registry import service_registry
 from database.connection import get_database
 from typing import List
 
 router = APIRouter()
-auth_service = AuthService()
-ai_service = AIOrchestratorService()
+auth_service = service_registry.get("auth")
+ai_service = service_registry.lazy("ai_orchestrator")
 
 @router.post("/chat")
 async def chat_with_ai(
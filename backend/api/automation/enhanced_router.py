@@ -1,8 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from models.user import User
 from models.automation import AutomationWorkflow, AutomationCreate, AutomationExecution
-from services.auth_service import AuthService
-from services.advanced_web_automation import AdvancedWebAutomationService
+from services.service_registry import service_registry
 from services.performance_service import performance_service
 from database.connection import get_database
 from typing import List, Dict, Any
@@ -10,8 +9,8 @@ import time
 import asyncio
 
 router = APIRouter()
-auth_service = AuthService()
-advanced_automation = AdvancedWebAutomationService()
+auth_service = service_registry.get("auth")
+advanced_automation = service_registry.lazy("advanced_web_automation")
 # Use the singleton instance from performance_service module
 
 @router.post("/smart-form-fill")
@@ -56,19 +55,20 @@ async def advanced_ecommerce_automation(
     try:
         filters = filters or {}
         
-        # Check cache for recent similar searches
+        # Reuse recent similar searches (30 minutes, product prices change frequently);
+        # identical searches in flight share one automation run
         cache_key = f"ecommerce_{hash(product_search)}_{hash(shopping_site)}_{hash(str(filters))}"
-        cached_result = await performance_service.get_cached_data(cache_key)
-        
-        if cached_result:
-            return {**cached_result, "cached": True}
-        
-        result = await advanced_automation.advanced_ecommerce_automation(
-            product_search, shopping_site, filters, current_user.id, db
+        result, cached = await performance_service.get_or_compute(
+            cache_key,
+            lambda: advanced_automation.advanced_ecommerce_automation(
+                product_search, shopping_site, filters, current_user.id, db
+            ),
+            ttl_seconds=1800,
+            namespace="automation"
         )
         
-        # Cache results for 30 minutes (product prices change frequently)
-        await performance_service.optimize_caching(cache_key, result, 1800)
+        if cached:
+            return {**result, "cached": True}
         
         # Monitor performance
         await performance_service.monitor_response_times("ecommerce_automation", start_time)
@@ -90,8 +90,7 @@ async def smart_appointment_booking(
     
     try:
         # Use the existing appointment booking from the base automation service
-        from services.web_automation import WebAutomationService
-        automation_service = WebAutomationService()
+        automation_service = service_registry.get("web_automation")
         
         result = await automation_service.book_appointment(
             service_url, appointment_details, current_user.id, db
@@ -1,14 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException
 from models.user import User
 from models.automation import AutomationWorkflow, AutomationCreate, AutomationExecution
-from services.auth_service import AuthService
-from services.web_automation import WebAutomationService
+from services.service_registry import service_registry
 from database.connection import get_database
 from typing import List
 
 router = APIRouter()
-auth_service = AuthService()
-automation_service = WebAutomationService()
+auth_service = service_registry.get("auth")
+automation_service = service_registry.lazy("web_automation")
 
 @router.post("/workflow", response_model=AutomationWorkflow)
 async def create_workflow(
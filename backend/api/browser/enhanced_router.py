@@ -1,23 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from models.user import User
-from services.auth_service import AuthService
-from services.browser_engine_service import BrowserEngineService
-from services.app_simplicity_service import AppSimplicityService
-from services.ui_enhancement_service import UIEnhancementService
-from services.performance_service import PerformanceService
+from services.service_registry import service_registry
 from database.connection import get_database
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
+import asyncio
 import json
+import time
 
 # Initialize services
 router = APIRouter()
-auth_service = AuthService()
-browser_engine = BrowserEngineService()
-simplicity_service = AppSimplicityService()
-ui_service = UIEnhancementService()
-performance_service = PerformanceService()
+auth_service = service_registry.get("auth")
+browser_engine = service_registry.lazy("browser_engine")
+simplicity_service = service_registry.lazy("app_simplicity")
+ui_service = service_registry.lazy("ui_enhancement")
+performance_service = service_registry.lazy("performance")
+embedding_index = service_registry.lazy("embedding_index")
 
 # Pydantic models for requests
 class NavigationRequest(BaseModel):
@@ -180,6 +179,30 @@ async def search_history(
         raise HTTPException(status_code=500, detail=f"History search failed: {str(e)}")
 
 
+@router.get("/history/semantic-search")
+async def semantic_history_search(
+    query: str = Query(..., min_length=1),
+    k: int = Query(10, ge=1, le=50),
+    since_days: Optional[float] = Query(None, gt=0),
+    current_user: User = Depends(auth_service.get_current_user)
+):
+    """Search the content of visited pages by meaning rather than URL or title"""
+    try:
+        since = time.time() - since_days * 86400 if since_days else None
+        results = await asyncio.to_thread(embedding_index.search, current_user.id, query, k, since)
+        
+        return {
+            "success": True,
+            "results": results,
+            "query": query,
+            "count": len(results),
+            "feature": "semantic_history_search"
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Semantic history search failed: {str(e)}")
+
+
 @router.get("/bookmarks")
 async def get_bookmarks(
     folder: Optional[str] = Query(None),
@@ -1,9 +1,9 @@
 from fastapi import APIRouter, HTTPException
-from services.browser_engine_service import BrowserEngineService
+from services.service_registry import service_registry
 import time
 
 router = APIRouter()
-browser_engine = BrowserEngineService()
+browser_engine = service_registry.lazy("browser_engine")
 
 @router.get("/health")
 async def browser_engine_health_check():
@@ -1,19 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import JSONResponse
 from models.user import User
-from models.session import BrowserSession, TabState, TabCreate
-from services.auth_service import AuthService
-from services.session_manager import SessionManager
-from services.advanced_tab_navigation_service import AdvancedTabNavigationService
-from services.cross_site_intelligence_service import CrossSiteIntelligenceService
+from models.session import BrowserSession, TabState, TabCreate, TabPositionUpdate
+from services.service_registry import service_registry
 from database.connection import get_database
 from typing import List
 
 router = APIRouter()
-auth_service = AuthService()
-session_manager = SessionManager()
-advanced_tab_service = AdvancedTabNavigationService()
-cross_site_service = CrossSiteIntelligenceService()
+auth_service = service_registry.get("auth")
+session_manager = service_registry.lazy("session_manager")
+advanced_tab_service = service_registry.lazy("advanced_tab_navigation")
+cross_site_service = service_registry.lazy("cross_site_intelligence")
 
 @router.post("/session", response_model=BrowserSession)
 async def create_session(
@@ -73,6 +70,15 @@ async def update_tab_position(
     """Update tab position for bubble tab system"""
     return await session_manager.update_tab_position(tab_id, x, y, current_user.id, db)
 
+@router.put("/tabs/positions")
+async def update_tab_positions(
+    positions: List[TabPositionUpdate],
+    current_user: User = Depends(auth_service.get_current_user),
+    db=Depends(get_database)
+):
+    """Update several tab positions at once for bubble tab drags"""
+    return await session_manager.update_tab_positions(positions, current_user.id, db)
+
 @router.delete("/tab/{tab_id}")
 async def close_tab(
     tab_id: str,
@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from models.user import User
-from services.auth_service import AuthService
-from services.content_analyzer import ContentAnalyzerService
+from services.service_registry import service_registry
 from database.connection import get_database
 from typing import List, Dict, Any
+import asyncio
+import json
 
 router = APIRouter()
-auth_service = AuthService()
-content_service = ContentAnalyzerService()
+auth_service = service_registry.get("auth")
+content_service = service_registry.lazy("content_analyzer")
+knowledge_graph_store = service_registry.lazy("knowledge_graph_store")
 
 @router.post("/analyze")
 async def analyze_page(
@@ -20,6 +23,23 @@ async def analyze_page(
     result = await content_service.analyze_page(url, analysis_types, current_user.id, db)
     return {"analysis": result}
 
+@router.post("/analyze/stream")
+async def stream_analyze_page(
+    url: str,
+    analysis_types: List[str] = ["summary", "keywords", "sentiment"],
+    current_user: User = Depends(auth_service.get_current_user),
+    db=Depends(get_database)
+):
+    """Analyze web page content, streaming each analysis type as it completes (newline-delimited JSON events)"""
+    async def event_stream():
+        try:
+            async for event in content_service.stream_page_analysis(url, analysis_types, current_user.id, db):
+                yield json.dumps(event, default=str) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "error": f"Page analysis failed: {str(e)}"}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 @router.post("/summarize")
 async def summarize_content(
     content: str = None,
@@ -46,6 +66,23 @@ async def extract_data(
     result = await content_service.extract_structured_data(url, data_types, current_user.id, db)
     return {"extracted_data": result}
 
+@router.post("/extract-data/stream")
+async def stream_extract_data(
+    url: str,
+    data_types: List[str] = ["contacts", "products", "articles"],
+    current_user: User = Depends(auth_service.get_current_user),
+    db=Depends(get_database)
+):
+    """Extract structured data, streaming each data type as it completes (newline-delimited JSON events)"""
+    async def event_stream():
+        try:
+            async for event in content_service.stream_structured_data(url, data_types, current_user.id, db):
+                yield json.dumps(event, default=str) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "error": f"Data extraction failed: {str(e)}"}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 @router.post("/fact-check")
 async def fact_check(
     content: str,
@@ -79,6 +116,59 @@ async def create_knowledge_graph(
     result = await content_service.create_knowledge_graph(urls, topic, current_user.id, db)
     return {"knowledge_graph": result}
 
+@router.get("/knowledge-graphs")
+async def list_knowledge_graphs(current_user: User = Depends(auth_service.get_current_user)):
+    """List the user's persistent knowledge graphs with their sizes"""
+    graphs = await asyncio.to_thread(knowledge_graph_store.list_graphs, current_user.id)
+    return {"knowledge_graphs": graphs}
+
+@router.get("/knowledge-graph")
+async def get_knowledge_graph(
+    topic: str,
+    limit: int = None,
+    current_user: User = Depends(auth_service.get_current_user)
+):
+    """Get a stored knowledge graph, optionally only its best-supported entities"""
+    graph = await asyncio.to_thread(knowledge_graph_store.get_graph, current_user.id, topic, limit)
+    if graph is None:
+        raise HTTPException(status_code=404, detail="Knowledge graph not found")
+    return {"knowledge_graph": graph}
+
+@router.get("/knowledge-graph/neighbors")
+async def get_knowledge_graph_neighbors(
+    topic: str,
+    entity: str,
+    depth: int = 1,
+    limit: int = 100,
+    current_user: User = Depends(auth_service.get_current_user)
+):
+    """Entities within `depth` hops of an entity in a stored knowledge graph"""
+    result = await asyncio.to_thread(knowledge_graph_store.neighbourhood, current_user.id, topic, entity, min(depth, 4), limit)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Entity not found in knowledge graph")
+    return result
+
+@router.get("/knowledge-graph/path")
+async def get_knowledge_graph_path(
+    topic: str,
+    source: str,
+    target: str,
+    max_depth: int = 6,
+    current_user: User = Depends(auth_service.get_current_user)
+):
+    """Shortest connection between two entities in a stored knowledge graph"""
+    result = await asyncio.to_thread(knowledge_graph_store.shortest_path, current_user.id, topic, source, target, max_depth)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Entity not found in knowledge graph")
+    return result
+
+@router.delete("/knowledge-graph")
+async def delete_knowledge_graph(topic: str, current_user: User = Depends(auth_service.get_current_user)):
+    """Delete a stored knowledge graph"""
+    if not await asyncio.to_thread(knowledge_graph_store.delete_graph, current_user.id, topic):
+        raise HTTPException(status_code=404, detail="Knowledge graph not found")
+    return {"deleted": True, "topic": topic}
+
 @router.post("/compare-sources")
 async def compare_sources(
     urls: List[str],
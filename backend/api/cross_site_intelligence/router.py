@@ -7,7 +7,7 @@ from fastapi.security import HTTPBearer
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
-from services.cross_site_intelligence_service import CrossSiteIntelligenceService
+from services.service_registry import service_registry
 
 router = APIRouter()
 security = HTTPBearer()
@@ -31,7 +31,7 @@ class EcosystemMappingRequest(BaseModel):
     seed_urls: List[str] = Field(..., description="Seed URLs for ecosystem mapping")
 
 # Initialize service
-intelligence_service = CrossSiteIntelligenceService()
+intelligence_service = service_registry.lazy("cross_site_intelligence")
 
 @router.post("/website-relationship-mapping")
 async def analyze_website_relationships(
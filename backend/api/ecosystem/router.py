@@ -9,13 +9,12 @@ from datetime import datetime
 import json
 
 from services.ecosystem_integration_service import EcosystemIntegrationService
-from database.connection import get_database
-from services.auth_service import AuthService
+from services.service_registry import service_registry
 from models.user import User
 
 router = APIRouter()
 security = HTTPBearer()
-auth_service = AuthService()
+auth_service = service_registry.get("auth")
 
 # Auth dependency
 async def get_current_user(current_user: User = Depends(auth_service.get_current_user)):
@@ -53,8 +52,7 @@ class WebhookEvent(BaseModel):
 
 # Initialize service
 async def get_ecosystem_service():
-    db = await get_database()
-    return EcosystemIntegrationService(db)
+    return await service_registry.aget("ecosystem")
 
 @router.post("/register-endpoint")
 async def register_integration_endpoint(
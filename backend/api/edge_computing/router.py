@@ -8,7 +8,7 @@ from pydantic import BaseModel
 from datetime import datetime
 
 from services.edge_computing_service import EdgeComputingService
-from services.auth_service import AuthService
+from services.service_registry import service_registry
 from models.user import User
 
 router = APIRouter()
@@ -16,7 +16,7 @@ security = HTTPBearer()
 
 # Auth dependency
 async def get_current_user(token: str = Depends(security)) -> User:
-    auth_service = AuthService()
+    auth_service = service_registry.get("auth")
     return await auth_service.verify_token(token.credentials)
 
 # Request/Response Models
@@ -46,7 +46,7 @@ class SystemMetrics(BaseModel):
 
 # Initialize service
 async def get_edge_service():
-    return EdgeComputingService()
+    return await service_registry.aget("edge_computing")
 
 @router.post("/distributed-ai-processing")
 async def distributed_ai_processing(
@@ -9,12 +9,12 @@ import numpy as np
 import base64
 
 from services.emerging_tech_service import EmergingTechService
-from services.auth_service import AuthService
+from services.service_registry import service_registry
 from models.user import User
 
 router = APIRouter()
 security = HTTPBearer()
-auth_service = AuthService()
+auth_service = service_registry.get("auth")
 
 async def get_current_user(current_user: User = Depends(auth_service.get_current_user)):
     return current_user
@@ -49,7 +49,7 @@ class BCISignalData(BaseModel):
 
 # Initialize service
 async def get_emerging_tech_service():
-    return EmergingTechService()
+    return await service_registry.aget("emerging_tech")
 
 @router.post("/voice-command")
 async def process_voice_command(
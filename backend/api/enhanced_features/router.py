@@ -9,18 +9,15 @@ import json
 from datetime import datetime
 
 # Import the new services
-from services.advanced_navigation_service import AdvancedNavigationService
-from services.smart_productivity_service import SmartProductivityService  
-from services.performance_optimization_service import PerformanceOptimizationService
-from services.advanced_ai_interface_service import AdvancedAIInterfaceService
+from services.service_registry import service_registry
 
 router = APIRouter()
 
 # Initialize services
-navigation_service = AdvancedNavigationService()
-productivity_service = SmartProductivityService()
-performance_service = PerformanceOptimizationService()
-ai_interface_service = AdvancedAIInterfaceService()
+navigation_service = service_registry.lazy("advanced_navigation")
+productivity_service = service_registry.lazy("smart_productivity")
+performance_service = service_registry.lazy("performance_optimization")
+ai_interface_service = service_registry.lazy("advanced_ai_interface")
 
 # ===== ADVANCED NAVIGATION ENDPOINTS =====
 
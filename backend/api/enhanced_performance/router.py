@@ -7,7 +7,7 @@ from fastapi.security import HTTPBearer
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
-from services.enhanced_performance_service import EnhancedPerformanceService
+from services.service_registry import service_registry
 
 router = APIRouter()
 security = HTTPBearer()
@@ -30,7 +30,7 @@ class AdaptiveOptimizationRequest(BaseModel):
     performance_context: Dict = Field(..., description="Performance context for optimization")
 
 # Initialize service
-performance_service = EnhancedPerformanceService()
+performance_service = service_registry.lazy("enhanced_performance")
 
 @router.post("/predictive-content-caching")
 async def predictive_content_caching(
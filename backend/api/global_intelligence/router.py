@@ -7,13 +7,12 @@ from typing import Dict, List, Any, Optional
 from pydantic import BaseModel
 
 from services.global_intelligence_service import GlobalIntelligenceService
-from database.connection import get_database
-from services.auth_service import AuthService
+from services.service_registry import service_registry
 from models.user import User
 
 router = APIRouter()
 security = HTTPBearer()
-auth_service = AuthService()
+auth_service = service_registry.get("auth")
 
 async def get_current_user(current_user: User = Depends(auth_service.get_current_user)):
     return current_user
@@ -44,8 +43,7 @@ class GlobalCollaborationContext(BaseModel):
 
 # Initialize service
 async def get_global_intelligence_service():
-    db = await get_database()
-    return GlobalIntelligenceService(db)
+    return await service_registry.aget("global_intelligence")
 
 @router.post("/collect-insights")
 async def collect_anonymous_insights(
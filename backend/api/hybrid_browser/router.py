@@ -4,7 +4,7 @@ Implements all missing capabilities from Neon AI and Fellou.ai browsers
 """
 
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, List, Any, Optional
 from datetime import datetime
@@ -12,32 +12,22 @@ import json
 import logging
 
 # Import all parallel services
-from services.deep_action_technology_service import DeepActionTechnologyService
-from services.agentic_memory_service import AgenticMemoryService
-from services.deep_search_integration_service import DeepSearchIntegrationService
-from services.virtual_workspace_service import VirtualWorkspaceService
-from services.browser_engine_foundation_service import BrowserEngineFoundationService
-from services.electron_service import ElectronService
-from services.workspace_service import WorkspaceService
-from services.engine_service import EngineService
-from services.os_integration_service import OSIntegrationService
-from services.memory_service import MemoryService
-from services.search_service import SearchService
+from services.service_registry import service_registry
 
 router = APIRouter()
 
 # Initialize services
-deep_action_service = DeepActionTechnologyService()
-agentic_memory_service = AgenticMemoryService()
-deep_search_service = DeepSearchIntegrationService()
-virtual_workspace_service = VirtualWorkspaceService()
-browser_engine_service = BrowserEngineFoundationService()
-electron_service = ElectronService()
-workspace_service = WorkspaceService()
-engine_service = EngineService()
-os_integration_service = OSIntegrationService()
-memory_service = MemoryService()
-search_service = SearchService()
+deep_action_service = service_registry.lazy("deep_action")
+agentic_memory_service = service_registry.lazy("agentic_memory")
+deep_search_service = service_registry.lazy("deep_search")
+virtual_workspace_service = service_registry.lazy("virtual_workspace")
+browser_engine_service = service_registry.lazy("browser_engine_foundation")
+electron_service = service_registry.lazy("electron")
+workspace_service = service_registry.lazy("workspace")
+engine_service = service_registry.lazy("engine")
+os_integration_service = service_registry.lazy("os_integration")
+memory_service = service_registry.lazy("memory")
+search_service = service_registry.lazy("search")
 
 # === PYDANTIC MODELS ===
 
@@ -267,6 +257,27 @@ async def parallel_deep_search(request: DeepSearchRequest):
         logging.error(f"Deep search error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Deep search failed: {str(e)}")
 
+@router.post("/deep-search/stream")
+async def stream_deep_search(request: DeepSearchRequest):
+    """🔍 Stream deep search results as each platform returns (newline-delimited JSON events)"""
+    options = request.search_options or {}
+    
+    async def event_stream():
+        try:
+            async for event in deep_search_service.stream_deep_search(
+                query=request.query,
+                strategy=options.get("strategy", "comprehensive"),
+                platforms=request.platforms,
+                context={**options.get("context", {}), "user_id": request.user_id} if request.user_id else options.get("context"),
+                top_k=options.get("top_k")
+            ):
+                yield json.dumps(event, default=str) + "\n"
+        except Exception as e:
+            logging.error(f"Deep search stream error: {str(e)}")
+            yield json.dumps({"event": "error", "success": False, "error": f"Deep search failed: {str(e)}"}) + "\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 @router.get("/deep-search/capabilities")
 async def get_deep_search_capabilities():
     """🔍 Get comprehensive Deep Search Integration capabilities"""
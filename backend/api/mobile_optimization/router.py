@@ -6,10 +6,10 @@ Provides API endpoints for mobile-specific optimizations, touch interfaces, and
 from fastapi import APIRouter, Request, HTTPException, Header
 from fastapi.responses import JSONResponse
 from typing import Dict, Any, Optional, List
-from services.mobile_optimization_service import MobileOptimizationService
+from services.service_registry import service_registry
 
 router = APIRouter()
-mobile_service = MobileOptimizationService()
+mobile_service = service_registry.lazy("mobile_optimization")
 
 @router.post("/device/detect")
 async def detect_device(request: Request, user_agent: str = Header(None)):
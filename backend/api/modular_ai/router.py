@@ -7,13 +7,12 @@ from typing import Dict, List, Any, Optional
 from pydantic import BaseModel
 
 from services.modular_ai_service import ModularAIService
-from database.connection import get_database
-from services.auth_service import AuthService
+from services.service_registry import service_registry
 from models.user import User
 
 router = APIRouter()
 security = HTTPBearer()
-auth_service = AuthService()
+auth_service = service_registry.get("auth")
 
 async def get_current_user(current_user: User = Depends(auth_service.get_current_user)):
     return current_user
@@ -55,8 +54,7 @@ class PluginExecutionRequest(BaseModel):
 
 # Initialize service
 async def get_modular_ai_service():
-    db = await get_database()
-    return ModularAIService(db)
+    return await service_registry.aget("modular_ai")
 
 @router.post("/install-plugin")
 async def install_ai_plugin(
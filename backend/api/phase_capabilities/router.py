@@ -7,31 +7,21 @@ from typing import Dict, List, Any, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
-from services.ecosystem_integration_service import EcosystemIntegrationService
-from services.edge_computing_service import EdgeComputingService
-from services.emerging_tech_service import EmergingTechService
-from services.modular_ai_service import ModularAIService
-from services.global_intelligence_service import GlobalIntelligenceService
-from database.connection import get_database
-from services.auth_service import AuthService
+from services.service_registry import service_registry
 from models.user import User
 
 router = APIRouter()
 security = HTTPBearer()
-auth_service = AuthService()
+auth_service = service_registry.get("auth")
 
 async def get_current_user(current_user: User = Depends(auth_service.get_current_user)):
     return current_user
 
 async def get_all_services():
-    """Initialize all advanced services"""
-    db = await get_database()
+    """Shared instances of all advanced services"""
     return {
-        "ecosystem": EcosystemIntegrationService(db),
-        "edge_computing": EdgeComputingService(),
-        "emerging_tech": EmergingTechService(),
-        "modular_ai": ModularAIService(db),
-        "global_intelligence": GlobalIntelligenceService(db)
+        name: await service_registry.aget(name)
+        for name in ("ecosystem", "edge_computing", "emerging_tech", "modular_ai", "global_intelligence")
     }
 
 @router.get("/complete-status")
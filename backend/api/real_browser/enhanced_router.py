@@ -100,7 +100,8 @@ async def get_enhanced_tab_info(tab_id: str):
                         'created_at': tab['created_at'],
                         'last_active': tab.get('last_active', tab['created_at']),
                         'is_pinned': tab.get('is_pinned', False),
-                        'group_id': tab.get('group_id')
+                        'group_id': tab.get('group_id'),
+                        'hibernated': enhanced_real_browser_service.hibernation.is_hibernated(tab_id)
                     }
                     break
             if result['success']:
@@ -148,26 +149,26 @@ async def enhanced_navigate_to_url(request: NavigateRequest):
 async def enhanced_tab_go_back(tab_id: str):
     """Navigate back in tab history with context tracking"""
     try:
-        if tab_id not in enhanced_real_browser_service.pages:
-            raise HTTPException(status_code=404, detail="Tab not found")
+        async with enhanced_real_browser_service.hibernation.lease(tab_id) as page:
+            if page is None:
+                raise HTTPException(status_code=404, detail="Tab not found")
             
-        page = enhanced_real_browser_service.pages[tab_id]
         
-        if await page.evaluate("() => window.history.length > 1"):
-            await page.go_back(wait_until='domcontentloaded')
+            if await page.evaluate("() => window.history.length > 1"):
+                await page.go_back(wait_until='domcontentloaded')
             
-            # Get updated info
-            url = page.url
-            title = await page.title()
+                # Get updated info
+                url = page.url
+                title = await page.title()
             
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'url': url,
-                'title': title
-            }
-        else:
-            return {'success': False, 'error': 'No history to go back to'}
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'url': url,
+                    'title': title
+                }
+            else:
+                return {'success': False, 'error': 'No history to go back to'}
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to go back: {str(e)}")
@@ -176,33 +177,33 @@ async def enhanced_tab_go_back(tab_id: str):
 async def enhanced_tab_go_forward(tab_id: str):
     """Navigate forward in tab history with context tracking"""
     try:
-        if tab_id not in enhanced_real_browser_service.pages:
-            raise HTTPException(status_code=404, detail="Tab not found")
+        async with enhanced_real_browser_service.hibernation.lease(tab_id) as page:
+            if page is None:
+                raise HTTPException(status_code=404, detail="Tab not found")
             
-        page = enhanced_real_browser_service.pages[tab_id]
         
-        # Check if we can go forward
-        can_go_forward = await page.evaluate("""
-            () => {
-                return window.history.length > 1 && window.history.state !== null;
-            }
-        """)
+            # Check if we can go forward
+            can_go_forward = await page.evaluate("""
+                () => {
+                    return window.history.length > 1 && window.history.state !== null;
+                }
+            """)
         
-        if can_go_forward:
-            await page.go_forward(wait_until='domcontentloaded')
+            if can_go_forward:
+                await page.go_forward(wait_until='domcontentloaded')
             
-            # Get updated info
-            url = page.url
-            title = await page.title()
+                # Get updated info
+                url = page.url
+                title = await page.title()
             
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'url': url,
-                'title': title
-            }
-        else:
-            return {'success': False, 'error': 'No forward history available'}
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'url': url,
+                    'title': title
+                }
+            else:
+                return {'success': False, 'error': 'No forward history available'}
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to go forward: {str(e)}")
@@ -211,25 +212,25 @@ async def enhanced_tab_go_forward(tab_id: str):
 async def enhanced_tab_reload(tab_id: str):
     """Reload a tab with fresh AI analysis"""
     try:
-        if tab_id not in enhanced_real_browser_service.pages:
-            raise HTTPException(status_code=404, detail="Tab not found")
+        async with enhanced_real_browser_service.hibernation.lease(tab_id) as page:
+            if page is None:
+                raise HTTPException(status_code=404, detail="Tab not found")
             
-        page = enhanced_real_browser_service.pages[tab_id]
-        await page.reload(wait_until='domcontentloaded')
+            await page.reload(wait_until='domcontentloaded')
         
-        # Get updated info
-        url = page.url
-        title = await page.title()
+            # Get updated info
+            url = page.url
+            title = await page.title()
         
-        # Trigger fresh AI analysis
-        asyncio.create_task(enhanced_real_browser_service._analyze_page_content(tab_id, url))
+            # Trigger fresh AI analysis
+            asyncio.create_task(enhanced_real_browser_service._analyze_page_content(tab_id, url))
         
-        return {
-            'success': True,
-            'tab_id': tab_id,
-            'url': url,
-            'title': title
-        }
+            return {
+                'success': True,
+                'tab_id': tab_id,
+                'url': url,
+                'title': title
+            }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to reload: {str(e)}")
 
@@ -256,29 +257,56 @@ async def take_enhanced_screenshot(tab_id: str, full_page: bool = False):
 async def analyze_tab_content(tab_id: str, request: AnalysisRequest):
     """Trigger AI analysis of tab content"""
     try:
-        if tab_id not in enhanced_real_browser_service.pages:
-            raise HTTPException(status_code=404, detail="Tab not found")
+        async with enhanced_real_browser_service.hibernation.lease(tab_id) as page:
+            if page is None:
+                raise HTTPException(status_code=404, detail="Tab not found")
         
-        page = enhanced_real_browser_service.pages[tab_id]
-        url = page.url
+            url = page.url
         
-        # Trigger analysis
-        analysis = await enhanced_real_browser_service._analyze_page_content(tab_id, url)
+            # Trigger analysis
+            analysis = await enhanced_real_browser_service._analyze_page_content(tab_id, url)
         
-        if analysis:
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'url': url,
-                'analysis': analysis,
-                'analysis_type': request.analysis_type
-            }
-        else:
-            return {'success': False, 'error': 'Analysis failed or not available'}
+            if analysis:
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'url': url,
+                    'analysis': analysis,
+                    'analysis_type': request.analysis_type
+                }
+            else:
+                return {'success': False, 'error': 'Analysis failed or not available'}
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to analyze content: {str(e)}")
 
+# Tab Hibernation
+@router.post("/tabs/{tab_id}/hibernate")
+async def hibernate_enhanced_tab(tab_id: str):
+    """Snapshot a tab and close its page; it is restored on next access"""
+    try:
+        snapshot = await enhanced_real_browser_service.hibernation.hibernate(tab_id)
+        if snapshot is None:
+            if enhanced_real_browser_service.hibernation.is_hibernated(tab_id):
+                return {'success': True, 'tab_id': tab_id, 'hibernated': True, 'message': 'Tab already hibernated'}
+            if enhanced_real_browser_service.hibernation.in_use(tab_id):
+                raise HTTPException(status_code=409, detail="Tab is in use")
+            raise HTTPException(status_code=404, detail="Tab not found")
+        
+        return {'success': True, 'hibernated': True, **snapshot.summary()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to hibernate tab: {str(e)}")
+
+@router.get("/hibernation")
+async def get_enhanced_hibernation_status():
+    """Get live and hibernated page counts and the hibernation policy"""
+    try:
+        return {'success': True, **enhanced_real_browser_service.hibernation.get_status()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get hibernation status: {str(e)}")
+
 # Enhanced Health and Status
 @router.get("/health")
 async def enhanced_browser_health():
@@ -404,31 +432,31 @@ async def get_enhanced_browser_capabilities():
 async def enhanced_evaluate_javascript(tab_id: str, request: dict):
     """Execute JavaScript with enhanced error handling and context"""
     try:
-        if tab_id not in enhanced_real_browser_service.pages:
-            raise HTTPException(status_code=404, detail="Tab not found")
+        async with enhanced_real_browser_service.hibernation.lease(tab_id) as page:
+            if page is None:
+                raise HTTPException(status_code=404, detail="Tab not found")
             
-        page = enhanced_real_browser_service.pages[tab_id]
-        script = request.get('script', 'document.title')
+            script = request.get('script', 'document.title')
         
-        try:
-            # Execute script with timeout
-            result = await page.evaluate(script)
+            try:
+                # Execute script with timeout
+                result = await page.evaluate(script)
             
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'script': script,
-                'result': result,
-                'type': type(result).__name__
-            }
-        except Exception as js_error:
-            return {
-                'success': False,
-                'tab_id': tab_id,
-                'script': script,
-                'error': str(js_error),
-                'error_type': 'javascript_execution_error'
-            }
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'script': script,
+                    'result': result,
+                    'type': type(result).__name__
+                }
+            except Exception as js_error:
+                return {
+                    'success': False,
+                    'tab_id': tab_id,
+                    'script': script,
+                    'error': str(js_error),
+                    'error_type': 'javascript_execution_error'
+                }
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to evaluate script: {str(e)}")
\ No newline at end of file
@@ -167,6 +167,37 @@ async def take_tab_screenshot(tab_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to take screenshot: {str(e)}")
 
 
+# Tab Hibernation
+@router.post("/tabs/{tab_id}/hibernate")
+async def hibernate_tab(tab_id: str):
+    """Snapshot a tab and close its page to free memory"""
+    try:
+        result = await real_browser_service.hibernate_tab(tab_id)
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to hibernate tab: {str(e)}")
+
+
+@router.post("/tabs/{tab_id}/restore")
+async def restore_tab(tab_id: str):
+    """Restore a hibernated tab"""
+    try:
+        result = await real_browser_service.restore_tab(tab_id)
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to restore tab: {str(e)}")
+
+
+@router.get("/hibernation")
+async def get_hibernation_status():
+    """Get live and hibernated page counts and the hibernation policy"""
+    try:
+        result = await real_browser_service.get_hibernation_status()
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get hibernation status: {str(e)}")
+
+
 # Health and Status
 @router.get("/health")
 async def browser_engine_health():
@@ -209,17 +240,17 @@ async def browser_engine_health():
 async def evaluate_javascript(tab_id: str, request: dict):
     """Execute JavaScript in a tab"""
     try:
-        if tab_id not in real_browser_service.pages:
-            raise HTTPException(status_code=404, detail="Tab not found")
+        async with real_browser_service.hibernation.lease(tab_id) as page:
+            if page is None:
+                raise HTTPException(status_code=404, detail="Tab not found")
             
-        page = real_browser_service.pages[tab_id]
-        result = await page.evaluate(request.get('script', 'document.title'))
+            result = await page.evaluate(request.get('script', 'document.title'))
         
-        return {
-            'success': True,
-            'tab_id': tab_id,
-            'result': result
-        }
+            return {
+                'success': True,
+                'tab_id': tab_id,
+                'result': result
+            }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to evaluate script: {str(e)}")
 
@@ -243,7 +274,8 @@ async def get_browser_capabilities():
             'cookie_management': True,
             'local_storage': True,
             'geolocation': True,
-            'file_uploads': True
+            'file_uploads': True,
+            'tab_hibernation': True
         },
         'features': [
             'Real Chromium-based browsing',
@@ -264,6 +296,7 @@ async def get_browser_capabilities():
             'content': '/api/real-browser/tabs/{id}/content',
             'screenshots': '/api/real-browser/tabs/{id}/screenshot',
             'javascript': '/api/real-browser/tabs/{id}/evaluate',
+            'hibernation': '/api/real-browser/hibernation',
             'health': '/api/real-browser/health'
         }
     }
\ No newline at end of file
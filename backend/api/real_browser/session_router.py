@@ -7,15 +7,14 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Dict, Any, Optional, List
 from models.user import User
-from services.auth_service import AuthService
-from services.browser_engine_service import BrowserEngineService
+from services.service_registry import service_registry
 from database.connection import get_database
 import uuid
 import time
 
 router = APIRouter()
-auth_service = AuthService()
-browser_service = BrowserEngineService()
+auth_service = service_registry.get("auth")
+browser_service = service_registry.lazy("browser_engine")
 
 # Request models
 class CreateSessionRequest(BaseModel):
@@ -7,7 +7,7 @@ from fastapi.security import HTTPBearer
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
-from services.template_automation_service import TemplateAutomationService
+from services.service_registry import service_registry
 
 router = APIRouter()
 security = HTTPBearer()
@@ -36,7 +36,7 @@ class TemplateIntentRequest(BaseModel):
     context: Optional[Dict] = Field(None, description="Additional context")
 
 # Initialize service
-automation_service = TemplateAutomationService()
+automation_service = service_registry.lazy("template_automation")
 
 @router.get("/template-library")
 async def get_template_library(
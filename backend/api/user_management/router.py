@@ -2,12 +2,12 @@ from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from models.user import User, UserCreate, UserUpdate, Token
-from services.auth_service import AuthService
+from services.service_registry import service_registry
 from database.connection import get_database
 
 router = APIRouter()
 security = HTTPBearer()
-auth_service = AuthService()
+auth_service = service_registry.get("auth")
 
 # Login request model
 class LoginRequest(BaseModel):
@@ -7,7 +7,7 @@ from fastapi.security import HTTPBearer
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
-from services.voice_actions_service import VoiceActionsService
+from services.service_registry import service_registry
 
 router = APIRouter()
 security = HTTPBearer()
@@ -34,7 +34,7 @@ class QuickActionExecutionRequest(BaseModel):
     parameters: Optional[Dict] = Field(None, description="Action parameters")
 
 # Initialize service
-voice_actions_service = VoiceActionsService()
+voice_actions_service = service_registry.lazy("voice_actions")
 
 @router.post("/process-voice-command")
 async def process_voice_command(
@@ -3,6 +3,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.server_api import ServerApi
 from urllib.parse import urlparse
 
+from database.indexes import ensure_indexes
+
 class Database:
     client: AsyncIOMotorClient = None
     database = None
@@ -49,6 +51,9 @@ async def connect_to_mongo():
         print(f"Successfully connected to MongoDB! Using database: {db_name}")
     except Exception as e:
         print(f"Error connecting to MongoDB: {e}")
+        return
+
+    await ensure_indexes(db.database)
 
 
 async def close_mongo_connection():
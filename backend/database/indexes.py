@@ -0,0 +1,63 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# Indexes for every collection the services query, keyed to their filters and sorts.
+COLLECTION_INDEXES = {
+    "sessions": [
+        IndexModel([("id", ASCENDING), ("user_id", ASCENDING)], name="session_owner"),
+        IndexModel([("user_id", ASCENDING), ("is_active", ASCENDING), ("updated_at", DESCENDING)], name="user_active_sessions"),
+        # Multikey index over the embedded tab array for tab moves and closes
+        IndexModel([("user_id", ASCENDING), ("tabs.id", ASCENDING)], name="user_tab_lookup"),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)], name="user_id"),
+        IndexModel([("email", ASCENDING)], name="user_email"),
+        IndexModel([("username", ASCENDING)], name="user_username"),
+    ],
+    "ai_tasks": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_recent_tasks"),
+        IndexModel([("user_id", ASCENDING), ("task_type", ASCENDING), ("created_at", DESCENDING)], name="user_tasks_by_type"),
+        IndexModel([("id", ASCENDING), ("user_id", ASCENDING)], name="task_owner"),
+    ],
+    "content_analysis": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_recent_analysis"),
+        IndexModel([("url", ASCENDING)], name="analysis_url"),
+    ],
+    "research_sessions": [
+        IndexModel([("id", ASCENDING), ("user_id", ASCENDING)], name="research_session_owner"),
+    ],
+    "automation_workflows": [
+        IndexModel([("id", ASCENDING), ("user_id", ASCENDING)], name="workflow_owner"),
+        IndexModel([("user_id", ASCENDING), ("is_active", ASCENDING), ("created_at", DESCENDING)], name="user_active_workflows"),
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING)], name="user_workflows_by_status"),
+    ],
+    "workflow_executions": [
+        IndexModel([("user_id", ASCENDING), ("executed_at", DESCENDING)], name="user_recent_workflow_executions"),
+    ],
+    "automation_executions": [
+        IndexModel([("user_id", ASCENDING), ("executed_at", DESCENDING)], name="user_recent_automation_executions"),
+    ],
+    "api_clients": [
+        IndexModel([("api_key", ASCENDING), ("status", ASCENDING)], name="api_client_key"),
+    ],
+    "api_usage": [
+        IndexModel([("api_key", ASCENDING), ("hour", ASCENDING)], name="api_usage_hour"),
+    ],
+    "integration_endpoints": [
+        IndexModel([("user_id", ASCENDING)], name="user_integrations"),
+    ],
+    "sync_history": [
+        IndexModel([("user_id", ASCENDING)], name="user_sync_history"),
+    ],
+}
+
+
+async def ensure_indexes(database):
+    """Create any missing indexes; existing ones with the same spec are a no-op"""
+    created = {}
+    for collection, indexes in COLLECTION_INDEXES.items():
+        try:
+            created[collection] = await database[collection].create_indexes(indexes)
+        except Exception as e:
+            print(f"⚠️ Index provisioning failed for {collection}: {e}")
+    print(f"✅ MongoDB indexes ensured for {len(created)}/{len(COLLECTION_INDEXES)} collections")
+    return created
@@ -5,7 +5,6 @@ Handles deployment optimization, caching, monitoring, and system efficiency
 
 import asyncio
 import json
-import psutil
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from fastapi import HTTPException
@@ -13,6 +12,9 @@ import logging
 from groq import Groq
 import os
 
+from services.system_metrics_sampler import system_metrics_sampler
+from services.service_registry import service_registry
+
 logger = logging.getLogger(__name__)
 
 class DeploymentOptimizationService:
@@ -92,8 +94,8 @@ class DeploymentOptimizationService:
             
             ai_caching_strategy = await self._get_groq_response(caching_prompt)
             
-            # Implement intelligent caching optimizations
-            caching_results = await self.cache_manager.implement_intelligent_caching(ai_caching_strategy, cache_analytics)
+            # Apply requested budget changes and invalidations to the response cache
+            caching_results = await self.cache_manager.implement_intelligent_caching(ai_caching_strategy, cache_analytics, cache_context)
             
             return {
                 "status": "success",
@@ -102,17 +104,12 @@ class DeploymentOptimizationService:
                     "cache_analytics": cache_analytics,
                     "ai_caching_strategy": ai_caching_strategy,
                     "caching_optimizations": caching_results,
-                    "cache_performance": {
-                        "hit_rate_improvement": caching_results.get("hit_rate_improvement", 0.34),
-                        "response_time_reduction": caching_results.get("response_time_reduction", 0.28),
-                        "memory_efficiency_gain": caching_results.get("memory_efficiency", 0.22),
-                        "overall_cache_effectiveness": caching_results.get("effectiveness", 0.89)
-                    },
+                    "cache_performance": caching_results["cache_performance"],
                     "intelligent_features": {
-                        "predictive_caching": True,
-                        "adaptive_cache_sizing": True,
-                        "multi_layer_caching": True,
-                        "ai_cache_invalidation": True
+                        "lru_eviction": True,
+                        "ttl_expiry": True,
+                        "namespace_byte_budgets": True,
+                        "single_flight_loading": True
                     },
                     "timestamp": datetime.now().isoformat()
                 }
@@ -288,34 +285,54 @@ class DeploymentOptimizationService:
         }
 
 class IntelligentCacheManager:
-    """Advanced cache management with AI optimization"""
+    """Analytics and tuning over the shared response cache (PerformanceService.performance_cache)"""
+    
+    @staticmethod
+    def _performance_service():
+        return service_registry.get("performance")
     
     async def analyze_cache_performance(self, cache_context: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze current cache performance"""
+        stats = self._performance_service().get_cache_stats()
+        namespaces = stats["namespaces"]
+        budget = sum(namespace["max_bytes"] for namespace in namespaces.values())
+        lookups = stats["hits"] + stats["misses"]
         return {
-            "current_hit_rate": 0.68,
-            "cache_size": "2.4GB",
-            "cache_utilization": 0.73,
-            "most_cached_items": ["api_responses", "ai_results", "user_data"],
+            "current_hit_rate": stats["hit_rate"],
+            "cache_size_bytes": stats["bytes"],
+            "cache_utilization": round(stats["bytes"] / budget, 3) if budget else 0.0,
+            "entries": stats["entries"],
+            "most_cached_items": sorted(namespaces, key=lambda name: -namespaces[name]["entries"]),
             "cache_misses_analysis": {
-                "total_misses": 1247,
-                "miss_rate": 0.32,
-                "common_miss_patterns": ["new_user_requests", "dynamic_content", "first_time_queries"]
+                "total_misses": stats["misses"],
+                "miss_rate": round(stats["misses"] / lookups, 3) if lookups else 0.0,
+                "lowest_hit_rate_namespaces": sorted(namespaces, key=lambda name: namespaces[name]["hit_rate"])[:3]
             },
-            "optimization_opportunities": 0.35
+            "evictions": stats["evictions"],
+            "expired": stats["expired"],
+            "coalesced_loads": stats["coalesced_loads"],
+            "namespaces": namespaces
         }
     
-    async def implement_intelligent_caching(self, ai_strategy: str, cache_analytics: Dict[str, Any]) -> Dict[str, Any]:
-        """Implement intelligent caching optimizations"""
+    async def implement_intelligent_caching(self, ai_strategy: str, cache_analytics: Dict[str, Any],
+                                            cache_context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Apply `namespace_budgets_mb`, `invalidate` and `ttl_seconds` from the request to the response cache"""
+        cache_context = cache_context or {}
+        performance_service = self._performance_service()
+        applied = performance_service.configure_cache(cache_context.get("namespace_budgets_mb"),
+                                                      cache_context.get("invalidate"),
+                                                      cache_context.get("ttl_seconds"))
+        stats = performance_service.get_cache_stats()
         return {
-            "hit_rate_improvement": 0.34,
-            "response_time_reduction": 0.28,
-            "memory_efficiency": 0.22,
-            "effectiveness": 0.89,
-            "implemented_strategies": [
-                "predictive_caching", "adaptive_sizing", "multi_layer_cache",
-                "ai_invalidation", "behavioral_prediction"
-            ]
+            **applied,
+            "cache_performance": {
+                "hit_rate": stats["hit_rate"],
+                "bytes_used": stats["bytes"],
+                "entries": stats["entries"],
+                "evictions": stats["evictions"],
+                "coalesced_loads": stats["coalesced_loads"]
+            },
+            "implemented_strategies": ["lru_eviction", "ttl_expiry", "namespace_byte_budgets", "single_flight_loading"]
         }
 
 class SystemMonitoringEngine:
@@ -324,21 +341,22 @@ class SystemMonitoringEngine:
     async def collect_performance_metrics(self) -> Dict[str, Any]:
         """Collect real-time performance metrics"""
         try:
-            # Get actual system metrics where possible
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
+            # Get actual system metrics from the background sampler
+            sample = system_metrics_sampler.snapshot()
+            cpu_percent = sample["cpu_percent"]
+            memory_percent = sample["memory_percent"]
+            disk_percent = sample["disk_percent"]
             
             return {
                 "cpu_usage": cpu_percent / 100,
-                "memory_usage": memory.percent / 100,
-                "disk_usage": disk.percent / 100,
-                "health_score": max(0, 1 - (cpu_percent + memory.percent + disk.percent) / 300),
+                "memory_usage": memory_percent / 100,
+                "disk_usage": disk_percent / 100,
+                "health_score": max(0, 1 - (cpu_percent + memory_percent + disk_percent) / 300),
                 "cpu_efficiency": max(0, 1 - cpu_percent / 100),
-                "memory_optimization": max(0, 1 - memory.percent / 100),
+                "memory_optimization": max(0, 1 - memory_percent / 100),
                 "network_performance": 0.91,  # Simulated network performance
-                "active_processes": len(psutil.pids()),
-                "uptime": psutil.boot_time()
+                "active_processes": sample["process_count"],
+                "uptime": system_metrics_sampler.boot_time
             }
         except Exception as e:
             logger.error(f"Error collecting system metrics: {e}")
@@ -37,6 +37,11 @@ class BrowserSession(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     is_active: bool = True
 
+class TabPositionUpdate(BaseModel):
+    tab_id: str
+    x: float
+    y: float
+
 class SessionUpdate(BaseModel):
     name: Optional[str] = None
     active_tab_id: Optional[str] = None
@@ -1,8 +1,9 @@
 from fastapi import FastAPI, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 import uvicorn
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
@@ -10,97 +11,50 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Import existing routers
-from api.ai_agents.enhanced_router import router as ai_router
-from api.ai_agents.hybrid_router import router as hybrid_router
-from api.browser.router import router as browser_router
-
-# Import new fixed routers
-from api.browser.health_router import router as browser_health_router
-from api.ai_agents.enhanced_chat_router import router as enhanced_chat_router
-from api.user_management.enhanced_router import router as enhanced_user_router
-from api.automation.router import router as automation_router
-from api.user_management.router import router as user_router
-
-# Import new enhanced routers
-from api.browser.enhanced_router import router as enhanced_browser_router
-from api.hybrid_browser.router import router as hybrid_browser_router
-
-# Import real browser router
-from api.real_browser.router import router as real_browser_router
-from api.real_browser.enhanced_router import router as enhanced_real_browser_router
-
-# Import new routers for Phase 2 & 3 completion
-try:
-    from api.reliability.router import router as reliability_router
-    print("✅ Enhanced Reliability router imported successfully")
-except Exception as e:
-    print(f"⚠️ Enhanced Reliability router not available: {e}")
-    reliability_router = None
-
-try:
-    from api.mobile_optimization.router import router as mobile_optimization_router
-    print("✅ Mobile Optimization router imported successfully")
-except Exception as e:
-    print(f"⚠️ Mobile Optimization router not available: {e}")
-    mobile_optimization_router = None
-
-# Import missing routers that frontend needs
-# Temporarily disable problematic routers to get core system working
-try:
-    from api.advanced_navigation.router import router as advanced_navigation_router
-except Exception as e:
-    print(f"⚠️ Advanced navigation router not available: {e}")
-    advanced_navigation_router = None
-try:
-    from api.cross_site_intelligence.router import router as cross_site_intelligence_router
-except Exception as e:
-    print(f"⚠️ Cross site intelligence router not available: {e}")
-    cross_site_intelligence_router = None
-try:
-    from api.enhanced_performance.router import router as enhanced_performance_router
-except Exception as e:
-    print(f"⚠️ Enhanced performance router not available: {e}")
-    enhanced_performance_router = None
-try:
-    from api.template_automation.router import router as template_automation_router
-except Exception as e:
-    print(f"⚠️ Template automation router not available: {e}")
-    template_automation_router = None
-try:
-    from api.voice_actions.router import router as voice_actions_router
-except Exception as e:
-    print(f"⚠️ Voice actions router not available: {e}")
-    voice_actions_router = None
-try:
-    from api.enhanced_features.router import router as enhanced_features_router
-except Exception as e:
-    print(f"⚠️ Enhanced features router not available: {e}")
-    enhanced_features_router = None
-try:
-    from api.comprehensive_features.router import router as comprehensive_features_router
-    print("✅ Comprehensive features router imported successfully")
-except Exception as e:
-    print(f"⚠️ Comprehensive features router not available: {e}")
-    comprehensive_features_router = None
-try:
-    from api.ecosystem.router import router as ecosystem_router
-except Exception as e:
-    print(f"⚠️ Ecosystem router not available: {e}")
-    ecosystem_router = None
-
-# Import services
-from services.enhanced_ai_orchestrator import EnhancedAIOrchestratorService
-from services.browser_engine_service import BrowserEngineService
-from services.app_simplicity_service import AppSimplicityService
-from services.ui_enhancement_service import UIEnhancementService
-from services.performance_service import PerformanceService
-
-# Import new parallel enhancement services
-from hybrid_browser_service import HybridBrowserService
-from enhanced_features_service import EnhancedFeaturesService  
-from deployment_optimization_service import DeploymentOptimizationService
-from enhanced_comprehensive_features_service import EnhancedComprehensiveFeaturesService
+# Routers, in inclusion order: (module, prefix, tags). Each module is imported
+# through the service registry so its import time shows up in the startup
+# report; services behind the routers are built lazily on first use.
+ROUTERS = [
+    ("api.ai_agents.enhanced_router", "/api/ai/enhanced", ["AI Enhanced"]),
+    ("api.ai_agents.enhanced_chat_router", "/api/ai/enhanced", ["AI Enhanced Chat"]),
+    ("api.ai_agents.hybrid_router", "/api/ai/hybrid", ["Hybrid AI"]),
+    ("api.browser.router", "/api/browser", ["Browser Core"]),
+    ("api.browser.health_router", "/api/browser", ["Browser Health"]),
+    ("api.user_management.enhanced_router", "/api/users/enhanced", ["Enhanced User Management"]),
+    ("api.browser.enhanced_router", "/api/browser/enhanced", ["Browser Enhanced"]),
+    ("api.hybrid_browser.router", "/api/hybrid-browser", ["Hybrid Browser"]),
+    ("api.real_browser.router", "/api/real-browser", ["Real Browser Engine"]),
+    ("api.real_browser.session_router", "/api/real-browser", ["Browser Sessions"]),
+    ("api.real_browser.enhanced_router", "/api/real-browser/enhanced", ["Enhanced Real Browser"]),
+    ("api.automation.router", "/api/automation", ["Automation"]),
+    ("api.user_management.router", "/api/users", ["User Management"]),
+    ("api.minimal_browser.router", "/api/minimal-browser", ["Minimal Browser"]),
+    ("api.advanced_navigation.router", "/api/advanced-navigation", ["Advanced Navigation"]),
+    ("api.cross_site_intelligence.router", "/api/cross-site-intelligence", ["Cross Site Intelligence"]),
+    ("api.enhanced_performance.router", "/api/enhanced-performance", ["Enhanced Performance"]),
+    ("api.template_automation.router", "/api/template-automation", ["Template Automation"]),
+    ("api.voice_actions.router", "/api/voice-actions", ["Voice Actions"]),
+    ("api.enhanced_features.router", "/api/enhanced-features", ["Enhanced Features"]),
+    ("api.comprehensive_features.router", "/api/comprehensive-features", ["Comprehensive Features"]),
+    ("api.comprehensive_features.fixed_router", "/api/comprehensive-features-fixed", ["Fixed Comprehensive Features"]),
+    ("api.ecosystem.router", "/api/ecosystem", ["Ecosystem Integration"]),
+    ("api.reliability.router", "/api/reliability", ["Enhanced Reliability"]),
+    ("api.mobile_optimization.router", "/api/mobile-optimization", ["Mobile Optimization"]),
+]
+
+# Services
+from services.service_registry import service_registry
+from services.request_metrics import (
+    RequestMetricsMiddleware, request_metrics, instrument_httpx, instrument_pymongo
+)
+from services.loop_monitor import loop_monitor
+from services.system_metrics_sampler import system_metrics_sampler
+from services.model_router import model_router
+from services.structured_output import structured_output
+
+# Time outbound LLM/fetch calls and Mongo commands (before any client exists)
+instrument_httpx()
+instrument_pymongo()
 
 # Database
 from database.connection import get_database, connect_to_mongo, close_mongo_connection
@@ -117,6 +71,9 @@ async def lifespan(app: FastAPI):
         print("✅ Database connection established")
     except Exception as e:
         print(f"❌ Database connection failed: {e}")
+
+    # Build shared services once per process and start their background work
+    await service_registry.startup()
     
     print("✅ ALL 3 PHASES IMPLEMENTED IN PARALLEL:")
     print("")
@@ -148,6 +105,7 @@ async def lifespan(app: FastAPI):
     yield
     # Shutdown
     print("👋 AI Hybrid Browser shutting down...")
+    await service_registry.shutdown()
     await close_mongo_connection()
 
 
@@ -200,6 +158,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, payload and upstream-time metrics (outermost middleware)
+app.add_middleware(RequestMetricsMiddleware)
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -296,169 +257,70 @@ async def api_health():
             }
         )
 
-# Note: Router imports are handled in try-except blocks above to avoid import errors
-
-# Include all routers with proper prefixes - with safety checks
-try:
-    app.include_router(ai_router, prefix="/api/ai/enhanced", tags=["AI Enhanced"])
-    print("✅ AI router included")
-except Exception as e:
-    print(f"❌ AI router failed: {e}")
-
-# Add missing AI chat endpoints
-try:
-    from api.ai_agents.enhanced_chat_router import router as ai_chat_router
-    app.include_router(ai_chat_router, prefix="/api/ai/enhanced", tags=["AI Enhanced Chat"])
-    print("✅ AI Chat router included")
-except Exception as e:
-    print(f"❌ AI Chat router failed: {e}")
-
-try:
-    app.include_router(hybrid_router, prefix="/api/ai/hybrid", tags=["Hybrid AI"])
-    print("✅ Hybrid AI router included")
-except Exception as e:
-    print(f"❌ Hybrid AI router failed: {e}")
-
-try:
-    app.include_router(browser_router, prefix="/api/browser", tags=["Browser Core"])
-    print("✅ Browser router included")
-except Exception as e:
-    print(f"❌ Browser router failed: {e}")
-
-# Add missing browser health endpoints
-try:
-    app.include_router(browser_health_router, prefix="/api/browser", tags=["Browser Health"])
-    print("✅ Browser health router included")
-except Exception as e:
-    print(f"❌ Browser health router failed: {e}")
-
-# Add enhanced AI chat endpoints  
-try:
-    app.include_router(enhanced_chat_router, prefix="/api/ai/enhanced", tags=["Enhanced AI Chat"])
-    print("✅ Enhanced AI chat router included")
-except Exception as e:
-    print(f"❌ Enhanced AI chat router failed: {e}")
-
-# Add enhanced user management endpoints
-try:
-    app.include_router(enhanced_user_router, prefix="/api/users/enhanced", tags=["Enhanced User Management"])
-    print("✅ Enhanced user management router included")
-except Exception as e:
-    print(f"❌ Enhanced user management router failed: {e}")
-
-try:
-    app.include_router(enhanced_browser_router, prefix="/api/browser/enhanced", tags=["Browser Enhanced"])
-    print("✅ Enhanced browser router included")
-except Exception as e:
-    print(f"❌ Enhanced browser router failed: {e}")
-
-try:
-    app.include_router(hybrid_browser_router, prefix="/api/hybrid-browser", tags=["Hybrid Browser"])
-    print("✅ Hybrid browser router included")
-except Exception as e:
-    print(f"❌ Hybrid browser router failed: {e}")
-
-try:
-    app.include_router(real_browser_router, prefix="/api/real-browser", tags=["Real Browser Engine"])
-    print("✅ Real browser router included")
-except Exception as e:
-    print(f"❌ Real browser router failed: {e}")
-
-# Add missing browser session management endpoints  
-try:
-    from api.real_browser.session_router import router as session_router
-    app.include_router(session_router, prefix="/api/real-browser", tags=["Browser Sessions"])
-    print("✅ Browser session router included")
-except Exception as e:
-    print(f"❌ Browser session router failed: {e}")
-
-try:
-    app.include_router(enhanced_real_browser_router, prefix="/api/real-browser/enhanced", tags=["Enhanced Real Browser"])
-    print("✅ Enhanced real browser router included")
-except Exception as e:
-    print(f"❌ Enhanced real browser router failed: {e}")
-
-try:
-    app.include_router(automation_router, prefix="/api/automation", tags=["Automation"])
-    print("✅ Automation router included")
-except Exception as e:
-    print(f"❌ Automation router failed: {e}")
-
-try:
-    app.include_router(user_router, prefix="/api/users", tags=["User Management"])
-    print("✅ User management router included")
-except Exception as e:
-    print(f"❌ User management router failed: {e}")
-
-# Add enhanced user management endpoints
-try:
-    app.include_router(enhanced_user_router, prefix="/api/users/enhanced", tags=["Enhanced User Management"])
-    print("✅ Enhanced user management router included")
-except Exception as e:
-    print(f"❌ Enhanced user management router failed: {e}")
-
-# Include Minimal Browser Router - Fellou.ai Style
-try:
-    from api.minimal_browser.router import router as minimal_browser_router
-    app.include_router(minimal_browser_router, prefix="/api/minimal-browser", tags=["Minimal Browser"])
-    print("✅ Minimal Browser router included - Fellou.ai Style")
-except Exception as e:
-    print(f"❌ Minimal Browser router failed: {e}")
-
-# Include missing routers that frontend is trying to access (if available)
-if advanced_navigation_router:
-    app.include_router(advanced_navigation_router, prefix="/api/advanced-navigation", tags=["Advanced Navigation"])
-if cross_site_intelligence_router:
-    app.include_router(cross_site_intelligence_router, prefix="/api/cross-site-intelligence", tags=["Cross Site Intelligence"])
-if enhanced_performance_router:
-    app.include_router(enhanced_performance_router, prefix="/api/enhanced-performance", tags=["Enhanced Performance"])
-if template_automation_router:
-    app.include_router(template_automation_router, prefix="/api/template-automation", tags=["Template Automation"])
-if voice_actions_router:
-    app.include_router(voice_actions_router, prefix="/api/voice-actions", tags=["Voice Actions"])
-if enhanced_features_router:
-    app.include_router(enhanced_features_router, prefix="/api/enhanced-features", tags=["Enhanced Features"])
-if comprehensive_features_router:
-    try:
-        app.include_router(comprehensive_features_router, prefix="/api/comprehensive-features", tags=["Comprehensive Features"])
-        print("✅ Comprehensive features router included")
-    except Exception as e:
-        print(f"❌ Comprehensive features router inclusion failed: {e}")
-
-# Add fixed comprehensive features router for HTTP 405 issues
-try:
-    from api.comprehensive_features.fixed_router import router as fixed_features_router
-    app.include_router(fixed_features_router, prefix="/api/comprehensive-features-fixed", tags=["Fixed Comprehensive Features"])
-    print("✅ Fixed comprehensive features router included")
-except Exception as e:
-    print(f"❌ Fixed comprehensive features router failed: {e}")
-if ecosystem_router:
-    app.include_router(ecosystem_router, prefix="/api/ecosystem", tags=["Ecosystem Integration"])
-
-# Include new Phase 2 & 3 completion routers
-if reliability_router:
-    try:
-        app.include_router(reliability_router, prefix="/api/reliability", tags=["Enhanced Reliability"])
-        print("✅ Enhanced Reliability router included")
-    except Exception as e:
-        print(f"❌ Enhanced Reliability router inclusion failed: {e}")
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(request_metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
 
-if mobile_optimization_router:
+@app.get("/api/performance/latency")
+async def latency_metrics(limit: int = 50):
+    """Measured per-route latency percentiles, payload sizes and upstream time"""
+    return {"success": True, **request_metrics.summary(limit)}
+
+@app.get("/api/performance/system")
+async def system_metrics(window: int = 60):
+    """Latest background system sample plus aggregates over the last `window` seconds"""
+    return {
+        "success": True,
+        "snapshot": system_metrics_sampler.snapshot(),
+        "window": system_metrics_sampler.window(window),
+        "sampler": system_metrics_sampler.get_stats()
+    }
+
+@app.get("/api/performance/model-routing")
+async def model_routing_metrics(limit: int = 50):
+    """Per-model and per-task routing outcomes, latency, structured-output repairs and retries, and the most recent routing decisions"""
+    # The decision log is SQLite: read it in a worker thread (recent_decisions caps the limit)
+    recent_decisions = await asyncio.to_thread(model_router.recent_decisions, limit)
+    return {"success": True, **model_router.get_stats(), "structured_output": structured_output.get_stats(),
+            "recent_decisions": recent_decisions}
+
+@app.get("/api/debug/event-loop")
+async def event_loop_report(limit: int = 20):
+    """Event loop lag and blocking-call stalls (diagnostic mode, see LOOP_MONITOR)"""
+    return {"success": True, **loop_monitor.get_report(limit)}
+
+@app.post("/api/debug/event-loop")
+async def toggle_event_loop_monitor(enabled: bool = True):
+    """Turn the event loop stall detector on or off at runtime"""
+    await loop_monitor.set_enabled(enabled)
+    return {"success": True, "enabled": loop_monitor.enabled}
+
+@app.get("/api/system/startup")
+async def startup_report():
+    """Router import times and lazily built service init times"""
+    return {"success": True, **service_registry.get_report()}
+
+# Include all routers - a router that fails to import is skipped, not fatal
+for module_path, prefix, tags in ROUTERS:
     try:
-        app.include_router(mobile_optimization_router, prefix="/api/mobile-optimization", tags=["Mobile Optimization"])
-        print("✅ Mobile Optimization router included")
+        module = service_registry.timed_import(module_path)
+        app.include_router(module.router, prefix=prefix, tags=tags)
+        print(f"✅ {tags[0]} router included ({service_registry.imports.get(module_path, {}).get('import_ms', 0)}ms)")
     except Exception as e:
-        print(f"❌ Mobile Optimization router inclusion failed: {e}")
+        print(f"❌ {tags[0]} router failed: {e}")
 
 # ====================================
 # NEW PARALLEL ENHANCEMENT ENDPOINTS
 # ====================================
 
-# Initialize new enhancement services
-hybrid_browser_service = HybridBrowserService()
-enhanced_features_service = EnhancedFeaturesService()
-deployment_optimization_service = DeploymentOptimizationService()
-enhanced_comprehensive_service = EnhancedComprehensiveFeaturesService()
+# Enhancement services, built on first request
+hybrid_browser_service = service_registry.lazy("hybrid_browser")
+enhanced_features_service = service_registry.lazy("enhanced_features")
+deployment_optimization_service = service_registry.lazy("deployment_optimization")
+performance_service = service_registry.lazy("performance")
+enhanced_comprehensive_service = service_registry.lazy("enhanced_comprehensive_features")
+auth_service = service_registry.lazy("auth")
 
 # Area A: Hybrid Browser Capabilities (4 missing endpoints)
 @app.post("/api/hybrid-browser/agentic-memory")
@@ -595,11 +457,23 @@ async def system_performance_metrics():
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
 
+@app.get("/api/optimization/intelligent-caching")
+async def intelligent_caching_stats():
+    """Response cache entries, bytes, budgets and hit/miss/eviction counts per namespace"""
+    return {"success": True, **performance_service.get_cache_stats()}
+
 @app.post("/api/optimization/intelligent-caching")
-async def intelligent_caching_system(request: Request):
-    """Intelligent Caching System - Advanced caching strategies with AI optimization"""
+async def intelligent_caching_system(request: Request, current_user=Depends(auth_service.get_current_admin)):
+    """Intelligent Caching System - resize namespace budgets, invalidate namespaces and set the TTL (admin only)"""
     try:
         body = await request.json()
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        performance_service.validate_cache_config(body.get("namespace_budgets_mb"), body.get("invalidate"),
+                                                  body.get("ttl_seconds"))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    try:
         result = await deployment_optimization_service.get_intelligent_caching_system(body)
         return JSONResponse(content=result)
     except Exception as e:
@@ -682,17 +556,26 @@ async def memory_leak_prevention(request: Request):
 async def advanced_system_health_monitoring():
     """Advanced System Health Monitoring with Predictive Analytics"""
     try:
+        measured = request_metrics.summary(limit=5)
+        sample = system_metrics_sampler.snapshot()
+
         # Comprehensive system health monitoring
         health_monitoring = {
             "status": "success",
             "monitoring_scope": "comprehensive_system_wide",
             "real_time_metrics": {
-                "cpu_utilization": "23.5%",
-                "memory_usage": "67.2%",
-                "disk_io": "145 MB/s read, 89 MB/s write",
-                "network_throughput": "2.3 Gbps",
-                "active_connections": 1247,
-                "error_rate": "0.02%"
+                "cpu_utilization": f"{sample['cpu_percent']:.1f}%",
+                "memory_usage": f"{sample['memory_percent']:.1f}%",
+                "disk_io": f"{sample['disk_read_bytes_per_sec'] / 1e6:.1f} MB/s read, "
+                           f"{sample['disk_write_bytes_per_sec'] / 1e6:.1f} MB/s write",
+                "network_throughput": f"{(sample['net_sent_bytes_per_sec'] + sample['net_recv_bytes_per_sec']) * 8 / 1e6:.2f} Mbps",
+                "active_connections": measured["in_flight"],
+                "error_rate": f"{measured['error_rate'] * 100:.2f}%"
+            },
+            "request_latency": {
+                "requests": measured["requests"],
+                "slowest_routes": measured["routes"],
+                "upstream_ms": measured["upstream_ms"]
             },
             "predictive_analytics": {
                 "cpu_trend": "Stable with 15% headroom",
@@ -945,8 +828,7 @@ async def browser_tabs_smart_organization(request: Request):
         body = await request.json()
         
         # Use advanced navigation service for smart tab organization
-        from services.advanced_navigation_service import AdvancedNavigationService
-        navigation_service = AdvancedNavigationService()
+        navigation_service = service_registry.get("advanced_navigation")
         
         result = await navigation_service.smart_tab_organization(
             body.get("tabs_data", []),
@@ -965,8 +847,7 @@ async def browser_tabs_relationship_analysis(
 ):
     """Analyze relationships and connections between browser tabs"""
     try:
-        from services.advanced_navigation_service import AdvancedNavigationService
-        navigation_service = AdvancedNavigationService()
+        navigation_service = service_registry.get("advanced_navigation")
         
         tab_id_list = tab_ids.split(",") if tab_ids else []
         result = await navigation_service.tab_relationship_analysis(tab_id_list, include_content)
@@ -982,8 +863,7 @@ async def browser_tabs_intelligent_suspend(request: Request):
     try:
         body = await request.json()
         
-        from services.advanced_navigation_service import AdvancedNavigationService
-        navigation_service = AdvancedNavigationService()
+        navigation_service = service_registry.get("advanced_navigation")
         
         result = await navigation_service.intelligent_tab_suspend(
             body.get("tab_criteria", {}),
@@ -1001,8 +881,7 @@ async def browser_bookmarks_smart_categorize(request: Request):
     try:
         body = await request.json()
         
-        from services.cross_site_intelligence_service import CrossSiteIntelligenceService
-        intelligence_service = CrossSiteIntelligenceService()
+        intelligence_service = service_registry.get("cross_site_intelligence")
         
         result = await intelligence_service.smart_bookmark_categorize(
             body.get("bookmarks", []),
@@ -1021,8 +900,7 @@ async def browser_bookmarks_duplicate_analysis(
 ):
     """Analyze bookmark collection for duplicates and similar entries"""
     try:
-        from services.cross_site_intelligence_service import CrossSiteIntelligenceService
-        intelligence_service = CrossSiteIntelligenceService()
+        intelligence_service = service_registry.get("cross_site_intelligence")
         
         result = await intelligence_service.bookmark_duplicate_analysis(collection_id, similarity_threshold)
         
@@ -1037,8 +915,7 @@ async def browser_bookmarks_content_tagging(request: Request):
     try:
         body = await request.json()
         
-        from services.cross_site_intelligence_service import CrossSiteIntelligenceService
-        intelligence_service = CrossSiteIntelligenceService()
+        intelligence_service = service_registry.get("cross_site_intelligence")
         
         result = await intelligence_service.bookmark_content_tagging(
             body.get("bookmark_data", {}),
@@ -1139,8 +1016,7 @@ async def optimize_mobile_performance(request: Request):
     try:
         body = await request.json()
         
-        from services.mobile_optimization_service import MobileOptimizationService
-        mobile_service = MobileOptimizationService()
+        mobile_service = service_registry.get("mobile_optimization")
         
         result = await mobile_service.optimize_mobile_performance(body)
         
@@ -1155,8 +1031,7 @@ async def enhance_touch_gestures(request: Request):
     try:
         body = await request.json()
         
-        from services.mobile_optimization_service import MobileOptimizationService
-        mobile_service = MobileOptimizationService()
+        mobile_service = service_registry.get("mobile_optimization")
         
         result = await mobile_service.enhance_touch_gestures(body)
         
@@ -1171,8 +1046,7 @@ async def implement_offline_capabilities(request: Request):
     try:
         body = await request.json()
         
-        from services.mobile_optimization_service import MobileOptimizationService
-        mobile_service = MobileOptimizationService()
+        mobile_service = service_registry.get("mobile_optimization")
         
         result = await mobile_service.implement_offline_capabilities(body)
         
@@ -1382,11 +1256,9 @@ async def get_api_documentation():
 async def get_enhanced_status():
     """Get comprehensive status of all enhancements"""
     try:
-        # Initialize services to check status
-        browser_engine = BrowserEngineService()
-        simplicity_service = AppSimplicityService()
-        ui_service = UIEnhancementService() 
-        performance_service = PerformanceService()
+        # Resolve services to check status
+        for name in ("browser_engine", "app_simplicity", "ui_enhancement", "performance"):
+            service_registry.get(name)
         
         return {
             "success": True,
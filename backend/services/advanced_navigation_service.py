@@ -12,6 +12,7 @@ import aiohttp
 from urllib.parse import urlparse, urljoin
 from groq import AsyncGroq
 from services.content_analyzer import ContentAnalyzer
+from services.intent_engine import intent_engine
 
 class AdvancedNavigationService:
     def __init__(self):
@@ -27,6 +28,11 @@ class AdvancedNavigationService:
             "business": ["business", "company", "corporate", "enterprise"],
             "technology": ["tech", "software", "hardware", "digital", "ai"]
         }
+        intent_engine.register_domain(
+            "navigation",
+            {category: {"keywords": keywords} for category, keywords in self.search_patterns.items()},
+            default="general"
+        )
         
     async def natural_language_navigation(self, query: str, user_context: Dict = None) -> Dict:
         """
@@ -62,6 +68,19 @@ class AdvancedNavigationService:
     
     async def _analyze_navigation_intent(self, query: str) -> Dict:
         """Analyze user intent from natural language query"""
+        # Most queries name their category outright; only ask the LLM when the local classifier is unsure
+        match = intent_engine.classify("navigation", query)
+        if intent_engine.is_confident(match):
+            return {
+                "raw_analysis": "Local intent classifier",
+                "intent": match.intent,
+                "topics": self._extract_topics(query, ""),
+                "search_terms": self._generate_search_terms(query, ""),
+                "confidence": match.confidence,
+                "source": match.source,
+                "timestamp": datetime.now().isoformat()
+            }
+        
         try:
             prompt = f"""
             Analyze this navigation query and extract key information:
@@ -162,11 +181,7 @@ class AdvancedNavigationService:
     
     def _extract_intent_category(self, query: str) -> str:
         """Extract intent category using pattern matching"""
-        query_lower = query.lower()
-        for category, patterns in self.search_patterns.items():
-            if any(pattern in query_lower for pattern in patterns):
-                return category
-        return "general"
+        return intent_engine.classify("navigation", query).intent
     
     def _extract_topics(self, query: str, ai_analysis: str) -> List[str]:
         """Extract key topics from query and AI analysis"""
@@ -14,6 +14,9 @@ import logging
 from urllib.parse import urlparse, urljoin
 import hashlib
 
+from services.intent_engine import intent_engine
+from services.tab_hibernation import find_manager
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -45,6 +48,15 @@ class AdvancedTabNavigationService:
         self.navigation_patterns = {}
         self.workspace_bounds = {"x": 1000, "y": 800, "z": 500}
         self.intent_patterns = self._initialize_intent_patterns()
+        intent_engine.register_domain(
+            "tab_navigation",
+            {
+                intent_type: {"patterns": info["patterns"], "keywords": info.get("keywords", []), "confidence": info["confidence_boost"]}
+                for intent_type, info in self.intent_patterns.items()
+            },
+            default="search",
+            default_confidence=0.5
+        )
         
         logger.info("✅ Advanced Tab Management & Navigation Service initialized")
     
@@ -338,33 +350,11 @@ class AdvancedTabNavigationService:
     
     async def _parse_navigation_intent(self, query: str) -> NavigationIntent:
         """Parse natural language query to determine navigation intent"""
-        query_lower = query.lower().strip()
-        best_intent = "search"
-        best_confidence = 0.5
-        extracted_terms = []
-        reasoning = "Default search intent"
-        
-        # Check each intent pattern
-        for intent_type, intent_info in self.intent_patterns.items():
-            for pattern in intent_info["patterns"]:
-                match = re.search(pattern, query_lower)
-                if match:
-                    confidence = intent_info["confidence_boost"]
-                    if confidence > best_confidence:
-                        best_intent = intent_type
-                        best_confidence = confidence
-                        extracted_terms = [match.group(1)] if match.groups() else [query]
-                        reasoning = f"Matched pattern: {pattern}"
-                    break
-        
-        # Enhance confidence based on keywords
-        keywords = query_lower.split()
-        for intent_type, intent_info in self.intent_patterns.items():
-            keyword_matches = sum(1 for keyword in keywords if any(k in keyword for k in intent_info.get("keywords", [])))
-            if keyword_matches > 0:
-                confidence_adjustment = keyword_matches * 0.1
-                if intent_type == best_intent:
-                    best_confidence = min(best_confidence + confidence_adjustment, 1.0)
+        match = intent_engine.classify("tab_navigation", query.strip())
+        best_intent = match.intent
+        best_confidence = match.confidence
+        extracted_terms = list(match.parameters[:1])
+        reasoning = f"Matched pattern: {match.pattern}" if match.pattern else "Default search intent"
         
         # Generate suggested URLs based on intent
         suggested_urls = []
@@ -736,24 +726,46 @@ class AdvancedTabNavigationService:
             memory_threshold = criteria.get("memory_threshold", 500)  # MB
             idle_time = criteria.get("idle_time", 300)  # seconds
             
-            # Mock intelligent suspension logic
-            current_memory = 245  # MB
-            last_active = 450  # seconds ago
+            manager = find_manager(tab_id) if tab_id else None
+            if manager is None:
+                return {
+                    "status": "success",
+                    "suspended": False,
+                    "reason": "Tab is not backed by a live browser page",
+                    "memory_saved_mb": 0,
+                    "tab_id": tab_id
+                }
+            
+            if manager.is_hibernated(tab_id):
+                return {
+                    "status": "success",
+                    "suspended": True,
+                    "reason": "Tab is already hibernated",
+                    "memory_saved_mb": 0,
+                    "tab_id": tab_id
+                }
+            
+            current_memory = manager.policy.page_memory_mb
+            last_active = manager.idle_seconds(tab_id) or 0
             
             should_suspend = (
-                current_memory < memory_threshold and 
-                last_active > idle_time
+                last_active > idle_time or
+                (current_memory >= memory_threshold and manager.memory_pressure())
             )
             
             if should_suspend:
-                memory_saved = current_memory * 0.8  # 80% memory recovery
-                
+                snapshot = await manager.hibernate(tab_id, reason="idle" if last_active > idle_time else "memory")
+                if snapshot is None:
+                    should_suspend = False
+            
+            if should_suspend:
                 return {
                     "status": "success",
                     "suspended": True,
-                    "reason": f"Tab idle for {last_active}s, memory usage: {current_memory}MB",
-                    "memory_saved_mb": memory_saved,
-                    "tab_id": tab_id
+                    "reason": f"Tab idle for {int(last_active)}s, memory usage: ~{current_memory:.0f}MB",
+                    "memory_saved_mb": current_memory,
+                    "tab_id": tab_id,
+                    "snapshot": snapshot.summary()
                 }
             else:
                 return {
@@ -5,13 +5,14 @@ import asyncio
 import json
 import re
 from models.automation import AutomationWorkflow, AutomationCreate, AutomationExecution
-from services.enhanced_ai_orchestrator import EnhancedAIOrchestratorService
+from services.service_registry import service_registry
+from services.structured_output import load_json
 
 class AdvancedWebAutomationService:
     def __init__(self):
         self.browser_pool = []
         self.max_browsers = 3
-        self.ai_orchestrator = EnhancedAIOrchestratorService()
+        self.ai_orchestrator = service_registry.get("enhanced_ai_orchestrator")
         
     async def initialize_browser_pool(self):
         """Initialize browser pool for better performance"""
@@ -150,7 +151,7 @@ Return as JSON with recommendations."""
                         temperature=0.2
                     )
                     
-                    ai_analysis = json.loads(response.choices[0].message.content)
+                    ai_analysis = load_json(response.choices[0].message.content)
                     return {**page_info, "ai_analysis": ai_analysis}
                     
                 except:
@@ -655,7 +656,7 @@ Return enhanced products as JSON array maintaining original structure but adding
             )
             
             try:
-                enhanced_products = json.loads(response.choices[0].message.content)
+                enhanced_products = load_json(response.choices[0].message.content)
                 return enhanced_products if isinstance(enhanced_products, list) else products
             except json.JSONDecodeError:
                 return products
@@ -11,7 +11,12 @@ from groq import Groq
 import logging
 import os
 import asyncio
-from collections import defaultdict
+from collections import Counter, defaultdict
+
+from services.behavior_event_store import behavior_event_store
+from services.behavior_pattern_miner import behavior_pattern_miner
+
+AGENTIC_MEMORY_DB = "data/agentic_memory.db"
 
 class AgenticMemoryService:
     def __init__(self):
@@ -27,7 +32,9 @@ class AgenticMemoryService:
             logging.warning("GROQ API key not found")
             self.groq_client = None
             
-        self.db_path = "data/agentic_memory.db"
+        self.db_path = AGENTIC_MEMORY_DB
+        self.behavior_store = behavior_event_store
+        self.pattern_miner = behavior_pattern_miner
         self.user_profiles = {}
         self.behavior_patterns = defaultdict(list)
         self.context_memory = {}
@@ -40,19 +47,7 @@ class AgenticMemoryService:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        # User behavior tracking table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS user_behavior (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT NOT NULL,
-                action_type TEXT NOT NULL,
-                action_data TEXT NOT NULL,
-                context TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                success BOOLEAN,
-                frequency INTEGER DEFAULT 1
-            )
-        """)
+        # Behavior events live in the shared behavior event store (data/behavior_events.db)
         
         # User preferences table
         cursor.execute("""
@@ -101,23 +96,15 @@ class AgenticMemoryService:
                                   context: Dict = None, success: bool = True) -> Dict:
         """Track and analyze user behavior patterns"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Store behavior data
-            cursor.execute("""
-                INSERT OR REPLACE INTO user_behavior 
-                (user_id, action_type, action_data, context, success, frequency)
-                VALUES (?, ?, ?, ?, ?, 
-                    COALESCE((SELECT frequency + 1 FROM user_behavior 
-                             WHERE user_id = ? AND action_type = ? AND action_data = ?), 1))
-            """, (user_id, action_type, json.dumps(action_data), 
-                  json.dumps(context or {}), success, user_id, action_type, json.dumps(action_data)))
-            
-            conn.commit()
-            conn.close()
+            # Append to the shared behavior event store
+            self.behavior_store.append(
+                user_id, action_type, data=action_data, context=context,
+                session_id=(context or {}).get("session_id"), success=success
+            )
+            # Mining runs in the background on the miner's debounce/interval schedule
+            self.pattern_miner.mark_dirty(user_id)
             
-            # Analyze behavior patterns
+            # Latest mined patterns (cached)
             patterns = await self._analyze_behavior_patterns(user_id, action_type)
             
             # Update user profile
@@ -142,143 +129,20 @@ class AgenticMemoryService:
             }
     
     async def _analyze_behavior_patterns(self, user_id: str, action_type: str) -> List[Dict]:
-        """Analyze user behavior to identify patterns"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get recent behavior data
-            cursor.execute("""
-                SELECT action_type, action_data, context, success, frequency, timestamp
-                FROM user_behavior 
-                WHERE user_id = ? 
-                ORDER BY timestamp DESC 
-                LIMIT 100
-            """, (user_id,))
-            
-            behavior_data = cursor.fetchall()
-            conn.close()
-            
-            if not behavior_data:
-                return []
-            
-            # Analyze patterns using AI
-            behavior_summary = []
-            for row in behavior_data:
-                behavior_summary.append({
-                    "action": row[0],
-                    "data": json.loads(row[1]),
-                    "context": json.loads(row[2]) if row[2] else {},
-                    "success": row[3],
-                    "frequency": row[4],
-                    "timestamp": row[5]
-                })
-            
-            # Use AI to identify patterns
-            system_prompt = """You are an Agentic Memory AI that analyzes user behavior patterns.
-            
-            Analyze the behavior data and identify:
-            1. Recurring workflow patterns
-            2. Time-based usage patterns 
-            3. Success/failure patterns
-            4. Context preferences
-            5. Automation opportunities
-            
-            Return JSON with identified patterns, confidence scores, and actionable insights.
-            """
-            
-            response = await self.groq_client.chat.completions.acreate(
-                model="llama3-70b-8192",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Analyze behavior data: {json.dumps(behavior_summary[:20])}"}
-                ],
-                temperature=0.2
-            )
-            
-            patterns_analysis = response.choices[0].message.content
-            
-            # Store learned patterns
-            await self._store_learned_patterns(user_id, patterns_analysis)
-            
-            return self._parse_patterns(patterns_analysis)
-            
-        except Exception as e:
-            logging.error(f"Pattern analysis error: {str(e)}")
-            return []
-    
-    async def _store_learned_patterns(self, user_id: str, patterns_analysis: str):
-        """Store learned patterns in database"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Extract and store patterns (simplified for now)
-            patterns = {
-                "workflow_patterns": "User prefers sequential task execution",
-                "time_patterns": "Most active during business hours",
-                "context_patterns": "Prefers detailed confirmations before critical actions",
-                "automation_opportunities": "Frequently repeats similar search and extraction workflows"
-            }
-            
-            for pattern_type, pattern_data in patterns.items():
-                cursor.execute("""
-                    INSERT OR REPLACE INTO learned_patterns 
-                    (user_id, pattern_type, pattern_data, confidence, usage_count, last_used)
-                    VALUES (?, ?, ?, 0.8, 
-                        COALESCE((SELECT usage_count + 1 FROM learned_patterns 
-                                 WHERE user_id = ? AND pattern_type = ?), 1),
-                        CURRENT_TIMESTAMP)
-                """, (user_id, pattern_type, pattern_data, user_id, pattern_type))
-            
-            conn.commit()
-            conn.close()
-            
-        except Exception as e:
-            logging.error(f"Pattern storage error: {str(e)}")
+        """Return the user's most recently mined patterns (never blocks on mining)"""
+        result = self.pattern_miner.get_result(user_id)
+        return self._parse_patterns(result) if result else []
     
     async def get_personalized_suggestions(self, user_id: str, current_context: Dict = None) -> Dict:
-        """Generate personalized suggestions based on learned behavior"""
+        """Serve personalized suggestions from the cached mining result"""
         try:
-            # Get user patterns and preferences
+            mined = await self.pattern_miner.ensure_result(user_id)
             patterns = await self._get_user_patterns(user_id)
-            preferences = await self._get_user_preferences(user_id)
             context_memory = await self._get_relevant_context(user_id, current_context)
             
-            # Generate AI-powered suggestions
-            system_prompt = """You are an Agentic Memory AI that provides personalized suggestions based on user behavior patterns.
-            
-            Based on the user's patterns, preferences, and current context, provide:
-            1. Proactive workflow suggestions
-            2. Automation opportunities  
-            3. Efficiency improvements
-            4. Context-aware assistance
-            5. Personalized shortcuts
-            
-            Return actionable suggestions with confidence scores and reasoning.
-            """
-            
-            user_data = {
-                "patterns": patterns,
-                "preferences": preferences, 
-                "context_memory": context_memory,
-                "current_context": current_context or {}
-            }
-            
-            response = await self.groq_client.chat.completions.acreate(
-                model="llama3-70b-8192",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Generate suggestions for user: {json.dumps(user_data)}"}
-                ],
-                temperature=0.3
-            )
-            
-            suggestions_data = response.choices[0].message.content
-            
             return {
                 "success": True,
-                "suggestions": self._parse_suggestions(suggestions_data),
+                "suggestions": self._parse_suggestions(mined) if mined else self._get_fallback_suggestions(),
                 "user_patterns": patterns,
                 "context_relevance": len(context_memory),
                 "personalization_score": self._calculate_personalization_score(user_id),
@@ -528,43 +392,149 @@ class AgenticMemoryService:
         }
     
     # Helper methods
-    def _parse_patterns(self, patterns_analysis: str) -> List[Dict]:
-        """Parse AI-generated pattern analysis"""
-        return [
-            {"type": "workflow", "pattern": "Sequential task preference", "confidence": 0.85},
-            {"type": "timing", "pattern": "Business hours usage", "confidence": 0.90},
-            {"type": "context", "pattern": "Detail-oriented confirmations", "confidence": 0.78},
-            {"type": "automation", "pattern": "Repetitive search workflows", "confidence": 0.82}
+    @staticmethod
+    def _parse_patterns(result: Dict) -> List[Dict]:
+        """Flatten a mining result into typed patterns"""
+        patterns = [
+            {
+                "type": "workflow",
+                "pattern": " → ".join(sequence["sequence"]),
+                "confidence": round(min(0.95, 0.4 + sequence["support_ratio"] / 2), 3),
+                "support": sequence["support"]
+            }
+            for sequence in result.get("sequences", [])
         ]
+        if result.get("peak_hours"):
+            patterns.append({
+                "type": "timing",
+                "pattern": "Most active around " + ", ".join(f"{hour:02d}:00" for hour in result["peak_hours"]),
+                "confidence": 0.7
+            })
+        if result.get("top_actions"):
+            patterns.append({
+                "type": "frequency",
+                "pattern": "Frequent actions: " + ", ".join(a["action"] for a in result["top_actions"]),
+                "confidence": 0.8,
+                "support": result["top_actions"][0]["count"]
+            })
+        return patterns
     
-    def _parse_suggestions(self, suggestions_data: str) -> List[Dict]:
-        """Parse AI-generated suggestions"""
+    def _parse_suggestions(self, result: Dict) -> List[Dict]:
+        """Suggestions from the LLM summary of mined patterns, else from the patterns themselves"""
+        summary = result.get("summary") or {}
+        if isinstance(summary, dict) and summary.get("suggestions"):
+            return summary["suggestions"]
+        
+        suggestions = []
+        for sequence in result.get("sequences", [])[:3]:
+            steps = sequence["sequence"]
+            suggestions.append({
+                "type": "workflow_automation" if len(steps) > 2 else "personalized_shortcut",
+                "suggestion": f"Automate the {' → '.join(steps)} workflow",
+                "confidence": round(min(0.95, 0.4 + sequence["support_ratio"] / 2), 3),
+                "reasoning": f"Seen in {sequence['support']} of {result['sessions']} sessions"
+            })
+        if result.get("success_rate", 1.0) < 0.7 and result.get("events", 0) >= 10:
+            suggestions.append({
+                "type": "efficiency_improvement",
+                "suggestion": "Review recently failing actions",
+                "confidence": 0.6,
+                "reasoning": f"Only {result['success_rate']:.0%} of recent actions succeeded"
+            })
+        return suggestions or self._get_fallback_suggestions()
+    
+    def _get_fallback_suggestions(self) -> List[Dict]:
+        """Generic suggestions for users without mined patterns"""
         return [
             {
-                "type": "workflow_automation",
-                "suggestion": "Create automated job search workflow",
-                "confidence": 0.88,
-                "reasoning": "User frequently performs similar search patterns"
-            },
-            {
-                "type": "efficiency_improvement", 
-                "suggestion": "Use bulk data extraction for research tasks",
-                "confidence": 0.82,
-                "reasoning": "Pattern shows repetitive data collection activities"
+                "type": "personalized_shortcut",
+                "suggestion": "Bookmark the sites you visit most for quick access",
+                "confidence": 0.5,
+                "reasoning": "Not enough activity yet to personalize"
             },
             {
-                "type": "personalized_shortcut",
-                "suggestion": "Create quick-access buttons for common sites",
-                "confidence": 0.75,
-                "reasoning": "User visits same sites in specific sequences"
+                "type": "workflow_automation",
+                "suggestion": "Record a repeated task as a workflow",
+                "confidence": 0.4,
+                "reasoning": "Not enough activity yet to personalize"
             }
         ]
     
+    async def _get_learning_status(self, user_id: str) -> Dict:
+        """How far pattern learning has progressed for this user"""
+        result = self.pattern_miner.get_result(user_id)
+        return {
+            "events_tracked": self.behavior_store.get_aggregates(user_id).total,
+            "patterns_mined": len(result["sequences"]) if result else 0,
+            "last_mined": datetime.fromtimestamp(result["mined_at"]).isoformat() if result else None,
+            "pending_update": user_id in self.pattern_miner.dirty,
+            "update_interval": self.pattern_miner.interval
+        }
+    
+    async def _update_user_profile(self, user_id: str, action_type: str, action_data: Dict, patterns: List[Dict]):
+        """Refresh the in-memory profile from the user's rolling aggregates"""
+        aggregates = self.behavior_store.get_aggregates(user_id)
+        self.user_profiles[user_id] = {
+            "total_actions": aggregates.total,
+            "top_actions": [action for action, _ in aggregates.top_actions(5)],
+            "peak_hours": aggregates.peak_hours(),
+            "success_rate": aggregates.successes / aggregates.total if aggregates.total else 0.0,
+            "last_action": action_type,
+            "patterns": len(patterns),
+            "updated_at": datetime.now().isoformat()
+        }
+    
+    async def _generate_behavioral_insights(self, user_id: str, patterns: List[Dict]) -> List[Dict]:
+        """Summarize what the aggregates say about this user"""
+        aggregates = self.behavior_store.get_aggregates(user_id)
+        insights = []
+        
+        top_actions = aggregates.top_actions(1)
+        if top_actions and aggregates.total >= 5:
+            action, count = top_actions[0]
+            insights.append({
+                "type": "frequency",
+                "insight": f"'{action}' accounts for {count / aggregates.total:.0%} of recent activity",
+                "confidence": min(0.95, 0.5 + aggregates.total / 200)
+            })
+        
+        peak_hours = aggregates.peak_hours(1)
+        if peak_hours and aggregates.total >= 10:
+            insights.append({
+                "type": "timing",
+                "insight": f"Most active around {peak_hours[0]:02d}:00",
+                "confidence": 0.7
+            })
+        
+        for (first, second, third), count in aggregates.trigrams.most_common(1):
+            if count >= 3:
+                insights.append({
+                    "type": "workflow",
+                    "insight": f"Repeats the sequence {first} → {second} → {third} ({count} times)",
+                    "confidence": min(0.95, 0.5 + count / 20)
+                })
+        
+        return insights
+    
+    async def _generate_recommendations(self, user_id: str, action_type: str, patterns: List[Dict]) -> List[str]:
+        """Suggest likely next steps from the user's action bigrams"""
+        aggregates = self.behavior_store.get_aggregates(user_id)
+        followers = Counter({
+            second: count for (first, second), count in aggregates.bigrams.items() if first == action_type
+        })
+        recommendations = [f"Continue with '{action}'" for action, _ in followers.most_common(3)]
+        
+        for (first, second, third), count in aggregates.trigrams.most_common(3):
+            if count >= 3:
+                recommendations.append(f"Automate the {first} → {second} → {third} workflow")
+        
+        return recommendations
+    
     def _calculate_personalization_score(self, user_id: str) -> float:
         """Calculate how personalized the system is for this user"""
         if user_id not in self.user_profiles:
             return 0.1
-        return min(0.9, len(self.behavior_patterns.get(user_id, [])) / 50.0)
+        return min(0.9, self.behavior_store.get_aggregates(user_id).total / 50.0)
     
     async def _count_total_patterns(self) -> int:
         """Count total learned patterns across all users"""
@@ -576,4 +546,33 @@ class AgenticMemoryService:
             conn.close()
             return count
         except:
-            return 0
\ No newline at end of file
+            return 0
+
+
+def _write_learned_patterns(user_id: str, result: Dict):
+    conn = sqlite3.connect(AGENTIC_MEMORY_DB)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM learned_patterns WHERE user_id = ?", (user_id,))
+        cursor.executemany("""
+            INSERT INTO learned_patterns (user_id, pattern_type, pattern_data, confidence, usage_count)
+            VALUES (?, ?, ?, ?, ?)
+        """, [
+            (user_id, pattern["type"], pattern["pattern"], pattern["confidence"], pattern.get("support", 0))
+            for pattern in AgenticMemoryService._parse_patterns(result)
+        ])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+async def _store_learned_patterns(user_id: str, result: Dict):
+    """Persist a mining run, replacing the user's previous patterns"""
+    try:
+        await asyncio.to_thread(_write_learned_patterns, user_id, result)
+    except Exception as e:
+        logging.error(f"Pattern storage error: {str(e)}")
+
+
+# Registered once per process, not once per service instance
+behavior_pattern_miner.add_listener(_store_learned_patterns)
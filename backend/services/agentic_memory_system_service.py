@@ -4,23 +4,33 @@ Advanced user behavior tracking, learning, and personalized assistance
 """
 
 import asyncio
-import json
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Any, Optional, Tuple
 from groq import AsyncGroq
 import os
-from collections import defaultdict, deque
+from collections import defaultdict
+
+from services.behavior_event_store import behavior_event_store
+from services.behavior_pattern_miner import behavior_pattern_miner
 
 class AgenticMemorySystemService:
+    # Action type -> behavior category
+    ACTION_CATEGORIES = {
+        "navigation": "browsing_patterns",
+        "search": "search_behavior",
+        "workflow": "task_preferences",
+        "interaction": "interaction_style",
+        "performance": "performance_patterns"
+    }
+
     def __init__(self):
         """Initialize Agentic Memory System with advanced behavioral learning"""
         self.groq_client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY")) if os.getenv("GROQ_API_KEY") else None
         
-        # Memory storage systems
+        # Memory storage systems; behavior events live in the shared event store
+        self.behavior_store = behavior_event_store
         self.user_profiles = {}
-        self.behavior_patterns = defaultdict(list)
-        self.interaction_history = defaultdict(deque)
         self.learning_models = {}
         self.personalization_rules = {}
         
@@ -34,6 +44,10 @@ class AgenticMemorySystemService:
             "learning_update_interval": 300  # 5 minutes in seconds
         }
         
+        # Sequence mining runs in the background at the learning update interval
+        self.pattern_miner = behavior_pattern_miner
+        self.pattern_miner.interval = self.memory_config["learning_update_interval"]
+        
         # Initialize behavior categories
         self.behavior_categories = self._initialize_behavior_categories()
 
@@ -79,23 +93,16 @@ class AgenticMemorySystemService:
             # Process and categorize the action
             processed_action = await self._process_action(action_data, timestamp)
             
-            # Store in interaction history with timestamp
-            interaction_entry = {
-                "timestamp": timestamp.isoformat(),
-                "action": processed_action,
-                "session_id": action_data.get("session_id"),
-                "context": action_data.get("context", {}),
-                "processed_at": datetime.now().isoformat()
-            }
-            
-            self.interaction_history[user_id].append(interaction_entry)
-            
-            # Maintain memory limits
-            if len(self.interaction_history[user_id]) > self.memory_config["max_interactions_per_user"]:
-                self.interaction_history[user_id].popleft()
-            
-            # Update behavior patterns
-            await self._update_behavior_patterns(user_id, processed_action, timestamp)
+            # Append to the shared behavior event store
+            self.behavior_store.append(
+                user_id, processed_action["type"],
+                data=processed_action["data"],
+                context=processed_action["context"],
+                session_id=action_data.get("session_id"),
+                timestamp=timestamp.timestamp()
+            )
+            self.pattern_miner.mark_dirty(user_id)
+            aggregates = self.behavior_store.get_aggregates(user_id)
             
             # Update user profile
             await self._update_user_profile(user_id, processed_action)
@@ -110,8 +117,8 @@ class AgenticMemorySystemService:
                 "behavior_updated": True,
                 "insights": insights,
                 "memory_stats": {
-                    "total_interactions": len(self.interaction_history[user_id]),
-                    "patterns_identified": len(self.behavior_patterns[user_id]),
+                    "total_interactions": aggregates.total,
+                    "patterns_identified": len(aggregates.bigrams),
                     "profile_completeness": self.user_profiles[user_id].get("completeness", 0)
                 },
                 "message": "User behavior tracked and analyzed successfully"
@@ -163,15 +170,7 @@ class AgenticMemorySystemService:
         action_type = action_data.get("type", "unknown")
         
         # Categorize action based on type
-        category_mapping = {
-            "navigation": "browsing_patterns",
-            "search": "search_behavior", 
-            "workflow": "task_preferences",
-            "interaction": "interaction_style",
-            "performance": "performance_patterns"
-        }
-        
-        category = category_mapping.get(action_type, "interaction_style")
+        category = self.ACTION_CATEGORIES.get(action_type, "interaction_style")
         
         return {
             "type": action_type,
@@ -186,27 +185,19 @@ class AgenticMemorySystemService:
             }
         }
 
-    async def _update_behavior_patterns(self, user_id: str, action: Dict[str, Any], timestamp: datetime) -> None:
-        """Update behavior patterns with new action data"""
-        category = action["category"]
-        
-        # Create pattern entry
-        pattern_entry = {
-            "timestamp": timestamp.isoformat(),
-            "category": category,
-            "action_type": action["type"],
-            "context": action["context"],
-            "metadata": action["metadata"]
-        }
-        
-        self.behavior_patterns[user_id].append(pattern_entry)
-        
-        # Maintain pattern history limits (last 30 days)
-        cutoff_time = timestamp - timedelta(days=30)
-        self.behavior_patterns[user_id] = [
-            p for p in self.behavior_patterns[user_id]
-            if datetime.fromisoformat(p["timestamp"]) > cutoff_time
-        ]
+    def _recent_patterns(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        """Recent behavior events for a user, oldest first, as pattern entries"""
+        patterns = []
+        for event in self.behavior_store.recent(user_id, limit=limit):
+            moment = datetime.fromtimestamp(event.timestamp)
+            patterns.append({
+                "timestamp": moment.isoformat(),
+                "category": self.ACTION_CATEGORIES.get(event.action_type, "interaction_style"),
+                "action_type": event.action_type,
+                "context": event.context,
+                "metadata": {"hour_of_day": moment.hour, "day_of_week": moment.weekday()}
+            })
+        return patterns
 
     async def _update_user_profile(self, user_id: str, action: Dict[str, Any]) -> None:
         """Update user profile based on new behavior data"""
@@ -236,67 +227,57 @@ class AgenticMemorySystemService:
             profile["learning_stage"] = "beginner"
 
     async def _generate_behavior_insights(self, user_id: str, recent_action: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate AI-powered behavior insights"""
+        """Behavior insights from the user's latest mined patterns"""
         try:
             profile = self.user_profiles[user_id]
-            recent_patterns = self.behavior_patterns[user_id][-10:]  # Last 10 actions
+            mined = self.pattern_miner.get_result(user_id)
             
-            if self.groq_client and len(recent_patterns) >= 3:
-                insight_prompt = f"""
-                Analyze user behavior and provide personalized insights:
-                
-                User Profile: {json.dumps(profile, indent=2)}
-                Recent Actions: {json.dumps(recent_patterns, indent=2)}
-                Current Action: {json.dumps(recent_action, indent=2)}
-                
-                Generate insights in JSON format:
-                {{
-                    "behavioral_insights": [
-                        {{
-                            "type": "pattern|preference|optimization|prediction",
-                            "category": "browsing|search|task|interaction|performance",
-                            "insight": "Description of the insight",
-                            "confidence": 0.0-1.0,
-                            "actionable": true/false,
-                            "suggestion": "Specific recommendation"
-                        }}
-                    ],
-                    "personalization_opportunities": [
-                        {{
-                            "area": "feature|interface|workflow|automation",
-                            "opportunity": "What can be personalized",
-                            "impact": "Expected benefit",
-                            "implementation": "How to implement"
-                        }}
-                    ],
-                    "learning_progress": {{
-                        "current_stage": "beginner|intermediate|advanced",
-                        "next_milestone": "What user is close to achieving",
-                        "recommendation": "How to help user progress"
-                    }}
-                }}
-                """
-                
-                try:
-                    chat_completion = await self.groq_client.chat.completions.create(
-                        messages=[
-                            {"role": "system", "content": "You are a behavioral analysis AI expert."},
-                            {"role": "user", "content": insight_prompt}
-                        ],
-                        model="llama3-70b-8192",
-                        temperature=0.3,
-                        max_tokens=2000
-                    )
-                    
-                    insights_data = json.loads(chat_completion.choices[0].message.content)
-                    insights_data["ai_generated"] = True
-                    return insights_data
-                    
-                except Exception as ai_error:
-                    pass
+            if not mined or not mined["sequences"]:
+                recent_patterns = self._recent_patterns(user_id, 10)  # Last 10 actions
+                return await self._generate_fallback_insights(user_id, profile, recent_patterns)
+            
+            insights = []
+            for sequence in mined["sequences"][:3]:
+                steps = " → ".join(sequence["sequence"])
+                insights.append({
+                    "type": "pattern",
+                    "category": self.ACTION_CATEGORIES.get(sequence["sequence"][0], "interaction_style").split("_")[0],
+                    "insight": f"Repeats {steps} in {sequence['support']} of {mined['sessions']} sessions",
+                    "confidence": round(min(0.95, 0.4 + sequence["support_ratio"] / 2), 3),
+                    "actionable": len(sequence["sequence"]) > 2,
+                    "suggestion": f"Automate the {steps} workflow"
+                })
+            
+            # The LLM only ever sees the mined summary, refreshed when the patterns change
+            summary = mined.get("summary") or {}
+            for item in summary.get("insights", [])[:3] if isinstance(summary, dict) else []:
+                insights.append({
+                    "type": "prediction",
+                    "category": "interaction",
+                    "insight": item.get("insight", ""),
+                    "confidence": item.get("confidence", 0.5),
+                    "actionable": False,
+                    "suggestion": ""
+                })
             
-            # Fallback insights based on patterns
-            return await self._generate_fallback_insights(user_id, profile, recent_patterns)
+            return {
+                "behavioral_insights": insights,
+                "personalization_opportunities": [
+                    {
+                        "area": "automation",
+                        "opportunity": f"Workflow template for {' → '.join(mined['sequences'][0]['sequence'])}",
+                        "impact": "Fewer repeated steps",
+                        "implementation": "Offer to record the sequence as a workflow"
+                    }
+                ],
+                "learning_progress": {
+                    "current_stage": profile.get("learning_stage", "beginner"),
+                    "next_milestone": "Intermediate automation usage",
+                    "recommendation": "Try advanced workflow features"
+                },
+                "ai_generated": bool(summary),
+                "mined_at": datetime.fromtimestamp(mined["mined_at"]).isoformat()
+            }
 
         except Exception as e:
             return {
@@ -358,7 +339,7 @@ class AgenticMemorySystemService:
                 return {"success": False, "error": "User profile not found"}
             
             profile = self.user_profiles[user_id]
-            recent_patterns = list(self.behavior_patterns[user_id])[-20:]  # Last 20 actions
+            recent_patterns = self._recent_patterns(user_id, 20)  # Last 20 actions
             
             recommendations = []
             
@@ -475,23 +456,23 @@ class AgenticMemorySystemService:
                     return {"success": False, "error": "User not found"}
                 
                 profile = self.user_profiles[user_id]
-                patterns = self.behavior_patterns[user_id]
-                interactions = list(self.interaction_history[user_id])
+                aggregates = self.behavior_store.get_aggregates(user_id)
+                month_start = datetime.now().toordinal() - 30
                 
                 return {
                     "success": True,
                     "user_id": user_id,
                     "memory_summary": {
-                        "total_interactions": len(interactions),
-                        "behavior_patterns": len(patterns),
+                        "total_interactions": aggregates.total,
+                        "behavior_patterns": sum(count for day, count in aggregates.day_counts.items() if day > month_start),
                         "learning_stage": profile["learning_stage"],
                         "completeness_score": profile["completeness"],
-                        "days_active": self._calculate_active_days(interactions),
+                        "days_active": len(aggregates.day_counts),
                         "primary_behavior_category": max(profile["behavior_scores"], 
                                                        key=profile["behavior_scores"].get)
                     },
                     "behavior_distribution": profile["behavior_scores"],
-                    "recent_activity_trend": self._analyze_activity_trend(interactions[-30:] if len(interactions) > 30 else interactions),
+                    "recent_activity_trend": self._analyze_activity_trend(self._recent_patterns(user_id, 30)),
                     "personalization_effectiveness": self._calculate_personalization_effectiveness(profile),
                     "learning_progress": {
                         "current_stage": profile["learning_stage"],
@@ -502,7 +483,9 @@ class AgenticMemorySystemService:
             else:
                 # Global analytics
                 total_users = len(self.user_profiles)
-                total_interactions = sum(len(hist) for hist in self.interaction_history.values())
+                total_interactions = sum(
+                    self.behavior_store.get_aggregates(uid).total for uid in self.user_profiles
+                )
                 
                 return {
                     "success": True,
@@ -523,21 +506,6 @@ class AgenticMemorySystemService:
                 "error": f"Analytics retrieval failed: {str(e)}"
             }
 
-    def _calculate_active_days(self, interactions: List) -> int:
-        """Calculate number of active days"""
-        if not interactions:
-            return 0
-        
-        dates = set()
-        for interaction in interactions:
-            try:
-                date = datetime.fromisoformat(interaction["timestamp"]).date()
-                dates.add(date)
-            except:
-                continue
-        
-        return len(dates)
-
     def _analyze_activity_trend(self, recent_interactions: List) -> str:
         """Analyze recent activity trend"""
         if len(recent_interactions) < 5:
@@ -590,9 +558,9 @@ class AgenticMemorySystemService:
         """Get most common behavior patterns across users"""
         pattern_counts = defaultdict(int)
         
-        for patterns in self.behavior_patterns.values():
-            for pattern in patterns:
-                pattern_counts[pattern["category"]] += 1
+        for user_id in self.behavior_store.known_users():
+            for action_type, count in self.behavior_store.get_aggregates(user_id).action_counts.items():
+                pattern_counts[self.ACTION_CATEGORIES.get(action_type, "interaction_style")] += count
         
         return sorted(pattern_counts.keys(), key=pattern_counts.get, reverse=True)[:5]
 
@@ -6,6 +6,9 @@ import json
 from groq import Groq
 from models.ai_task import AITask, AITaskCreate, AITaskType, AITaskStatus
 
+from services.embedding_index import embedding_index
+from services.model_router import model_router
+
 class AIOrchestratorService:
     def __init__(self):
         try:
@@ -29,10 +32,18 @@ class AIOrchestratorService:
             # Create context-aware system prompt
             system_prompt = self._get_system_prompt(context)
             
-            # Use GROQ with Llama model for fast inference
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",  # Fast Llama model
-                messages=[
+            # Passages from pages the user has visited that bear on the message
+            history_passages = await asyncio.to_thread(embedding_index.search, user_id, message, k=3, min_score=0.15)
+            if history_passages:
+                system_prompt += "\n\nRELEVANT PASSAGES FROM PAGES THE USER HAS VISITED:" + "".join(
+                    f"\n- {passage['url']}: {passage['text'][:600]}" for passage in history_passages
+                )
+            
+            # Routed GROQ call: the fast small model unless the prompt or live stats call for more
+            response, _ = await model_router.complete(
+                self.groq_client,
+                "chat",
+                [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": message}
                 ],
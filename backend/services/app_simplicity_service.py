@@ -5,6 +5,8 @@ from datetime import datetime
 import json
 from groq import Groq
 
+from services.structured_output import load_json
+
 class AppSimplicityService:
     """Service focused on making the app extremely simple and user-friendly"""
     
@@ -219,7 +221,7 @@ Example: {{"text": "Analyze this page", "action": "analyze_content", "icon": "br
             )
             
             try:
-                suggestions = json.loads(response.choices[0].message.content)
+                suggestions = load_json(response.choices[0].message.content)
                 self.smart_suggestions[user_id] = {
                     "suggestions": suggestions,
                     "context": context,
@@ -14,6 +14,8 @@ security = HTTPBearer()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Accounts allowed to use administrative endpoints (comma-separated emails)
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
 
 class AuthService:
     def verify_password(self, plain_password, hashed_password):
@@ -95,6 +97,19 @@ class AuthService:
             raise credentials_exception
         return User(**user_data)
 
+    async def get_current_admin(
+        self,
+        credentials: HTTPAuthorizationCredentials = Depends(security),
+        db=Depends(get_database)
+    ):
+        user = await self.get_current_user(credentials, db)
+        if user.email.lower() not in ADMIN_EMAILS:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Administrator privileges required",
+            )
+        return user
+
     async def update_user(self, user_id: str, user_update: UserUpdate, db):
         update_data = user_update.dict(exclude_unset=True)
         update_data["updated_at"] = datetime.utcnow()
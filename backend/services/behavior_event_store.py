@@ -0,0 +1,546 @@
+"""
+Behavior Event Store
+Append-only, month-partitioned store of user behavior events with compact
+interned columns and per-user rolling aggregates shared by the memory and
+predictive intelligence services
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_PARTITION_PREFIX = "events_"
+
+
+@dataclass(frozen=True)
+class BehaviorEvent:
+    user_id: str
+    action_type: str
+    timestamp: float
+    session_id: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    context: Dict[str, Any] = field(default_factory=dict)
+    success: bool = True
+
+    @property
+    def isoformat(self) -> str:
+        return datetime.fromtimestamp(self.timestamp).isoformat()
+
+
+class UserAggregates:
+    """Rolling per-user aggregates, updated in O(1) per event"""
+
+    def __init__(self, window: int = 500):
+        self.total = 0
+        self.successes = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.action_counts = Counter()
+        self.hour_histogram = [0] * 24
+        self.weekday_histogram = [0] * 7
+        self.day_counts = Counter()  # date ordinal -> events
+        self.bigrams = Counter()
+        self.trigrams = Counter()
+        self.recent = deque(maxlen=window)  # recent action types, oldest first
+
+    def add(self, action_type: str, timestamp: float, success: bool = True):
+        moment = datetime.fromtimestamp(timestamp)
+        self.total += 1
+        self.successes += 1 if success else 0
+        self.first_ts = timestamp if self.first_ts is None else min(self.first_ts, timestamp)
+        self.last_ts = timestamp if self.last_ts is None else max(self.last_ts, timestamp)
+        self.action_counts[action_type] += 1
+        self.hour_histogram[moment.hour] += 1
+        self.weekday_histogram[moment.weekday()] += 1
+        self.day_counts[moment.toordinal()] += 1
+        if self.recent:
+            self.bigrams[(self.recent[-1], action_type)] += 1
+            if len(self.recent) > 1:
+                self.trigrams[(self.recent[-2], self.recent[-1], action_type)] += 1
+        self.recent.append(action_type)
+
+    def copy(self) -> "UserAggregates":
+        """Detached copy that is safe to read while this one keeps changing"""
+        clone = UserAggregates(self.recent.maxlen)
+        clone.total, clone.successes = self.total, self.successes
+        clone.first_ts, clone.last_ts = self.first_ts, self.last_ts
+        clone.action_counts = Counter(self.action_counts)
+        clone.hour_histogram = list(self.hour_histogram)
+        clone.weekday_histogram = list(self.weekday_histogram)
+        clone.day_counts = Counter(self.day_counts)
+        clone.bigrams = Counter(self.bigrams)
+        clone.trigrams = Counter(self.trigrams)
+        clone.recent.extend(self.recent)
+        return clone
+
+    def top_actions(self, n: int = 5) -> List[Tuple[str, int]]:
+        return self.action_counts.most_common(n)
+
+    def peak_hours(self, n: int = 3) -> List[int]:
+        ranked = sorted(range(24), key=lambda hour: self.hour_histogram[hour], reverse=True)
+        return [hour for hour in ranked[:n] if self.hour_histogram[hour]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_events": self.total,
+            "success_rate": self.successes / self.total if self.total else 0.0,
+            "first_seen": datetime.fromtimestamp(self.first_ts).isoformat() if self.first_ts else None,
+            "last_seen": datetime.fromtimestamp(self.last_ts).isoformat() if self.last_ts else None,
+            "action_frequencies": dict(self.action_counts),
+            "hour_of_day": list(self.hour_histogram),
+            "day_of_week": list(self.weekday_histogram),
+            "active_days": len(self.day_counts),
+            "top_bigrams": [{"sequence": list(gram), "count": count} for gram, count in self.bigrams.most_common(5)],
+            "top_trigrams": [{"sequence": list(gram), "count": count} for gram, count in self.trigrams.most_common(5)]
+        }
+
+
+class BehaviorEventStore:
+    """Append-only behavior events in monthly SQLite partitions.
+
+    Rows are integer and float columns plus the payload and context as JSON
+    text: user, action and session are ids into an interned `symbols`
+    table, so repeated users, actions and sessions cost one row each.
+    Session symbols no longer referenced by any partition are deleted when
+    an expired partition is dropped.
+
+    `append` only touches memory: the event joins the user's aggregates,
+    the in-memory window of their newest `window` events and the write
+    buffer. Interning and inserts happen in batches on a worker thread, and
+    so does the first read of a user's older history after a restart, which
+    is merged into the aggregates when it arrives (`ensure_loaded` waits
+    for it). `recent()` never touches the database; `history()` reads
+    further back in a worker thread. Without a running event loop (scripts,
+    tests) writes and loads happen inline. Two locks keep the event loop off
+    SQLite: `_lock` guards the in-memory state and is never held across a
+    query, `_db_lock` guards the connection and symbol cache, and `_lock` is
+    never acquired while `_db_lock` is held.
+    """
+
+    INTERNED = ("user", "action", "session")
+
+    def __init__(self, db_path: str = "data/behavior_events.db", window: int = 500,
+                 flush_size: int = 64, flush_interval: float = 1.0, retention_months: int = 6,
+                 symbol_cache_size: int = 50000):
+        self.db_path = db_path
+        self.window = window
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.retention_months = retention_months
+        self.symbol_cache_size = symbol_cache_size
+        self.aggregates: Dict[str, UserAggregates] = {}
+        self.events: Dict[str, deque] = {}  # user_id -> newest events, oldest first
+        self.loaded_users = set()           # users whose history from earlier runs is merged in
+        self.loading: Dict[str, asyncio.Task] = {}
+        self.buffer: List[Tuple[str, tuple]] = []  # (partition, row with symbol values not yet interned)
+        self.partitions = set()
+        self.preexisting: Dict[str, int] = {}  # partition -> last rowid written before this process
+        self.symbol_ids = OrderedDict()     # (kind, value) -> id
+        self.symbol_values = OrderedDict()  # id -> value
+        self.stats = {"appended": 0, "flushes": 0, "rows_written": 0, "partitions_dropped": 0,
+                      "symbols_collected": 0, "history_reads": 0, "users_loaded_from_disk": 0}
+        self.listeners: List[Callable[[BehaviorEvent], None]] = []
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        self._db_lock = threading.RLock()
+        self._writer: Optional[asyncio.Task] = None
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+
+    def _db(self) -> sqlite3.Connection:
+        """The connection, opening the database and its schema on first use (caller holds `_db_lock`)"""
+        if self.conn is not None:
+            return self.conn
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS symbols (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                UNIQUE(kind, value)
+            )
+        """)
+        self.partitions = {
+            row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?", (f"{_PARTITION_PREFIX}%",)
+            )
+        }
+        # Rows past these marks were written by this process and are already in memory
+        self.preexisting = {
+            partition: conn.execute(f"SELECT COALESCE(MAX(rowid), 0) FROM {partition}").fetchone()[0]
+            for partition in self.partitions
+        }
+        conn.commit()
+        self.conn = conn
+        return conn
+
+    # ── Interning ─────────────────────────────────────────────────
+
+    def _remember_symbol(self, kind: str, value: str, symbol_id: int):
+        self.symbol_ids[(kind, value)] = symbol_id
+        self.symbol_values[symbol_id] = value
+        while len(self.symbol_ids) > self.symbol_cache_size:
+            self.symbol_ids.popitem(last=False)
+        while len(self.symbol_values) > self.symbol_cache_size:
+            self.symbol_values.popitem(last=False)
+
+    def _intern(self, kind: str, value: Optional[str]) -> Optional[int]:
+        if not value:
+            return None
+        key = (kind, value)
+        symbol_id = self.symbol_ids.get(key)
+        if symbol_id is not None:
+            self.symbol_ids.move_to_end(key)
+            return symbol_id
+        conn = self._db()
+        row = conn.execute("SELECT id FROM symbols WHERE kind = ? AND value = ?", key).fetchone()
+        if row is None:
+            symbol_id = conn.execute("INSERT INTO symbols (kind, value) VALUES (?, ?)", key).lastrowid
+        else:
+            symbol_id = row[0]
+        self._remember_symbol(kind, value, symbol_id)
+        return symbol_id
+
+    def _symbols(self, ids: set) -> Dict[int, Any]:
+        resolved = {i: self.symbol_values[i] for i in ids if i in self.symbol_values}
+        missing = [i for i in ids if i is not None and i not in resolved]
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            query = f"SELECT id, kind, value FROM symbols WHERE id IN ({','.join('?' * len(chunk))})"
+            for symbol_id, kind, value in self.conn.execute(query, chunk):
+                self._remember_symbol(kind, value, symbol_id)
+                resolved[symbol_id] = value
+        return resolved
+
+    @staticmethod
+    def _encode(payload: Optional[Dict[str, Any]]) -> Optional[str]:
+        return json.dumps(payload, default=str) if payload else None
+
+    @staticmethod
+    def _decode(payload: Any) -> Dict[str, Any]:
+        # Only JSON text is a payload; anything else is an unreadable legacy value
+        if not isinstance(payload, str):
+            return {}
+        try:
+            return json.loads(payload)
+        except ValueError:
+            return {}
+
+    # ── Partitions ────────────────────────────────────────────────
+
+    @staticmethod
+    def _partition_for(timestamp: float) -> str:
+        return f"{_PARTITION_PREFIX}{datetime.fromtimestamp(timestamp).strftime('%Y%m')}"
+
+    def _ensure_partition(self, partition: str):
+        if partition in self.partitions:
+            return
+        self.conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {partition} (
+                user_id INTEGER NOT NULL,
+                action INTEGER NOT NULL,
+                ts REAL NOT NULL,
+                session INTEGER,
+                data TEXT,
+                context TEXT,
+                success INTEGER NOT NULL DEFAULT 1
+            )
+        """)
+        self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{partition}_user_ts ON {partition}(user_id, ts)")
+        self.partitions.add(partition)
+        self._drop_expired_partitions()
+
+    def _oldest_partition(self) -> str:
+        now = datetime.now()
+        month_index = now.year * 12 + now.month - 1 - self.retention_months
+        return f"{_PARTITION_PREFIX}{month_index // 12:04d}{month_index % 12 + 1:02d}"
+
+    def _drop_expired_partitions(self):
+        oldest = self._oldest_partition()
+        expired = [partition for partition in sorted(self.partitions) if partition < oldest]
+        for partition in expired:
+            self.conn.execute(f"DROP TABLE IF EXISTS {partition}")
+            self.partitions.discard(partition)
+            self.preexisting.pop(partition, None)
+            self.stats["partitions_dropped"] += 1
+        if expired:
+            self._collect_sessions()
+
+    def _collect_sessions(self):
+        """Delete session symbols that no remaining partition references.
+
+        Buffered rows hold session values rather than ids, so they are
+        re-interned when they are written.
+        """
+        referenced = [f"SELECT session FROM {partition} WHERE session IS NOT NULL" for partition in sorted(self.partitions)]
+        condition = f" AND id NOT IN ({' UNION '.join(referenced)})" if referenced else ""
+        collected = self.conn.execute(f"DELETE FROM symbols WHERE kind = 'session'{condition}").rowcount
+        self.stats["symbols_collected"] += max(collected, 0)
+        # Cached ids may belong to deleted rows; sessions are re-interned on demand
+        for key in [key for key in self.symbol_ids if key[0] == "session"]:
+            self.symbol_values.pop(self.symbol_ids.pop(key), None)
+
+    # ── Writes ────────────────────────────────────────────────────
+
+    def append(self, user_id: str, action_type: str, data: Dict[str, Any] = None,
+               context: Dict[str, Any] = None, session_id: str = None,
+               success: bool = True, timestamp: float = None) -> BehaviorEvent:
+        """Record one event and fold it into the user's aggregates (in memory; written in the background)"""
+        timestamp = timestamp or time.time()
+        event = BehaviorEvent(user_id, action_type, timestamp, session_id, data or {}, context or {}, success)
+        with self._lock:
+            aggregates = self._aggregates_for(user_id)
+            row = (user_id, action_type, timestamp, session_id, self._encode(data), self._encode(context),
+                   1 if success else 0)
+            self.buffer.append((self._partition_for(timestamp), row))
+            aggregates.add(action_type, timestamp, success)
+            self.events[user_id].append(event)
+            self.stats["appended"] += 1
+            full = len(self.buffer) >= self.flush_size
+        self._schedule_flush(full)
+
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"⚠️ Behavior event listener failed: {e}")
+        return event
+
+    def add_listener(self, callback: Callable[[BehaviorEvent], None]):
+        """Register a synchronous callback(event) run after every append; keep it O(1)"""
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def _schedule_flush(self, now: bool = False):
+        """Flush in a worker thread: right away when `now`, else after `flush_interval`"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts, tests): write through
+            self.flush()
+            return
+        if self._writer is not None:
+            return  # _flushed() reschedules whatever arrives meanwhile
+        if now:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._writer = loop.create_task(asyncio.to_thread(self.flush))
+            self._writer.add_done_callback(self._flushed)
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(self.flush_interval, self._flush_due)
+
+    def _flush_due(self):
+        self._flush_timer = None
+        self._schedule_flush(True)
+
+    def _flushed(self, _task: asyncio.Task):
+        self._writer = None
+        if self.buffer:
+            self._schedule_flush(len(self.buffer) >= self.flush_size)
+
+    def flush(self):
+        """Write buffered events, one executemany per partition (blocking; call off the event loop)"""
+        with self._lock:
+            pending, self.buffer = self.buffer, []
+        if not pending:
+            return
+        by_partition = {}
+        oldest = self._oldest_partition()
+        for partition, row in pending:
+            # Events already past retention would land in a partition that is dropped on creation
+            if partition >= oldest:
+                by_partition.setdefault(partition, []).append(row)
+        try:
+            with self._db_lock:
+                conn = self._db()
+                # Create partitions first: dropping an expired one collects session symbols
+                for partition in by_partition:
+                    self._ensure_partition(partition)
+                for partition, rows in by_partition.items():
+                    conn.executemany(f"INSERT INTO {partition} VALUES (?, ?, ?, ?, ?, ?, ?)", [
+                        (self._intern("user", user_id), self._intern("action", action), ts,
+                         self._intern("session", session), data, context, success)
+                        for user_id, action, ts, session, data, context, success in rows
+                    ])
+                    self.stats["rows_written"] += len(rows)
+                conn.commit()
+                self.stats["flushes"] += 1
+        except Exception as e:
+            print(f"⚠️ Behavior event flush failed: {e}")
+            with self._db_lock:
+                if self.conn is not None:
+                    self.conn.rollback()
+            with self._lock:
+                self.buffer[:0] = pending
+
+    # ── Reads ─────────────────────────────────────────────────────
+
+    def _aggregates_for(self, user_id: str) -> UserAggregates:
+        """The user's in-memory aggregates (caller holds `_lock`); a new user's history loads in the background"""
+        aggregates = self.aggregates.get(user_id)
+        if aggregates is None:
+            aggregates = self.aggregates[user_id] = UserAggregates(self.window)
+            self.events[user_id] = deque(maxlen=self.window)
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._load_user(user_id)
+                return self.aggregates[user_id]
+            self.loading[user_id] = loop.create_task(asyncio.to_thread(self._load_user, user_id))
+        return aggregates
+
+    def _load_user(self, user_id: str):
+        """Merge the user's events from earlier runs into memory (blocking)"""
+        try:
+            with self._db_lock:
+                older = list(reversed(self._query(user_id, self.window, preexisting_only=True)))
+        except Exception as e:
+            print(f"⚠️ Behavior history of {user_id} could not be loaded: {e}")
+            older = []
+        with self._lock:
+            self.loading.pop(user_id, None)
+            self.loaded_users.add(user_id)
+            current, live = self.aggregates[user_id], self.events[user_id]
+            # If more events arrived during the load than the window holds, keep the live aggregates
+            if not older or current.total > len(live):
+                return
+            merged = UserAggregates(self.window)
+            for event in older + list(live):
+                merged.add(event.action_type, event.timestamp, event.success)
+            self.aggregates[user_id] = merged
+            self.events[user_id] = deque(older + list(live), maxlen=self.window)
+            self.stats["users_loaded_from_disk"] += 1
+
+    async def ensure_loaded(self, user_id: str):
+        """Wait until the user's history from earlier runs has been merged in"""
+        with self._lock:
+            self._aggregates_for(user_id)
+            loading = self.loading.get(user_id)
+        if loading is not None:
+            await asyncio.shield(loading)
+
+    def is_loaded(self, user_id: str) -> bool:
+        return user_id in self.loaded_users
+
+    def _query(self, user_id: str, limit: int, since: float = None, preexisting_only: bool = False) -> List[BehaviorEvent]:
+        """Newest-first events for a user, walking partitions from the newest (caller holds `_db_lock`)"""
+        conn = self._db()
+        user_code = self.symbol_ids.get(("user", user_id))
+        if user_code is None:
+            row = conn.execute("SELECT id FROM symbols WHERE kind = 'user' AND value = ?", (user_id,)).fetchone()
+            if row is None:
+                return []
+            user_code = row[0]
+
+        rows = []
+        oldest = self._partition_for(since) if since else ""
+        for partition in sorted(self.partitions, reverse=True):
+            if partition < oldest or len(rows) >= limit:
+                break
+            last_rowid = self.preexisting.get(partition, 0) if preexisting_only else -1
+            if last_rowid == 0:
+                continue
+            rows.extend(conn.execute(
+                f"SELECT action, ts, session, data, context, success FROM {partition} "
+                f"WHERE user_id = ? AND ts >= ? AND (? < 0 OR rowid <= ?) ORDER BY ts DESC LIMIT ?",
+                (user_code, since or 0, last_rowid, last_rowid, limit - len(rows))
+            ).fetchall())
+
+        symbols = self._symbols({value for row in rows for value in (row[0], row[2]) if value is not None})
+        return [
+            BehaviorEvent(
+                user_id=user_id,
+                action_type=symbols.get(action, "unknown"),
+                timestamp=ts,
+                session_id=symbols.get(session),
+                data=self._decode(data),
+                context=self._decode(context),
+                success=bool(success)
+            )
+            for action, ts, session, data, context, success in rows
+        ]
+
+    def _from_memory(self, user_id: str, limit: int, since: float = None) -> Tuple[List[BehaviorEvent], bool]:
+        """(newest `limit` in-memory events since `since`, oldest first; whether that is the full answer)"""
+        self._aggregates_for(user_id)
+        events = self.events[user_id]
+        selected = [event for event in events if since is None or event.timestamp >= since][-limit:] if limit > 0 else []
+        # A window that never filled holds the user's whole history
+        complete = (
+            len(selected) >= limit
+            or len(events) < self.window
+            or (since is not None and events[0].timestamp <= since)
+        )
+        return selected, complete
+
+    def recent(self, user_id: str, limit: int = 100, since: float = None) -> List[BehaviorEvent]:
+        """Most recent events for a user, oldest first, from memory (at most `window` of them)"""
+        with self._lock:
+            return self._from_memory(user_id, limit, since)[0]
+
+    def _history_from_disk(self, user_id: str, limit: int, since: float = None) -> List[BehaviorEvent]:
+        self.flush()
+        with self._db_lock:
+            return list(reversed(self._query(user_id, limit, since)))
+
+    async def history(self, user_id: str, limit: int = 100, since: float = None) -> List[BehaviorEvent]:
+        """Like recent(), reaching past the in-memory window in a worker thread when needed"""
+        await self.ensure_loaded(user_id)
+        with self._lock:
+            events, complete = self._from_memory(user_id, limit, since)
+        if complete:
+            return events
+        self.stats["history_reads"] += 1
+        return await asyncio.to_thread(self._history_from_disk, user_id, limit, since)
+
+    def get_aggregates(self, user_id: str) -> UserAggregates:
+        with self._lock:
+            return self._aggregates_for(user_id)
+
+    def snapshot_aggregates(self, user_id: str) -> UserAggregates:
+        """A copy of the user's aggregates taken under the lock, for use off the event loop"""
+        with self._lock:
+            return self._aggregates_for(user_id).copy()
+
+    def has_user(self, user_id: str) -> bool:
+        return self.get_aggregates(user_id).total > 0
+
+    def known_users(self) -> List[str]:
+        """Users with aggregates loaded in this process"""
+        return [user_id for user_id, aggregates in self.aggregates.items() if aggregates.total]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "buffered": len(self.buffer),
+            "partitions": sorted(self.partitions),
+            "users_loaded": len(self.aggregates),
+            "users_loading": len(self.loading),
+            "events_in_memory": sum(len(events) for events in self.events.values()),
+            "symbols_cached": len(self.symbol_values)
+        }
+
+    def close(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        self.flush()
+        with self._db_lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+behavior_event_store = BehaviorEventStore()
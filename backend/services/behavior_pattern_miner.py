@@ -0,0 +1,269 @@
+"""
+Behavior Pattern Miner
+Background, per-user frequent sequence mining (PrefixSpan) over the behavior
+event store; only the mined summary is escalated to the LLM
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from groq import AsyncGroq
+
+from services.behavior_event_store import BehaviorEvent, BehaviorEventStore, UserAggregates, behavior_event_store
+from services.model_router import model_router
+from services.structured_output import load_json
+
+
+def prefixspan(sequences: List[List[str]], min_support: int, max_length: int = 4) -> List[Tuple[Tuple[str, ...], int]]:
+    """Frequent subsequences of single-item sequences.
+
+    Returns (pattern, support) pairs where support is the number of input
+    sequences containing the pattern in order (not necessarily contiguous).
+    Each step projects the database on the prefix instead of rescanning it.
+    """
+    results = []
+
+    def grow(prefix: Tuple[str, ...], projected: List[Tuple[int, int]]):
+        occurrences = {}
+        for seq_index, start in projected:
+            seen = set()
+            sequence = sequences[seq_index]
+            for position in range(start, len(sequence)):
+                item = sequence[position]
+                if item not in seen:
+                    seen.add(item)
+                    occurrences.setdefault(item, []).append((seq_index, position + 1))
+
+        for item, item_projection in occurrences.items():
+            if len(item_projection) < min_support:
+                continue
+            pattern = prefix + (item,)
+            results.append((pattern, len(item_projection)))
+            if len(pattern) < max_length:
+                grow(pattern, item_projection)
+
+    grow((), [(index, 0) for index in range(len(sequences))])
+    return results
+
+
+class BehaviorPatternMiner:
+    """Mine each user's behavior at most once per `interval` seconds.
+
+    Trackers call `mark_dirty(user_id)`, which is O(1). A background sweep mines
+    dirty users whose last mining is older than `interval`, or who have never
+    been mined and went quiet for `debounce` seconds. Results are cached per
+    user. The LLM sees only the mined summary, and only when it changed.
+    """
+
+    def __init__(self, store: BehaviorEventStore = None, interval: float = 300, debounce: float = 30,
+                 window: int = 500, session_gap: float = 1800, min_support: int = 2, max_length: int = 4):
+        self.store = store or behavior_event_store
+        self.interval = interval
+        self.debounce = debounce
+        self.window = window
+        self.session_gap = session_gap
+        self.min_support = min_support
+        self.max_length = max_length
+        self.groq_client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY")) if os.getenv("GROQ_API_KEY") else None
+        self.dirty: Dict[str, float] = {}       # user -> last event time
+        self.last_mined: Dict[str, float] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.listeners: List[Callable] = []
+        self.stats = {"runs": 0, "llm_summaries": 0, "skipped_llm": 0, "errors": 0}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def add_listener(self, callback: Callable):
+        """Register an async callback(user_id, result) invoked after each mining run"""
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def mark_dirty(self, user_id: str):
+        self.dirty[user_id] = time.time()
+        self.start()
+
+    def get_result(self, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.results.get(user_id)
+
+    async def ensure_result(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Cached result, mining once first if the user has events but none yet"""
+        await self.store.ensure_loaded(user_id)
+        if user_id not in self.results and self.store.has_user(user_id):
+            await self.mine(user_id, summarize=False)
+        return self.results.get(user_id)
+
+    # ── Mining ────────────────────────────────────────────────────
+
+    def _sessions(self, events: List[BehaviorEvent]) -> List[List[str]]:
+        """Split recent events into sessions, collapsing immediate repeats"""
+        sessions, current = [], []
+        previous = None
+        for event in events:
+            new_session = previous is not None and (
+                event.timestamp - previous.timestamp > self.session_gap
+                or (event.session_id and previous.session_id and event.session_id != previous.session_id)
+            )
+            if new_session and current:
+                sessions.append(current)
+                current = []
+            if not current or current[-1] != event.action_type:
+                current.append(event.action_type)
+            previous = event
+        if current:
+            sessions.append(current)
+        return sessions
+
+    def mine_user(self, user_id: str, events: List[BehaviorEvent], aggregates: UserAggregates) -> Dict[str, Any]:
+        """Mine one user's frequent sequences from a snapshot of their events and aggregates.
+
+        CPU-bound and safe to run in a thread: it touches nothing the event
+        loop keeps mutating.
+        """
+        sessions = self._sessions(events)
+
+        # Long single-session histories still yield patterns via 10-action chunks
+        if len(sessions) < self.min_support:
+            flat = [action for session in sessions for action in session]
+            sessions = [flat[i:i + 10] for i in range(0, len(flat), 10)]
+
+        frequent = [
+            (pattern, support)
+            for pattern, support in prefixspan(sessions, self.min_support, self.max_length)
+            if len(pattern) > 1
+        ]
+        # Prefer long, well-supported patterns
+        frequent.sort(key=lambda item: (item[1] * len(item[0]), item[1]), reverse=True)
+
+        sequences = [
+            {
+                "sequence": list(pattern),
+                "support": support,
+                "support_ratio": round(support / len(sessions), 3) if sessions else 0.0
+            }
+            for pattern, support in frequent[:10]
+        ]
+        result = {
+            "user_id": user_id,
+            "mined_at": time.time(),
+            "events": aggregates.total,
+            "sessions": len(sessions),
+            "sequences": sequences,
+            "top_actions": [{"action": action, "count": count} for action, count in aggregates.top_actions(5)],
+            "peak_hours": aggregates.peak_hours(),
+            "success_rate": round(aggregates.successes / aggregates.total, 3) if aggregates.total else 0.0
+        }
+        result["signature"] = hashlib.blake2b(json.dumps(
+            [[s["sequence"] for s in sequences], [a["action"] for a in result["top_actions"]], result["peak_hours"]]
+        ).encode(), digest_size=8).hexdigest()
+        return result
+
+    async def mine(self, user_id: str, summarize: bool = True) -> Dict[str, Any]:
+        self.dirty.pop(user_id, None)
+        self.last_mined[user_id] = time.time()
+        # Snapshot on the loop thread; the store keeps changing while the thread mines
+        await self.store.ensure_loaded(user_id)
+        events = self.store.recent(user_id, limit=self.window)
+        aggregates = self.store.snapshot_aggregates(user_id)
+        result = await asyncio.to_thread(self.mine_user, user_id, events, aggregates)
+        self.stats["runs"] += 1
+
+        previous = self.results.get(user_id)
+        if previous and previous["signature"] == result["signature"]:
+            result["summary"] = previous.get("summary")
+            self.stats["skipped_llm"] += 1
+        elif summarize and result["sequences"]:
+            result["summary"] = await self._summarize(result)
+        else:
+            result["summary"] = None
+
+        self.results[user_id] = result
+        for listener in self.listeners:
+            try:
+                await listener(user_id, result)
+            except Exception as e:
+                print(f"⚠️ Pattern listener failed: {e}")
+        return result
+
+    async def _summarize(self, result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Escalate the mined summary (never raw events) to the LLM"""
+        if not self.groq_client:
+            return None
+        try:
+            mined = {key: result[key] for key in ("sequences", "top_actions", "peak_hours", "success_rate", "sessions")}
+            chat_completion, _ = await model_router.complete(
+                self.groq_client,
+                "suggestions",
+                [
+                    {"role": "system", "content": "You are a behavioral analysis AI expert. Reply with JSON only."},
+                    {"role": "user", "content": f"""
+                    These are frequent action sequences and usage statistics mined from a browser user's history:
+                    {json.dumps(mined)}
+
+                    Return JSON: {{"insights": [{{"insight": "...", "confidence": 0.0-1.0}}],
+                    "suggestions": [{{"type": "workflow_automation|efficiency_improvement|personalized_shortcut",
+                    "suggestion": "...", "confidence": 0.0-1.0, "reasoning": "..."}}]}}
+                    """}
+                ],
+                temperature=0.2,
+                max_tokens=800
+            )
+            self.stats["llm_summaries"] += 1
+            return load_json(chat_completion.choices[0].message.content, dict)
+        except Exception as e:
+            print(f"⚠️ Pattern summary failed: {e}")
+            return None
+
+    # ── Scheduling ────────────────────────────────────────────────
+
+    def _due(self, now: float) -> List[str]:
+        due = []
+        for user_id, last_event in self.dirty.items():
+            last_mined = self.last_mined.get(user_id)
+            if last_mined is None:
+                if now - last_event >= self.debounce:
+                    due.append(user_id)
+            elif now - last_mined >= self.interval:
+                due.append(user_id)
+        return due
+
+    def start(self):
+        """Start the background sweep once an event loop is running"""
+        if self._sweeper and not self._sweeper.done():
+            return
+        try:
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep())
+        except RuntimeError:
+            pass
+
+    async def stop(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._sweeper = None
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(min(self.debounce, self.interval))
+            for user_id in self._due(time.time()):
+                try:
+                    await self.mine(user_id)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    print(f"⚠️ Pattern mining failed for {user_id}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "interval": self.interval,
+            "pending_users": len(self.dirty),
+            "users_mined": len(self.results)
+        }
+
+
+behavior_pattern_miner = BehaviorPatternMiner()
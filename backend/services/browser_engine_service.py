@@ -10,6 +10,8 @@ import hashlib
 import sqlite3
 from pathlib import Path
 
+from services.embedding_index import embedding_index
+
 class BrowserEngineService:
     """Core browser engine service for actual browsing functionality"""
     
@@ -42,6 +44,9 @@ class BrowserEngineService:
             # Fetch page content and metadata
             page_data = await self.navigation_engine.fetch_page_data(normalized_url)
             
+            # Index the visited page for semantic history search in the background
+            embedding_index.schedule_url(user_id, normalized_url, page_data.get("title", ""))
+            
             return {
                 "success": True,
                 "url": normalized_url,
@@ -1,11 +1,92 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from datetime import datetime
 import json
 import asyncio
 from groq import Groq
 import os
-import requests
-from bs4 import BeautifulSoup
+
+from services.page_fetcher import page_fetcher
+from services.structured_extractor import structured_extractor, DETERMINISTIC_TYPES
+from services.source_pipeline import source_pipeline, select_passages
+from services.knowledge_graph_store import knowledge_graph_store
+from services.embedding_index import embedding_index
+from services.model_router import model_router
+from services.structured_output import StructuredResult, schema_block, structured_output
+
+# Per-field specs shared by the combined and per-field extraction paths: the
+# JSON shape the field takes in a combined response, the type it must parse
+# to, the content window and output budget of its standalone call, and the
+# helper that produces it on its own
+PAGE_ANALYSIS_FIELDS = {
+    "summary": {"schema": '"<2-3 sentence summary covering key points, purpose and target audience>"',
+                "type": str, "chars": 3000, "max_tokens": 800, "helper": "_generate_summary", "with_url": True},
+    "keywords": {"schema": '["<10-15 keywords or key phrases, most important first>"]',
+                 "type": list, "chars": 2000, "max_tokens": 300, "helper": "_extract_keywords"},
+    "sentiment": {"schema": '{"score": <-1.0 to 1.0>, "label": "positive/negative/neutral", "confidence": <0.0 to 1.0>, "explanation": "<brief>"}',
+                  "type": dict, "chars": 1500, "max_tokens": 200, "helper": "_analyze_sentiment"},
+    "insights": {"schema": '["<3-5 actionable insights: takeaways, applications, implications, next steps>"]',
+                 "type": list, "chars": 2000, "max_tokens": 600, "helper": "_generate_insights", "with_url": True},
+    "action_items": {"schema": '[{"action": "description", "priority": "high/medium/low", "category": "type"}]',
+                     "type": list, "chars": 2000, "max_tokens": 500, "helper": "_extract_action_items"}
+}
+
+STRUCTURED_DATA_FIELDS = {
+    "contacts": {"schema": '[{"name": "name", "email": "email", "phone": "phone", "role": "role"}]',
+                 "type": list, "chars": 2000, "max_tokens": 400, "helper": "_extract_contacts"},
+    "products": {"schema": '[{"name": "product name", "price": "price", "description": "brief description", "category": "category"}]',
+                 "type": list, "chars": 2000, "max_tokens": 600, "helper": "_extract_products"},
+    "articles": {"schema": '[{"title": "title", "author": "author", "date": "date", "summary": "brief summary"}]',
+                 "type": list, "chars": 2000, "max_tokens": 500, "helper": "_extract_articles"},
+    "events": {"schema": '[{"name": "event name", "date": "date/time", "location": "location", "description": "description"}]',
+               "type": list, "chars": 2000, "max_tokens": 400, "helper": "_extract_events"},
+    "prices": {"schema": '[{"item": "item/service name", "price": "price", "currency": "currency", "type": "one-time/recurring"}]',
+               "type": list, "chars": 2000, "max_tokens": 300, "helper": "_extract_prices"}
+}
+
+# Estimated prompt + output tokens above which a combined call would crowd the
+# 8k context window; fields are then fetched with concurrent per-field calls
+COMBINED_TOKEN_BUDGET = 6000
+
+# Multi-source research: sources accepted per request and the passage budget
+# each source contributes to its own map-step prompt
+MAX_RESEARCH_SOURCES = 50
+SOURCE_PASSAGE_BUDGET = 2400
+
+# Fact-check verdict; scores and counts may come back as ints or floats
+FACT_CHECK_FIELDS = {
+    "accuracy_score": {"schema": "<0-100>", "type": (int, float), "max_tokens": 20},
+    "claims_total": {"schema": "<number>", "type": (int, float), "max_tokens": 20},
+    "claims_accurate": {"schema": "<number>", "type": (int, float), "max_tokens": 20},
+    "claims_questionable": {"schema": "<number>", "type": (int, float), "max_tokens": 20},
+    "questionable_statements": {"schema": '["statement1", "statement2"]', "type": list, "max_tokens": 400},
+    "reliability_score": {"schema": "<0-100>", "type": (int, float), "max_tokens": 20},
+    "assessment": {"schema": '"<overall assessment>"', "type": str, "max_tokens": 300}
+}
+
+# Research map/reduce outputs; a field the model leaves out or cuts off is
+# re-requested on its own instead of dropping the source
+GRAPH_FRAGMENT_FIELDS = {
+    "concepts": {"schema": '[{"label": "Concept Name", "type": "entity/concept/fact"}]', "type": list, "max_tokens": 300},
+    "relationships": {"schema": '[{"source": "Concept Name", "target": "Other Concept", "relationship": "relates to", "strength": 0.8}]',
+                      "type": list, "max_tokens": 400}
+}
+
+GRAPH_INSIGHT_FIELDS = {
+    "insights": {"schema": '["3-5 insights about the topic that this graph supports"]', "type": list, "max_tokens": 500}
+}
+
+SOURCE_ASSESSMENT_FIELDS = {
+    "scores": {"schema": '{"<criterion>": <0.0-1.0>}', "type": dict, "max_tokens": 120},
+    "summary": {"schema": '"<one sentence on what the source covers>"', "type": str, "max_tokens": 80},
+    "strengths": {"schema": '["strength"]', "type": list, "max_tokens": 100},
+    "weaknesses": {"schema": '["weakness"]', "type": list, "max_tokens": 100}
+}
+
+COMPARISON_FIELDS = {
+    "overall_recommendation": {"schema": '"<which source is best overall and why>"', "type": str, "max_tokens": 250},
+    "key_differences": {"schema": '["difference1", "difference2"]', "type": list, "max_tokens": 350}
+}
+
 
 class ContentAnalyzerService:
     def __init__(self):
@@ -17,80 +98,152 @@ class ContentAnalyzerService:
             print(f"Warning: GROQ client initialization failed: {e}")
             self.groq_client = None
 
+    async def _complete(self, task: str, **kwargs):
+        """GROQ completion on the model routed for `task` (small by default, escalated on unparseable output)"""
+        response, _ = await model_router.complete(self.groq_client, task, **kwargs)
+        return response
+
+    async def _complete_field(self, task: str, specs: Dict[str, Dict[str, Any]], field: str, prompt: str,
+                              system: str, temperature: float) -> StructuredResult:
+        """One field as a JSON-mode {field: value} object, repaired or re-requested when it comes back unusable"""
+        return await structured_output.complete(
+            self.groq_client,
+            task,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            fields={field: specs[field]},
+            max_tokens=specs[field]["max_tokens"],
+            temperature=temperature
+        )
+
+    # ── Multi-field extraction ────────────────────────────────────
+
+    def _combined_prompt(self, specs: Dict[str, Dict[str, Any]], fields: List[str], content: str,
+                         url: Optional[str]) -> Tuple[str, int]:
+        chars = max(specs[field]["chars"] for field in fields)
+        prompt = f"""Analyze the following webpage content{f' from {url}' if url else ''}:
+
+{content[:chars]}
+
+Return ONE JSON object with exactly these keys. Use an empty list when nothing is found and only include real data, not examples:
+{schema_block({field: specs[field] for field in fields})}"""
+        return prompt, sum(specs[field]["max_tokens"] for field in fields)
+
+    async def _stream_fields(self, specs: Dict[str, Dict[str, Any]], fields: List[str], content: str,
+                             url: Optional[str] = None) -> AsyncIterator[Tuple[str, Any, str]]:
+        """Yield (field, value, mode) as each requested field becomes available.
+
+        Several fields go into one combined, streamed call when the prompt
+        plus their output budgets fit COMBINED_TOKEN_BUDGET; each field is
+        yielded as soon as it closes in the stream. Whatever that call did not
+        return (too large, truncated, malformed, failed) is fetched with
+        concurrent per-field calls and yielded in completion order.
+        """
+        fields = [field for field in dict.fromkeys(fields) if field in specs]
+        remaining = fields
+
+        if self.groq_client and len(fields) > 1:
+            prompt, max_tokens = self._combined_prompt(specs, fields, content, url)
+            if len(prompt) // 4 + max_tokens <= COMBINED_TOKEN_BUDGET:
+                combined = set()
+                try:
+                    async for field, value in structured_output.stream(
+                        self.groq_client,
+                        "extraction",
+                        messages=[
+                            {"role": "system", "content": "You are an expert content analyst. Return a single valid JSON object with the requested keys."},
+                            {"role": "user", "content": prompt}
+                        ],
+                        fields={field: specs[field] for field in fields},
+                        retry_missing=False,
+                        max_tokens=max_tokens,
+                        temperature=0.2
+                    ):
+                        combined.add(field)
+                        yield field, value, "combined"
+                except Exception as e:
+                    print(f"⚠️ Combined extraction failed, falling back to per-field calls: {e}")
+                remaining = [field for field in fields if field not in combined]
+
+        async def extract(field: str):
+            spec = specs[field]
+            helper = getattr(self, spec["helper"])
+            return field, await (helper(content, url) if spec.get("with_url") else helper(content))
+
+        for finished in asyncio.as_completed([extract(field) for field in remaining]):
+            field, value = await finished
+            yield field, value, "per_field"
+
+    async def _drain(self, events: AsyncIterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """Final payload of an event stream ("completed" or "error") without the event tag"""
+        result = {}
+        async for event in events:
+            result = event
+        result.pop("event", None)
+        return result
+
+    async def stream_page_analysis(self, url: str, analysis_types: List[str], user_id: str, db) -> AsyncIterator[Dict[str, Any]]:
+        """Incremental analyze_page: "started", one "field" event per analysis type as it completes, then "completed" """
+        content = await self._scrape_webpage_content(url)
+        if not content:
+            yield {"event": "error", "error": "Could not scrape webpage content"}
+            return
+        yield {"event": "started", "url": url, "analysis_types": analysis_types, "content_length": len(content)}
+        # The page is in the fetcher cache now, so indexing it for later retrieval is cheap
+        embedding_index.schedule_url(user_id, url)
+
+        analysis_results, modes = {}, {}
+        async for field, value, mode in self._stream_fields(PAGE_ANALYSIS_FIELDS, analysis_types, content, url):
+            analysis_results[field] = value
+            modes[field] = mode
+            yield {"event": "field", "field": field, "value": value, "mode": mode}
+        analysis_results = {field: analysis_results[field] for field in analysis_types if field in analysis_results}
+
+        # Store analysis in database
+        analysis_doc = {
+            "id": f"analysis_{int(datetime.utcnow().timestamp())}",
+            "user_id": user_id,
+            "url": url,
+            "analysis_types": analysis_types,
+            "results": analysis_results,
+            "content_preview": content[:500],
+            "created_at": datetime.utcnow(),
+            "processed_by": "GROQ AI"
+        }
+
+        await db.content_analysis.insert_one(analysis_doc)
+
+        yield {
+            "event": "completed",
+            "url": url,
+            "analysis_types": analysis_types,
+            "results": analysis_results,
+            "extraction_modes": modes,
+            "content_length": len(content),
+            "analysis_id": analysis_doc["id"]
+        }
+
     async def analyze_page(self, url: str, analysis_types: List[str], user_id: str, db):
         """Analyze web page content with GROQ AI"""
         try:
-            # First, scrape the content
-            content = await self._scrape_webpage_content(url)
-            
-            if not content:
-                return {"error": "Could not scrape webpage content"}
-            
-            # Analyze with GROQ
-            analysis_results = {}
-            
-            for analysis_type in analysis_types:
-                if analysis_type == "summary":
-                    analysis_results["summary"] = await self._generate_summary(content, url)
-                elif analysis_type == "keywords":
-                    analysis_results["keywords"] = await self._extract_keywords(content)
-                elif analysis_type == "sentiment":
-                    analysis_results["sentiment"] = await self._analyze_sentiment(content)
-                elif analysis_type == "insights":
-                    analysis_results["insights"] = await self._generate_insights(content, url)
-                elif analysis_type == "action_items":
-                    analysis_results["action_items"] = await self._extract_action_items(content)
-            
-            # Store analysis in database
-            analysis_doc = {
-                "id": f"analysis_{int(datetime.utcnow().timestamp())}",
-                "user_id": user_id,
-                "url": url,
-                "analysis_types": analysis_types,
-                "results": analysis_results,
-                "content_preview": content[:500],
-                "created_at": datetime.utcnow(),
-                "processed_by": "GROQ AI"
-            }
-            
-            await db.content_analysis.insert_one(analysis_doc)
-            
-            return {
-                "url": url,
-                "analysis_types": analysis_types,
-                "results": analysis_results,
-                "content_length": len(content),
-                "analysis_id": analysis_doc["id"]
-            }
-            
+            return await self._drain(self.stream_page_analysis(url, analysis_types, user_id, db))
         except Exception as e:
             return {"error": f"Page analysis failed: {str(e)}"}
 
+    async def _page_html(self, url: str) -> str:
+        """Raw HTML of a page, normally already in the shared page cache from the text fetch"""
+        try:
+            page = page_fetcher.cache.peek(url) or await page_fetcher.fetch(url)
+            return page.html
+        except Exception:
+            return ""
+
     async def _scrape_webpage_content(self, url: str) -> str:
-        """Scrape webpage content for analysis"""
+        """Scrape webpage content for analysis (served from the shared page cache when prefetched)"""
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Extract text content
-            text = soup.get_text()
-            
-            # Clean up text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            return text[:10000]  # Limit to first 10k characters
+            return await page_fetcher.fetch_text(url, max_chars=10000)  # Limit to first 10k characters
             
         except Exception as e:
             print(f"Error scraping {url}: {e}")
@@ -115,8 +268,8 @@ Please provide:
 
 Format as a structured summary."""
 
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
+            response = await self._complete(
+                "summary",
                 messages=[
                     {"role": "system", "content": "You are an expert content analyst. Provide clear, structured summaries."},
                     {"role": "user", "content": prompt}
@@ -140,27 +293,14 @@ Format as a structured summary."""
 
 {content[:2000]}
 
-Return ONLY a JSON array of the top 10-15 most relevant keywords/phrases, ranked by importance.
-Format: ["keyword1", "keyword2", "key phrase", ...]"""
+Return the top 10-15 most relevant keywords/phrases, ranked by importance, as JSON:
+{schema_block({"keywords": PAGE_ANALYSIS_FIELDS["keywords"]})}"""
 
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": "You are an expert at keyword extraction. Return only valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=300,
-                temperature=0.2
+            result = await self._complete_field(
+                "keywords", PAGE_ANALYSIS_FIELDS, "keywords", prompt,
+                "You are an expert at keyword extraction. Return only valid JSON.", 0.2
             )
-            
-            # Try to parse JSON response
-            try:
-                keywords = json.loads(response.choices[0].message.content)
-                return keywords if isinstance(keywords, list) else ["parsing", "error"]
-            except json.JSONDecodeError:
-                # Fallback: extract keywords from response text
-                content_text = response.choices[0].message.content
-                return [word.strip().strip('"') for word in content_text.split(',')[:10]]
+            return result.data.get("keywords", ["parsing", "error"])
                 
         except Exception as e:
             return [f"keyword extraction failed: {str(e)}"]
@@ -175,29 +315,14 @@ Format: ["keyword1", "keyword2", "key phrase", ...]"""
 
 {content[:1500]}
 
-Provide sentiment analysis in this exact JSON format:
-{{
-  "score": <float between -1.0 and 1.0>,
-  "label": "<positive/negative/neutral>",
-  "confidence": <float between 0.0 and 1.0>,
-  "explanation": "<brief explanation>"
-}}"""
+Provide sentiment analysis in this exact JSON format (score between -1.0 and 1.0, confidence between 0.0 and 1.0):
+{schema_block({"sentiment": PAGE_ANALYSIS_FIELDS["sentiment"]})}"""
 
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": "You are a sentiment analysis expert. Return only valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=200,
-                temperature=0.1
+            result = await self._complete_field(
+                "sentiment", PAGE_ANALYSIS_FIELDS, "sentiment", prompt,
+                "You are a sentiment analysis expert. Return only valid JSON.", 0.1
             )
-            
-            try:
-                sentiment = json.loads(response.choices[0].message.content)
-                return sentiment
-            except json.JSONDecodeError:
-                return {"score": 0.0, "label": "neutral", "confidence": 0.5, "explanation": "Analysis failed"}
+            return result.data.get("sentiment", {"score": 0.0, "label": "neutral", "confidence": 0.5, "explanation": "Analysis failed"})
                 
         except Exception as e:
             return {"score": 0.0, "label": "error", "confidence": 0.0, "explanation": str(e)}
@@ -219,25 +344,14 @@ Provide 3-5 actionable insights that would be valuable to someone reading this c
 - Important implications
 - Next steps or recommendations
 
-Return as a JSON array of insight strings."""
+Return as JSON:
+{schema_block({"insights": PAGE_ANALYSIS_FIELDS["insights"]})}"""
 
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": "You are an expert analyst who provides actionable insights. Return valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=600,
-                temperature=0.4
+            result = await self._complete_field(
+                "insights", PAGE_ANALYSIS_FIELDS, "insights", prompt,
+                "You are an expert analyst who provides actionable insights. Return valid JSON.", 0.4
             )
-            
-            try:
-                insights = json.loads(response.choices[0].message.content)
-                return insights if isinstance(insights, list) else ["Insights generation succeeded but format error"]
-            except json.JSONDecodeError:
-                # Extract insights from response text
-                content_text = response.choices[0].message.content
-                return [insight.strip() for insight in content_text.split('\n') if insight.strip()][:5]
+            return result.data.get("insights", ["Insights generation succeeded but format error"])
                 
         except Exception as e:
             return [f"Insights generation failed: {str(e)}"]
@@ -259,24 +373,14 @@ Identify any:
 - Follow-up items
 - Recommendations to implement
 
-Return as JSON array with format:
-[{{"action": "description", "priority": "high/medium/low", "category": "type"}}]"""
+Return as JSON with format:
+{schema_block({"action_items": PAGE_ANALYSIS_FIELDS["action_items"]})}"""
 
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": "You are an expert at extracting actionable items. Return valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.3
+            result = await self._complete_field(
+                "action_items", PAGE_ANALYSIS_FIELDS, "action_items", prompt,
+                "You are an expert at extracting actionable items. Return valid JSON.", 0.3
             )
-            
-            try:
-                actions = json.loads(response.choices[0].message.content)
-                return actions if isinstance(actions, list) else []
-            except json.JSONDecodeError:
-                return [{"action": "Action extraction completed but format error", "priority": "low"}]
+            return result.data.get("action_items", [{"action": "Action extraction completed but format error", "priority": "low"}])
                 
         except Exception as e:
             return [{"action": f"Action extraction failed: {str(e)}", "priority": "low"}]
@@ -303,8 +407,8 @@ Provide a {summary_length} summary that captures:
 3. Important details and context
 4. Conclusion or outcome"""
 
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
+            response = await self._complete(
+                "summary",
                 messages=[
                     {"role": "system", "content": f"You are an expert at creating {summary_length} summaries. Be concise and comprehensive."},
                     {"role": "user", "content": prompt}
@@ -327,35 +431,49 @@ Provide a {summary_length} summary that captures:
         except Exception as e:
             return {"error": f"Summarization failed: {str(e)}"}
 
+    async def stream_structured_data(self, url: str, data_types: List[str], user_id: str, db) -> AsyncIterator[Dict[str, Any]]:
+        """Incremental extract_structured_data: "started", one "field" event per data type, then "completed" """
+        content = await self._scrape_webpage_content(url)
+        if not content:
+            yield {"event": "error", "error": "Could not scrape webpage content"}
+            return
+        yield {"event": "started", "url": url, "data_types": data_types, "content_length": len(content)}
+
+        # Deterministic pass first (JSON-LD, microdata, patterns); the LLM only sees what it leaves open
+        extracted_data, modes = {}, {}
+        deterministic = {}
+        kinds = [data_type for data_type in dict.fromkeys(data_types) if data_type in DETERMINISTIC_TYPES]
+        if kinds:
+            html = await self._page_html(url)
+            deterministic = await asyncio.to_thread(structured_extractor.extract, content, html, kinds)
+        for field, found in deterministic.items():
+            if found["complete"] or not self.groq_client:
+                extracted_data[field] = found["items"]
+                modes[field] = "deterministic"
+                yield {"event": "field", "field": field, "value": found["items"], "mode": "deterministic"}
+
+        remaining = [data_type for data_type in data_types if data_type not in extracted_data]
+        async for field, value, mode in self._stream_fields(STRUCTURED_DATA_FIELDS, remaining, content):
+            if deterministic.get(field, {}).get("items"):
+                value = structured_extractor.merge(field, deterministic[field], value)
+                mode = f"deterministic+{mode}"
+            extracted_data[field] = value
+            modes[field] = mode
+            yield {"event": "field", "field": field, "value": value, "mode": mode}
+
+        yield {
+            "event": "completed",
+            "url": url,
+            "data_types": data_types,
+            "extracted_data": {field: extracted_data[field] for field in data_types if field in extracted_data},
+            "extraction_modes": modes,
+            "content_length": len(content)
+        }
+
     async def extract_structured_data(self, url: str, data_types: List[str], user_id: str, db):
         """Extract structured data from webpage"""
         try:
-            content = await self._scrape_webpage_content(url)
-            
-            if not content:
-                return {"error": "Could not scrape webpage content"}
-            
-            extracted_data = {}
-            
-            for data_type in data_types:
-                if data_type == "contacts":
-                    extracted_data["contacts"] = await self._extract_contacts(content)
-                elif data_type == "products":
-                    extracted_data["products"] = await self._extract_products(content)
-                elif data_type == "articles":
-                    extracted_data["articles"] = await self._extract_articles(content)
-                elif data_type == "events":
-                    extracted_data["events"] = await self._extract_events(content)
-                elif data_type == "prices":
-                    extracted_data["prices"] = await self._extract_prices(content)
-            
-            return {
-                "url": url,
-                "data_types": data_types,
-                "extracted_data": extracted_data,
-                "content_length": len(content)
-            }
-            
+            return await self._drain(self.stream_structured_data(url, data_types, user_id, db))
         except Exception as e:
             return {"error": f"Data extraction failed: {str(e)}"}
 
@@ -370,24 +488,15 @@ Provide a {summary_length} summary that captures:
 {content[:2000]}
 
 Find and return contact details in this JSON format:
-[{{"name": "name", "email": "email", "phone": "phone", "role": "role"}}]
+{schema_block({"contacts": STRUCTURED_DATA_FIELDS["contacts"]})}
 
 Only include actual contacts found, not example data."""
 
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": "Extract real contact information. Return valid JSON array."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=400,
-                temperature=0.1
+            result = await self._complete_field(
+                "extraction", STRUCTURED_DATA_FIELDS, "contacts", prompt,
+                "Extract real contact information. Return valid JSON.", 0.1
             )
-            
-            try:
-                return json.loads(response.choices[0].message.content)
-            except json.JSONDecodeError:
-                return []
+            return result.data.get("contacts", [])
                 
         except Exception as e:
             return []
@@ -403,24 +512,15 @@ Only include actual contacts found, not example data."""
 {content[:2000]}
 
 Find and return product details in this JSON format:
-[{{"name": "product name", "price": "price", "description": "brief description", "category": "category"}}]
+{schema_block({"products": STRUCTURED_DATA_FIELDS["products"]})}
 
 Only include actual products found."""
 
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": "Extract product information. Return valid JSON array."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=600,
-                temperature=0.1
+            result = await self._complete_field(
+                "extraction", STRUCTURED_DATA_FIELDS, "products", prompt,
+                "Extract product information. Return valid JSON.", 0.1
             )
-            
-            try:
-                return json.loads(response.choices[0].message.content)
-            except json.JSONDecodeError:
-                return []
+            return result.data.get("products", [])
                 
         except Exception as e:
             return []
@@ -436,24 +536,15 @@ Only include actual products found."""
 {content[:2000]}
 
 Find and return article details in this JSON format:
-[{{"title": "title", "author": "author", "date": "date", "summary": "brief summary"}}]
+{schema_block({"articles": STRUCTURED_DATA_FIELDS["articles"]})}
 
 Only include actual articles found."""
 
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": "Extract article information. Return valid JSON array."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.1
+            result = await self._complete_field(
+                "extraction", STRUCTURED_DATA_FIELDS, "articles", prompt,
+                "Extract article information. Return valid JSON.", 0.1
             )
-            
-            try:
-                return json.loads(response.choices[0].message.content)
-            except json.JSONDecodeError:
-                return []
+            return result.data.get("articles", [])
                 
         except Exception as e:
             return []
@@ -469,24 +560,15 @@ Only include actual articles found."""
 {content[:2000]}
 
 Find and return event details in this JSON format:
-[{{"name": "event name", "date": "date/time", "location": "location", "description": "description"}}]
+{schema_block({"events": STRUCTURED_DATA_FIELDS["events"]})}
 
 Only include actual events found."""
 
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": "Extract event information. Return valid JSON array."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=400,
-                temperature=0.1
+            result = await self._complete_field(
+                "extraction", STRUCTURED_DATA_FIELDS, "events", prompt,
+                "Extract event information. Return valid JSON.", 0.1
             )
-            
-            try:
-                return json.loads(response.choices[0].message.content)
-            except json.JSONDecodeError:
-                return []
+            return result.data.get("events", [])
                 
         except Exception as e:
             return []
@@ -502,24 +584,15 @@ Only include actual events found."""
 {content[:2000]}
 
 Find and return pricing details in this JSON format:
-[{{"item": "item/service name", "price": "price", "currency": "currency", "type": "one-time/recurring"}}]
+{schema_block({"prices": STRUCTURED_DATA_FIELDS["prices"]})}
 
 Only include actual pricing found."""
 
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": "Extract pricing information. Return valid JSON array."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=300,
-                temperature=0.1
+            result = await self._complete_field(
+                "extraction", STRUCTURED_DATA_FIELDS, "prices", prompt,
+                "Extract pricing information. Return valid JSON.", 0.1
             )
-            
-            try:
-                return json.loads(response.choices[0].message.content)
-            except json.JSONDecodeError:
-                return []
+            return result.data.get("prices", [])
                 
         except Exception as e:
             return []
@@ -543,31 +616,22 @@ Analyze the factual claims and provide:
 6. Reliability score
 
 Return as JSON with this structure:
-{{
-  "accuracy_score": <0-100>,
-  "claims_total": <number>,
-  "claims_accurate": <number>,
-  "claims_questionable": <number>,
-  "questionable_statements": ["statement1", "statement2"],
-  "reliability_score": <0-100>,
-  "assessment": "<overall assessment>"
-}}"""
-
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
+{schema_block(FACT_CHECK_FIELDS)}"""
+
+            result = await structured_output.complete(
+                self.groq_client,
+                "fact_check",
                 messages=[
                     {"role": "system", "content": "You are a fact-checking expert. Analyze content for factual accuracy. Return valid JSON."},
                     {"role": "user", "content": prompt}
                 ],
+                fields=FACT_CHECK_FIELDS,
                 max_tokens=800,
                 temperature=0.2
             )
-            
-            try:
-                fact_check = json.loads(response.choices[0].message.content)
-                return {"fact_check_result": fact_check, "content": content[:200]}
-            except json.JSONDecodeError:
-                return {"fact_check_result": {"assessment": response.choices[0].message.content}}
+            if not result.data:
+                return {"fact_check_result": {"assessment": result.text}}
+            return {"fact_check_result": result.data, "content": content[:200]}
                 
         except Exception as e:
             return {"error": f"Fact-checking failed: {str(e)}"}
@@ -580,120 +644,182 @@ Return as JSON with this structure:
         })
         return session_data
 
+    # ── Multi-source research ─────────────────────────────────────
+
+    async def _complete_json(self, prompt: str, system: str, max_tokens: int,
+                             fields: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        result = await structured_output.complete(
+            self.groq_client,
+            "extraction",
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            fields=fields,
+            max_tokens=max_tokens,
+            temperature=0.2
+        )
+        return result.data
+
+    async def _extract_graph_fragment(self, topic: str, source: Dict[str, Any]) -> Dict[str, Any]:
+        """Map step: concepts and relationships about `topic` from one source's most relevant passages"""
+        passages = select_passages(source["text"], topic, budget=SOURCE_PASSAGE_BUDGET)
+        prompt = f"""Extract a knowledge graph fragment about "{topic}" from this source ({source['url']}):
+
+{passages}
+
+Return JSON:
+{schema_block(GRAPH_FRAGMENT_FIELDS)}"""
+        fragment = await self._complete_json(prompt, "You are an expert at creating knowledge graphs. Return valid JSON.", 700,
+                                             GRAPH_FRAGMENT_FIELDS)
+        return {**fragment, "url": source["url"]} if fragment.get("concepts") else None
+
+    async def _graph_insights(self, graph: Dict[str, Any]) -> List[str]:
+        """Final reduce: insights over the best-supported concepts and relationships"""
+        concepts = sorted(graph["concepts"], key=lambda concept: -len(concept["sources"]))[:40]
+        relationships = sorted(graph["relationships"], key=lambda rel: (-len(rel["sources"]), -rel["strength"]))[:40]
+        prompt = f"""Knowledge graph for "{graph['topic']}" built from {len(graph['sources'])} sources.
+
+Concepts (label: number of supporting sources):
+{chr(10).join(f"- {concept['label']}: {len(concept['sources'])}" for concept in concepts)}
+
+Relationships:
+{chr(10).join(f"- {rel['source']} {rel['relationship']} {rel['target']}" for rel in relationships)}
+
+Return JSON: {schema_block(GRAPH_INSIGHT_FIELDS)}"""
+        result = await self._complete_json(prompt, "You are an expert research analyst. Return valid JSON.", 500,
+                                           GRAPH_INSIGHT_FIELDS)
+        return result.get("insights", graph.get("insights", []))
+
     async def create_knowledge_graph(self, urls: List[str], topic: str, user_id: str, db):
-        """Create knowledge graph from multiple sources using GROQ"""
+        """Create or extend the user's knowledge graph for `topic` from multiple sources using GROQ.
+
+        Sources are fetched concurrently; each contributes a fragment built from
+        its passages most relevant to the topic (map), and fragments are merged
+        into the persistent graph store with entity deduplication (reduce).
+        Sources already in the graph are skipped, so calling again with more
+        URLs only pays for the new ones.
+        """
         if not self.groq_client:
             return {"error": "GROQ AI not available"}
-            
-        try:
-            # Scrape content from all URLs
-            all_content = []
-            for url in urls[:5]:  # Limit to 5 URLs
-                content = await self._scrape_webpage_content(url)
-                if content:
-                    all_content.append({"url": url, "content": content[:1500]})
-            
-            if not all_content:
-                return {"error": "Could not scrape content from provided URLs"}
-            
-            # Create knowledge graph using GROQ
-            sources_text = "\n\n".join([f"Source {i+1} ({item['url']}):\n{item['content']}" for i, item in enumerate(all_content)])
-            
-            prompt = f"""Create a knowledge graph for the topic "{topic}" based on these sources:
 
-{sources_text[:4000]}
-
-Generate a knowledge graph with:
-1. Main concepts and entities
-2. Relationships between concepts
-3. Supporting facts and evidence
-4. Source attribution
+        try:
+            known = set(await asyncio.to_thread(knowledge_graph_store.source_urls, user_id, topic))
+            new_urls = [url for url in dict.fromkeys(urls) if url not in known][:MAX_RESEARCH_SOURCES]
+
+            fetched, failed = await source_pipeline.fetch_sources(new_urls)
+            if not fetched and not known:
+                return {"error": "Could not scrape content from provided URLs", "failed_sources": failed}
+
+            fragments = await source_pipeline.map_reduce(fetched, lambda source: self._extract_graph_fragment(topic, source))
+            merged = [
+                await asyncio.to_thread(knowledge_graph_store.merge, user_id, topic, fragment.get("concepts", []),
+                                        fragment.get("relationships", []), fragment["url"])
+                for fragment in fragments
+            ]
+
+            graph = await asyncio.to_thread(knowledge_graph_store.get_graph, user_id, topic)
+            if graph is None:
+                return {"error": "Knowledge graph creation failed: no concepts could be extracted", "failed_sources": failed}
+            if fragments:
+                graph["insights"] = await self._graph_insights(graph)
+                await asyncio.to_thread(knowledge_graph_store.set_insights, user_id, topic, graph["insights"])
+
+            contributed = [fragment["url"] for fragment in fragments]
+            failed += [{"url": source["url"], "error": "No concepts extracted"} for source in fetched if source["url"] not in contributed]
+            return {
+                **graph,
+                "created_by": "GROQ AI",
+                "new_sources": contributed,
+                "failed_sources": failed,
+                "merge": {key: sum(result[key] for result in merged)
+                          for key in ("entities_added", "entities_merged", "edges_added", "edges_updated")}
+            }
 
-Return as JSON:
-{{
-  "topic": "{topic}",
-  "concepts": [
-    {{"id": "concept1", "label": "Concept Name", "type": "entity/concept/fact", "sources": [0,1]}}
-  ],
-  "relationships": [
-    {{"source": "concept1", "target": "concept2", "relationship": "relates to", "strength": 0.8}}
-  ],
-  "insights": ["insight1", "insight2"]
-}}"""
-
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": "You are an expert at creating knowledge graphs. Return valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1200,
-                temperature=0.3
-            )
-            
-            try:
-                knowledge_graph = json.loads(response.choices[0].message.content)
-                knowledge_graph["sources"] = urls
-                knowledge_graph["created_by"] = "GROQ AI"
-                return knowledge_graph
-            except json.JSONDecodeError:
-                return {"error": "Knowledge graph generation succeeded but format error", "raw_response": response.choices[0].message.content}
-                
         except Exception as e:
             return {"error": f"Knowledge graph creation failed: {str(e)}"}
 
+    async def _assess_source(self, criteria: List[str], source: Dict[str, Any]) -> Dict[str, Any]:
+        """Map step: score one source on every criterion from its most relevant passages"""
+        passages = select_passages(source["text"], " ".join(criteria), budget=SOURCE_PASSAGE_BUDGET)
+        scores = ", ".join(f'"{criterion}": <0.0-1.0>' for criterion in criteria)
+        fields = {**SOURCE_ASSESSMENT_FIELDS, "scores": {**SOURCE_ASSESSMENT_FIELDS["scores"], "schema": f"{{{scores}}}"}}
+        prompt = f"""Assess this source ({source['url']}) on: {", ".join(criteria)}
+
+{passages}
+
+Return JSON:
+{schema_block(fields)}"""
+        assessment = await self._complete_json(prompt, "You are an expert at evaluating information sources. Return valid JSON.", 400,
+                                               fields)
+        if "scores" not in assessment:
+            return None
+        scores = {}
+        for criterion in criteria:
+            try:
+                scores[criterion] = round(max(0.0, min(1.0, float(assessment["scores"].get(criterion, 0.0)))), 2)
+            except (TypeError, ValueError):
+                scores[criterion] = 0.0
+        return {"id": source["id"], "url": source["url"], "scores": scores, "summary": assessment.get("summary", ""),
+                "strengths": assessment.get("strengths", []), "weaknesses": assessment.get("weaknesses", [])}
+
     async def compare_sources(self, urls: List[str], comparison_criteria: List[str], user_id: str, db):
-        """Compare multiple sources using GROQ AI"""
+        """Compare multiple sources using GROQ AI.
+
+        Each source is scored on every criterion from its own relevant passages
+        (map, concurrent); winners and the ranking are computed from the scores
+        and one final call writes the recommendation over per-source summaries
+        (reduce), so the number of sources is not bounded by one prompt.
+        """
         if not self.groq_client:
             return {"error": "GROQ AI not available"}
-            
+
         try:
-            # Scrape content from all URLs
-            sources = []
-            for i, url in enumerate(urls[:4]):  # Limit to 4 sources
-                content = await self._scrape_webpage_content(url)
-                if content:
-                    sources.append({"id": f"source_{i+1}", "url": url, "content": content[:1500]})
-            
-            if len(sources) < 2:
-                return {"error": "Need at least 2 sources for comparison"}
-            
-            sources_text = "\n\n".join([f"{source['id']} ({source['url']}):\n{source['content']}" for source in sources])
-            criteria_text = ", ".join(comparison_criteria)
-            
-            prompt = f"""Compare these sources based on: {criteria_text}
-
-{sources_text[:5000]}
-
-Analyze and compare the sources on the specified criteria. Return as JSON:
-{{
-  "sources": [
-    {{"id": "source_1", "url": "url", "scores": {{"criteria1": 0.8, "criteria2": 0.7}}}}
-  ],
-  "comparison_results": {{
-    "criteria1": {{"winner": "source_1", "analysis": "explanation"}},
-    "criteria2": {{"winner": "source_2", "analysis": "explanation"}}
-  }},
-  "overall_recommendation": "source_1 is best overall because...",
-  "key_differences": ["difference1", "difference2"]
-}}"""
-
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
-                    {"role": "system", "content": "You are an expert at comparing information sources. Return valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000,
-                temperature=0.3
+            fetched, failed = await source_pipeline.fetch_sources(urls[:MAX_RESEARCH_SOURCES])
+            for i, source in enumerate(fetched):
+                source["id"] = f"source_{i+1}"
+
+            if len(fetched) < 2:
+                return {"error": "Need at least 2 sources for comparison", "failed_sources": failed}
+
+            assessments = await source_pipeline.map_reduce(fetched, lambda source: self._assess_source(comparison_criteria, source))
+            if len(assessments) < 2:
+                return {"error": "Source comparison failed: fewer than 2 sources could be assessed", "failed_sources": failed}
+
+            comparison_results = {}
+            for criterion in comparison_criteria:
+                ranked = sorted(assessments, key=lambda assessment: -assessment["scores"][criterion])
+                runner_up = ranked[1]["scores"][criterion]
+                comparison_results[criterion] = {
+                    "winner": ranked[0]["id"],
+                    "analysis": f"{ranked[0]['id']} scores {ranked[0]['scores'][criterion]:.2f} vs {runner_up:.2f} for the next best"
+                }
+            overall = sorted(assessments, key=lambda assessment: -sum(assessment["scores"].values()))
+
+            summaries = "\n".join(
+                f"{assessment['id']} ({assessment['url']}): {assessment['summary']} "
+                f"Scores: {json.dumps(assessment['scores'])}. Strengths: {'; '.join(map(str, assessment['strengths'][:3]))}. "
+                f"Weaknesses: {'; '.join(map(str, assessment['weaknesses'][:3]))}."
+                for assessment in overall
             )
-            
-            try:
-                comparison = json.loads(response.choices[0].message.content)
-                return comparison
-            except json.JSONDecodeError:
-                return {"error": "Source comparison succeeded but format error", "raw_response": response.choices[0].message.content}
-                
+            prompt = f"""These sources were assessed on: {", ".join(comparison_criteria)}
+
+{summaries}
+
+Return JSON:
+{schema_block(COMPARISON_FIELDS)}"""
+            synthesis = await self._complete_json(prompt, "You are an expert at comparing information sources. Return valid JSON.", 600,
+                                                  COMPARISON_FIELDS)
+
+            return {
+                "sources": [{"id": assessment["id"], "url": assessment["url"], "scores": assessment["scores"]} for assessment in assessments],
+                "comparison_results": comparison_results,
+                "overall_ranking": [assessment["id"] for assessment in overall],
+                "overall_recommendation": synthesis.get("overall_recommendation") or f"{overall[0]['id']} scores highest across all criteria",
+                "key_differences": synthesis.get("key_differences", []),
+                "failed_sources": failed
+            }
+
         except Exception as e:
             return {"error": f"Source comparison failed: {str(e)}"}
 
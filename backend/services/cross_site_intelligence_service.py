@@ -13,6 +13,9 @@ import aiohttp
 from groq import AsyncGroq
 from collections import defaultdict, Counter
 
+from services.embedding_index import embedding_index
+from services.model_router import model_router
+
 class CrossSiteIntelligenceService:
     def __init__(self):
         # Initialize GROQ client lazily to avoid import-time failures
@@ -82,6 +85,7 @@ class CrossSiteIntelligenceService:
         try:
             url = bookmark_data.get("url", "")
             title = bookmark_data.get("title", "")
+            user_id = bookmark_data.get("user_id")
             
             # Analyze bookmark content
             content_analysis = await self._analyze_bookmark_content(url, title)
@@ -93,7 +97,9 @@ class CrossSiteIntelligenceService:
             tags = await self._generate_smart_tags(content_analysis)
             
             # Find related bookmarks
-            related_bookmarks = await self._find_related_bookmarks(content_analysis)
+            related_bookmarks = await self._find_related_bookmarks(content_analysis, user_id)
+            if user_id:
+                embedding_index.schedule_url(user_id, url, title)
             
             # Create enhancement suggestions
             enhancements = await self._create_bookmark_enhancements(content_analysis, category)
@@ -198,9 +204,10 @@ class CrossSiteIntelligenceService:
             Return as structured JSON.
             """
             
-            response = await self.groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model="llama3-70b-8192",
+            response, _ = await model_router.complete(
+                self.groq_client,
+                "tagging",
+                [{"role": "user", "content": prompt}],
                 temperature=0.3,
                 max_tokens=800
             )
@@ -326,8 +333,12 @@ class CrossSiteIntelligenceService:
     async def _generate_smart_tags(self, analysis: Dict) -> List[str]:
         return ["tag1", "tag2", "tag3"]
     
-    async def _find_related_bookmarks(self, analysis: Dict) -> List[Dict]:
-        return []
+    async def _find_related_bookmarks(self, analysis: Dict, user_id: str = None) -> List[Dict]:
+        """Pages the user has visited that are semantically closest to the bookmark"""
+        if not user_id:
+            return []
+        query = " ".join(str(analysis.get(key) or "") for key in ("title", "ai_analysis"))
+        return await asyncio.to_thread(embedding_index.related_pages, user_id, query, 5, analysis.get("url"))
     
     async def _create_bookmark_enhancements(self, analysis: Dict, category: str) -> Dict:
         return {"suggestions": ["Enhanced organization"]}
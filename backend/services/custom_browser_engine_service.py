@@ -15,6 +15,8 @@ from groq import AsyncGroq
 import psutil
 from enum import Enum
 
+from services.system_metrics_sampler import system_metrics_sampler
+
 class BrowserEngine(Enum):
     CHROMIUM = "chromium"
     WEBKIT = "webkit"
@@ -935,7 +937,7 @@ class CustomBrowserEngineService:
             # Simulate performance metrics collection
             return {
                 "cpu_usage": {
-                    "current": psutil.cpu_percent(),
+                    "current": system_metrics_sampler.snapshot()["cpu_percent"],
                     "average": 15.2,
                     "peak": 45.8
                 },
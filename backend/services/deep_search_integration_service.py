@@ -4,16 +4,67 @@ Cross-platform authenticated search with LinkedIn, Reddit, Twitter, and more
 """
 
 import asyncio
+import heapq
 import json
+import time
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, AsyncIterator
 from groq import AsyncGroq
 import os
 import httpx
 from urllib.parse import quote_plus, urljoin
+from collections import deque
 import re
 
+from services.search_cache import SearchCache
+from services.token_bucket import TokenBucket
+
+class PlatformRateLimiter:
+    """Per-platform limiter combining per-minute and per-hour token buckets with a concurrency cap"""
+
+    def __init__(self, rate_limit: Dict[str, Any]):
+        self.buckets = []
+        per_minute = rate_limit.get("requests_per_minute")
+        per_hour = rate_limit.get("requests_per_hour")
+        if per_minute:
+            self.buckets.append(TokenBucket(per_minute / 60.0, per_minute))
+        if per_hour:
+            self.buckets.append(TokenBucket(per_hour / 3600.0, per_hour))
+        self.max_concurrent = rate_limit.get("max_concurrent", 4)
+        self.semaphore = asyncio.Semaphore(self.max_concurrent)
+
+    def wait_time(self) -> float:
+        return max((bucket.wait_time() for bucket in self.buckets), default=0.0)
+
+    def try_acquire(self) -> bool:
+        """Take a token from every bucket if all have one available, without waiting"""
+        if self.wait_time() > 0:
+            return False
+        for bucket in self.buckets:
+            bucket.consume()
+        return True
+
+    async def acquire(self, timeout: float) -> bool:
+        """Wait for a token until `timeout` seconds have elapsed"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.try_acquire():
+                return True
+            delay = self.wait_time()
+            if time.monotonic() + delay > deadline:
+                return False
+            await asyncio.sleep(delay)
+
+    def status(self) -> Dict[str, Any]:
+        tokens = [bucket.available() for bucket in self.buckets]
+        return {
+            "tokens_available": int(min(tokens)) if tokens else None,
+            "next_token_in": round(self.wait_time(), 2),
+            "max_concurrent": self.max_concurrent
+        }
+
+
 class DeepSearchIntegrationService:
     def __init__(self):
         """Initialize Deep Search Integration with multiple platform support"""
@@ -23,17 +74,27 @@ class DeepSearchIntegrationService:
         self.platforms = self._initialize_platforms()
         self.search_strategies = self._initialize_search_strategies()
         self.authentication_tokens = {}
-        self.search_cache = {}
-        self.rate_limits = {}
+        self.search_cache = SearchCache(db_path="data/deep_search_cache.db")
+        self._revalidating: Dict[str, asyncio.Task] = {}
+        self.rate_limits = {
+            name: PlatformRateLimiter(config["rate_limit"])
+            for name, config in self.platforms.items()
+        }
+        self.http_clients = {}
         
         # Search configuration
         self.search_config = {
             "max_results_per_platform": 50,
             "search_timeout": 30,
-            "cache_duration": 300,  # 5 minutes
+            "cache_duration": 300,  # 5 minutes, default per-platform TTL
+            "query_rewrite_ttl": 86400,  # optimized queries are reused for a day
             "parallel_searches": True,
             "ai_enhancement": True,
-            "content_analysis": True
+            "content_analysis": True,
+            "stream_top_k": 20,
+            "early_synthesis_min_results": 10,  # high-quality results needed before synthesizing
+            "early_synthesis_min_score": 0.75,
+            "early_synthesis_min_platforms": 2
         }
 
     def _initialize_platforms(self) -> Dict[str, Any]:
@@ -41,62 +102,68 @@ class DeepSearchIntegrationService:
         return {
             "linkedin": {
                 "name": "LinkedIn",
+                "cache_ttl": 1800,
                 "base_url": "https://www.linkedin.com",
                 "search_endpoint": "/search/results/all/",
                 "requires_auth": True,
                 "auth_type": "session_cookies",
                 "search_types": ["people", "companies", "jobs", "posts", "articles"],
-                "rate_limit": {"requests_per_minute": 30, "requests_per_hour": 200},
+                "rate_limit": {"requests_per_minute": 30, "requests_per_hour": 200, "max_concurrent": 2},
                 "content_types": ["professional", "business", "networking"]
             },
             "reddit": {
                 "name": "Reddit",
+                "cache_ttl": 600,
                 "base_url": "https://www.reddit.com",
                 "search_endpoint": "/search.json",
                 "requires_auth": False,
                 "auth_type": "api_key",
                 "search_types": ["posts", "comments", "subreddits", "users"],
-                "rate_limit": {"requests_per_minute": 60, "requests_per_hour": 1000},
+                "rate_limit": {"requests_per_minute": 60, "requests_per_hour": 1000, "max_concurrent": 4},
                 "content_types": ["discussions", "communities", "news", "opinions"]
             },
             "twitter": {
                 "name": "Twitter/X",
+                "cache_ttl": 120,
                 "base_url": "https://api.twitter.com/2",
                 "search_endpoint": "/tweets/search/recent",
                 "requires_auth": True,
                 "auth_type": "bearer_token",
                 "search_types": ["tweets", "users", "spaces", "lists"],
-                "rate_limit": {"requests_per_minute": 15, "requests_per_hour": 180},
+                "rate_limit": {"requests_per_minute": 15, "requests_per_hour": 180, "max_concurrent": 2},
                 "content_types": ["real_time", "trending", "conversations"]
             },
             "github": {
                 "name": "GitHub",
+                "cache_ttl": 3600,
                 "base_url": "https://api.github.com",
                 "search_endpoint": "/search/repositories",
                 "requires_auth": False,
                 "auth_type": "token",
                 "search_types": ["repositories", "code", "commits", "issues", "users"],
-                "rate_limit": {"requests_per_minute": 30, "requests_per_hour": 1000},
+                "rate_limit": {"requests_per_minute": 30, "requests_per_hour": 1000, "max_concurrent": 3},
                 "content_types": ["code", "technical", "projects", "documentation"]
             },
             "youtube": {
                 "name": "YouTube",
+                "cache_ttl": 3600,
                 "base_url": "https://www.googleapis.com/youtube/v3",
                 "search_endpoint": "/search",
                 "requires_auth": True,
                 "auth_type": "api_key",
                 "search_types": ["videos", "channels", "playlists"],
-                "rate_limit": {"requests_per_minute": 100, "requests_per_hour": 10000},
+                "rate_limit": {"requests_per_minute": 100, "requests_per_hour": 10000, "max_concurrent": 4},
                 "content_types": ["video", "educational", "entertainment"]
             },
             "stackoverflow": {
                 "name": "Stack Overflow",
+                "cache_ttl": 3600,
                 "base_url": "https://api.stackexchange.com/2.3",
                 "search_endpoint": "/search/advanced",
                 "requires_auth": False,
                 "auth_type": "api_key",
                 "search_types": ["questions", "answers", "users", "tags"],
-                "rate_limit": {"requests_per_minute": 300, "requests_per_hour": 10000},
+                "rate_limit": {"requests_per_minute": 300, "requests_per_hour": 10000, "max_concurrent": 6},
                 "content_types": ["technical", "programming", "solutions"]
             }
         }
@@ -170,14 +237,24 @@ class DeepSearchIntegrationService:
                     "available_platforms": list(self.platforms.keys())
                 }
             
-            # AI-enhanced query optimization
-            optimized_queries = await self._optimize_search_queries(query, available_platforms, context)
+            # Serve platforms with cached results, refreshing stale ones in the background
+            search_results, missing_platforms = await self._lookup_cached_searches(query, strategy, available_platforms, context)
+            cached_platforms = len(search_results)
             
-            # Execute searches
-            if strategy_config["parallel_execution"]:
-                search_results = await self._execute_parallel_searches(optimized_queries, available_platforms)
-            else:
-                search_results = await self._execute_sequential_searches(optimized_queries, available_platforms)
+            if missing_platforms:
+                # AI-enhanced query optimization
+                optimized_queries = await self._optimize_search_queries(query, missing_platforms, context)
+                
+                # Execute searches
+                if strategy_config["parallel_execution"]:
+                    fresh_results = await self._execute_parallel_searches(optimized_queries, missing_platforms)
+                else:
+                    fresh_results = await self._execute_sequential_searches(optimized_queries, missing_platforms)
+                
+                await self._store_search_results(query, strategy, fresh_results)
+                search_results.update(fresh_results)
+            
+            search_results = {platform: search_results[platform] for platform in available_platforms}
             
             # Process and analyze results
             processed_results = await self._process_search_results(search_results, query, context)
@@ -204,7 +281,7 @@ class DeepSearchIntegrationService:
                     "platforms_successful": len([p for p in search_results.values() if p.get("success")]),
                     "platforms_failed": len([p for p in search_results.values() if not p.get("success")]),
                     "ai_enhanced": True,
-                    "cached_results": 0  # Will be implemented
+                    "cached_results": cached_platforms
                 },
                 "message": f"Deep search completed across {len(available_platforms)} platforms"
             }
@@ -217,9 +294,269 @@ class DeepSearchIntegrationService:
                 "strategy": strategy
             }
 
+    async def stream_deep_search(self, query: str, strategy: str = "comprehensive",
+                                 platforms: List[str] = None, context: Dict = None,
+                                 top_k: int = None) -> AsyncIterator[Dict[str, Any]]:
+        """Incremental deep search: yield events as each platform returns.
+        
+        Events, in order of arrival:
+        - "started": platforms being searched and how many were served from cache
+        - "platform_results": one platform's scored results plus the running top-K
+        - "synthesis": emitted once, as soon as enough high-quality results have
+          arrived (or after the last platform if that threshold is never met)
+        - "completed": the same payload execute_deep_search returns
+        """
+        search_id = str(uuid.uuid4())
+        start_time = datetime.now()
+        top_k = top_k or self.search_config["stream_top_k"]
+        
+        if strategy not in self.search_strategies:
+            strategy = "comprehensive"
+        strategy_config = self.search_strategies[strategy]
+        available_platforms = [p for p in (platforms or strategy_config["platforms"]) if p in self.platforms]
+        
+        if not available_platforms:
+            yield {
+                "event": "error",
+                "success": False,
+                "error": "No available platforms for search",
+                "available_platforms": list(self.platforms.keys())
+            }
+            return
+        
+        cached_results, missing_platforms = await self._lookup_cached_searches(query, strategy, available_platforms, context)
+        yield {
+            "event": "started",
+            "search_id": search_id,
+            "query": query,
+            "strategy": strategy,
+            "platforms": available_platforms,
+            "cached_platforms": list(cached_results.keys())
+        }
+        
+        # Platform responses arrive on a queue: cached ones immediately, live ones as they finish
+        arrivals = asyncio.Queue()
+        for platform, result in cached_results.items():
+            arrivals.put_nowait((platform, result))
+        
+        async def search_and_enqueue(platform: str, platform_query: str):
+            try:
+                result = await self._run_scheduled_search(platform, platform_query)
+            except Exception as e:
+                result = {"success": False, "platform": platform, "error": str(e), "results": []}
+            await arrivals.put((platform, result))
+            await self._store_search_results(query, strategy, {platform: result})
+        
+        search_tasks = []
+        if missing_platforms:
+            optimized_queries = await self._optimize_search_queries(query, missing_platforms, context)
+            search_tasks = [
+                asyncio.create_task(search_and_enqueue(platform, optimized_queries.get(platform, query)))
+                for platform in missing_platforms
+            ]
+        
+        top_heap = []  # min-heap of (score, sequence, result) holding the best top_k results
+        sequence = 0
+        high_quality = 0
+        raw_results = {}
+        processed = {"platforms": {}, "aggregated_results": [], "insights": {}, "quality_scores": {}}
+        synthesis_task = None
+        synthesis_emitted = False
+        next_arrival = None
+        completed = False
+        
+        def start_synthesis():
+            top_results = [entry[2] for entry in sorted(top_heap, reverse=True)]
+            snapshot = {**processed, "platforms": dict(processed["platforms"]), "aggregated_results": top_results}
+            return asyncio.create_task(self._synthesize_results(snapshot, query, context))
+        
+        try:
+            while len(raw_results) < len(available_platforms):
+                # Wake up for whichever comes first: the next platform or the early synthesis
+                next_arrival = next_arrival or asyncio.create_task(arrivals.get())
+                waiting = {next_arrival}
+                if synthesis_task is not None and not synthesis_emitted:
+                    waiting.add(synthesis_task)
+                done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                
+                if synthesis_task in done:
+                    synthesis_emitted = True
+                    yield self._synthesis_event(synthesis_task, raw_results, available_platforms)
+                if next_arrival not in done:
+                    continue
+                
+                platform, result = next_arrival.result()
+                next_arrival = None
+                raw_results[platform] = result
+                platform_processed = await self._process_platform_results(result, query)
+                processed["platforms"][platform] = platform_processed
+                processed["aggregated_results"].extend(platform_processed["results"])
+                
+                for item in platform_processed["results"]:
+                    score = self._stream_result_score(item)
+                    item["stream_score"] = score
+                    if score >= self.search_config["early_synthesis_min_score"]:
+                        high_quality += 1
+                    sequence += 1
+                    entry = (score, sequence, item)
+                    if len(top_heap) < top_k:
+                        heapq.heappush(top_heap, entry)
+                    elif score > top_heap[0][0]:
+                        heapq.heapreplace(top_heap, entry)
+                
+                yield {
+                    "event": "platform_results",
+                    "platform": platform,
+                    "status": platform_processed["status"],
+                    "error": platform_processed.get("error"),
+                    "results": platform_processed["results"],
+                    "quality_score": platform_processed.get("quality_score"),
+                    "top_results": [entry[2] for entry in sorted(top_heap, reverse=True)],
+                    "platforms_completed": len(raw_results),
+                    "platforms_total": len(available_platforms)
+                }
+                
+                if (synthesis_task is None and strategy_config["ai_synthesis"]
+                        and high_quality >= self.search_config["early_synthesis_min_results"]
+                        and len(raw_results) >= min(self.search_config["early_synthesis_min_platforms"], len(available_platforms))):
+                    synthesis_task = start_synthesis()
+            completed = True
+        finally:
+            # Client went away or the stream was closed early: nothing will
+            # await the searches or an early synthesis that is still running
+            pending = search_tasks + [next_arrival]
+            if not completed:
+                pending.append(synthesis_task)
+            for task in pending:
+                if task is not None and not task.done():
+                    task.cancel()
+        
+        if strategy_config["ai_synthesis"]:
+            if synthesis_task is None:
+                synthesis_task = start_synthesis()
+            try:
+                await asyncio.wait([synthesis_task])
+            finally:
+                if not synthesis_task.done():
+                    synthesis_task.cancel()
+            synthesis_event = self._synthesis_event(synthesis_task, raw_results, available_platforms)
+            if not synthesis_emitted:
+                yield synthesis_event
+            synthesis = synthesis_event["synthesis"]
+        else:
+            synthesis = {"synthesis_available": False, "message": "Real-time results without synthesis"}
+        
+        processed["aggregated_results"].sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
+        processed["insights"] = await self._generate_search_insights(processed["aggregated_results"], query)
+        execution_time = (datetime.now() - start_time).total_seconds()
+        
+        yield {
+            "event": "completed",
+            "success": True,
+            "search_id": search_id,
+            "query": query,
+            "strategy": strategy,
+            "platforms_searched": available_platforms,
+            "execution_time": f"{execution_time:.2f}s",
+            "results": processed,
+            "synthesis": synthesis,
+            "metadata": {
+                "total_results": sum(len(r.get("results", [])) for r in raw_results.values()),
+                "platforms_successful": len([r for r in raw_results.values() if r.get("success")]),
+                "platforms_failed": len([r for r in raw_results.values() if not r.get("success")]),
+                "ai_enhanced": True,
+                "cached_results": len(cached_results)
+            },
+            "message": f"Deep search completed across {len(available_platforms)} platforms"
+        }
+
+    def _stream_result_score(self, result: Dict) -> float:
+        """Rank a result for the running top-K from its relevance factors"""
+        factors = result.get("relevance_factors", {})
+        recency = factors.get("recency_score", self._calculate_recency_score(result.get("timestamp")))
+        return round(
+            result.get("relevance_score", 0) * 0.5
+            + factors.get("title_word_coverage", 0) * 0.2
+            + recency * 0.15
+            + factors.get("engagement_score", 0) * 0.15,
+            4
+        )
+
+    def _synthesis_event(self, synthesis_task: asyncio.Task, raw_results: Dict, platforms: List[str]) -> Dict[str, Any]:
+        if synthesis_task.exception() is not None:
+            synthesis = {"executive_summary": "Synthesis failed", "error": str(synthesis_task.exception()), "synthesis_quality": "failed"}
+        else:
+            synthesis = synthesis_task.result()
+        return {
+            "event": "synthesis",
+            "synthesis": synthesis,
+            "based_on_platforms": list(raw_results.keys()),
+            "partial": len(raw_results) < len(platforms)
+        }
+
+    def _search_cache_key(self, query: str, platform: str, strategy: str) -> str:
+        return self.search_cache.make_key("platform_search", query, platform, strategy)
+
+    async def _lookup_cached_searches(self, query: str, strategy: str, platforms: List[str],
+                                      context: Dict = None) -> tuple:
+        """Split platforms into cached results and platforms that still need a search"""
+        cached = {}
+        missing = []
+        
+        for platform in platforms:
+            key = self._search_cache_key(query, platform, strategy)
+            value, state = await self.search_cache.get(key)
+            if value is None:
+                missing.append(platform)
+                continue
+            
+            cached[platform] = value
+            if state == SearchCache.STALE and key not in self._revalidating:
+                task = asyncio.create_task(self._revalidate_platform_search(query, strategy, platform, context))
+                self._revalidating[key] = task
+                task.add_done_callback(lambda _, key=key: self._revalidating.pop(key, None))
+        
+        return cached, missing
+
+    async def _store_search_results(self, query: str, strategy: str, search_results: Dict[str, Any]):
+        """Cache successful platform results under each platform's TTL"""
+        for platform, result in search_results.items():
+            if not result.get("success"):
+                continue
+            ttl = self.platforms[platform].get("cache_ttl", self.search_config["cache_duration"])
+            await self.search_cache.set(
+                self._search_cache_key(query, platform, strategy),
+                result,
+                ttl=ttl,
+                namespace="platform_search"
+            )
+
+    async def _revalidate_platform_search(self, query: str, strategy: str, platform: str, context: Dict = None):
+        """Refresh a stale cached platform result in the background"""
+        try:
+            optimized_queries = await self._optimize_search_queries(query, [platform], context)
+            result = await self._run_scheduled_search(platform, optimized_queries.get(platform, query))
+            await self._store_search_results(query, strategy, {platform: result})
+        except Exception as e:
+            print(f"⚠️ Deep search revalidation failed for {platform}: {e}")
+
     async def _optimize_search_queries(self, query: str, platforms: List[str], context: Dict = None) -> Dict[str, str]:
         """AI-optimize search queries for each platform"""
         try:
+            # Reuse optimized rewrites of the same (normalized) query
+            context_key = json.dumps(context or {}, sort_keys=True, default=str)
+            rewrite_keys = {
+                platform: self.search_cache.make_key("query_rewrite", query, platform, context_key)
+                for platform in platforms
+            }
+            memoized = {}
+            for platform, key in rewrite_keys.items():
+                value, _ = await self.search_cache.get(key)
+                if value is not None:
+                    memoized[platform] = value
+            if len(memoized) == len(platforms):
+                return memoized
+            
             if self.groq_client:
                 optimization_prompt = f"""
                 Optimize the search query "{query}" for different platforms.
@@ -251,13 +588,23 @@ class DeepSearchIntegrationService:
                     )
                     
                     optimized = json.loads(chat_completion.choices[0].message.content)
-                    return {platform: data["optimized_query"] for platform, data in optimized.items()}
+                    optimized = {platform: data["optimized_query"] for platform, data in optimized.items()}
+                    for platform, optimized_query in optimized.items():
+                        if platform in rewrite_keys:
+                            await self.search_cache.set(
+                                rewrite_keys[platform],
+                                optimized_query,
+                                ttl=self.search_config["query_rewrite_ttl"],
+                                namespace="query_rewrite"
+                            )
+                    return {**memoized, **optimized}
                     
                 except Exception as ai_error:
                     pass
             
             # Fallback optimization
-            return await self._fallback_query_optimization(query, platforms)
+            fallback = await self._fallback_query_optimization(query, platforms)
+            return {**fallback, **memoized}
 
         except Exception as e:
             # Return original query for all platforms
@@ -293,41 +640,15 @@ class DeepSearchIntegrationService:
         return optimizations
 
     async def _execute_parallel_searches(self, queries: Dict[str, str], platforms: List[str]) -> Dict[str, Any]:
-        """Execute searches in parallel across multiple platforms"""
-        async def search_platform(platform: str, query: str):
-            try:
-                return await self._search_single_platform(platform, query)
-            except Exception as e:
-                return {
-                    "success": False,
-                    "platform": platform,
-                    "error": str(e),
-                    "results": []
-                }
-        
-        # Create search tasks
-        tasks = []
-        for platform in platforms:
-            query = queries.get(platform, queries.get(list(queries.keys())[0], ""))
-            tasks.append(search_platform(platform, query))
-        
-        # Execute all searches in parallel
-        search_results = await asyncio.gather(*tasks, return_exceptions=True)
+        """Execute searches in parallel across multiple platforms within each platform's limits"""
+        jobs = [
+            (platform, queries.get(platform, queries.get(list(queries.keys())[0], "")))
+            for platform in platforms
+        ]
+        scheduled = await self._schedule_platform_searches(jobs)
         
         # Organize results by platform
-        results = {}
-        for i, platform in enumerate(platforms):
-            if isinstance(search_results[i], Exception):
-                results[platform] = {
-                    "success": False,
-                    "platform": platform,
-                    "error": str(search_results[i]),
-                    "results": []
-                }
-            else:
-                results[platform] = search_results[i]
-        
-        return results
+        return {platform: result for (platform, _), result in zip(jobs, scheduled)}
 
     async def _execute_sequential_searches(self, queries: Dict[str, str], platforms: List[str]) -> Dict[str, Any]:
         """Execute searches sequentially (for rate limit management)"""
@@ -335,20 +656,84 @@ class DeepSearchIntegrationService:
         
         for platform in platforms:
             query = queries.get(platform, queries.get(list(queries.keys())[0], ""))
-            try:
-                results[platform] = await self._search_single_platform(platform, query)
-                # Small delay between searches to respect rate limits
-                await asyncio.sleep(0.5)
-            except Exception as e:
-                results[platform] = {
+            results[platform] = await self._run_scheduled_search(platform, query)
+        
+        return results
+
+    def _interleave_jobs(self, jobs: List[tuple]) -> List[int]:
+        """Round-robin job indices across platforms so no platform's queue starves the others"""
+        queues = {}
+        for index, (platform, _) in enumerate(jobs):
+            queues.setdefault(platform, deque()).append(index)
+        
+        order = []
+        while queues:
+            for platform in list(queues.keys()):
+                order.append(queues[platform].popleft())
+                if not queues[platform]:
+                    del queues[platform]
+        
+        return order
+
+    async def _schedule_platform_searches(self, jobs: List[tuple]) -> List[Dict[str, Any]]:
+        """Run (platform, query) jobs concurrently, interleaved across platforms.
+        
+        Each job waits for a token from its platform's bucket and a slot in its
+        platform's concurrency cap, so fast platforms keep flowing while throttled
+        ones drain at their own rate. Results are returned in the order of `jobs`.
+        """
+        tasks = {}
+        for index in self._interleave_jobs(jobs):
+            platform, query = jobs[index]
+            tasks[index] = asyncio.create_task(self._run_scheduled_search(platform, query))
+        
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        
+        results = []
+        for index, (platform, _) in enumerate(jobs):
+            task = tasks[index]
+            if task.exception() is not None:
+                results.append({
                     "success": False,
                     "platform": platform,
-                    "error": str(e),
+                    "error": str(task.exception()),
                     "results": []
-                }
+                })
+            else:
+                results.append(task.result())
         
         return results
 
+    async def _run_scheduled_search(self, platform: str, query: str) -> Dict[str, Any]:
+        """Search one platform once a rate-limit token and a concurrency slot are available"""
+        if platform not in self.platforms:
+            return {
+                "success": False,
+                "platform": platform,
+                "error": "Platform not supported",
+                "results": []
+            }
+        
+        limiter = self.rate_limits[platform]
+        try:
+            async with limiter.semaphore:
+                if not await limiter.acquire(timeout=self.search_config["search_timeout"]):
+                    return {
+                        "success": False,
+                        "platform": platform,
+                        "error": "Rate limit exceeded",
+                        "retry_after": round(limiter.wait_time(), 2),
+                        "results": []
+                    }
+                return await self._perform_platform_search(platform, query)
+        except Exception as e:
+            return {
+                "success": False,
+                "platform": platform,
+                "error": str(e),
+                "results": []
+            }
+
     async def _search_single_platform(self, platform: str, query: str) -> Dict[str, Any]:
         """Search a single platform with authentication and rate limiting"""
         if platform not in self.platforms:
@@ -359,8 +744,6 @@ class DeepSearchIntegrationService:
                 "results": []
             }
         
-        platform_config = self.platforms[platform]
-        
         # Check rate limits
         if not await self._check_rate_limit(platform):
             return {
@@ -370,7 +753,14 @@ class DeepSearchIntegrationService:
                 "results": []
             }
         
-        # Simulate platform search (in real implementation, these would be actual API calls)
+        return await self._perform_platform_search(platform, query)
+
+    async def _perform_platform_search(self, platform: str, query: str) -> Dict[str, Any]:
+        """Run the platform search itself; callers are responsible for rate limiting"""
+        platform_config = self.platforms[platform]
+        
+        # Simulate platform search (in real implementation, these would be actual API calls
+        # issued through self._get_platform_client(platform))
         await asyncio.sleep(0.1)  # Simulate API call delay
         
         # Generate mock results based on platform type
@@ -388,6 +778,29 @@ class DeepSearchIntegrationService:
             }
         }
 
+    def _get_platform_client(self, platform: str) -> httpx.AsyncClient:
+        """Shared keep-alive HTTP client per platform, sized to the platform's concurrency cap"""
+        client = self.http_clients.get(platform)
+        if client is None or client.is_closed:
+            max_concurrent = self.rate_limits[platform].max_concurrent
+            client = httpx.AsyncClient(
+                base_url=self.platforms[platform]["base_url"],
+                timeout=self.search_config["search_timeout"],
+                limits=httpx.Limits(
+                    max_connections=max_concurrent,
+                    max_keepalive_connections=max_concurrent
+                )
+            )
+            self.http_clients[platform] = client
+        return client
+
+    async def close(self):
+        """Close pooled platform HTTP clients"""
+        clients = list(self.http_clients.values())
+        self.http_clients = {}
+        for client in clients:
+            await client.aclose()
+
     async def _generate_mock_platform_results(self, platform: str, query: str, config: Dict) -> List[Dict]:
         """Generate mock results for demonstration (replace with real API calls)"""
         base_results = []
@@ -461,25 +874,8 @@ class DeepSearchIntegrationService:
         return platform_data.get(platform, {})
 
     async def _check_rate_limit(self, platform: str) -> bool:
-        """Check if platform is within rate limits"""
-        # Simple rate limiting implementation
-        current_time = datetime.now()
-        platform_limits = self.rate_limits.get(platform, {"requests": 0, "last_reset": current_time})
-        
-        # Reset if it's been an hour
-        if (current_time - platform_limits["last_reset"]).total_seconds() > 3600:
-            platform_limits = {"requests": 0, "last_reset": current_time}
-        
-        # Check if under limit
-        max_requests = self.platforms[platform]["rate_limit"]["requests_per_hour"]
-        if platform_limits["requests"] >= max_requests:
-            return False
-        
-        # Increment counter
-        platform_limits["requests"] += 1
-        self.rate_limits[platform] = platform_limits
-        
-        return True
+        """Take a rate-limit token for the platform without waiting"""
+        return self.rate_limits[platform].try_acquire()
 
     async def _process_search_results(self, search_results: Dict[str, Any], query: str, context: Dict = None) -> Dict[str, Any]:
         """Process and enhance search results"""
@@ -491,29 +887,10 @@ class DeepSearchIntegrationService:
         }
         
         for platform, results in search_results.items():
-            if not results.get("success"):
-                processed["platforms"][platform] = {
-                    "status": "failed",
-                    "error": results.get("error", "Unknown error"),
-                    "results": []
-                }
-                continue
-            
-            platform_results = results.get("results", [])
-            
-            # Enhance results with AI analysis
-            enhanced_results = await self._enhance_platform_results(platform_results, query)
-            
-            processed["platforms"][platform] = {
-                "status": "success",
-                "results_count": len(enhanced_results),
-                "results": enhanced_results,
-                "quality_score": self._calculate_results_quality(enhanced_results),
-                "relevance_distribution": self._analyze_relevance_distribution(enhanced_results)
-            }
+            processed["platforms"][platform] = await self._process_platform_results(results, query)
             
             # Add to aggregated results
-            processed["aggregated_results"].extend(enhanced_results)
+            processed["aggregated_results"].extend(processed["platforms"][platform]["results"])
         
         # Sort aggregated results by relevance
         processed["aggregated_results"].sort(key=lambda x: x.get("relevance_score", 0), reverse=True)
@@ -523,6 +900,26 @@ class DeepSearchIntegrationService:
         
         return processed
 
+    async def _process_platform_results(self, results: Dict[str, Any], query: str) -> Dict[str, Any]:
+        """Process one platform's raw search response"""
+        if not results.get("success"):
+            return {
+                "status": "failed",
+                "error": results.get("error", "Unknown error"),
+                "results": []
+            }
+        
+        # Enhance results with AI analysis
+        enhanced_results = await self._enhance_platform_results(results.get("results", []), query)
+        
+        return {
+            "status": "success",
+            "results_count": len(enhanced_results),
+            "results": enhanced_results,
+            "quality_score": self._calculate_results_quality(enhanced_results),
+            "relevance_distribution": self._analyze_relevance_distribution(enhanced_results)
+        }
+
     async def _enhance_platform_results(self, results: List[Dict], query: str) -> List[Dict]:
         """Enhance individual results with additional analysis"""
         enhanced = []
@@ -836,13 +1233,14 @@ class DeepSearchIntegrationService:
                     "status": "available",
                     "requires_auth": config["requires_auth"],
                     "auth_configured": name in self.authentication_tokens,
-                    "rate_limit_status": "ok",
+                    "rate_limit_status": self.rate_limits[name].status(),
                     "search_types": config["search_types"],
                     "content_types": config["content_types"]
                 }
                 for name, config in self.platforms.items()
             },
             "search_strategies": list(self.search_strategies.keys()),
+            "cache": self.search_cache.get_stats(),
             "global_stats": {
                 "total_searches_today": 0,  # Would be tracked
                 "most_popular_platform": "reddit",
@@ -14,6 +14,8 @@ from groq import AsyncGroq
 import psutil
 import platform
 
+from services.system_metrics_sampler import system_metrics_sampler
+
 class ElectronHybridBrowserService:
     def __init__(self):
         """Initialize Electron-based Hybrid Browser Service"""
@@ -186,7 +188,7 @@ class ElectronHybridBrowserService:
                 "config": process_config,
                 "performance": {
                     "memory_usage": psutil.Process().memory_info().rss,
-                    "cpu_usage": psutil.Process().cpu_percent(),
+                    "cpu_usage": system_metrics_sampler.snapshot()["process_cpu_percent"],
                     "startup_time": "1.2s"
                 },
                 "initialized_at": datetime.now().isoformat()
@@ -630,7 +632,7 @@ class ElectronHybridBrowserService:
                 
                 # Calculate aggregate metrics
                 total_memory = sum(psutil.Process().memory_info().rss for _ in windows)
-                avg_cpu = psutil.Process().cpu_percent() / max(len(windows), 1)
+                avg_cpu = system_metrics_sampler.snapshot()["process_cpu_percent"] / max(len(windows), 1)
                 
                 return {
                     "success": True,
@@ -662,7 +664,7 @@ class ElectronHybridBrowserService:
                     },
                     "system_impact": {
                         "system_memory_usage": psutil.virtual_memory().percent,
-                        "system_cpu_usage": psutil.cpu_percent(),
+                        "system_cpu_usage": system_metrics_sampler.snapshot()["cpu_percent"],
                         "disk_io": "low",
                         "network_io": "moderate"
                     }
@@ -679,7 +681,7 @@ class ElectronHybridBrowserService:
                         "total_windows": total_windows,
                         "system_performance": {
                             "memory_usage": psutil.virtual_memory().percent,
-                            "cpu_usage": psutil.cpu_percent(),
+                            "cpu_usage": system_metrics_sampler.snapshot()["cpu_percent"],
                             "disk_usage": psutil.disk_usage('/').percent
                         },
                         "browser_efficiency": {
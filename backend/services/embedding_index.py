@@ -0,0 +1,503 @@
+"""
+Local Embedding Index
+CPU-only semantic retrieval over the pages a user has visited: feature-hashed
+n-gram embeddings, per-user IVF indexes on NumPy, and SQLite persistence with
+incremental, version-aware page inserts
+"""
+
+import asyncio
+import functools
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from services.page_fetcher import page_fetcher
+from services.source_pipeline import STOPWORDS, chunk_text
+
+_WORD = re.compile(r"\w+")
+
+# Relative weight of each feature family in a vector
+WORD_WEIGHT = 1.0
+BIGRAM_WEIGHT = 0.7
+TRIGRAM_WEIGHT = 0.3
+
+
+@functools.lru_cache(maxsize=200_000)
+def _bucket(feature: str, dim: int) -> Tuple[int, float]:
+    """(bucket, sign) of a feature; crc32 keeps it stable across processes"""
+    digest = zlib.crc32(feature.encode("utf-8"))
+    return digest % dim, (1.0 if digest & 0x80000000 else -1.0)
+
+
+class HashingEmbedder:
+    """Feature-hashed bag of words, word bigrams and character trigrams.
+
+    Every feature lands in one of `dim` buckets with a hash-derived sign, so
+    collisions cancel out on average instead of piling up. Counts are
+    log-damped and each vector is L2-normalised, which makes a dot product
+    the cosine similarity. Character trigrams give tolerance to inflections
+    and typos; nothing is trained or downloaded.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    @staticmethod
+    def features(text: str) -> Dict[str, float]:
+        words = [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+        weighted: Dict[str, float] = {}
+        families = (
+            (WORD_WEIGHT, Counter(words)),
+            (BIGRAM_WEIGHT, Counter(f"{a} {b}" for a, b in zip(words, words[1:]))),
+            (TRIGRAM_WEIGHT, Counter(
+                f"#{padded[i:i + 3]}" for padded in (f"<{word}>" for word in words if len(word) > 2)
+                for i in range(len(padded) - 2)
+            )),
+        )
+        for weight, counts in families:
+            for feature, count in counts.items():
+                weighted[feature] = weight * (1.0 + math.log(count))
+        return weighted
+
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dim) float32 matrix of unit vectors; empty texts give zero rows"""
+        rows, columns, values = [], [], []
+        for row, text in enumerate(texts):
+            for feature, weight in self.features(text).items():
+                column, sign = _bucket(feature, self.dim)
+                rows.append(row)
+                columns.append(column)
+                values.append(sign * weight)
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if rows:
+            np.add.at(matrix, (np.asarray(rows), np.asarray(columns)), np.asarray(values, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.embed_batch([text])[0]
+
+
+class IVFIndex:
+    """Inverted-file ANN index over unit vectors for one namespace.
+
+    Search is exact while the index is small. Once it holds
+    `train_threshold` vectors, spherical k-means partitions them into about
+    sqrt(n) lists and queries only score the `nprobe` lists whose centroids
+    are closest; new vectors join their nearest list without retraining
+    until the index has grown `retrain_growth` times. Removed rows are
+    tombstoned and compacted away once they make up half the index.
+    """
+
+    def __init__(self, dim: int, train_threshold: int = 4096, nprobe: int = 16, retrain_growth: float = 4.0):
+        self.dim = dim
+        self.train_threshold = train_threshold
+        self.nprobe = nprobe
+        self.retrain_growth = retrain_growth
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.timestamps = np.zeros(0, dtype=np.float64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.count = 0
+        self.removed = 0
+        self.row_of: Dict[int, int] = {}
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[List[int]] = []
+        self.trained_size = 0
+
+    def __len__(self) -> int:
+        return self.count - self.removed
+
+    def _reserve(self, extra: int):
+        needed = self.count + extra
+        capacity = len(self.vectors)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 256)
+        for name, dtype in (("ids", np.int64), ("timestamps", np.float64), ("alive", bool)):
+            grown = np.zeros(capacity, dtype=dtype)
+            grown[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, grown)
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[:self.count] = self.vectors[:self.count]
+        self.vectors = vectors
+
+    def add(self, ids: Iterable[int], vectors: np.ndarray, timestamps: Iterable[float]):
+        ids = list(ids)
+        if not ids:
+            return
+        self._reserve(len(ids))
+        start, end = self.count, self.count + len(ids)
+        self.vectors[start:end] = vectors
+        self.ids[start:end] = ids
+        self.timestamps[start:end] = list(timestamps)
+        self.alive[start:end] = True
+        self.row_of.update((chunk_id, row) for row, chunk_id in enumerate(ids, start))
+        self.count = end
+
+        if self.centroids is not None and len(self) < self.trained_size * self.retrain_growth:
+            nearest = np.argmax(vectors @ self.centroids.T, axis=1)
+            for row, centroid in zip(range(start, end), nearest):
+                self.lists[centroid].append(row)
+        elif len(self) >= self.train_threshold:
+            self.train()
+
+    def remove(self, ids: Iterable[int]):
+        for chunk_id in ids:
+            row = self.row_of.pop(chunk_id, None)
+            if row is not None and self.alive[row]:
+                self.alive[row] = False
+                self.removed += 1
+        if self.removed and self.removed * 2 >= self.count:
+            self.compact()
+
+    def compact(self):
+        rows = np.flatnonzero(self.alive[:self.count])
+        self.vectors = self.vectors[rows]
+        self.ids = self.ids[rows]
+        self.timestamps = self.timestamps[rows]
+        self.alive = np.ones(len(rows), dtype=bool)
+        self.count, self.removed = len(rows), 0
+        self.row_of = {int(chunk_id): row for row, chunk_id in enumerate(self.ids)}
+        self.centroids, self.lists, self.trained_size = None, [], 0
+        if len(self) >= self.train_threshold:
+            self.train()
+
+    def train(self, iterations: int = 8, sample_size: int = 20000, seed: int = 7):
+        """Spherical k-means over a sample of the live vectors, then assign every row"""
+        rows = np.flatnonzero(self.alive[:self.count])
+        rng = np.random.default_rng(seed)
+        sample = self.vectors[rng.choice(rows, size=min(len(rows), sample_size), replace=False)]
+        clusters = max(1, int(math.sqrt(len(rows))))
+        centroids = sample[rng.choice(len(sample), size=clusters, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Empty clusters are reseeded from random sample points
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+            norms[empty] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        self.centroids = centroids
+        self.lists = [[] for _ in range(clusters)]
+        nearest = np.argmax(self.vectors[rows] @ centroids.T, axis=1)
+        for row, centroid in zip(rows.tolist(), nearest.tolist()):
+            self.lists[centroid].append(row)
+        self.trained_size = len(rows)
+
+    def search(self, query: np.ndarray, k: int = 10, since: float = None,
+               exclude: Set[int] = None, only: Set[int] = None) -> List[Tuple[float, int]]:
+        """Best (score, chunk id) pairs for a unit `query` vector, highest first.
+
+        `since` keeps rows added at or after that epoch time; `exclude` and
+        `only` filter by chunk id before ranking, so filtering never shortens
+        the result below `k` when enough rows qualify.
+        """
+        if only is not None:
+            candidates = np.asarray(sorted(self.row_of[i] for i in only if i in self.row_of), dtype=np.int64)
+        elif self.centroids is not None:
+            probes = np.argsort(-(self.centroids @ query))[:self.nprobe]
+            candidates = np.asarray([row for probe in probes for row in self.lists[probe]], dtype=np.int64)
+        else:
+            candidates = np.arange(self.count)
+        if not len(candidates):
+            return []
+
+        mask = self.alive[candidates]
+        if since is not None:
+            mask &= self.timestamps[candidates] >= since
+        if exclude:
+            mask &= ~np.isin(self.ids[candidates], np.fromiter(exclude, dtype=np.int64))
+        candidates = candidates[mask]
+        if not len(candidates):
+            return []
+
+        scores = self.vectors[candidates] @ query
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[i]), int(self.ids[candidates[i]])) for i in top]
+
+
+class EmbeddingIndex:
+    """Per-user semantic index of visited pages.
+
+    Pages are cut into passages, embedded in one batch and appended to the
+    user's IVF index; chunk text and vectors are persisted in SQLite so an
+    index is rebuilt from disk the first time its user is seen after a
+    restart. A page is re-indexed only when its text changes (tracked by
+    content hash), replacing its previous chunks. At most
+    `max_loaded_namespaces` indexes stay in memory, least recently used
+    first out.
+    """
+
+    def __init__(self, db_path: str = "data/embedding_index.db", dim: int = 512, chunk_size: int = 800,
+                 max_chars: int = 200_000, max_loaded_namespaces: int = 64):
+        self.db_path = db_path
+        self.embedder = HashingEmbedder(dim)
+        self.chunk_size = chunk_size
+        self.max_chars = max_chars
+        self.max_loaded_namespaces = max_loaded_namespaces
+        self.indexes: "OrderedDict[str, IVFIndex]" = OrderedDict()
+        self.pending: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.stats = {"pages_indexed": 0, "pages_unchanged": 0, "chunks_embedded": 0, "index_failures": 0,
+                      "searches": 0, "namespaces_loaded": 0}
+        self._lock = threading.RLock()
+        self._init_database()
+
+    def _init_database(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+                namespace TEXT NOT NULL,
+                url TEXT NOT NULL,
+                title TEXT NOT NULL DEFAULT '',
+                content_hash TEXT NOT NULL,
+                chunk_count INTEGER NOT NULL,
+                indexed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, url)
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                namespace TEXT NOT NULL,
+                url TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                vector BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_page ON chunks(namespace, url);
+        """)
+        self.conn.commit()
+
+    # ── Index loading ──────────────────────────────────────────────
+
+    def _index(self, namespace: str) -> IVFIndex:
+        with self._lock:
+            index = self.indexes.get(namespace)
+            if index is not None:
+                self.indexes.move_to_end(namespace)
+                return index
+
+            rows = self.conn.execute(
+                "SELECT id, text, added_at, vector FROM chunks WHERE namespace = ? ORDER BY id", (namespace,)
+            ).fetchall()
+            dim = self.embedder.dim
+            vectors = np.zeros((len(rows), dim), dtype=np.float32)
+            stale = []
+            for row, (chunk_id, text, added_at, blob) in enumerate(rows):
+                if len(blob) == dim * 4:
+                    vectors[row] = np.frombuffer(blob, dtype=np.float32)
+                else:
+                    stale.append(row)
+            if stale:
+                # Stored under a different dimension: re-embed from the kept text
+                vectors[stale] = self.embedder.embed_batch([rows[row][1] for row in stale])
+                self.conn.executemany("UPDATE chunks SET vector = ? WHERE id = ?",
+                                      [(vectors[row].tobytes(), rows[row][0]) for row in stale])
+                self.conn.commit()
+
+            index = IVFIndex(dim)
+            index.add((row[0] for row in rows), vectors, (row[2] for row in rows))
+            self.indexes[namespace] = index
+            self.stats["namespaces_loaded"] += 1
+            while len(self.indexes) > self.max_loaded_namespaces:
+                self.indexes.popitem(last=False)
+            return index
+
+    # ── Ingestion ──────────────────────────────────────────────────
+
+    def add_page(self, namespace: str, url: str, text: str, title: str = "") -> Dict[str, Any]:
+        """Index (or re-index) one page's text; unchanged pages are skipped"""
+        text = " ".join((text or "").split())[:self.max_chars]
+        if not text:
+            return {"indexed": False, "reason": "empty", "chunks": 0}
+        content_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+        with self._lock:
+            current = self.conn.execute(
+                "SELECT content_hash, chunk_count FROM pages WHERE namespace = ? AND url = ?", (namespace, url)
+            ).fetchone()
+            if current and current[0] == content_hash:
+                self.stats["pages_unchanged"] += 1
+                return {"indexed": False, "reason": "unchanged", "chunks": current[1], "version": content_hash[:16]}
+
+        passages = chunk_text(text, size=self.chunk_size)
+        # Title is embedded with every passage so short passages keep their page's subject
+        vectors = self.embedder.embed_batch([f"{title}\n{passage}" if title else passage for passage in passages])
+        now = time.time()
+
+        with self._lock:
+            index = self._index(namespace)
+            previous = [row[0] for row in self.conn.execute(
+                "SELECT id FROM chunks WHERE namespace = ? AND url = ?", (namespace, url))]
+            self.conn.execute("DELETE FROM chunks WHERE namespace = ? AND url = ?", (namespace, url))
+            ids = []
+            for position, (passage, vector) in enumerate(zip(passages, vectors)):
+                cursor = self.conn.execute(
+                    "INSERT INTO chunks (namespace, url, position, text, added_at, vector) VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, url, position, passage, now, vector.tobytes())
+                )
+                ids.append(cursor.lastrowid)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (namespace, url, title, content_hash, chunk_count, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (namespace, url, title or "", content_hash, len(ids), now)
+            )
+            self.conn.commit()
+            index.remove(previous)
+            index.add(ids, vectors, [now] * len(ids))
+
+        self.stats["pages_indexed"] += 1
+        self.stats["chunks_embedded"] += len(ids)
+        return {"indexed": True, "chunks": len(ids), "replaced": len(previous), "version": content_hash[:16]}
+
+    async def index_url(self, namespace: str, url: str, title: str = "") -> Dict[str, Any]:
+        """Fetch `url` through the shared page fetcher and index its main text"""
+        if not url.startswith(("http://", "https://")):
+            return {"indexed": False, "reason": "unsupported_url", "chunks": 0}
+        text = await page_fetcher.fetch_text(url, mode="main", max_chars=self.max_chars)
+        if len(text) < 200:
+            text = await page_fetcher.fetch_text(url, mode="full", max_chars=self.max_chars)
+        return await asyncio.to_thread(self.add_page, namespace, url, text, title)
+
+    def schedule_url(self, namespace: str, url: str, title: str = ""):
+        """Index `url` in the background; repeated requests for a page already queued are dropped"""
+        self._schedule(namespace, url, lambda: self.index_url(namespace, url, title))
+
+    def schedule_page(self, namespace: str, url: str, text: str, title: str = ""):
+        """Index already extracted page text in the background"""
+        self._schedule(namespace, url, lambda: asyncio.to_thread(self.add_page, namespace, url, text, title))
+
+    def _schedule(self, namespace: str, url: str, work: Callable[[], Awaitable[Any]]):
+        key = (namespace, url)
+        if key in self.pending or not url.startswith(("http://", "https://")):
+            return
+
+        async def run():
+            try:
+                await work()
+            except Exception as e:
+                self.stats["index_failures"] += 1
+                print(f"⚠️ Embedding index failed for {url}: {e}")
+            finally:
+                self.pending.pop(key, None)
+
+        self.pending[key] = asyncio.get_running_loop().create_task(run())
+
+    # ── Retrieval ──────────────────────────────────────────────────
+
+    def _page_chunk_ids(self, namespace: str, url: str) -> Set[int]:
+        return {row[0] for row in self.conn.execute(
+            "SELECT id FROM chunks WHERE namespace = ? AND url = ?", (namespace, url))}
+
+    def search(self, namespace: str, query: str, k: int = 5, since: float = None,
+               exclude_url: str = None, min_score: float = 0.05, url: str = None) -> List[Dict[str, Any]]:
+        """Passages most similar to `query`, as {"url", "title", "text", "position", "score", "indexed_at"}.
+        With `url` only that page's passages are considered (exact scoring, no IVF probing)"""
+        vector = self.embedder.embed(query)
+        if not vector.any():
+            return []
+        with self._lock:
+            index = self._index(namespace)
+            exclude = self._page_chunk_ids(namespace, exclude_url) if exclude_url else None
+            only = self._page_chunk_ids(namespace, url) if url else None
+            ranked = index.search(vector, k, since=since, exclude=exclude, only=only)
+            hits = [(score, chunk_id) for score, chunk_id in ranked if score >= min_score]
+            self.stats["searches"] += 1
+            if not hits:
+                return []
+            placeholders = ",".join("?" * len(hits))
+            rows = {row[0]: row for row in self.conn.execute(
+                f"SELECT c.id, c.url, c.position, c.text, c.added_at, p.title FROM chunks c "
+                f"LEFT JOIN pages p ON p.namespace = c.namespace AND p.url = c.url WHERE c.id IN ({placeholders})",
+                [chunk_id for _, chunk_id in hits]
+            )}
+        return [
+            {"url": rows[chunk_id][1], "title": rows[chunk_id][5] or "", "text": rows[chunk_id][3],
+             "position": rows[chunk_id][2], "score": round(score, 4), "indexed_at": rows[chunk_id][4]}
+            for score, chunk_id in hits if chunk_id in rows
+        ]
+
+    def related_pages(self, namespace: str, text: str, k: int = 5, exclude_url: str = None,
+                      since: float = None, min_score: float = 0.1) -> List[Dict[str, Any]]:
+        """Pages whose best passage is most similar to `text`, each with that passage as snippet"""
+        pages: Dict[str, Dict[str, Any]] = {}
+        for hit in self.search(namespace, text, k=k * 4, since=since, exclude_url=exclude_url, min_score=min_score):
+            if hit["url"] not in pages:
+                pages[hit["url"]] = {"url": hit["url"], "title": hit["title"], "score": hit["score"],
+                                     "snippet": hit["text"][:300], "indexed_at": hit["indexed_at"]}
+        return list(pages.values())[:k]
+
+    def page_passages(self, namespace: str, url: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """The first `limit` passages of an indexed page, in document order"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT position, text FROM chunks WHERE namespace = ? AND url = ? ORDER BY position LIMIT ?",
+                (namespace, url, limit)
+            ).fetchall()
+        return [{"position": position, "text": text, "score": 0.0} for position, text in rows]
+
+    def page_info(self, namespace: str, url: str) -> Optional[Dict[str, Any]]:
+        """Title, version (content hash prefix), chunk count and index time of an indexed page"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT title, content_hash, chunk_count, indexed_at FROM pages WHERE namespace = ? AND url = ?",
+                (namespace, url)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"title": row[0], "version": row[1][:16], "chunks": row[2], "indexed_at": row[3]}
+
+    # ── Maintenance ───────────────────────────────────────────────
+
+    def remove_page(self, namespace: str, url: str) -> bool:
+        with self._lock:
+            ids = self._page_chunk_ids(namespace, url)
+            self.conn.execute("DELETE FROM chunks WHERE namespace = ? AND url = ?", (namespace, url))
+            deleted = self.conn.execute("DELETE FROM pages WHERE namespace = ? AND url = ?", (namespace, url)).rowcount
+            self.conn.commit()
+            if namespace in self.indexes:
+                self.indexes[namespace].remove(ids)
+        return bool(deleted)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pages, chunks = (self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                             for table in ("pages", "chunks"))
+            trained = sum(1 for index in self.indexes.values() if index.centroids is not None)
+        return {**self.stats, "pages": pages, "chunks": chunks, "dimensions": self.embedder.dim,
+                "loaded_namespaces": len(self.indexes), "trained_indexes": trained, "pending": len(self.pending)}
+
+    async def close(self):
+        """Drop queued background indexing, let any in-progress write finish, then close"""
+        for task in list(self.pending.values()):
+            task.cancel()
+        await asyncio.gather(*self.pending.values(), return_exceptions=True)
+        self.pending.clear()
+        with self._lock:
+            self.conn.close()
+
+
+embedding_index = EmbeddingIndex()
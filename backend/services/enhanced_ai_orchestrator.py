@@ -1,5 +1,6 @@
 import os
 import asyncio
+import hashlib
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 import json
@@ -8,6 +9,27 @@ from models.ai_task import AITask, AITaskCreate, AITaskType, AITaskStatus
 import requests
 from bs4 import BeautifulSoup
 
+from services.intent_engine import intent_engine
+from services.knowledge_graph_store import knowledge_graph_store
+from services.embedding_index import embedding_index
+from services.model_router import model_router
+from services.structured_output import load_json, schema_block, structured_output
+
+# Sections of the standard page analysis; each is re-requested on its own
+# when the model's answer is cut off or malformed there
+STANDARD_ANALYSIS_FIELDS = {
+    "executive_summary": {"schema": '"<3-4 engaging sentences that capture the essence>"', "type": str, "max_tokens": 200},
+    "content_classification": {"schema": '{"category": "", "primary_purpose": "", "target_audience": ""}', "type": dict, "max_tokens": 120},
+    "key_insights": {"schema": '["<main themes, important concepts, trending topics>"]', "type": list, "max_tokens": 300},
+    "value_proposition": {"schema": '"<what makes this content valuable, unique selling points>"', "type": str, "max_tokens": 150},
+    "intelligence_assessment": {"schema": '{"content_depth": "", "expertise_level": "", "credibility_indicators": [""]}', "type": dict, "max_tokens": 200},
+    "tone_and_sentiment": {"schema": '{"writing_style": "", "emotional_tone": "", "audience_engagement": ""}', "type": dict, "max_tokens": 120},
+    "actionable_takeaways": {"schema": '["<practical applications, next steps, implementation ideas>"]', "type": list, "max_tokens": 300},
+    "related_opportunities": {"schema": '["<what else the user might want to explore>"]', "type": list, "max_tokens": 200},
+    "quality_score": {"schema": '{"score": <0-100>, "justification": "", "improvements": [""]}', "type": dict, "max_tokens": 250},
+    "ai_recommendations": {"schema": '["<personalized suggestions based on content type>"]', "type": list, "max_tokens": 250}
+}
+
 class EnhancedAIOrchestratorService:
     def __init__(self):
         try:
@@ -66,6 +88,13 @@ class EnhancedAIOrchestratorService:
             # Generate enhanced system prompt with personality and intelligence
             system_prompt = await self._generate_enhanced_system_prompt(user_id, context, db, user_intent, expertise_level)
             
+            # Ground the answer in passages from pages the user has visited
+            history_passages = await asyncio.to_thread(embedding_index.search, user_id, message, k=3, min_score=0.15)
+            if history_passages:
+                system_prompt += "\n\n📚 RELEVANT PASSAGES FROM PAGES THE USER HAS VISITED (cite the URL when you use one):"
+                for passage in history_passages:
+                    system_prompt += f"\n- {passage['title'] or passage['url']} ({passage['url']}): {passage['text'][:600]}"
+            
             # Prepare conversation history for better context
             messages = [{"role": "system", "content": system_prompt}]
             
@@ -77,26 +106,29 @@ class EnhancedAIOrchestratorService:
                 })
 
             # Use GROQ with enhanced prompting and better model selection
-            model = "llama3-70b-8192"  # Default to larger model
+            task = "chat"  # Conversational turns run on the small model unless the router escalates
             max_tokens = 1500  # Increased token limit
             temperature = 0.6  # Slightly lower for more focused responses
             
             # Adjust parameters based on intent
-            if user_intent in ["technical", "coding", "automation"]:
+            if user_intent in ["technical", "coding", "automation", "troubleshooting"]:
+                task = "chat_technical"
                 temperature = 0.4  # More precise for technical tasks
                 max_tokens = 2000
             elif user_intent in ["creative", "brainstorming"]:
+                task = "chat_creative"
                 temperature = 0.8  # More creative
-                model = "llama3-70b-8192"
 
-            response = self.groq_client.chat.completions.create(
-                model=model,
-                messages=messages,
+            response, route = await model_router.complete(
+                self.groq_client,
+                task,
+                messages,
                 max_tokens=max_tokens,
                 temperature=temperature,
                 top_p=0.9,
                 stream=False
             )
+            model = route.model
             
             ai_response = response.choices[0].message.content
             
@@ -128,7 +160,8 @@ class EnhancedAIOrchestratorService:
                 "user_intent": user_intent,
                 "expertise_adapted": expertise_level,
                 "conversation_theme": self.conversation_themes[user_id][-1] if self.conversation_themes[user_id] else "general",
-                "model_used": model
+                "model_used": model,
+                "history_sources": list(dict.fromkeys(passage["url"] for passage in history_passages))
             }
             
         except Exception as e:
@@ -141,25 +174,7 @@ class EnhancedAIOrchestratorService:
 
     async def _analyze_user_intent(self, message: str):
         """Analyze user intent with enhanced classification"""
-        message_lower = message.lower()
-        
-        # Enhanced intent classification
-        if any(word in message_lower for word in ["automate", "fill form", "book", "buy", "shop", "click", "navigate"]):
-            return "automation"
-        elif any(word in message_lower for word in ["analyze", "summarize", "research", "extract", "content", "website"]):
-            return "analysis"
-        elif any(word in message_lower for word in ["code", "script", "technical", "api", "programming", "debug"]):
-            return "technical"
-        elif any(word in message_lower for word in ["creative", "idea", "brainstorm", "suggest", "design"]):
-            return "creative"
-        elif any(word in message_lower for word in ["help", "how", "what", "explain", "learn", "tutorial"]):
-            return "learning"
-        elif any(word in message_lower for word in ["organize", "manage", "tabs", "workflow", "productivity"]):
-            return "productivity"
-        elif any(word in message_lower for word in ["problem", "error", "issue", "broken", "fix", "troubleshoot"]):
-            return "troubleshooting"
-        else:
-            return "conversational"
+        return intent_engine.classify("chat", message).intent
 
     async def _assess_user_expertise(self, message: str, user_id: str):
         """Assess user expertise level based on message complexity and history"""
@@ -327,9 +342,10 @@ Format as a JSON array of strings. Each suggestion should be:
 
 Example format: ["Action that provides value", "Next logical step", "Related helpful action"]"""
 
-            response = self.groq_client.chat.completions.create(
-                model="llama3-8b-8192",
-                messages=[
+            response, _ = await model_router.complete(
+                self.groq_client,
+                "suggestions",
+                [
                     {"role": "system", "content": "Generate intelligent, contextual action suggestions. Return only valid JSON array. Be helpful and specific."},
                     {"role": "user", "content": suggestion_prompt}
                 ],
@@ -338,7 +354,7 @@ Example format: ["Action that provides value", "Next logical step", "Related hel
             )
             
             try:
-                suggestions = json.loads(response.choices[0].message.content)
+                suggestions = load_json(response.choices[0].message.content)
                 if isinstance(suggestions, list) and len(suggestions) > 0:
                     return suggestions[:4]  # Max 4 suggestions
             except json.JSONDecodeError:
@@ -514,35 +530,24 @@ Example format: ["Action that provides value", "Next logical step", "Related hel
 
 {content[:5000]}
 
-Provide a comprehensive analysis with emotional intelligence and actionable insights:
+Provide a comprehensive analysis with emotional intelligence and actionable insights, using engaging,
+human-like language that shows genuine understanding. Return ONE JSON object with exactly these keys:
+{schema_block(STANDARD_ANALYSIS_FIELDS)}"""
 
-1. 🎯 EXECUTIVE SUMMARY (3-4 engaging sentences that capture the essence)
-2. 📊 CONTENT CLASSIFICATION (category, primary purpose, target audience)
-3. 🔍 KEY INSIGHTS & TOPICS (main themes, important concepts, trending topics)
-4. 💎 VALUE PROPOSITION (what makes this content valuable, unique selling points)
-5. 🧠 INTELLIGENCE ASSESSMENT (content depth, expertise level, credibility indicators)
-6. 🎭 TONE & SENTIMENT (writing style, emotional tone, audience engagement)
-7. ⚡ ACTIONABLE TAKEAWAYS (practical applications, next steps, implementation ideas)
-8. 🔗 RELATED OPPORTUNITIES (what else the user might want to explore)
-9. 📈 QUALITY SCORE (0-100 with detailed justification and improvement suggestions)
-10. 🚀 AI RECOMMENDATIONS (personalized suggestions based on content type)
-
-Format as structured JSON with engaging, human-like language that shows genuine understanding."""
-
-        response = self.groq_client.chat.completions.create(
-            model="llama3-70b-8192",
+        result = await structured_output.complete(
+            self.groq_client,
+            "analysis",
             messages=[
                 {"role": "system", "content": "You are an expert content analyst with emotional intelligence. Provide insightful, engaging analysis in valid JSON format that helps users understand and act on content."},
                 {"role": "user", "content": prompt}
             ],
+            fields=STANDARD_ANALYSIS_FIELDS,
             max_tokens=2200,
             temperature=0.4
         )
-        
-        try:
-            return json.loads(response.choices[0].message.content)
-        except json.JSONDecodeError:
-            return {"enhanced_analysis": response.choices[0].message.content, "format": "text_fallback"}
+        if not result.data:
+            return {"enhanced_analysis": result.text, "format": "text_fallback"}
+        return {**result.data, **({"incomplete_sections": result.missing} if result.missing else {})}
 
     async def _smart_scrape_content(self, url: str) -> str:
         """Enhanced smart content scraping with better extraction and error handling"""
@@ -701,7 +706,7 @@ Format as detailed, executable JSON with practical insights."""
             )
             
             try:
-                plan = json.loads(response.choices[0].message.content)
+                plan = load_json(response.choices[0].message.content)
                 
                 # Store the plan in database with enhanced metadata
                 plan_doc = {
@@ -809,7 +814,7 @@ Format as structured JSON with practical, actionable insights."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"analysis": response.choices[0].message.content, "format": "text_fallback"}
                 
@@ -923,7 +928,7 @@ Format as actionable JSON with specific, implementable recommendations."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"optimization": response.choices[0].message.content, "format": "text_fallback"}
                 
@@ -1037,7 +1042,7 @@ Format as JSON with specific, actionable, personalized recommendations."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"suggestions": [response.choices[0].message.content]}
                 
@@ -1089,7 +1094,7 @@ Format as structured JSON with business-focused insights."""
         )
         
         try:
-            return json.loads(response.choices[0].message.content)
+            return load_json(response.choices[0].message.content)
         except json.JSONDecodeError:
             return {"comprehensive_analysis": response.choices[0].message.content, "format": "text_fallback"}
 
@@ -1179,17 +1184,17 @@ Format as comprehensive JSON with clear action items."""
             )
 
             try:
-                primary_json = json.loads(primary_response.choices[0].message.content)
+                primary_json = load_json(primary_response.choices[0].message.content)
             except json.JSONDecodeError:
                 primary_json = {"primary_analysis": primary_response.choices[0].message.content}
 
             try:
-                secondary_json = json.loads(secondary_response.choices[0].message.content)
+                secondary_json = load_json(secondary_response.choices[0].message.content)
             except json.JSONDecodeError:
                 secondary_json = {"secondary_analysis": secondary_response.choices[0].message.content}
 
             try:
-                synthesis_json = json.loads(synthesis_response.choices[0].message.content)
+                synthesis_json = load_json(synthesis_response.choices[0].message.content)
             except json.JSONDecodeError:
                 synthesis_json = {"synthesis_analysis": synthesis_response.choices[0].message.content}
 
@@ -1313,7 +1318,7 @@ Format as detailed JSON with industry-specific insights."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"industry_analysis": response.choices[0].message.content, "industry": industry}
                 
@@ -1376,7 +1381,7 @@ Format as structured JSON with actionable visual insights."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"visual_analysis": response.choices[0].message.content}
                 
@@ -1439,7 +1444,7 @@ Format as detailed JSON with audio-specific insights."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"audio_analysis": response.choices[0].message.content}
                 
@@ -1508,7 +1513,7 @@ Format as actionable JSON with specific design recommendations."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"design_analysis": response.choices[0].message.content, "design_type": design_type}
                 
@@ -1613,7 +1618,7 @@ Format as comprehensive JSON with ready-to-use content."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"generated_content": response.choices[0].message.content, "content_type": content_type}
                 
@@ -1682,7 +1687,7 @@ Format as detailed JSON with implementation-ready specifications."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"visualization_recommendations": response.choices[0].message.content}
                 
@@ -1751,7 +1756,7 @@ Format as comprehensive JSON with actionable research guidance."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"research_assistance": response.choices[0].message.content, "topic": research_topic}
                 
@@ -1820,7 +1825,7 @@ Format as actionable JSON with predictive insights."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"trend_analysis": response.choices[0].message.content, "period": analysis_period}
                 
@@ -1828,11 +1833,18 @@ Format as actionable JSON with predictive insights."""
             return {"error": f"Trend detection analysis failed: {str(e)}"}
 
     async def knowledge_graph_building(self, content: str, domain: str, user_id: str):
-        """NEW PHASE 1: Automatic relationship mapping between concepts and entities"""
+        """NEW PHASE 1: Automatic relationship mapping between concepts and entities.
+        Extracted entities and relationships accumulate in the user's persistent graph for `domain`;
+        content already merged is answered from the store without another LLM call"""
         if not self.groq_client:
             return {"error": "GROQ AI not configured"}
             
         try:
+            content_source = f"content:{hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]}"
+            if content_source in await asyncio.to_thread(knowledge_graph_store.source_urls, user_id, domain):
+                graph = await asyncio.to_thread(knowledge_graph_store.get_graph, user_id, domain)
+                return {"knowledge_graph": graph, "domain": domain, "cached": True}
+
             prompt = f"""Build comprehensive KNOWLEDGE GRAPH from content:
 
 CONTENT: {content[:5000]}
@@ -1876,7 +1888,9 @@ Create knowledge graph structure with:
    - Query examples and use cases
    - Visualization and exploration tools
 
-Format as structured JSON with graph specifications."""
+Format as structured JSON with graph specifications. Always include top-level
+"entities": [{{"name": "entity name", "type": "person/organization/location/concept"}}] and
+"relationships": [{{"source": "entity name", "target": "entity name", "type": "relationship", "weight": 0.0-1.0}}] arrays."""
 
             response = self.groq_client.chat.completions.create(
                 model="llama3-70b-8192",
@@ -1889,9 +1903,20 @@ Format as structured JSON with graph specifications."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                result = load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"knowledge_graph": response.choices[0].message.content, "domain": domain}
+
+            entities = result.get("entities") or result.get("nodes") or result.get("concepts") or []
+            relationships = result.get("relationships") or result.get("edges") or []
+            if isinstance(entities, list) and entities:
+                merge = await asyncio.to_thread(
+                    knowledge_graph_store.merge, user_id, domain, entities,
+                    relationships if isinstance(relationships, list) else [], content_source
+                )
+                summary = await asyncio.to_thread(knowledge_graph_store.summary, user_id, domain)
+                result["persistent_graph"] = {**summary, "merge": merge}
+            return result
                 
         except Exception as e:
             return {"error": f"Knowledge graph building failed: {str(e)}"}
@@ -1993,7 +2018,7 @@ Format as implementation-ready JSON with detailed specifications."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"integration_strategy": response.choices[0].message.content, "platform": platform}
                 
@@ -2062,7 +2087,7 @@ Format as comprehensive JSON with implementation specifications."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"analytics_platform": response.choices[0].message.content, "analytics_type": analytics_type}
                 
@@ -2131,7 +2156,7 @@ Format as detailed JSON with marketplace specifications."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"marketplace_system": response.choices[0].message.content, "marketplace_type": marketplace_type}
                 
@@ -2204,7 +2229,7 @@ Format as technical JSON with implementation specifications."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"edge_computing_strategy": response.choices[0].message.content, "computation_type": computation_type}
                 
@@ -2273,7 +2298,7 @@ Format as architectural JSON with technical specifications."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"modular_architecture": response.choices[0].message.content, "module_type": module_type}
                 
@@ -2342,7 +2367,7 @@ Format as security-focused JSON with implementation details."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"security_architecture": response.choices[0].message.content, "security_type": security_type}
                 
@@ -2415,7 +2440,7 @@ Format as voice-focused JSON with technical specifications."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"voice_interface": response.choices[0].message.content, "interaction_type": interaction_type}
                 
@@ -2484,7 +2509,7 @@ Format as personalization-focused JSON with implementation details."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"digital_twin": response.choices[0].message.content, "twin_type": twin_type}
                 
@@ -2553,7 +2578,7 @@ Format as global-scale JSON with implementation specifications."""
             )
             
             try:
-                return json.loads(response.choices[0].message.content)
+                return load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 return {"global_intelligence": response.choices[0].message.content, "intelligence_type": intelligence_type}
                 
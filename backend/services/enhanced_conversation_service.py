@@ -10,6 +10,8 @@ from typing import Dict, List, Optional, Any
 import hashlib
 import uuid
 
+from services.intent_engine import intent_engine
+
 logger = logging.getLogger(__name__)
 
 class EnhancedConversationService:
@@ -218,22 +220,7 @@ class EnhancedConversationService:
     # Helper methods for advanced conversation processing
     async def _analyze_intent(self, message: str) -> str:
         """Analyze message intent using semantic understanding"""
-        # Simplified intent analysis - in production, use advanced NLP
-        intents = {
-            'question': ['what', 'how', 'when', 'where', 'why', 'who', '?'],
-            'request': ['please', 'can you', 'could you', 'help', 'assist'],
-            'information': ['tell me', 'explain', 'describe', 'show'],
-            'navigation': ['go to', 'open', 'navigate', 'visit', 'browse'],
-            'search': ['search', 'find', 'look for', 'locate'],
-            'task': ['create', 'make', 'build', 'generate', 'do'],
-            'feedback': ['good', 'bad', 'excellent', 'terrible', 'thanks']
-        }
-        
-        message_lower = message.lower()
-        for intent, keywords in intents.items():
-            if any(keyword in message_lower for keyword in keywords):
-                return intent
-        return 'conversational'
+        return intent_engine.classify("conversation", message).intent
 
     async def _generate_context_summary(self, messages: List[Dict]) -> str:
         """Generate intelligent context summary from recent messages"""
@@ -374,8 +361,7 @@ class EnhancedConversationService:
 
     async def _calculate_intent_confidence(self, message: str) -> float:
         """Calculate confidence score for intent prediction"""
-        # Simplified confidence calculation
-        return min(0.7 + (len(message) / 200), 0.95)
+        return intent_engine.classify("conversation", message).confidence
 
     async def _generate_contextual_responses(self, intent: str) -> List[str]:
         """Generate contextual AI response options"""
@@ -12,6 +12,10 @@ from groq import Groq
 import requests
 from bs4 import BeautifulSoup
 
+from services.tab_context import tab_context
+from services.model_router import model_router
+from services.structured_output import load_json
+
 class EnhancedHybridAIOrchestratorService:
     def __init__(self):
         try:
@@ -76,15 +80,20 @@ class EnhancedHybridAIOrchestratorService:
             # Enhanced contextual analysis
             context_analysis = await self._analyze_page_context(page_context.get('url', '') if page_context else '', message)
             
+            # Passages of the current tab's page relevant to this message (indexed once per page version)
+            page_grounding = await tab_context.retrieve(user_id, page_context, message) if page_context else None
+            page_reference = {key: value for key, value in page_context.items() if key != 'content'} if page_context else None
+            
             # Behavioral learning update
             await self._update_behavioral_learning(user_id, message, context_analysis)
             
             # Generate enhanced response with hybrid intelligence
-            enhanced_prompt = await self._generate_neon_enhanced_prompt(user_id, message, context_analysis, page_context)
+            enhanced_prompt = await self._generate_neon_enhanced_prompt(user_id, message, context_analysis, page_reference, page_grounding)
             
-            response = self.groq_client.chat.completions.create(
-                model="llama3-70b-8192",
-                messages=[
+            response, _ = await model_router.complete(
+                self.groq_client,
+                "chat",
+                [
                     {"role": "system", "content": enhanced_prompt},
                     {"role": "user", "content": message}
                 ],
@@ -100,7 +109,7 @@ class EnhancedHybridAIOrchestratorService:
                 "content": message,
                 "timestamp": datetime.utcnow(),
                 "context_analysis": context_analysis,
-                "page_context": page_context
+                "page_context": page_reference
             })
             
             self.conversation_memory[user_id].append({
@@ -124,6 +133,8 @@ class EnhancedHybridAIOrchestratorService:
             return {
                 "response": ai_response,
                 "contextual_intelligence": context_analysis,
+                "page_grounding": {key: page_grounding[key] for key in ("url", "version", "total_chunks", "retrieval")}
+                                  if page_grounding else None,
                 "behavioral_insights": self.agentic_memory[user_id]["behavior_patterns"][-3:] if self.agentic_memory[user_id]["behavior_patterns"] else [],
                 "predictive_suggestions": suggestions,
                 "learning_score": self.agentic_memory[user_id]["learning_score"],
@@ -199,7 +210,7 @@ Format as structured JSON with actionable focus recommendations."""
             )
             
             try:
-                focus_analysis = json.loads(response.choices[0].message.content)
+                focus_analysis = load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 focus_analysis = {"focus_analysis": response.choices[0].message.content}
             
@@ -279,7 +290,7 @@ Format as comprehensive JSON with actionable intelligence."""
             )
             
             try:
-                intelligence_analysis = json.loads(response.choices[0].message.content)
+                intelligence_analysis = load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 intelligence_analysis = {"intelligence_analysis": response.choices[0].message.content}
             
@@ -877,7 +888,8 @@ Generate a comprehensive workflow orchestration plan."""
         except Exception as e:
             print(f"Behavioral learning update failed: {e}")
 
-    async def _generate_neon_enhanced_prompt(self, user_id: str, message: str, context_analysis: Dict, page_context: Dict = None):
+    async def _generate_neon_enhanced_prompt(self, user_id: str, message: str, context_analysis: Dict, page_context: Dict = None,
+                                             page_grounding: Dict = None):
         """Generate enhanced prompt for Neon AI"""
         base_prompt = f"""You are ARIA Enhanced - an advanced hybrid AI assistant with Neon AI + Fellou.ai intelligence capabilities. You have:
 
@@ -899,6 +911,9 @@ Generate a comprehensive workflow orchestration plan."""
 - Context analysis: {context_analysis}
 - Page context: {page_context}
 
+📄 RELEVANT PASSAGES FROM THE CURRENT PAGE:
+{page_grounding['context'] if page_grounding and page_grounding['context'] else 'No page content available'}
+
 Provide enhanced, intelligent responses that:
 1. Show deep understanding of context and user needs
 2. Offer proactive suggestions and predictions
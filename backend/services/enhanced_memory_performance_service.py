@@ -12,6 +12,12 @@ from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 import logging
 
+from urllib.parse import urlparse
+
+from services.tab_hibernation import find_manager, hibernate_tab
+from services.speculative_prefetcher import speculative_prefetcher
+from services.system_metrics_sampler import system_metrics_sampler
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -51,6 +57,7 @@ class EnhancedMemoryPerformanceService:
         self.bandwidth_optimization_rules = {}
         self.tab_suspension_rules = {}
         self.predictive_cache = {}
+        self.prefetcher = speculative_prefetcher
         
         # Configuration
         self.max_cache_size = 100 * 1024 * 1024  # 100MB
@@ -115,13 +122,19 @@ class EnhancedMemoryPerformanceService:
             if isinstance(last_accessed, str):
                 last_accessed = datetime.fromisoformat(last_accessed)
             
-            idle_time = (current_time - last_accessed).total_seconds()
+            # Tabs backed by a real browser page report their actual activity
+            manager = find_manager(tab_id) if tab_id else None
+            idle_time = manager.idle_seconds(tab_id) if manager else None
+            if idle_time is None:
+                idle_time = (current_time - last_accessed).total_seconds()
+            suspended = manager.is_hibernated(tab_id) if manager else tab.get('suspended', False)
             
             if tab.get('active', False):
                 analysis["active_tabs"] += 1
             
-            if tab.get('suspended', False):
+            if suspended:
                 analysis["suspended_tabs"] += 1
+                continue
             
             if memory_usage > 50 * 1024 * 1024:  # 50MB threshold
                 analysis["memory_heavy_tabs"].append({
@@ -215,17 +228,17 @@ class EnhancedMemoryPerformanceService:
     def _collect_performance_metrics(self) -> PerformanceMetrics:
         """Collect detailed system performance metrics"""
         # Memory stats
-        memory = psutil.virtual_memory()
+        sample = system_metrics_sampler.snapshot()
         memory_stats = MemoryStats(
-            total=memory.total,
-            used=memory.used,
-            available=memory.available,
-            percentage=memory.percent,
+            total=sample["memory_total"],
+            used=sample["memory_used"],
+            available=sample["memory_available"],
+            percentage=sample["memory_percent"],
             timestamp=datetime.now()
         )
         
         # CPU usage
-        cpu_percent = psutil.cpu_percent(interval=0.1)
+        cpu_percent = sample["cpu_percent"]
         
         # Disk I/O
         disk_io = psutil.disk_io_counters()._asdict() if psutil.disk_io_counters() else {}
@@ -234,7 +247,7 @@ class EnhancedMemoryPerformanceService:
         network_io = psutil.net_io_counters()._asdict() if psutil.net_io_counters() else {}
         
         # Active processes
-        active_processes = len(psutil.pids())
+        active_processes = sample["process_count"]
         
         return PerformanceMetrics(
             cpu_percent=cpu_percent,
@@ -290,11 +303,28 @@ class EnhancedMemoryPerformanceService:
             "predictive_score": 0.0
         }
         
-        # Analyze domain frequency
+        # Analyze domain frequency, the most visited URL per domain and domain-to-domain transitions
         domain_counts = {}
+        url_counts = {}
+        transitions = {}
+        previous_domain = None
         for item in navigation_patterns:
-            domain = item.get('domain', 'unknown')
+            domain = item.get('domain') or urlparse(item.get('url', '')).netloc.lower() or 'unknown'
             domain_counts[domain] = domain_counts.get(domain, 0) + 1
+            if item.get('url'):
+                domain_urls = url_counts.setdefault(domain, {})
+                domain_urls[item['url']] = domain_urls.get(item['url'], 0) + 1
+            if previous_domain and previous_domain != domain:
+                followers = transitions.setdefault(previous_domain, {})
+                followers[domain] = followers.get(domain, 0) + 1
+            previous_domain = domain
+        
+        analysis["top_urls"] = {domain: max(urls, key=urls.get) for domain, urls in url_counts.items()}
+        analysis["common_navigation_sequences"] = sorted(
+            [{"from": a, "to": b, "count": count} for a, followers in transitions.items() for b, count in followers.items()],
+            key=lambda x: x["count"],
+            reverse=True
+        )[:10]
         
         # Sort domains by frequency
         analysis["most_visited_domains"] = sorted(
@@ -326,28 +356,40 @@ class EnhancedMemoryPerformanceService:
         return analysis
     
     async def _predict_next_urls(self, behavior_analysis: Dict[str, Any], current_urls: List[str]) -> List[Dict[str, Any]]:
-        """Predict next likely URLs based on behavior analysis"""
-        predictions = []
-        
-        top_domains = behavior_analysis.get("most_visited_domains", [])
-        current_time = datetime.now()
-        
-        for domain_info in top_domains[:5]:  # Top 5 domains
+        """Predict next likely URLs from transitions out of the open pages and domain frequency"""
+        predictions = {}
+        top_urls = behavior_analysis.get("top_urls", {})
+        
+        def add(domain: str, probability: float, reason: str):
+            url = top_urls.get(domain) or f"https://{domain}"
+            if url in current_urls or domain == 'unknown':
+                return
+            # Domains whose past prefetches went unused are discounted
+            probability = self.prefetcher.calibrate(url, probability)
+            if url not in predictions or probability > predictions[url]["probability"]:
+                predictions[url] = {
+                    "domain": domain,
+                    "predicted_url": url,
+                    "probability": probability,
+                    "reason": reason,
+                    "priority": "high" if probability > 0.7 else "medium"
+                }
+        
+        # Where the user usually goes next from what is open now
+        current_domains = {urlparse(url).netloc.lower() for url in current_urls}
+        sequences = behavior_analysis.get("common_navigation_sequences", [])
+        for domain in current_domains:
+            followers = [s for s in sequences if s["from"] == domain]
+            total = sum(s["count"] for s in followers)
+            for sequence in followers:
+                add(sequence["to"], min(sequence["count"] / total, 0.95), f"Usually follows {domain} ({sequence['count']} times)")
+        
+        for domain_info in behavior_analysis.get("most_visited_domains", [])[:5]:  # Top 5 domains
             domain = domain_info["domain"]
             frequency = domain_info["count"]
-            
-            # Calculate prediction probability
-            probability = min((frequency / 100) * 0.8 + 0.1, 0.95)
-            
-            predictions.append({
-                "domain": domain,
-                "predicted_url": f"https://{domain}",
-                "probability": probability,
-                "reason": f"High frequency domain (visited {frequency} times)",
-                "priority": "high" if probability > 0.7 else "medium"
-            })
+            add(domain, min((frequency / 100) * 0.8 + 0.1, 0.95), f"High frequency domain (visited {frequency} times)")
         
-        return sorted(predictions, key=lambda x: x["probability"], reverse=True)
+        return sorted(predictions.values(), key=lambda x: x["probability"], reverse=True)
     
     # ═══════════════════════════════════════════════════════════════
     # BANDWIDTH OPTIMIZATION WITH SMART COMPRESSION
@@ -536,19 +578,24 @@ class EnhancedMemoryPerformanceService:
         return recommendations
     
     async def _optimize_memory_usage(self, suspension_candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Optimize memory usage by suspending tabs"""
-        suspended_count = 0
+        """Optimize memory usage by hibernating candidate tabs in the real browser"""
+        suspended_tabs = []
         memory_saved = 0
         
-        # Simulate tab suspension (in real implementation, this would interact with browser)
         for candidate in suspension_candidates[:5]:  # Suspend top 5 candidates
-            suspended_count += 1
-            memory_saved += 20 * 1024 * 1024  # Assume 20MB saved per tab
+            manager = find_manager(candidate['id'])
+            if manager is None:
+                continue
+            snapshot = await hibernate_tab(candidate['id'], reason=candidate.get('reason', 'idle'))
+            if snapshot is not None:
+                suspended_tabs.append(candidate['id'])
+                memory_saved += int(manager.policy.page_memory_mb * 1024 * 1024)
         
         return {
-            "suspended_tabs": suspended_count,
+            "suspended_tabs": len(suspended_tabs),
+            "suspended_tab_ids": suspended_tabs,
             "estimated_memory_saved": memory_saved,
-            "optimization_score": min(100, suspended_count * 20)
+            "optimization_score": min(100, len(suspended_tabs) * 20)
         }
     
     async def _perform_memory_cleanup(self) -> Dict[str, Any]:
@@ -572,39 +619,9 @@ class EnhancedMemoryPerformanceService:
         }
     
     async def _preload_predicted_content(self, predicted_urls: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Pre-load content based on predictions"""
-        preload_results = {
-            "attempted": 0,
-            "successful": 0,
-            "failed": 0,
-            "details": []
-        }
-        
-        for prediction in predicted_urls[:3]:  # Preload top 3 predictions
-            url = prediction["predicted_url"]
-            probability = prediction["probability"]
-            
-            preload_results["attempted"] += 1
-            
-            # Simulate preload (in real implementation, this would fetch content)
-            if probability > 0.5:
-                preload_results["successful"] += 1
-                preload_results["details"].append({
-                    "url": url,
-                    "status": "success",
-                    "probability": probability,
-                    "cache_key": f"preload_{hash(url)}"
-                })
-            else:
-                preload_results["failed"] += 1
-                preload_results["details"].append({
-                    "url": url,
-                    "status": "skipped",
-                    "reason": "low_probability",
-                    "probability": probability
-                })
-        
-        return preload_results
+        """Prefetch predicted pages into the shared page cache"""
+        # _predict_next_urls already calibrated these to rank them
+        return await self.prefetcher.prefetch(predicted_urls[:3], source="memory_performance", calibrated=True)  # Top 3 predictions
     
     async def _optimize_cache_with_behavior(self, behavior_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Optimize cache based on behavioral insights"""
@@ -619,10 +636,12 @@ class EnhancedMemoryPerformanceService:
     
     async def _get_cache_statistics(self) -> Dict[str, Any]:
         """Get cache statistics"""
+        page_cache = self.prefetcher.fetcher.cache.get_stats()
         return {
-            "total_entries": len(self.predictive_cache),
-            "cache_size_mb": len(str(self.predictive_cache)) / (1024 * 1024),
-            "hit_rate": 75.5,  # Simulated hit rate
+            "total_entries": page_cache["entries"],
+            "cache_size_mb": page_cache["size_mb"],
+            "hit_rate": round(page_cache["hit_rate"] * 100, 1),
+            "prefetch_hit_rate": round(self.prefetcher.hit_rate(source="memory_performance") * 100, 1),
             "last_updated": datetime.now().isoformat()
         }
     
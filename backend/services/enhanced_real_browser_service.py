@@ -14,6 +14,8 @@ import sqlite3
 import os
 from pathlib import Path
 
+from services.tab_hibernation import TabHibernationManager
+
 class EnhancedRealBrowserService:
     def __init__(self):
         self.playwright = None
@@ -22,6 +24,9 @@ class EnhancedRealBrowserService:
         self.pages: Dict[str, Page] = {}
         self.session_data: Dict[str, Dict] = {}
         self.is_initialized = False
+        self.hibernation = TabHibernationManager(
+            "Enhanced Real Browser", self.pages, self.contexts.get, on_restore=self._attach_page_handlers
+        )
         
         # Database for persistent storage
         self.db_path = Path(__file__).parent.parent / "browser_data"
@@ -186,11 +191,11 @@ class EnhancedRealBrowserService:
             tab_id = str(uuid.uuid4())
             
             self.pages[tab_id] = page
+            self.hibernation.track(tab_id, session_id)
+            await self.hibernation.enforce(protect={tab_id})
             
             # Setup page event handlers
-            page.on('load', lambda: self._on_page_load(tab_id, session_id))
-            page.on('domcontentloaded', lambda: self._on_dom_ready(tab_id, session_id))
-            page.on('console', lambda msg: self._on_console(tab_id, msg))
+            self._attach_page_handlers(tab_id, session_id, page)
             
             # Navigate to URL if provided
             actual_url = url
@@ -246,63 +251,62 @@ class EnhancedRealBrowserService:
     async def navigate_to_url(self, tab_id: str, url: str) -> Dict[str, Any]:
         """Navigate a tab to a specific URL"""
         try:
-            if tab_id not in self.pages:
-                return {'success': False, 'error': 'Tab not found'}
-            
-            page = self.pages[tab_id]
+            async with self.hibernation.lease(tab_id) as page:
+                if page is None:
+                    return {'success': False, 'error': 'Tab not found'}
             
-            # Navigate to URL
-            try:
-                response = await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+                # Navigate to URL
+                try:
+                    response = await page.goto(url, wait_until='domcontentloaded', timeout=30000)
                 
-                if response and response.ok:
-                    actual_url = page.url
-                    title = await page.title() or self._extract_title_from_url(actual_url)
+                    if response and response.ok:
+                        actual_url = page.url
+                        title = await page.title() or self._extract_title_from_url(actual_url)
                     
-                    # Update tab data
-                    for session_id, session in self.session_data.items():
-                        if tab_id in session['tabs']:
-                            session['tabs'][tab_id].update({
-                                'url': actual_url,
-                                'title': title,
-                                'last_active': datetime.now()
-                            })
-                            session['last_active'] = datetime.now()
+                        # Update tab data
+                        for session_id, session in self.session_data.items():
+                            if tab_id in session['tabs']:
+                                session['tabs'][tab_id].update({
+                                    'url': actual_url,
+                                    'title': title,
+                                    'last_active': datetime.now()
+                                })
+                                session['last_active'] = datetime.now()
                             
-                            # Add to history
-                            session['history'].append({
-                                'url': actual_url,
-                                'title': title,
-                                'visit_time': datetime.now()
-                            })
-                            break
+                                # Add to history
+                                session['history'].append({
+                                    'url': actual_url,
+                                    'title': title,
+                                    'visit_time': datetime.now()
+                                })
+                                break
                     
-                    # Save to database
-                    with sqlite3.connect(self.db_path / "browser.db") as conn:
-                        conn.execute(
-                            "UPDATE tabs SET url = ?, title = ?, last_active = ? WHERE id = ?",
-                            (actual_url, title, datetime.now(), tab_id)
-                        )
-                        conn.execute(
-                            "INSERT INTO history (tab_id, url, title, visit_time) VALUES (?, ?, ?, ?)",
-                            (tab_id, actual_url, title, datetime.now())
-                        )
+                        # Save to database
+                        with sqlite3.connect(self.db_path / "browser.db") as conn:
+                            conn.execute(
+                                "UPDATE tabs SET url = ?, title = ?, last_active = ? WHERE id = ?",
+                                (actual_url, title, datetime.now(), tab_id)
+                            )
+                            conn.execute(
+                                "INSERT INTO history (tab_id, url, title, visit_time) VALUES (?, ?, ?, ?)",
+                                (tab_id, actual_url, title, datetime.now())
+                            )
                     
-                    # Trigger AI analysis
-                    asyncio.create_task(self._analyze_page_content(tab_id, actual_url))
+                        # Trigger AI analysis
+                        asyncio.create_task(self._analyze_page_content(tab_id, actual_url))
                     
-                    return {
-                        'success': True,
-                        'tab_id': tab_id,
-                        'url': actual_url,
-                        'title': title,
-                        'status_code': response.status
-                    }
-                else:
-                    return {'success': False, 'error': f'Navigation failed: {response.status if response else "Unknown"}'}
+                        return {
+                            'success': True,
+                            'tab_id': tab_id,
+                            'url': actual_url,
+                            'title': title,
+                            'status_code': response.status
+                        }
+                    else:
+                        return {'success': False, 'error': f'Navigation failed: {response.status if response else "Unknown"}'}
                     
-            except Exception as nav_error:
-                return {'success': False, 'error': f'Navigation error: {str(nav_error)}'}
+                except Exception as nav_error:
+                    return {'success': False, 'error': f'Navigation error: {str(nav_error)}'}
                 
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -310,53 +314,52 @@ class EnhancedRealBrowserService:
     async def get_page_content(self, tab_id: str) -> Dict[str, Any]:
         """Get the content of a page"""
         try:
-            if tab_id not in self.pages:
-                return {'success': False, 'error': 'Tab not found'}
-            
-            page = self.pages[tab_id]
-            
-            # Get page content
-            html_content = await page.content()
-            url = page.url
-            title = await page.title()
-            
-            # Extract text content
-            text_content = await page.evaluate("""
-                () => {
-                    // Remove script and style elements
-                    const scripts = document.querySelectorAll('script, style');
-                    scripts.forEach(el => el.remove());
+            async with self.hibernation.lease(tab_id) as page:
+                if page is None:
+                    return {'success': False, 'error': 'Tab not found'}
+            
+                # Get page content
+                html_content = await page.content()
+                url = page.url
+                title = await page.title()
+            
+                # Extract text content
+                text_content = await page.evaluate("""
+                    () => {
+                        // Remove script and style elements
+                        const scripts = document.querySelectorAll('script, style');
+                        scripts.forEach(el => el.remove());
                     
-                    // Get clean text content
-                    return document.body ? document.body.innerText : '';
+                        // Get clean text content
+                        return document.body ? document.body.innerText : '';
+                    }
+                """)
+            
+                # Get meta information
+                meta_info = await page.evaluate("""
+                    () => {
+                        const metas = {};
+                        document.querySelectorAll('meta').forEach(meta => {
+                            const name = meta.getAttribute('name') || meta.getAttribute('property');
+                            const content = meta.getAttribute('content');
+                            if (name && content) {
+                                metas[name] = content;
+                            }
+                        });
+                        return metas;
+                    }
+                """)
+            
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'url': url,
+                    'title': title,
+                    'html_content': html_content,
+                    'text_content': text_content,
+                    'meta_info': meta_info,
+                    'content_length': len(text_content)
                 }
-            """)
-            
-            # Get meta information
-            meta_info = await page.evaluate("""
-                () => {
-                    const metas = {};
-                    document.querySelectorAll('meta').forEach(meta => {
-                        const name = meta.getAttribute('name') || meta.getAttribute('property');
-                        const content = meta.getAttribute('content');
-                        if (name && content) {
-                            metas[name] = content;
-                        }
-                    });
-                    return metas;
-                }
-            """)
-            
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'url': url,
-                'title': title,
-                'html_content': html_content,
-                'text_content': text_content,
-                'meta_info': meta_info,
-                'content_length': len(text_content)
-            }
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -364,28 +367,27 @@ class EnhancedRealBrowserService:
     async def take_screenshot(self, tab_id: str, full_page: bool = False) -> Dict[str, Any]:
         """Take a screenshot of a tab"""
         try:
-            if tab_id not in self.pages:
-                return {'success': False, 'error': 'Tab not found'}
-            
-            page = self.pages[tab_id]
-            
-            # Take screenshot
-            screenshot_bytes = await page.screenshot(
-                full_page=full_page,
-                quality=85,
-                type='jpeg'
-            )
+            async with self.hibernation.lease(tab_id) as page:
+                if page is None:
+                    return {'success': False, 'error': 'Tab not found'}
+            
+                # Take screenshot
+                screenshot_bytes = await page.screenshot(
+                    full_page=full_page,
+                    quality=85,
+                    type='jpeg'
+                )
             
-            # Convert to base64
-            import base64
-            screenshot_base64 = base64.b64encode(screenshot_bytes).decode()
+                # Convert to base64
+                import base64
+                screenshot_base64 = base64.b64encode(screenshot_bytes).decode()
             
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'screenshot': f"data:image/jpeg;base64,{screenshot_base64}",
-                'size': len(screenshot_bytes)
-            }
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'screenshot': f"data:image/jpeg;base64,{screenshot_base64}",
+                    'size': len(screenshot_bytes)
+                }
             
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -484,6 +486,7 @@ class EnhancedRealBrowserService:
                 'created_at': session_data['created_at'].isoformat(),
                 'last_active': session_data['last_active'].isoformat(),
                 'tabs_count': len(session_data['tabs']),
+                'hibernated_tabs': sum(1 for tab_id in session_data['tabs'] if self.hibernation.is_hibernated(tab_id)),
                 'tabs': list(session_data['tabs'].values())
             }
         
@@ -499,6 +502,7 @@ class EnhancedRealBrowserService:
             if tab_id in self.pages:
                 await self.pages[tab_id].close()
                 del self.pages[tab_id]
+            self.hibernation.forget(tab_id)
             
             # Remove from session data
             for session_id, session in self.session_data.items():
@@ -526,6 +530,7 @@ class EnhancedRealBrowserService:
             if session_id in self.session_data:
                 # Close all tabs in session
                 for tab_id in list(self.session_data[session_id]['tabs'].keys()):
+                    self.hibernation.forget(tab_id)
                     if tab_id in self.pages:
                         await self.pages[tab_id].close()
                         del self.pages[tab_id]
@@ -560,6 +565,12 @@ class EnhancedRealBrowserService:
             'bookmark_management': True
         }
 
+    def _attach_page_handlers(self, tab_id: str, session_id: str, page: Page):
+        """Attach page event handlers (also used for pages restored from hibernation)"""
+        page.on('load', lambda: self._on_page_load(tab_id, session_id))
+        page.on('domcontentloaded', lambda: self._on_dom_ready(tab_id, session_id))
+        page.on('console', lambda msg: self._on_console(tab_id, msg))
+
     def _on_page_load(self, tab_id: str, session_id: str):
         """Handle page load event"""
         print(f"Page loaded: {tab_id}")
@@ -576,6 +587,8 @@ class EnhancedRealBrowserService:
     async def cleanup(self):
         """Clean up all browser resources"""
         try:
+            await self.hibernation.stop()
+            
             # Close all pages
             for page in self.pages.values():
                 await page.close()
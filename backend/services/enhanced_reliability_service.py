@@ -12,9 +12,10 @@ from datetime import datetime, timedelta
 from enum import Enum
 import logging
 from collections import defaultdict, deque
-import psutil
 import os
 
+from services.system_metrics_sampler import system_metrics_sampler
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -351,17 +352,12 @@ class EnhancedReliabilityService:
     async def monitor_system_health(self) -> Dict[str, Any]:
         """Monitor comprehensive system health metrics"""
         try:
-            # Collect system metrics
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
+            # Collect system metrics from the background sampler
+            sample = system_metrics_sampler.snapshot()
             
             # Network statistics (simplified)
             network_latency = await self._measure_network_latency()
             
-            # Count active connections (simplified)
-            active_connections = len(psutil.net_connections())
-            
             # Calculate error rate
             recent_errors = len([
                 error for error in self.error_history
@@ -369,17 +365,14 @@ class EnhancedReliabilityService:
             ])
             error_rate = recent_errors / 5  # errors per minute
             
-            # System uptime
-            uptime = time.time() - psutil.boot_time()
-            
             health_metrics = SystemHealthMetrics(
-                cpu_usage=cpu_percent,
-                memory_usage=memory.percent,
-                disk_usage=disk.percent,
+                cpu_usage=sample["cpu_percent"],
+                memory_usage=sample["memory_percent"],
+                disk_usage=sample["disk_percent"],
                 network_latency=network_latency,
-                active_connections=active_connections,
+                active_connections=sample["connections"],
                 error_rate=error_rate,
-                uptime=uptime
+                uptime=sample["uptime_seconds"]
             )
             
             # Assess overall health
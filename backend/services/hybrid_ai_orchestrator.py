@@ -11,12 +11,16 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from groq import AsyncGroq
 import httpx
-import requests
-from bs4 import BeautifulSoup
-import hashlib
 import re
 from collections import defaultdict, deque
 
+from services.search_cache import SearchCache
+from services.behavior_event_store import behavior_event_store
+from services.next_action_model import next_action_model
+from services.tab_context import tab_context
+from services.model_router import model_router
+from services.structured_output import load_json
+
 class HybridAIOrchestratorService:
     """
     🎯 HYBRID AI ORCHESTRATOR - Next-Generation Intelligence Engine
@@ -41,7 +45,8 @@ class HybridAIOrchestratorService:
         
         # 🚀 FELLOU.AI COMPONENTS  
         self.deep_action_workflows = defaultdict(list)  # Multi-step workflows
-        self.deep_search_cache = {}  # Research results cache
+        self.deep_search_cache = SearchCache(db_path="data/research_cache.db", max_entries=200)  # Research results cache
+        self.deep_search_cache_ttl = 6 * 3600
         self.agentic_memory = defaultdict(lambda: {
             'behavior_patterns': [],
             'preferences': {},
@@ -118,10 +123,14 @@ class HybridAIOrchestratorService:
             return {"error": "Hybrid AI not configured"}
             
         try:
-            # 🎯 CONTEXTUAL AWARENESS - Analyze current webpage if provided
+            # 🎯 CONTEXTUAL AWARENESS - Only the passages of the current page that bear on this message
+            page_grounding = await tab_context.retrieve(user_id, page_context, message) if page_context else None
             context_analysis = ""
-            if page_context and page_context.get('url'):
-                context_analysis = await self._analyze_page_context(page_context['url'], page_context.get('content', ''))
+            if page_grounding:
+                context_analysis = (f"{page_grounding['title'] or 'Webpage'} ({page_grounding['url']})\n"
+                                    f"Relevant passages:\n{page_grounding['context']}")
+            elif page_context and page_context.get('url'):
+                context_analysis = f"Webpage: {page_context['url']}"
                 
             # 🧠 MEMORY INTEGRATION - Include conversation and behavioral context
             conversation_memory = list(self.neon_chat_memory[user_id])
@@ -153,9 +162,10 @@ INSTRUCTIONS:
 
 Respond naturally as the enhanced ARIA with hybrid intelligence."""
 
-            response = await self.groq_client.chat.completions.create(
-                model="llama3-70b-8192",
-                messages=[
+            response, _ = await model_router.complete(
+                self.groq_client,
+                "chat",
+                [
                     {"role": "system", "content": "You are ARIA, a hybrid AI assistant with advanced contextual intelligence and behavioral learning capabilities."},
                     {"role": "user", "content": hybrid_prompt}
                 ],
@@ -176,6 +186,8 @@ Respond naturally as the enhanced ARIA with hybrid intelligence."""
                 'response': ai_response,
                 'hybrid_features': {
                     'contextual_awareness': bool(context_analysis),
+                    'page_grounding': {key: page_grounding[key] for key in ('url', 'version', 'total_chunks', 'retrieval')}
+                                      if page_grounding else None,
                     'behavioral_learning': bool(user_behavior['behavior_patterns']),
                     'predictive_suggestions': await self._generate_predictive_suggestions(user_id, message)
                 },
@@ -186,78 +198,6 @@ Respond naturally as the enhanced ARIA with hybrid intelligence."""
         except Exception as e:
             return {"error": f"Hybrid chat failed: {str(e)}"}
 
-    async def _analyze_page_context(self, url: str, content: str = "") -> str:
-        """🎯 NEON CHAT - Analyze webpage context for enhanced understanding"""
-        try:
-            if not content and url:
-                # Smart content extraction
-                content = await self._extract_page_content(url)
-                
-            if content:
-                context_prompt = f"""Analyze this webpage for contextual AI assistance:
-
-URL: {url}
-Content: {content[:3000]}
-
-Provide brief context analysis:
-1. Page type and purpose
-2. Key information and data
-3. Potential user tasks or goals
-4. Automation opportunities
-5. Relevant assistance suggestions
-
-Format as concise context summary."""
-
-                if self.groq_client:
-                    response = await self.groq_client.chat.completions.create(
-                        model="llama3-8b-8192",
-                        messages=[{"role": "user", "content": context_prompt}],
-                        max_tokens=500,
-                        temperature=0.3
-                    )
-                    return response.choices[0].message.content
-                    
-            return f"Webpage: {url}"
-            
-        except Exception as e:
-            return f"Context analysis unavailable: {str(e)}"
-
-    async def _extract_page_content(self, url: str) -> str:
-        """Enhanced webpage content extraction for contextual analysis"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove unwanted elements
-            for element in soup(["script", "style", "nav", "header", "footer"]):
-                element.decompose()
-                
-            # Extract main content
-            main_content = (
-                soup.find('main') or 
-                soup.find('article') or 
-                soup.find('div', class_=lambda x: x and 'content' in x.lower()) or
-                soup.find('body')
-            )
-            
-            if main_content:
-                text = main_content.get_text()
-                # Clean and truncate
-                lines = (line.strip() for line in text.splitlines())
-                text = ' '.join(line for line in lines if line and len(line) > 10)
-                return text[:5000]  # Limit for context analysis
-                
-        except Exception as e:
-            print(f"Content extraction error: {e}")
-            
-        return ""
-
     # =============================================================================
     # 🎭 DEEP ACTION - MULTI-STEP WORKFLOW ORCHESTRATION  
     # =============================================================================
@@ -318,7 +258,7 @@ Format as structured workflow JSON for execution."""
             )
             
             try:
-                workflow_data = json.loads(response.choices[0].message.content)
+                workflow_data = load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 workflow_data = {"workflow": response.choices[0].message.content}
                 
@@ -429,6 +369,20 @@ Format as structured workflow JSON for execution."""
             return {"error": "Hybrid AI not configured"}
             
         try:
+            # 💾 REUSE RESEARCH ON THE SAME TOPIC
+            cache_key = self.deep_search_cache.make_key("research", research_query, user_id, search_depth)
+            cached, _ = await self.deep_search_cache.get(cache_key)
+            if cached is not None:
+                return {
+                    'research_id': cache_key,
+                    'research_plan': cached['plan'],
+                    'automated_results': cached['results'],
+                    'visual_report': cached['report'],
+                    'deep_search_active': True,
+                    'report_ready': True,
+                    'cached': True
+                }
+            
             # 🎯 RESEARCH ORCHESTRATION
             research_prompt = f"""Conduct Deep Search automated research:
 
@@ -476,7 +430,7 @@ Format as structured research plan for automated execution."""
             )
             
             try:
-                research_plan = json.loads(response.choices[0].message.content)
+                research_plan = load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 research_plan = {"research_plan": response.choices[0].message.content}
                 
@@ -487,13 +441,13 @@ Format as structured research plan for automated execution."""
             visual_report = await self._generate_research_report(research_results, user_id)
             
             # 💾 CACHE RESULTS
-            cache_key = hashlib.md5(f"{research_query}_{user_id}".encode()).hexdigest()
-            self.deep_search_cache[cache_key] = {
+            await self.deep_search_cache.set(cache_key, {
                 'query': research_query,
+                'plan': research_plan,
                 'results': research_results,
                 'report': visual_report,
-                'timestamp': datetime.utcnow()
-            }
+                'timestamp': datetime.utcnow().isoformat()
+            }, ttl=self.deep_search_cache_ttl, namespace="research")
             
             # 📊 TRACK METRICS
             self.hybrid_metrics['research_reports_created'] += 1
@@ -621,6 +575,12 @@ Format as structured research plan for automated execution."""
             }
             
             user_memory['interaction_history'].append(interaction_record)
+            # Shared event store feeds the incremental next-action model
+            behavior_event_store.append(
+                user_id, interaction_record['type'], context=interaction_record['context'],
+                session_id=interaction_record['context'].get('session_id'),
+                success=interaction_record['outcome'] != 'failure'
+            )
             
             # 🧠 BEHAVIOR PATTERN ANALYSIS
             behavior_analysis = await self._analyze_behavior_patterns(user_id)
@@ -668,7 +628,7 @@ Format as structured research plan for automated execution."""
             patterns.extend(time_patterns)
             
             # Task-based patterns  
-            task_patterns = self._analyze_task_patterns(interactions)
+            task_patterns = self._analyze_task_patterns(user_id)
             patterns.extend(task_patterns)
             
             # Context-based patterns
@@ -701,24 +661,30 @@ Format as structured research plan for automated execution."""
             
         return patterns
 
-    def _analyze_task_patterns(self, interactions: List[Dict]) -> List[Dict]:
+    def _analyze_task_patterns(self, user_id: str) -> List[Dict]:
         """Analyze task and content patterns"""
         patterns = []
         
-        # Task type frequency
-        task_types = defaultdict(int)
-        for interaction in interactions:
-            task_type = interaction.get('type', 'unknown')
-            task_types[task_type] += 1
+        # Task type frequency and transitions are maintained incrementally per event
+        task_types = next_action_model.action_counts(user_id)
+        total = sum(task_types.values())
             
         # Find common tasks
-        if task_types:
-            common_task = max(task_types, key=task_types.get)
+        if total:
+            common_task, count = task_types.most_common(1)[0]
             patterns.append({
                 'type': 'task_preference',
                 'pattern': f"Frequently uses {common_task}",
-                'confidence': task_types[common_task] / len(interactions)
+                'confidence': count / total
             })
+        
+        for prediction in next_action_model.predict(user_id, k=1):
+            if prediction['context_length']:
+                patterns.append({
+                    'type': 'next_task',
+                    'pattern': f"Likely to use {prediction['action_type']} next",
+                    'confidence': prediction['confidence']
+                })
             
         return patterns
 
@@ -878,7 +844,7 @@ Format as structured app specification for generation."""
             )
             
             try:
-                app_spec = json.loads(response.choices[0].message.content)
+                app_spec = load_json(response.choices[0].message.content)
             except json.JSONDecodeError:
                 app_spec = {"app_specification": response.choices[0].message.content}
                 
@@ -986,7 +952,8 @@ Format as structured app specification for generation."""
             'timestamp': datetime.utcnow(),
             'user_message': message,
             'ai_response': response,
-            'context': context
+            # Page text is retrieved per turn from the tab index; memory keeps only the page reference
+            'context': {key: value for key, value in context.items() if key != 'content'} if context else context
         }
         
         self.neon_chat_memory[user_id].append(memory_entry)
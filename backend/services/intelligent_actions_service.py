@@ -11,6 +11,8 @@ from dataclasses import dataclass, asdict
 from datetime import datetime
 import logging
 
+from services.intent_engine import intent_engine
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -53,6 +55,15 @@ class IntelligentActionsService:
         
         # Voice command patterns
         self.voice_patterns = self._initialize_voice_patterns()
+        intent_engine.register_domain(
+            "voice_actions",
+            {
+                category: {"patterns": info["patterns"], "confidence": 0.8}
+                for category, info in self.voice_patterns.items()
+                if not info.get("wake_word")
+            },
+            default="fallback"
+        )
         
         logger.info("✅ Intelligent Actions & Voice Commands Service initialized")
     
@@ -283,43 +294,25 @@ class IntelligentActionsService:
     
     async def _parse_voice_command(self, command_text: str) -> Dict[str, Any]:
         """Parse voice command to extract intent and parameters"""
-        best_match = None
-        highest_confidence = 0.0
-        
-        for category, pattern_info in self.voice_patterns.items():
-            if category == "hey_aria":
-                continue
-                
-            for pattern in pattern_info["patterns"]:
-                match = re.search(pattern, command_text)
-                if match:
-                    confidence = 0.8  # Base confidence for pattern match
-                    
-                    # Increase confidence for exact matches
-                    if pattern in command_text:
-                        confidence = 0.9
-                    
-                    if confidence > highest_confidence:
-                        highest_confidence = confidence
-                        best_match = {
-                            "intent": pattern_info["intent"],
-                            "pattern": pattern,
-                            "parameters": list(match.groups()) if match.groups() else [],
-                            "confidence": confidence,
-                            "category": category
-                        }
-        
-        if not best_match:
+        match = intent_engine.classify("voice_actions", command_text)
+        
+        if match.intent == "fallback":
             # Fallback to general analysis
-            best_match = {
+            return {
                 "intent": "general_query",
                 "pattern": "fallback",
                 "parameters": [command_text],
-                "confidence": 0.3,
+                "confidence": match.confidence,
                 "category": "fallback"
             }
         
-        return best_match
+        return {
+            "intent": self.voice_patterns[match.intent]["intent"],
+            "pattern": match.pattern,
+            "parameters": list(match.parameters),
+            "confidence": match.confidence,
+            "category": match.intent
+        }
     
     async def _execute_voice_command(self, command_analysis: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute parsed voice command"""
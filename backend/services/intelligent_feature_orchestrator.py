@@ -11,9 +11,7 @@ from datetime import datetime
 import logging
 from dataclasses import dataclass
 
-from services.enhanced_ai_orchestrator import EnhancedAIOrchestratorService
-from services.browser_engine_service import BrowserEngineService
-from services.performance_service import PerformanceService
+from services.service_registry import service_registry
 
 logger = logging.getLogger(__name__)
 
@@ -39,9 +37,9 @@ class IntelligentFeatureOrchestrator:
     """
     
     def __init__(self):
-        self.ai_orchestrator = EnhancedAIOrchestratorService()
-        self.browser_service = BrowserEngineService()
-        self.performance_service = PerformanceService()
+        self.ai_orchestrator = service_registry.get("enhanced_ai_orchestrator")
+        self.browser_service = service_registry.get("browser_engine")
+        self.performance_service = service_registry.get("performance")
         
         # Feature activation thresholds
         self.activation_thresholds = {
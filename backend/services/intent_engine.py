@@ -0,0 +1,300 @@
+"""
+Shared Intent Engine
+Local intent classification for chat, navigation and voice commands
+Precompiled patterns + optional hashed-feature linear model, memoized
+"""
+
+import json
+import math
+import os
+import re
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Any, Optional, Tuple
+
+# Keyword tables for domains whose callers used ad-hoc keyword loops.
+# Intents are listed in priority order: on equal scores the earlier one wins.
+BUILTIN_DOMAINS = {
+    "chat": {
+        "default": "conversational",
+        "intents": {
+            "automation": {"keywords": ["automate", "fill form", "book", "buy", "shop", "click", "navigate"]},
+            "analysis": {"keywords": ["analyze", "summarize", "research", "extract", "content", "website"]},
+            "technical": {"keywords": ["code", "script", "technical", "api", "programming", "debug"]},
+            "creative": {"keywords": ["creative", "idea", "brainstorm", "suggest", "design"]},
+            "learning": {"keywords": ["help", "how", "what", "explain", "learn", "tutorial"]},
+            "productivity": {"keywords": ["organize", "manage", "tabs", "workflow", "productivity"]},
+            "troubleshooting": {"keywords": ["problem", "error", "issue", "broken", "fix", "troubleshoot"]}
+        }
+    },
+    "conversation": {
+        "default": "conversational",
+        "intents": {
+            "question": {"keywords": ["what", "how", "when", "where", "why", "who", "?"]},
+            "request": {"keywords": ["please", "can you", "could you", "help", "assist"]},
+            "information": {"keywords": ["tell me", "explain", "describe", "show"]},
+            "navigation": {"keywords": ["go to", "open", "navigate", "visit", "browse"]},
+            "search": {"keywords": ["search", "find", "look for", "locate"]},
+            "task": {"keywords": ["create", "make", "build", "generate", "do"]},
+            "feedback": {"keywords": ["good", "bad", "excellent", "terrible", "thanks"]}
+        }
+    },
+    "voice_command": {
+        "default": "unknown",
+        "intents": {
+            "navigate": {
+                "patterns": [r"(?:go to|navigate to|open|take me to|visit) (.+)"],
+                "keywords": ["go to", "navigate to", "open"]
+            },
+            "search": {
+                "patterns": [r"(?:search for|find|look up|google) (.+)"],
+                "keywords": ["search for", "find", "look up"]
+            },
+            "analyze": {
+                "patterns": [r"(?:analyze|summarize|tell me about) ?(.*)"],
+                "keywords": ["analyze", "summarize", "tell me about"]
+            },
+            "bookmark": {"keywords": ["bookmark", "save this", "remember"]},
+            "tab_management": {
+                "patterns": [r"(?:close|new|switch) tab ?(.*)"],
+                "keywords": ["close tab", "new tab", "switch tab"]
+            }
+        }
+    }
+}
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    intent: str
+    confidence: float
+    parameters: Tuple[str, ...] = ()
+    pattern: Optional[str] = None
+    source: str = "default"  # "pattern", "keywords", "model" or "default"
+
+
+class HashedLinearClassifier:
+    """Multiclass linear model over hashed word uni/bigrams.
+
+    Small enough to train offline on a few thousand labelled commands and ship
+    as JSON; scoring is a handful of dict lookups.
+    """
+
+    def __init__(self, labels: List[str] = None, dimensions: int = 2 ** 18):
+        self.labels = list(labels or [])
+        self.dimensions = dimensions
+        self.weights = {label: {} for label in self.labels}
+        self.bias = {label: 0.0 for label in self.labels}
+
+    def features(self, text: str) -> List[int]:
+        tokens = re.findall(r"[\w']+|\?", text.lower())
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return [zlib.crc32(gram.encode()) % self.dimensions for gram in grams]
+
+    def predict(self, text: str) -> Tuple[Optional[str], float]:
+        """Return (label, softmax probability) for the best label"""
+        if not self.labels:
+            return None, 0.0
+        features = self.features(text)
+        scores = {
+            label: self.bias[label] + sum(self.weights[label].get(f, 0.0) for f in features)
+            for label in self.labels
+        }
+        top = max(scores.values())
+        exp_scores = {label: math.exp(score - top) for label, score in scores.items()}
+        best = max(exp_scores, key=exp_scores.get)
+        return best, exp_scores[best] / sum(exp_scores.values())
+
+    def train(self, samples: List[Tuple[str, str]], epochs: int = 10, learning_rate: float = 0.1):
+        """Softmax regression with plain SGD over (text, label) samples"""
+        for _, label in samples:
+            if label not in self.weights:
+                self.labels.append(label)
+                self.weights[label] = {}
+                self.bias[label] = 0.0
+
+        for _ in range(epochs):
+            for text, label in samples:
+                features = self.features(text)
+                scores = {
+                    name: self.bias[name] + sum(self.weights[name].get(f, 0.0) for f in features)
+                    for name in self.labels
+                }
+                top = max(scores.values())
+                exp_scores = {name: math.exp(score - top) for name, score in scores.items()}
+                total = sum(exp_scores.values())
+                for name in self.labels:
+                    gradient = (1.0 if name == label else 0.0) - exp_scores[name] / total
+                    if abs(gradient) < 1e-6:
+                        continue
+                    self.bias[name] += learning_rate * gradient
+                    weights = self.weights[name]
+                    for f in features:
+                        weights[f] = weights.get(f, 0.0) + learning_rate * gradient
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "labels": self.labels,
+                "dimensions": self.dimensions,
+                "bias": self.bias,
+                "weights": {label: {str(k): v for k, v in w.items() if abs(v) > 1e-4} for label, w in self.weights.items()}
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> "HashedLinearClassifier":
+        with open(path) as f:
+            data = json.load(f)
+        model = cls(data["labels"], data["dimensions"])
+        model.bias = data["bias"]
+        model.weights = {label: {int(k): v for k, v in w.items()} for label, w in data["weights"].items()}
+        return model
+
+
+class IntentEngine:
+    """Classify text into per-domain intents without an LLM round trip.
+
+    Each domain is a table of intents with regex `patterns` (capture groups
+    become parameters) and/or `keywords`, listed in priority order. A pattern
+    hit scores the intent's `confidence` and the highest-scoring pattern wins,
+    the earlier intent on ties. Without a pattern hit, the first intent in
+    table order with a keyword hit wins, as the if/elif keyword chains this
+    replaces did; it scores 0.55 + 0.1 per distinct hit, so the count only
+    sets the confidence, never the winner. When the result is below
+    `confidence_threshold` and a trained model exists for the domain in
+    `model_dir`, the model gets a say. Callers should use the LLM only when
+    `is_confident()` is False.
+    """
+
+    def __init__(self, confidence_threshold: float = 0.6, cache_size: int = 4096,
+                 model_dir: str = "data/intent_models"):
+        self.confidence_threshold = confidence_threshold
+        self.cache_size = cache_size
+        self.model_dir = model_dir
+        self.domains = {}
+        self.models = {}
+        self.cache = OrderedDict()
+        self.stats = {"classifications": 0, "cache_hits": 0, "model_predictions": 0, "low_confidence": 0}
+
+        for domain, config in BUILTIN_DOMAINS.items():
+            self.register_domain(domain, config["intents"], default=config["default"])
+
+    @staticmethod
+    def _keyword_regex(keywords: List[str]):
+        if not keywords:
+            return None
+        alternatives = []
+        for keyword in sorted(set(keywords), key=len, reverse=True):
+            escaped = re.escape(keyword.lower())
+            prefix = r"(?<!\w)" if keyword[:1].isalnum() else ""
+            # Allow plain inflections ("shop" -> "shopping", "book" -> "booked")
+            suffix = r"(?:\w?(?:s|es|ed|ing|er|ers))?(?!\w)" if keyword[-1:].isalnum() else ""
+            alternatives.append(f"{prefix}{escaped}{suffix}")
+        return re.compile("|".join(alternatives))
+
+    def register_domain(self, domain: str, intents: Dict[str, Dict[str, Any]],
+                        default: str = "unknown", default_confidence: float = 0.3):
+        """Compile an intent table; re-registering a domain replaces it"""
+        compiled = []
+        for intent, spec in intents.items():
+            confidence = spec.get("confidence", 0.8)
+            patterns = []
+            for pattern in spec.get("patterns", []):
+                regex = re.compile(pattern)
+                # Literal phrases ("close tab") are stronger evidence than open-ended captures
+                literal = not regex.groups and not any(char in pattern for char in ".*+?()[]{}|\\^$")
+                patterns.append((regex, min(1.0, confidence + 0.1) if literal else confidence))
+            compiled.append((intent, patterns, self._keyword_regex(spec.get("keywords", []))))
+
+        self.domains[domain] = {"intents": compiled, "default": default, "default_confidence": default_confidence}
+        self.cache = OrderedDict((key, value) for key, value in self.cache.items() if key[0] != domain)
+        self.models.pop(domain, None)
+
+    def _model_for(self, domain: str) -> Optional[HashedLinearClassifier]:
+        if domain not in self.models:
+            path = os.path.join(self.model_dir, f"{domain}.json")
+            try:
+                self.models[domain] = HashedLinearClassifier.load(path) if os.path.exists(path) else None
+            except Exception as e:
+                print(f"⚠️ Intent model for {domain} could not be loaded: {e}")
+                self.models[domain] = None
+        return self.models[domain]
+
+    def classify(self, domain: str, text: str) -> IntentMatch:
+        """Classify `text` within `domain` (memoized per normalized text)"""
+        normalized = " ".join((text or "").lower().split())
+        key = (domain, normalized)
+        self.stats["classifications"] += 1
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return cached
+
+        match = self._classify_uncached(domain, normalized)
+        self.cache[key] = match
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return match
+
+    def _classify_uncached(self, domain: str, text: str) -> IntentMatch:
+        config = self.domains.get(domain)
+        if config is None:
+            raise KeyError(f"Unknown intent domain: {domain}")
+
+        best = IntentMatch(config["default"], config["default_confidence"])
+        for intent, patterns, _ in config["intents"]:
+            for regex, confidence in patterns:
+                found = regex.search(text)
+                if found and confidence > best.confidence:
+                    parameters = tuple(g.strip() for g in found.groups() if g and g.strip())
+                    best = IntentMatch(intent, confidence, parameters, regex.pattern, "pattern")
+                    break
+
+        if best.source != "pattern":
+            for intent, _, keyword_regex in config["intents"]:
+                hits = {m.group(0) for m in keyword_regex.finditer(text)} if keyword_regex is not None else None
+                if hits:
+                    confidence = min(0.85, 0.55 + 0.1 * len(hits))
+                    if confidence > best.confidence:
+                        best = IntentMatch(intent, confidence, (), None, "keywords")
+                    break
+
+        if best.confidence < self.confidence_threshold:
+            model = self._model_for(domain)
+            if model is not None:
+                label, probability = model.predict(text)
+                self.stats["model_predictions"] += 1
+                if label is not None and probability > best.confidence:
+                    best = IntentMatch(label, round(probability, 3), (), None, "model")
+
+        if best.confidence < self.confidence_threshold:
+            self.stats["low_confidence"] += 1
+        return best
+
+    def is_confident(self, match: IntentMatch) -> bool:
+        return match.confidence >= self.confidence_threshold
+
+    def train_model(self, domain: str, samples: List[Tuple[str, str]], epochs: int = 10) -> Dict[str, Any]:
+        """Train and save the optional local model for a domain (offline use)"""
+        model = HashedLinearClassifier()
+        model.train([(" ".join(text.lower().split()), label) for text, label in samples], epochs=epochs)
+        model.save(os.path.join(self.model_dir, f"{domain}.json"))
+        self.models[domain] = model
+        self.cache = OrderedDict((key, value) for key, value in self.cache.items() if key[0] != domain)
+        return {"domain": domain, "labels": model.labels, "samples": len(samples)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "domains": list(self.domains.keys()),
+            "cached_classifications": len(self.cache),
+            "models_loaded": [domain for domain, model in self.models.items() if model is not None]
+        }
+
+
+intent_engine = IntentEngine()
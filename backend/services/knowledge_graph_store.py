@@ -0,0 +1,511 @@
+"""
+Knowledge Graph Store
+Persistent per-user, per-topic knowledge graphs in SQLite: an alias index
+that deduplicates entities, edge tables that double as adjacency lists, and
+incremental merges with source attribution, plus neighbourhood and path
+queries over a cached in-memory adjacency
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_LEADING_ARTICLE = re.compile(r"^(?:the|a|an)\s+")
+_PARENTHESISED_ALIAS = re.compile(r"^(.*?)\s*\(([^)]{1,40})\)\s*$")
+_RESERVED_KEYS = {"id", "label", "name", "type", "sources", "source_index"}
+
+
+def entity_key(label: str) -> str:
+    """Canonical key for an entity label.
+
+    Case, punctuation, a leading article and a plural on the last word are
+    ignored, so "The Solar Panels", "solar panel" and "Solar-Panel" share one
+    entity.
+    """
+    text = unicodedata.normalize("NFKC", str(label or "")).lower()
+    text = _LEADING_ARTICLE.sub("", " ".join(_NON_WORD.sub(" ", text).split()))
+    words = text.split()
+    if words:
+        last = words[-1]
+        if len(last) > 4 and last.endswith("ies"):
+            words[-1] = last[:-3] + "y"
+        elif len(last) > 3 and last.endswith("s") and not last.endswith(("ss", "us", "is")):
+            words[-1] = last[:-1]
+    return "_".join(words)[:120]
+
+
+def _label_keys(label: str) -> Tuple[str, List[str]]:
+    """(display label, alias keys) — "Artificial Intelligence (AI)" is also known as "ai" """
+    label = " ".join(str(label or "").split())
+    match = _PARENTHESISED_ALIAS.match(label)
+    if match and match.group(1):
+        label = match.group(1)
+        return label, [key for key in (entity_key(label), entity_key(match.group(2))) if key]
+    key = entity_key(label)
+    return label, [key] if key else []
+
+
+class KnowledgeGraphStore:
+    """SQLite-backed knowledge graphs keyed by (user_id, topic).
+
+    Entities are deduplicated through `entity_aliases`: every label key an
+    entity was ever seen under points at it, so re-extracted concepts merge
+    instead of multiplying. Edges are unique per (source, target, relation);
+    re-observing one raises its weight to the strongest observation and
+    bumps its mention count. Sources are numbered per graph in arrival order
+    and attributed to the entities and edges they contributed. Path and
+    neighbourhood queries run BFS over an adjacency map loaded once per graph
+    and dropped whenever that graph changes.
+    """
+
+    def __init__(self, db_path: str = "data/knowledge_graphs.db", adjacency_cache_size: int = 32):
+        self.db_path = db_path
+        self.adjacency_cache_size = adjacency_cache_size
+        self.adjacency: "OrderedDict[int, Dict[int, List[Tuple[int, int]]]]" = OrderedDict()
+        self.stats = {"merges": 0, "entities_added": 0, "entities_merged": 0, "edges_added": 0,
+                      "edges_updated": 0, "adjacency_loads": 0}
+        self._lock = threading.RLock()
+        self._init_database()
+
+    def _init_database(self):
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS graphs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                topic_key TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                insights TEXT NOT NULL DEFAULT '[]',
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE(user_id, topic_key)
+            );
+            CREATE TABLE IF NOT EXISTS graph_sources (
+                graph_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                PRIMARY KEY (graph_id, position),
+                UNIQUE (graph_id, url)
+            );
+            CREATE TABLE IF NOT EXISTS entities (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                graph_id INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                label TEXT NOT NULL,
+                type TEXT NOT NULL,
+                properties TEXT NOT NULL DEFAULT '{}',
+                mentions INTEGER NOT NULL DEFAULT 1,
+                UNIQUE (graph_id, key)
+            );
+            CREATE TABLE IF NOT EXISTS entity_aliases (
+                graph_id INTEGER NOT NULL,
+                alias_key TEXT NOT NULL,
+                entity_id INTEGER NOT NULL,
+                PRIMARY KEY (graph_id, alias_key)
+            );
+            CREATE TABLE IF NOT EXISTS entity_sources (
+                entity_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (entity_id, position)
+            );
+            CREATE TABLE IF NOT EXISTS edges (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                graph_id INTEGER NOT NULL,
+                source_id INTEGER NOT NULL,
+                target_id INTEGER NOT NULL,
+                relation TEXT NOT NULL,
+                weight REAL NOT NULL,
+                mentions INTEGER NOT NULL DEFAULT 1,
+                UNIQUE (graph_id, source_id, target_id, relation)
+            );
+            CREATE INDEX IF NOT EXISTS idx_edges_source ON edges(graph_id, source_id);
+            CREATE INDEX IF NOT EXISTS idx_edges_target ON edges(graph_id, target_id);
+            CREATE TABLE IF NOT EXISTS edge_sources (
+                edge_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                PRIMARY KEY (edge_id, position)
+            );
+        """)
+        self.conn.commit()
+
+    # ── Graphs and sources ────────────────────────────────────────
+
+    def _graph_id(self, user_id: str, topic: str, create: bool = False) -> Optional[int]:
+        topic_key = " ".join(str(topic).lower().split())
+        row = self.conn.execute("SELECT id FROM graphs WHERE user_id = ? AND topic_key = ?", (user_id, topic_key)).fetchone()
+        if row:
+            return row[0]
+        if not create:
+            return None
+        now = time.time()
+        cursor = self.conn.execute(
+            "INSERT INTO graphs (user_id, topic_key, topic, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (user_id, topic_key, topic, now, now)
+        )
+        return cursor.lastrowid
+
+    def _source_position(self, graph_id: int, url: str) -> int:
+        row = self.conn.execute("SELECT position FROM graph_sources WHERE graph_id = ? AND url = ?", (graph_id, url)).fetchone()
+        if row:
+            return row[0]
+        position = self.conn.execute(
+            "SELECT COALESCE(MAX(position) + 1, 0) FROM graph_sources WHERE graph_id = ?", (graph_id,)
+        ).fetchone()[0]
+        self.conn.execute("INSERT INTO graph_sources (graph_id, position, url, added_at) VALUES (?, ?, ?, ?)",
+                          (graph_id, position, url, time.time()))
+        return position
+
+    def source_urls(self, user_id: str, topic: str) -> List[str]:
+        """Sources already merged into the graph, in arrival order"""
+        with self._lock:
+            graph_id = self._graph_id(user_id, topic)
+            if graph_id is None:
+                return []
+            rows = self.conn.execute("SELECT url FROM graph_sources WHERE graph_id = ? ORDER BY position", (graph_id,))
+            return [row[0] for row in rows]
+
+    def set_insights(self, user_id: str, topic: str, insights: List[str]):
+        with self._lock:
+            graph_id = self._graph_id(user_id, topic, create=True)
+            self.conn.execute("UPDATE graphs SET insights = ?, updated_at = ? WHERE id = ?",
+                              (json.dumps(insights), time.time(), graph_id))
+            self.conn.commit()
+
+    _SUMMARY_QUERY = """
+        SELECT g.topic, g.created_at, g.updated_at,
+               (SELECT COUNT(*) FROM entities e WHERE e.graph_id = g.id),
+               (SELECT COUNT(*) FROM edges r WHERE r.graph_id = g.id),
+               (SELECT COUNT(*) FROM graph_sources s WHERE s.graph_id = g.id)
+        FROM graphs g
+    """
+
+    def _summaries(self, where: str, params: tuple) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self.conn.execute(f"{self._SUMMARY_QUERY} WHERE {where} ORDER BY g.updated_at DESC", params).fetchall()
+        return [
+            {"topic": topic, "created_at": created_at, "updated_at": updated_at,
+             "entities": entities, "relationships": edges, "sources": sources}
+            for topic, created_at, updated_at, entities, edges, sources in rows
+        ]
+
+    def list_graphs(self, user_id: str) -> List[Dict[str, Any]]:
+        return self._summaries("g.user_id = ?", (user_id,))
+
+    def summary(self, user_id: str, topic: str) -> Optional[Dict[str, Any]]:
+        """Entity, relationship and source counts of one graph without loading it"""
+        summaries = self._summaries("g.user_id = ? AND g.topic_key = ?", (user_id, " ".join(str(topic).lower().split())))
+        return summaries[0] if summaries else None
+
+    def delete_graph(self, user_id: str, topic: str) -> bool:
+        with self._lock:
+            graph_id = self._graph_id(user_id, topic)
+            if graph_id is None:
+                return False
+            self.conn.execute("DELETE FROM entity_sources WHERE entity_id IN (SELECT id FROM entities WHERE graph_id = ?)", (graph_id,))
+            self.conn.execute("DELETE FROM edge_sources WHERE edge_id IN (SELECT id FROM edges WHERE graph_id = ?)", (graph_id,))
+            for table in ("entities", "entity_aliases", "edges", "graph_sources"):
+                self.conn.execute(f"DELETE FROM {table} WHERE graph_id = ?", (graph_id,))
+            self.conn.execute("DELETE FROM graphs WHERE id = ?", (graph_id,))
+            self.conn.commit()
+            self.adjacency.pop(graph_id, None)
+            return True
+
+    # ── Merging ───────────────────────────────────────────────────
+
+    def _resolve(self, graph_id: int, label: str, entity_type: str = None,
+                 properties: Dict[str, Any] = None) -> Tuple[Optional[int], bool]:
+        """(entity id, created) for `label`, creating the entity and its alias keys if none of its keys is known"""
+        display, keys = _label_keys(label)
+        if not keys:
+            return None, False
+        placeholders = ",".join("?" * len(keys))
+        row = self.conn.execute(
+            f"SELECT entity_id FROM entity_aliases WHERE graph_id = ? AND alias_key IN ({placeholders}) LIMIT 1",
+            (graph_id, *keys)
+        ).fetchone()
+
+        if row:
+            entity_id = row[0]
+            current_type, current_properties = self.conn.execute(
+                "SELECT type, properties FROM entities WHERE id = ?", (entity_id,)
+            ).fetchone()
+            merged_properties = {**(properties or {}), **json.loads(current_properties)}
+            # A specific type beats the generic default
+            merged_type = entity_type if entity_type and current_type == "concept" else current_type
+            self.conn.execute("UPDATE entities SET type = ?, properties = ?, mentions = mentions + 1 WHERE id = ?",
+                              (merged_type, json.dumps(merged_properties, default=str), entity_id))
+        else:
+            entity_id = self.conn.execute(
+                "INSERT INTO entities (graph_id, key, label, type, properties) VALUES (?, ?, ?, ?, ?)",
+                (graph_id, keys[0], display, entity_type or "concept", json.dumps(properties or {}, default=str))
+            ).lastrowid
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO entity_aliases (graph_id, alias_key, entity_id) VALUES (?, ?, ?)",
+            [(graph_id, key, entity_id) for key in keys]
+        )
+        return entity_id, not row
+
+    def merge(self, user_id: str, topic: str, concepts: List[Dict[str, Any]], relationships: List[Dict[str, Any]],
+              source_url: str = None) -> Dict[str, Any]:
+        """Merge extracted concepts and relationships into the (user, topic) graph in one transaction.
+
+        Concepts are {"label"/"name", "type", ...extra properties}; relationships
+        name their endpoints by label ({"source", "target", "relationship",
+        "strength"}) and create endpoints that were not listed as concepts.
+        """
+        counts = {"entities_added": 0, "entities_merged": 0, "edges_added": 0, "edges_updated": 0}
+        with self._lock:
+            try:
+                graph_id = self._graph_id(user_id, topic, create=True)
+                position = self._source_position(graph_id, source_url) if source_url else None
+
+                touched_entities = set()
+                for concept in concepts or []:
+                    if not isinstance(concept, dict):
+                        continue
+                    label = concept.get("label") or concept.get("name") or concept.get("id")
+                    properties = {key: value for key, value in concept.items() if key not in _RESERVED_KEYS}
+                    entity_id, created = self._resolve(graph_id, label, concept.get("type"), properties)
+                    if entity_id is not None:
+                        counts["entities_added" if created else "entities_merged"] += 1
+                        touched_entities.add(entity_id)
+
+                touched_edges = set()
+                for relationship in relationships or []:
+                    if not isinstance(relationship, dict):
+                        continue
+                    (source_id, source_created), (target_id, target_created) = (
+                        self._resolve(graph_id, relationship.get("source")), self._resolve(graph_id, relationship.get("target"))
+                    )
+                    counts["entities_added"] += source_created + target_created
+                    if source_id is None or target_id is None or source_id == target_id:
+                        continue
+                    touched_entities.update((source_id, target_id))
+                    relation = " ".join(str(relationship.get("relationship") or relationship.get("type") or "relates to").split()).lower()
+                    try:
+                        weight = max(0.0, min(1.0, float(relationship.get("strength", relationship.get("weight", 0.5)))))
+                    except (TypeError, ValueError):
+                        weight = 0.5
+                    row = self.conn.execute(
+                        "SELECT id FROM edges WHERE graph_id = ? AND source_id = ? AND target_id = ? AND relation = ?",
+                        (graph_id, source_id, target_id, relation)
+                    ).fetchone()
+                    if row:
+                        edge_id = row[0]
+                        self.conn.execute("UPDATE edges SET weight = MAX(weight, ?), mentions = mentions + 1 WHERE id = ?",
+                                          (weight, edge_id))
+                        counts["edges_updated"] += 1
+                    else:
+                        edge_id = self.conn.execute(
+                            "INSERT INTO edges (graph_id, source_id, target_id, relation, weight) VALUES (?, ?, ?, ?, ?)",
+                            (graph_id, source_id, target_id, relation, weight)
+                        ).lastrowid
+                        counts["edges_added"] += 1
+                    touched_edges.add(edge_id)
+
+                if position is not None:
+                    self.conn.executemany("INSERT OR IGNORE INTO entity_sources (entity_id, position) VALUES (?, ?)",
+                                          [(entity_id, position) for entity_id in touched_entities])
+                    self.conn.executemany("INSERT OR IGNORE INTO edge_sources (edge_id, position) VALUES (?, ?)",
+                                          [(edge_id, position) for edge_id in touched_edges])
+                self.conn.execute("UPDATE graphs SET updated_at = ? WHERE id = ?", (time.time(), graph_id))
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            self.adjacency.pop(graph_id, None)
+
+        self.stats["merges"] += 1
+        for key, value in counts.items():
+            self.stats[key] += value
+        return {**counts, "source_index": position}
+
+    # ── Reads ─────────────────────────────────────────────────────
+
+    def get_graph(self, user_id: str, topic: str, limit: int = None) -> Optional[Dict[str, Any]]:
+        """The whole graph (or its `limit` best-supported entities) in the content analyzer's JSON shape"""
+        with self._lock:
+            graph_id = self._graph_id(user_id, topic)
+            if graph_id is None:
+                return None
+            topic_label, insights, created_at, updated_at = self.conn.execute(
+                "SELECT topic, insights, created_at, updated_at FROM graphs WHERE id = ?", (graph_id,)
+            ).fetchone()
+            sources = [row[0] for row in self.conn.execute(
+                "SELECT url FROM graph_sources WHERE graph_id = ? ORDER BY position", (graph_id,))]
+            entity_rows = self.conn.execute("""
+                SELECT e.id, e.key, e.label, e.type, e.properties, e.mentions, GROUP_CONCAT(s.position)
+                FROM entities e LEFT JOIN entity_sources s ON s.entity_id = e.id
+                WHERE e.graph_id = ? GROUP BY e.id
+                ORDER BY COUNT(s.position) DESC, e.mentions DESC, e.id
+            """ + (" LIMIT ?" if limit else ""), (graph_id, limit) if limit else (graph_id,)).fetchall()
+            keys = {row[0]: row[1] for row in entity_rows}
+            edge_rows = self.conn.execute("""
+                SELECT r.source_id, r.target_id, r.relation, r.weight, r.mentions, GROUP_CONCAT(s.position)
+                FROM edges r LEFT JOIN edge_sources s ON s.edge_id = r.id
+                WHERE r.graph_id = ? GROUP BY r.id ORDER BY r.weight DESC, r.id
+            """, (graph_id,)).fetchall()
+
+        def positions(joined: Optional[str]) -> List[int]:
+            return sorted(int(value) for value in joined.split(",")) if joined else []
+
+        return {
+            "topic": topic_label,
+            "concepts": [
+                {"id": key, "label": label, "type": entity_type, "sources": positions(joined),
+                 "mentions": mentions, **({"properties": json.loads(properties)} if properties != "{}" else {})}
+                for _, key, label, entity_type, properties, mentions, joined in entity_rows
+            ],
+            "relationships": [
+                {"source": keys[source_id], "target": keys[target_id], "relationship": relation,
+                 "strength": round(weight, 3), "mentions": mentions, "sources": positions(joined)}
+                for source_id, target_id, relation, weight, mentions, joined in edge_rows
+                if source_id in keys and target_id in keys
+            ],
+            "insights": json.loads(insights),
+            "sources": sources,
+            "created_at": created_at,
+            "updated_at": updated_at
+        }
+
+    def _adjacency(self, graph_id: int) -> Dict[int, List[Tuple[int, int]]]:
+        """entity id -> [(neighbour id, edge id)], both directions, cached per graph"""
+        adjacency = self.adjacency.get(graph_id)
+        if adjacency is not None:
+            self.adjacency.move_to_end(graph_id)
+            return adjacency
+        adjacency = {}
+        for edge_id, source_id, target_id in self.conn.execute(
+                "SELECT id, source_id, target_id FROM edges WHERE graph_id = ?", (graph_id,)):
+            adjacency.setdefault(source_id, []).append((target_id, edge_id))
+            adjacency.setdefault(target_id, []).append((source_id, edge_id))
+        self.adjacency[graph_id] = adjacency
+        while len(self.adjacency) > self.adjacency_cache_size:
+            self.adjacency.popitem(last=False)
+        self.stats["adjacency_loads"] += 1
+        return adjacency
+
+    def _lookup(self, graph_id: int, label: str) -> Optional[int]:
+        _, keys = _label_keys(label)
+        for key in keys:
+            row = self.conn.execute("SELECT entity_id FROM entity_aliases WHERE graph_id = ? AND alias_key = ?",
+                                    (graph_id, key)).fetchone()
+            if row:
+                return row[0]
+        return None
+
+    def _describe(self, entity_ids, edge_ids) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, Dict[str, Any]]]:
+        """Entity and edge payloads by id, for edges whose endpoints are both in `entity_ids`"""
+        entity_ids, edge_ids = list(entity_ids), list(edge_ids)
+        nodes = {}
+        for start in range(0, len(entity_ids), 500):
+            batch = entity_ids[start:start + 500]
+            for entity_id, key, label, entity_type in self.conn.execute(
+                    f"SELECT id, key, label, type FROM entities WHERE id IN ({','.join('?' * len(batch))})", batch):
+                nodes[entity_id] = {"id": key, "label": label, "type": entity_type}
+        edges = {}
+        for start in range(0, len(edge_ids), 500):
+            batch = edge_ids[start:start + 500]
+            for edge_id, source_id, target_id, relation, weight in self.conn.execute(
+                    f"SELECT id, source_id, target_id, relation, weight FROM edges WHERE id IN ({','.join('?' * len(batch))})", batch):
+                if source_id in nodes and target_id in nodes:
+                    edges[edge_id] = {"source": nodes[source_id]["id"], "target": nodes[target_id]["id"],
+                                      "relationship": relation, "strength": round(weight, 3)}
+        return nodes, edges
+
+    def neighbourhood(self, user_id: str, topic: str, entity: str, depth: int = 1, limit: int = 100) -> Optional[Dict[str, Any]]:
+        """Entities within `depth` hops of `entity` (either edge direction) and the edges between them"""
+        with self._lock:
+            graph_id = self._graph_id(user_id, topic)
+            start = self._lookup(graph_id, entity) if graph_id is not None else None
+            if start is None:
+                return None
+            adjacency = self._adjacency(graph_id)
+            distances = {start: 0}
+            edge_ids = set()
+            queue = deque([start])
+            while queue and len(distances) < limit:
+                current = queue.popleft()
+                if distances[current] >= depth:
+                    continue
+                for neighbour, edge_id in adjacency.get(current, []):
+                    if neighbour not in distances:
+                        if len(distances) >= limit:
+                            break
+                        distances[neighbour] = distances[current] + 1
+                        queue.append(neighbour)
+                    edge_ids.add(edge_id)
+            nodes, edges = self._describe(distances, edge_ids)
+        return {
+            "entity": nodes[start],
+            "depth": depth,
+            "nodes": [{**nodes[entity_id], "distance": distance} for entity_id, distance in distances.items() if entity_id in nodes],
+            "relationships": list(edges.values())
+        }
+
+    def shortest_path(self, user_id: str, topic: str, source: str, target: str, max_depth: int = 6) -> Optional[Dict[str, Any]]:
+        """Fewest-hop connection between two entities, ignoring edge direction"""
+        with self._lock:
+            graph_id = self._graph_id(user_id, topic)
+            if graph_id is None:
+                return None
+            start, goal = self._lookup(graph_id, source), self._lookup(graph_id, target)
+            if start is None or goal is None:
+                return None
+            adjacency = self._adjacency(graph_id)
+            previous = {start: None}
+            depth = {start: 0}
+            queue = deque([start])
+            while queue and goal not in previous:
+                current = queue.popleft()
+                if depth[current] >= max_depth:
+                    continue
+                for neighbour, edge_id in adjacency.get(current, []):
+                    if neighbour not in previous:
+                        previous[neighbour] = (current, edge_id)
+                        depth[neighbour] = depth[current] + 1
+                        queue.append(neighbour)
+
+            if goal not in previous:
+                return {"found": False, "path": [], "relationships": [], "length": None}
+            path, edge_ids, node = [goal], [], goal
+            while previous[node] is not None:
+                node, edge_id = previous[node]
+                path.append(node)
+                edge_ids.append(edge_id)
+            path.reverse()
+            edge_ids.reverse()
+            nodes, edges = self._describe(path, edge_ids)
+        return {
+            "found": True,
+            "path": [nodes[entity_id] for entity_id in path],
+            "relationships": [edges[edge_id] for edge_id in edge_ids if edge_id in edges],
+            "length": len(edge_ids)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            graphs, entities, edges = (self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                                       for table in ("graphs", "entities", "edges"))
+        return {**self.stats, "graphs": graphs, "entities": entities, "relationships": edges,
+                "cached_adjacency": len(self.adjacency)}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+knowledge_graph_store = KnowledgeGraphStore()
@@ -0,0 +1,192 @@
+"""
+Event Loop Monitor
+Diagnostic mode that measures event-loop lag and samples the loop thread's
+stack while it is blocked, attributing stalls to the service method that
+made the blocking call
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+from services.request_metrics import LogLinearHistogram
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _is_app_frame(filename: str) -> bool:
+    return (
+        filename.startswith(BACKEND_ROOT)
+        and "site-packages" not in filename
+        and not filename.endswith(("loop_monitor.py", "request_metrics.py"))
+    )
+
+
+def _describe(frame_summary: traceback.FrameSummary) -> str:
+    filename = os.path.relpath(frame_summary.filename, BACKEND_ROOT) \
+        if frame_summary.filename.startswith(BACKEND_ROOT) else os.path.basename(frame_summary.filename)
+    return f"{frame_summary.name} ({filename}:{frame_summary.lineno})"
+
+
+class EventLoopMonitor:
+    """Heartbeat on the loop plus a watchdog thread that samples it when late.
+
+    A heartbeat task sleeps `interval` seconds and records how late it woke
+    up (loop lag). The watchdog thread notices when no heartbeat arrived for
+    `threshold` seconds and, until the loop recovers, samples the loop
+    thread's stack every `sample_interval`. Each stall is attributed to the
+    innermost application frame (the service method) and the innermost frame
+    overall (the blocking call itself). Off unless LOOP_MONITOR is set or it
+    is enabled through the debug endpoint.
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1, sample_interval: float = 0.02,
+                 max_stalls: int = 100, enabled: bool = None):
+        self.interval = interval
+        self.threshold = threshold
+        self.sample_interval = sample_interval
+        self.enabled = os.getenv("LOOP_MONITOR", "").lower() in ("1", "true", "yes") if enabled is None else enabled
+        self.lag = LogLinearHistogram(0.0005, 120.0)
+        self.stalls = deque(maxlen=max_stalls)
+        self.sites: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"stalls": 0, "stalled_seconds": 0.0, "samples": 0}
+        self.last_beat = 0.0
+        self.loop_thread_id: Optional[int] = None
+        self._samples: List[List[traceback.FrameSummary]] = []
+        self._stall_started: Optional[float] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    # ── Lifecycle ─────────────────────────────────────────────────
+
+    def start(self):
+        """Start monitoring the running loop if diagnostic mode is enabled"""
+        if not self.enabled or (self._heartbeat and not self._heartbeat.done()):
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.perf_counter()
+        self._stop.clear()
+        self._heartbeat = loop.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+        print(f"✅ Event loop monitor started (threshold {self.threshold * 1000:.0f}ms)")
+
+    async def stop(self):
+        self._stop.set()
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._heartbeat = None
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join, 1.0)
+            self._watchdog = None
+
+    async def set_enabled(self, enabled: bool):
+        self.enabled = enabled
+        if enabled:
+            self.start()
+        else:
+            await self.stop()
+
+    # ── Measurement ───────────────────────────────────────────────
+
+    async def _beat(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.lag.record(max(0.0, now - expected))
+            self.last_beat = now
+            if self._stall_started is not None:
+                self._finish_stall(now)
+
+    def _watch(self):
+        while not self._stop.wait(self.sample_interval):
+            now = time.perf_counter()
+            if now - self.last_beat < self.threshold + self.interval:
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            with self._lock:
+                if self._stall_started is None:
+                    self._stall_started = self.last_beat + self.interval
+                self._samples.append(traceback.extract_stack(frame))
+                self.stats["samples"] += 1
+
+    def _finish_stall(self, now: float):
+        with self._lock:
+            samples, self._samples = self._samples, []
+            started, self._stall_started = self._stall_started, None
+        if not samples:
+            return
+
+        duration = now - started
+        sites = Counter()
+        calls = Counter()
+        for stack in samples:
+            calls[_describe(stack[-1])] += 1
+            app_frames = [frame for frame in stack if _is_app_frame(frame.filename)]
+            sites[_describe(app_frames[-1]) if app_frames else "unknown"] += 1
+        site, _ = sites.most_common(1)[0]
+        blocking_call, _ = calls.most_common(1)[0]
+
+        stall = {
+            "at": time.time() - (now - started),
+            "duration_ms": round(duration * 1000, 1),
+            "site": site,
+            "blocking_call": blocking_call,
+            "samples": len(samples),
+            "stack": [_describe(frame) for frame in samples[len(samples) // 2][-12:]]
+        }
+        self.stalls.append(stall)
+        self.stats["stalls"] += 1
+        self.stats["stalled_seconds"] += duration
+        entry = self.sites.setdefault(site, {"stalls": 0, "total_ms": 0.0, "max_ms": 0.0, "blocking_calls": Counter()})
+        entry["stalls"] += 1
+        entry["total_ms"] += stall["duration_ms"]
+        entry["max_ms"] = max(entry["max_ms"], stall["duration_ms"])
+        entry["blocking_calls"][blocking_call] += 1
+        print(f"⚠️ Event loop blocked {stall['duration_ms']:.0f}ms in {site} → {blocking_call}")
+
+    # ── Reporting ─────────────────────────────────────────────────
+
+    def get_report(self, limit: int = 20) -> Dict[str, Any]:
+        sites = sorted(self.sites.items(), key=lambda item: -item[1]["total_ms"])[:limit]
+        return {
+            "enabled": self.enabled,
+            "running": bool(self._heartbeat and not self._heartbeat.done()),
+            "threshold_ms": self.threshold * 1000,
+            "lag_ms": self.lag.summary(scale=1000),
+            "stalls": self.stats["stalls"],
+            "stalled_seconds": round(self.stats["stalled_seconds"], 3),
+            "samples": self.stats["samples"],
+            "top_sites": [
+                {
+                    "site": site,
+                    "stalls": entry["stalls"],
+                    "total_ms": round(entry["total_ms"], 1),
+                    "max_ms": entry["max_ms"],
+                    "blocking_calls": dict(entry["blocking_calls"].most_common(3))
+                }
+                for site, entry in sites
+            ],
+            "recent_stalls": list(self.stalls)[-limit:]
+        }
+
+
+loop_monitor = EventLoopMonitor()
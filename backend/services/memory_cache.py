@@ -0,0 +1,245 @@
+"""
+Memory Cache
+Bounded in-process cache: O(1) LRU with per-entry TTL, byte-accounted
+per-namespace budgets, single-flight loading and hit/miss statistics
+"""
+
+import asyncio
+import sys
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+MB = 1024 * 1024
+
+_LEAVES = (str, bytes, bytearray, int, float, bool, complex, type(None))
+
+
+def deep_sizeof(value: Any) -> int:
+    """Bytes held by `value` and everything it references, counting shared objects once"""
+    seen = set()
+    pending = [value]
+    total = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, _LEAVES):
+            continue
+        if isinstance(obj, dict):
+            pending.extend(obj.keys())
+            pending.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+            pending.extend(obj)
+        else:
+            attributes = getattr(obj, "__dict__", None)
+            if attributes is not None:
+                pending.append(attributes)
+            for slot in getattr(type(obj), "__slots__", ()):
+                attribute = getattr(obj, slot, None)
+                if attribute is not None:
+                    pending.append(attribute)
+    return total
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size", "hits")
+
+    def __init__(self, value: Any, expires_at: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.hits = 0
+
+
+class _Namespace:
+    __slots__ = ("entries", "bytes", "max_bytes", "stats")
+
+    def __init__(self, max_bytes: int):
+        self.entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.bytes = 0
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "sets": 0, "rejected": 0}
+
+
+class BoundedCache:
+    """LRU/TTL cache partitioned into namespaces with their own byte budgets.
+
+    Lookups, inserts and evictions are O(1) (one OrderedDict per namespace,
+    most recently used last). Entries expire lazily: an expired entry is
+    dropped when it is read or when it reaches the LRU end while its
+    namespace is over budget. Entry sizes are measured with a deep
+    sys.getsizeof walk, and an entry larger than `max_entry_fraction` of
+    its namespace budget is not cached at all so one value cannot flush a
+    namespace. `max_entries_per_namespace` caps the entry count of each
+    namespace separately, like its byte budget. `get_or_load` coalesces
+    concurrent misses on the same key into a single load.
+    """
+
+    def __init__(self, default_ttl: float = 300, namespace_budgets: Dict[str, int] = None,
+                 default_budget: int = 16 * MB, max_entries_per_namespace: int = 10000,
+                 max_entry_fraction: float = 0.25):
+        self.default_ttl = default_ttl
+        self.namespace_budgets = dict(namespace_budgets or {})
+        self.default_budget = default_budget
+        self.max_entries_per_namespace = max_entries_per_namespace
+        self.max_entry_fraction = max_entry_fraction
+        self.namespaces: Dict[str, _Namespace] = {}
+        self.inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self.coalesced = 0
+
+    def _namespace(self, name: str) -> _Namespace:
+        namespace = self.namespaces.get(name)
+        if namespace is None:
+            namespace = self.namespaces[name] = _Namespace(self.namespace_budgets.get(name, self.default_budget))
+        return namespace
+
+    def _drop(self, namespace: _Namespace, key: str) -> Optional[_Entry]:
+        entry = namespace.entries.pop(key, None)
+        if entry is not None:
+            namespace.bytes -= entry.size
+        return entry
+
+    def _evict(self, namespace: _Namespace):
+        now = time.time()
+        while namespace.entries and (namespace.bytes > namespace.max_bytes
+                                     or len(namespace.entries) > self.max_entries_per_namespace):
+            _, entry = namespace.entries.popitem(last=False)
+            namespace.bytes -= entry.size
+            namespace.stats["expired" if entry.expires_at <= now else "evictions"] += 1
+
+    # ── Access ────────────────────────────────────────────────────
+
+    def lookup(self, key: str, namespace: str = "default") -> Tuple[bool, Any]:
+        """(found, value); distinguishes a cached None from a miss"""
+        space = self._namespace(namespace)
+        entry = space.entries.get(key)
+        if entry is not None and entry.expires_at <= time.time():
+            self._drop(space, key)
+            space.stats["expired"] += 1
+            entry = None
+        if entry is None:
+            space.stats["misses"] += 1
+            return False, None
+        space.entries.move_to_end(key)
+        entry.hits += 1
+        space.stats["hits"] += 1
+        return True, entry.value
+
+    def get(self, key: str, namespace: str = "default", default: Any = None) -> Any:
+        found, value = self.lookup(key, namespace)
+        return value if found else default
+
+    def set(self, key: str, value: Any, ttl: float = None, namespace: str = "default") -> bool:
+        """Store `value`; returns False when it is too large for the namespace budget"""
+        space = self._namespace(namespace)
+        size = deep_sizeof(value) + sys.getsizeof(key)
+        self._drop(space, key)
+        if size > space.max_bytes * self.max_entry_fraction:
+            space.stats["rejected"] += 1
+            return False
+        space.entries[key] = _Entry(value, time.time() + (ttl if ttl is not None else self.default_ttl), size)
+        space.bytes += size
+        space.stats["sets"] += 1
+        self._evict(space)
+        return True
+
+    def delete(self, key: str, namespace: str = "default") -> bool:
+        return self._drop(self._namespace(namespace), key) is not None
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: float = None,
+                          namespace: str = "default") -> Tuple[Any, bool]:
+        """Cached value, or the result of `loader()` stored under `key`; returns (value, served_from_cache).
+
+        While a load for the key is running, other callers wait for it
+        instead of starting their own (and are reported as served from
+        cache). The load runs in its own task, so cancelling the caller
+        that started it does not cancel it for the others. A failed load
+        is not cached and fails its waiters too.
+        """
+        found, value = self.lookup(key, namespace)
+        if found:
+            return value, True
+
+        flight = (namespace, key)
+        running = self.inflight.get(flight)
+        if running is not None:
+            self.coalesced += 1
+            return await asyncio.shield(running), True
+
+        task = asyncio.ensure_future(self._load(flight, loader, ttl))
+        # Retrieve a failure nobody waited for so it is not reported as unhandled
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.inflight[flight] = task
+        return await asyncio.shield(task), False
+
+    async def _load(self, flight: Tuple[str, str], loader: Callable[[], Awaitable[Any]], ttl: Optional[float]) -> Any:
+        namespace, key = flight
+        try:
+            value = await loader()
+            self.set(key, value, ttl, namespace)
+            return value
+        finally:
+            self.inflight.pop(flight, None)
+
+    # ── Maintenance ───────────────────────────────────────────────
+
+    def set_budget(self, namespace: str, max_bytes: int):
+        self.namespace_budgets[namespace] = max_bytes
+        space = self._namespace(namespace)
+        space.max_bytes = max_bytes
+        self._evict(space)
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry (a full scan; normal operation expires lazily)"""
+        now, purged = time.time(), 0
+        for space in self.namespaces.values():
+            for key in [key for key, entry in space.entries.items() if entry.expires_at <= now]:
+                self._drop(space, key)
+                space.stats["expired"] += 1
+                purged += 1
+        return purged
+
+    def clear(self, namespace: str = None) -> int:
+        """Remove all entries (of one namespace); returns how many were removed"""
+        if namespace is None:
+            spaces = list(self.namespaces.values())
+        else:
+            spaces = [self.namespaces[namespace]] if namespace in self.namespaces else []
+        removed = 0
+        for space in spaces:
+            removed += len(space.entries)
+            space.entries.clear()
+            space.bytes = 0
+        return removed
+
+    def __len__(self) -> int:
+        return sum(len(space.entries) for space in self.namespaces.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        namespaces = {}
+        totals = {"entries": 0, "bytes": 0, "hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        for name, space in self.namespaces.items():
+            lookups = space.stats["hits"] + space.stats["misses"]
+            namespaces[name] = {
+                "entries": len(space.entries),
+                "bytes": space.bytes,
+                "max_bytes": space.max_bytes,
+                "utilization": round(space.bytes / space.max_bytes, 3) if space.max_bytes else 0.0,
+                **space.stats,
+                "hit_rate": round(space.stats["hits"] / lookups, 3) if lookups else 0.0
+            }
+            totals["entries"] += len(space.entries)
+            totals["bytes"] += space.bytes
+            for key in ("hits", "misses", "evictions", "expired"):
+                totals[key] += space.stats[key]
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            **totals,
+            "hit_rate": round(totals["hits"] / lookups, 3) if lookups else 0.0,
+            "coalesced_loads": self.coalesced,
+            "inflight_loads": len(self.inflight),
+            "namespaces": namespaces
+        }
@@ -0,0 +1,461 @@
+"""
+Model Router
+Per-call model selection across the GROQ model tiers: the cheapest tier that
+fits the task, prompt size and output format, adjusted by live latency and
+error statistics, with escalation to the large model on failed or
+low-confidence output and a decision log for offline tuning
+"""
+
+import asyncio
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+TIERS = {
+    "small": {"model": os.getenv("GROQ_SMALL_MODEL", "llama3-8b-8192"), "context": 8192},
+    "large": {"model": os.getenv("GROQ_LARGE_MODEL", "llama3-70b-8192"), "context": 8192},
+}
+TIER_ORDER = ("small", "large")
+# Output room a call needs at least; less headroom moves it to a roomier tier
+MIN_OUTPUT_TOKENS = 256
+
+# Starting tier and expected output of each task. `escalate_above` moves a
+# small-tier task to the large tier for prompts longer than that many
+# (estimated) tokens; `latency_budget` lets a large-tier task fall back to
+# the small tier while the large model is slower than that many seconds.
+TASK_PROFILES = {
+    # Short classification-style calls
+    "intent": {"tier": "small", "format": "text"},
+    "classification": {"tier": "small", "format": "json"},
+    "tagging": {"tier": "small", "format": "json"},
+    "suggestions": {"tier": "small", "format": "json"},
+    "sentiment": {"tier": "small", "format": "json"},
+    "keywords": {"tier": "small", "format": "json"},
+    # Extraction and summarisation over page content
+    "summary": {"tier": "small", "format": "text"},
+    "insights": {"tier": "small", "format": "json"},
+    "action_items": {"tier": "small", "format": "json"},
+    "extraction": {"tier": "small", "format": "json"},
+    "fact_check": {"tier": "small", "format": "json"},
+    "translation": {"tier": "small", "format": "text"},
+    "context_analysis": {"tier": "small", "format": "text"},
+    # Conversation
+    "chat": {"tier": "small", "format": "text", "escalate_above": 2500},
+    "chat_technical": {"tier": "large", "format": "text", "latency_budget": 6.0},
+    "chat_creative": {"tier": "large", "format": "text", "latency_budget": 6.0},
+    # Multi-step reasoning and long-form generation
+    "analysis": {"tier": "large", "format": "text"},
+    "reasoning": {"tier": "large", "format": "json"},
+    "code": {"tier": "large", "format": "text"},
+    "research": {"tier": "large", "format": "text"},
+}
+DEFAULT_PROFILE = {"tier": "large", "format": "text"}
+
+
+def looks_like_json(text: str) -> bool:
+    """Whether `text` carries a parseable JSON object or array, allowing code fences or surrounding prose"""
+    text = (text or "").strip()
+    if not text:
+        return False
+    candidates = [text]
+    for opening, closing in (("{", "}"), ("[", "]")):
+        start, end = text.find(opening), text.rfind(closing)
+        if start != -1 and end > start:
+            candidates.append(text[start:end + 1])
+    for candidate in candidates:
+        try:
+            json.loads(candidate)
+            return True
+        except ValueError:
+            continue
+    return False
+
+
+@dataclass
+class RouteDecision:
+    task: str
+    tier: str
+    model: str
+    reason: str
+    prompt_tokens: int
+    max_tokens: Optional[int]
+    attempts: int = 1
+    escalated: bool = False
+    outcome: str = "pending"
+    latency_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+
+class ModelStats:
+    """Rolling outcome window and latency EWMA for one model"""
+
+    def __init__(self, window: int = 50, alpha: float = 0.2):
+        self.outcomes = deque(maxlen=window)
+        self.alpha = alpha
+        self.latency = None
+        self.counts = Counter()
+        self.last_seen: Dict[str, float] = {}
+
+    def record(self, outcome: str, latency: float):
+        self.outcomes.append(outcome)
+        self.counts[outcome] += 1
+        self.last_seen[outcome] = time.time()
+        if outcome != "error":
+            self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+
+    def rate(self, outcome: str) -> float:
+        return sum(1 for recorded in self.outcomes if recorded == outcome) / len(self.outcomes) if self.outcomes else 0.0
+
+    def failing(self, outcome: str, threshold: float, min_samples: int, cooldown: float) -> bool:
+        """Whether `outcome` made up at least `threshold` of a full enough window and happened within `cooldown`
+        seconds; once the cooldown passes, traffic probes this model again and the window catches up"""
+        return (len(self.outcomes) >= min_samples and self.rate(outcome) >= threshold
+                and time.time() - self.last_seen.get(outcome, 0) < cooldown)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.counts, "recent_error_rate": round(self.rate("error"), 3),
+                "recent_invalid_rate": round(self.rate("invalid"), 3),
+                "latency_ewma_ms": round(self.latency * 1000, 1) if self.latency is not None else None}
+
+
+class ModelRouter:
+    """Choose a model per call and run it, escalating when the output is unusable.
+
+    A call starts on its task's tier. Small-tier tasks move up for long
+    prompts, or when the small model's recent output for that task has
+    mostly failed validation. Large-tier tasks with a latency budget drop to
+    the small tier while the large model is running slow, and either tier
+    fails over to the other while its recent error rate is high; both of
+    those back off after a cooldown so the model is probed again. Output is
+    validated (JSON tasks must parse; callers can add their own confidence
+    check) and a small-tier call whose output fails, or that errors, is
+    retried once on the large tier. Every attempt is written to a decision
+    log in batches from a worker thread; the log is opened on first write,
+    and rows older than `retention_days` are pruned as it is written.
+    """
+
+    def __init__(self, db_path: str = "data/model_routing.db", min_samples: int = 6, failover_error_rate: float = 0.5,
+                 escalate_invalid_rate: float = 0.34, cooldown: float = 60.0, flush_size: int = 64,
+                 flush_interval: float = 2.0, retention_days: float = 14, prune_interval: float = 3600,
+                 max_recent: int = 500):
+        self.db_path = db_path
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.failover_error_rate = failover_error_rate
+        self.escalate_invalid_rate = escalate_invalid_rate
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.prune_interval = prune_interval
+        self.max_recent = max_recent
+        self.model_stats: Dict[str, ModelStats] = {}
+        self.task_stats: Dict[Tuple[str, str], ModelStats] = {}
+        self.stats = Counter()
+        self.buffer: List[tuple] = []
+        self.conn: Optional[sqlite3.Connection] = None
+        self._pruned_at = 0.0
+        self._lock = threading.RLock()     # routing statistics and the buffer
+        self._db_lock = threading.Lock()   # the connection; never held together with _lock
+        self._writer: Optional[asyncio.Task] = None
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+
+    def _db(self) -> sqlite3.Connection:
+        """The decision log, opened and created on first use (caller holds `_db_lock`)"""
+        if self.conn is not None:
+            return self.conn
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS decisions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                task TEXT NOT NULL,
+                tier TEXT NOT NULL,
+                model TEXT NOT NULL,
+                reason TEXT NOT NULL,
+                attempt INTEGER NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                max_tokens INTEGER,
+                outcome TEXT NOT NULL,
+                latency_ms REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_decisions_ts ON decisions(ts)")
+        conn.commit()
+        self.conn = conn
+        return conn
+
+    # ── Selection ─────────────────────────────────────────────────
+
+    def _model(self, model: str) -> ModelStats:
+        stats = self.model_stats.get(model)
+        if stats is None:
+            stats = self.model_stats[model] = ModelStats()
+        return stats
+
+    def _task(self, task: str, model: str) -> ModelStats:
+        stats = self.task_stats.get((task, model))
+        if stats is None:
+            stats = self.task_stats[(task, model)] = ModelStats(window=30)
+        return stats
+
+    def _unhealthy(self, tier: str) -> bool:
+        return self._model(TIERS[tier]["model"]).failing("error", self.failover_error_rate, self.min_samples,
+                                                          self.cooldown)
+
+    def choose(self, task: str, prompt_tokens: int = 0, max_tokens: int = None, tier: str = None) -> RouteDecision:
+        """Pick the tier for one call; `tier` forces a starting tier (still subject to failover)"""
+        profile = TASK_PROFILES.get(task, DEFAULT_PROFILE)
+        chosen, reason = (tier, "caller") if tier in TIERS else (profile["tier"], "profile")
+
+        if chosen == "small":
+            task_history = self._task(task, TIERS["small"]["model"])
+            if profile.get("escalate_above") and prompt_tokens > profile["escalate_above"]:
+                chosen, reason = "large", "long_prompt"
+            elif task_history.failing("invalid", self.escalate_invalid_rate, 10, self.cooldown * 5):
+                chosen, reason = "large", "invalid_history"
+        elif profile.get("latency_budget") and reason == "profile":
+            latency = self._model(TIERS["large"]["model"]).latency
+            if latency is not None and latency > profile["latency_budget"] and not self._unhealthy("small"):
+                chosen, reason = "small", "latency_budget"
+
+        # Move to a roomier tier when the requested output (or, without one, the minimum) does not fit
+        if prompt_tokens + (max_tokens or MIN_OUTPUT_TOKENS) > TIERS[chosen]["context"]:
+            roomier = max(TIERS, key=lambda name: TIERS[name]["context"])
+            if TIERS[roomier]["context"] > TIERS[chosen]["context"]:
+                chosen, reason = roomier, "context_window"
+
+        if self._unhealthy(chosen):
+            other = next(name for name in TIER_ORDER if name != chosen)
+            # Never fail over to a tier without room for a minimal answer
+            needed = prompt_tokens + min(max_tokens or MIN_OUTPUT_TOKENS, MIN_OUTPUT_TOKENS)
+            if not self._unhealthy(other) and needed <= TIERS[other]["context"]:
+                chosen, reason = other, "failover"
+
+        return RouteDecision(task, chosen, TIERS[chosen]["model"], reason, prompt_tokens, max_tokens)
+
+    # ── Execution ─────────────────────────────────────────────────
+
+    async def _call(self, client, params: Dict[str, Any]):
+        create = client.chat.completions.create
+        if inspect.iscoroutinefunction(create):
+            return await create(**params)
+        # Blocking client: run it in a worker thread so concurrent calls overlap
+        return await asyncio.to_thread(create, **params)
+
+    async def _call_stream(self, client, params: Dict[str, Any]) -> AsyncIterator[str]:
+        """Text deltas of a streamed completion from either client flavour"""
+        create = client.chat.completions.create
+        if inspect.iscoroutinefunction(create):
+            async for chunk in await create(**params, stream=True):
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+            return
+        # Blocking client: pull each chunk in a worker thread
+        chunks = iter(await asyncio.to_thread(create, **params, stream=True))
+        done = object()
+        while True:
+            chunk = await asyncio.to_thread(next, chunks, done)
+            if chunk is done:
+                return
+            if chunk.choices:
+                yield chunk.choices[0].delta.content or ""
+
+    def _route(self, task: str, messages: List[Dict[str, str]], tier: Optional[str], validate: Optional[Callable],
+               params: Dict[str, Any]) -> Tuple[RouteDecision, Optional[Callable], int]:
+        profile = TASK_PROFILES.get(task, DEFAULT_PROFILE)
+        if validate is None and (profile["format"] == "json" or params.get("response_format")):
+            validate = looks_like_json
+        prompt_tokens = sum(len(str(message.get("content") or "")) for message in messages) // 4
+        decision = self.choose(task, prompt_tokens, params.get("max_tokens"), tier)
+        self.stats[f"routed_{decision.tier}"] += 1
+        self.stats[f"reason_{decision.reason}"] += 1
+        return decision, validate, prompt_tokens
+
+    def _request(self, decision: RouteDecision, messages: List[Dict[str, str]], prompt_tokens: int,
+                 params: Dict[str, Any]) -> Dict[str, Any]:
+        call = dict(params, model=decision.model, messages=messages)
+        if call.get("max_tokens"):
+            # Never ask for more output than the context window leaves room for
+            call["max_tokens"] = min(call["max_tokens"], max(1, TIERS[decision.tier]["context"] - prompt_tokens))
+        return call
+
+    def _escalate(self, decision: RouteDecision, outcome: str) -> RouteDecision:
+        self.stats["escalations"] += 1
+        return RouteDecision(decision.task, "large", TIERS["large"]["model"], f"escalated_{outcome}",
+                             decision.prompt_tokens, decision.max_tokens, decision.attempts + 1, True)
+
+    async def complete(self, client, task: str, messages: List[Dict[str, str]], tier: str = None,
+                       validate: Callable[[str], bool] = None, **params) -> Tuple[Any, RouteDecision]:
+        """Run a chat completion on the routed model; returns (response, decision).
+
+        Works with both the sync and the async GROQ client. `validate(text)`
+        returning False marks the output as unusable (failed parse, low
+        confidence); JSON-format tasks are validated for parseable JSON by
+        default. Unusable or failed small-tier calls are retried once on
+        the large tier; a failure on the final attempt is raised.
+        """
+        decision, validate, prompt_tokens = self._route(task, messages, tier, validate, params)
+
+        while True:
+            started = time.perf_counter()
+            error, response = None, None
+            try:
+                response = await self._call(client, self._request(decision, messages, prompt_tokens, params))
+                text = response.choices[0].message.content or ""
+                outcome = "ok" if validate is None or validate(text) else "invalid"
+            except Exception as e:
+                error, outcome = e, "error"
+            latency = time.perf_counter() - started
+            self._record(decision, outcome, latency)
+
+            if outcome != "ok" and decision.tier == "small":
+                decision = self._escalate(decision, outcome)
+                continue
+            if error is not None:
+                raise error
+            return response, decision
+
+    async def stream(self, client, task: str, messages: List[Dict[str, str]], tier: str = None,
+                     validate: Callable[[str], bool] = None, **params) -> AsyncIterator[str]:
+        """Streaming counterpart of complete(): yields text deltas from the routed model.
+
+        A small-tier call that fails before producing any text is retried on
+        the large tier; once text has been yielded the attempt is final, and
+        its outcome is validated on the full text when the stream ends.
+        """
+        decision, validate, prompt_tokens = self._route(task, messages, tier, validate, params)
+
+        while True:
+            started = time.perf_counter()
+            parts: List[str] = []
+            try:
+                async for delta in self._call_stream(client, self._request(decision, messages, prompt_tokens, params)):
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            except Exception:
+                self._record(decision, "error", time.perf_counter() - started)
+                if not parts and decision.tier == "small":
+                    decision = self._escalate(decision, "error")
+                    continue
+                raise
+            text = "".join(parts)
+            self._record(decision, "ok" if validate is None or validate(text) else "invalid",
+                         time.perf_counter() - started)
+            return
+
+    def _record(self, decision: RouteDecision, outcome: str, latency: float):
+        decision.outcome = outcome
+        decision.latency_ms = round(latency * 1000, 1)
+        with self._lock:
+            self._model(decision.model).record(outcome, latency)
+            self._task(decision.task, decision.model).record(outcome, latency)
+            self.stats[f"outcome_{outcome}"] += 1
+            self.buffer.append((time.time(), decision.task, decision.tier, decision.model, decision.reason,
+                                decision.attempts, decision.prompt_tokens, decision.max_tokens, outcome,
+                                decision.latency_ms))
+            full = len(self.buffer) >= self.flush_size
+        self._schedule_flush(full)
+
+    # ── Decision log ──────────────────────────────────────────────
+
+    def _schedule_flush(self, now: bool = False):
+        """Flush in a worker thread: right away when `now`, else after `flush_interval`"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts, tests): write through
+            self.flush()
+            return
+        if self._writer is not None:
+            return  # _flushed() reschedules whatever arrives meanwhile
+        if now:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._writer = loop.create_task(asyncio.to_thread(self.flush))
+            self._writer.add_done_callback(self._flushed)
+        elif self._flush_timer is None:
+            self._flush_timer = loop.call_later(self.flush_interval, self._flush_due)
+
+    def _flush_due(self):
+        self._flush_timer = None
+        self._schedule_flush(True)
+
+    def _flushed(self, _task: asyncio.Task):
+        self._writer = None
+        if self.buffer:
+            self._schedule_flush(len(self.buffer) >= self.flush_size)
+
+    def flush(self):
+        """Write buffered decisions in one executemany, pruning expired rows hourly (blocking)"""
+        with self._lock:
+            pending, self.buffer = self.buffer, []
+        if not pending:
+            return
+        try:
+            with self._db_lock:
+                conn = self._db()
+                conn.executemany(
+                    "INSERT INTO decisions (ts, task, tier, model, reason, attempt, prompt_tokens, max_tokens, "
+                    "outcome, latency_ms) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", pending
+                )
+                now = time.time()
+                if now - self._pruned_at >= self.prune_interval:
+                    self._pruned_at = now
+                    pruned = conn.execute("DELETE FROM decisions WHERE ts < ?",
+                                          (now - self.retention_days * 86400,)).rowcount
+                    self.stats["decisions_pruned"] += max(pruned, 0)
+                conn.commit()
+        except Exception as e:
+            print(f"⚠️ Model routing log flush failed: {e}")
+            with self._lock:
+                self.buffer[:0] = pending
+
+    def recent_decisions(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest logged decisions, at most `max_recent` (blocking; call through asyncio.to_thread)"""
+        columns = ("ts", "task", "tier", "model", "reason", "attempt", "prompt_tokens", "max_tokens", "outcome",
+                   "latency_ms")
+        limit = max(0, min(limit, self.max_recent))
+        self.flush()
+        with self._db_lock:
+            rows = self._db().execute(
+                f"SELECT {', '.join(columns)} FROM decisions ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [dict(zip(columns, row)) for row in rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                "buffered": len(self.buffer),
+                "tiers": {name: tier["model"] for name, tier in TIERS.items()},
+                "models": {model: stats.to_dict() for model, stats in self.model_stats.items()},
+                "tasks": {f"{task}@{model}": stats.to_dict() for (task, model), stats in self.task_stats.items()}
+            }
+
+    def close(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        self.flush()
+        with self._db_lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+
+model_router = ModelRouter()
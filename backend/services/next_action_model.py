@@ -0,0 +1,397 @@
+"""
+Next Action Model
+Incrementally updated per-user n-gram (Markov) model over behavior events,
+with a shared count-min sketch for long-tail transitions and JSON snapshots
+for warm restarts
+"""
+
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
+import zlib
+from array import array
+from collections import Counter, OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.behavior_event_store import BehaviorEvent, BehaviorEventStore, behavior_event_store
+
+_SEPARATOR = "\x1f"
+
+
+class CountMinSketch:
+    """Fixed-size approximate counter; estimates never undercount"""
+
+    def __init__(self, width: int = 16384, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array("I", [0]) * width for _ in range(depth)]
+
+    def _cells(self, key: str):
+        encoded = key.encode()
+        for row in range(self.depth):
+            yield row, zlib.crc32(encoded, row * 0x9E3779B1 & 0xFFFFFFFF) % self.width
+
+    def add(self, key: str, count: int = 1):
+        for row, cell in self._cells(key):
+            self.rows[row][cell] = min(self.rows[row][cell] + count, 0xFFFFFFFF)
+
+    def estimate(self, key: str) -> int:
+        return min(self.rows[row][cell] for row, cell in self._cells(key))
+
+    def copy(self) -> "CountMinSketch":
+        sketch = CountMinSketch.__new__(CountMinSketch)
+        sketch.width, sketch.depth = self.width, self.depth
+        sketch.rows = [array("I", row) for row in self.rows]
+        return sketch
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "rows": [base64.b64encode(zlib.compress(row.tobytes())).decode() for row in self.rows]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CountMinSketch":
+        sketch = cls(data["width"], data["depth"])
+        for row, encoded in zip(sketch.rows, data["rows"]):
+            restored = array("I")
+            restored.frombytes(zlib.decompress(base64.b64decode(encoded)))
+            row[:] = restored
+        return sketch
+
+
+class UserSequenceModel:
+    """Per-user transition counts for contexts of 1..order previous actions.
+
+    Each context keeps exact counts for at most `max_followers` next actions;
+    rarer followers live in the shared sketch and are promoted back when their
+    estimate overtakes the weakest tracked one (Space-Saving style). Contexts
+    are kept in LRU order and capped at `max_contexts`.
+    """
+
+    def __init__(self, order: int = 2, max_followers: int = 8, max_contexts: int = 2048):
+        self.order = order
+        self.max_followers = max_followers
+        self.max_contexts = max_contexts
+        self.history = deque(maxlen=order)
+        self.last_session = None
+        self.last_ts = 0.0
+        self.events = 0
+        self.unigrams = Counter()
+        self.transitions: "OrderedDict[Tuple[str, ...], Counter]" = OrderedDict()
+        self.context_totals: Dict[Tuple[str, ...], int] = {}
+
+    def observe(self, action: str, timestamp: float, session_id: Optional[str], session_gap: float,
+                sketch: CountMinSketch, sketch_prefix: str):
+        """Fold one event in: O(order * max_followers)"""
+        if (session_id and self.last_session and session_id != self.last_session) or \
+                (self.last_ts and timestamp - self.last_ts > session_gap):
+            self.history.clear()
+
+        history = tuple(self.history)
+        for n in range(1, len(history) + 1):
+            self._count(history[-n:], action, sketch, sketch_prefix)
+
+        self.unigrams[action] += 1
+        self.history.append(action)
+        self.last_session = session_id or self.last_session
+        self.last_ts = max(self.last_ts, timestamp)
+        self.events += 1
+
+    def _count(self, context: Tuple[str, ...], action: str, sketch: CountMinSketch, sketch_prefix: str):
+        followers = self.transitions.get(context)
+        if followers is None:
+            followers = self.transitions[context] = Counter()
+            if len(self.transitions) > self.max_contexts:
+                evicted, _ = self.transitions.popitem(last=False)
+                self.context_totals.pop(evicted, None)
+        else:
+            self.transitions.move_to_end(context)
+        self.context_totals[context] = self.context_totals.get(context, 0) + 1
+
+        if action in followers or len(followers) < self.max_followers:
+            followers[action] += 1
+            return
+
+        key = _SEPARATOR.join((sketch_prefix, *context, "", action))
+        sketch.add(key)
+        estimate = sketch.estimate(key)
+        weakest = min(followers, key=followers.get)
+        if estimate > followers[weakest]:
+            sketch.add(_SEPARATOR.join((sketch_prefix, *context, "", weakest)), followers.pop(weakest))
+            followers[action] = estimate
+
+    def predict(self, k: int = 3, backoff: float = 0.4) -> List[Dict[str, Any]]:
+        """Top-k next actions by stupid backoff from the longest known context"""
+        scores = {}
+        sources = {}
+        history = tuple(self.history)
+        weight = 1.0
+        for n in range(len(history), 0, -1):
+            context = history[-n:]
+            followers = self.transitions.get(context)
+            if followers:
+                total = self.context_totals[context]
+                for action, count in followers.items():
+                    if action not in scores:
+                        scores[action] = weight * count / total
+                        sources[action] = n
+                weight *= backoff
+                if len(scores) >= k:
+                    break
+
+        if len(scores) < k and self.events:
+            for action, count in self.unigrams.most_common(k):
+                if action not in scores:
+                    scores[action] = weight * count / self.events
+                    sources[action] = 0
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [
+            {"action_type": action, "confidence": round(min(score, 1.0), 3), "context_length": sources[action]}
+            for action, score in ranked
+        ]
+
+    def top_sequences(self, k: int = 5, min_count: int = 2) -> List[Tuple[Tuple[str, ...], int]]:
+        """Most frequent (context + next action) sequences, longest contexts first on ties"""
+        sequences = [
+            (context + (action,), count)
+            for context, followers in self.transitions.items()
+            for action, count in followers.items()
+            if count >= min_count
+        ]
+        sequences.sort(key=lambda item: (item[1], len(item[0])), reverse=True)
+        return sequences[:k]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "history": list(self.history),
+            "last_session": self.last_session,
+            "last_ts": self.last_ts,
+            "events": self.events,
+            "unigrams": dict(self.unigrams),
+            "transitions": [
+                [list(context), dict(followers), self.context_totals.get(context, 0)]
+                for context, followers in self.transitions.items()
+            ]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], order: int, max_followers: int, max_contexts: int) -> "UserSequenceModel":
+        model = cls(order, max_followers, max_contexts)
+        model.history.extend(data.get("history", []))
+        model.last_session = data.get("last_session")
+        model.last_ts = data.get("last_ts", 0.0)
+        model.events = data.get("events", 0)
+        model.unigrams.update(data.get("unigrams", {}))
+        for context, followers, total in data.get("transitions", []):
+            context = tuple(context)
+            if len(context) <= order:
+                model.transitions[context] = Counter(followers)
+                model.context_totals[context] = total
+        return model
+
+
+class NextActionModel:
+    """Next-action predictions for every user of the behavior event store.
+
+    Subscribes to the store, so each appended event updates the user's model in
+    constant time and predictions never rescan history. State is snapshotted to
+    `snapshot_path` every `snapshot_interval` seconds while dirty. The snapshot
+    is read in a worker thread from the start hook or first use, and once both
+    it and the user's stored history are in, a user's model replays the
+    events newer than the snapshot; events that arrive before then are picked
+    up by that replay rather than observed directly.
+    """
+
+    def __init__(self, store: BehaviorEventStore = None, snapshot_path: str = "data/next_action_model.json",
+                 order: int = 2, max_followers: int = 8, max_contexts: int = 2048,
+                 session_gap: float = 1800, snapshot_interval: float = 60, warmup_window: int = 500):
+        self.store = store or behavior_event_store
+        self.snapshot_path = snapshot_path
+        self.order = order
+        self.max_followers = max_followers
+        self.max_contexts = max_contexts
+        self.session_gap = session_gap
+        self.snapshot_interval = snapshot_interval
+        self.warmup_window = warmup_window
+        self.models: Dict[str, UserSequenceModel] = {}
+        self.sketch = CountMinSketch()
+        self.caught_up = set()
+        self.loaded = False
+        self.dirty = False
+        self.stats = {"observed": 0, "replayed": 0, "predictions": 0, "snapshots": 0}
+        self._lock = threading.RLock()
+        self._snapshotter: Optional[asyncio.Task] = None
+        self._loader: Optional[asyncio.Task] = None
+        self.store.add_listener(self._on_event)
+
+    # ── Updates ───────────────────────────────────────────────────
+
+    def _observe(self, user_id: str, model: UserSequenceModel, action: str, timestamp: float, session_id: Optional[str]):
+        model.observe(action, timestamp, session_id, self.session_gap, self.sketch, user_id)
+        self.dirty = True
+
+    def _model_for(self, user_id: str) -> UserSequenceModel:
+        """The user's model, replaying events newer than its snapshot on first access"""
+        with self._lock:
+            if not self.loaded:
+                self._request_load()
+            model = self.models.get(user_id)
+            if model is None:
+                model = self.models[user_id] = UserSequenceModel(self.order, self.max_followers, self.max_contexts)
+            if self.loaded and user_id not in self.caught_up and self.store.is_loaded(user_id):
+                self.caught_up.add(user_id)
+                for event in self.store.recent(user_id, limit=self.warmup_window, since=model.last_ts or None):
+                    if event.timestamp > model.last_ts:
+                        self._observe(user_id, model, event.action_type, event.timestamp, event.session_id)
+                        self.stats["replayed"] += 1
+            return model
+
+    def _on_event(self, event: BehaviorEvent):
+        with self._lock:
+            model = self._model_for(event.user_id)
+            # Not caught up yet: the replay will pick this event up. Caught up: already folded in by it
+            if event.user_id in self.caught_up and event.timestamp > model.last_ts:
+                self._observe(event.user_id, model, event.action_type, event.timestamp, event.session_id)
+                self.stats["observed"] += 1
+        self.start()
+
+    # ── Queries ───────────────────────────────────────────────────
+
+    def predict(self, user_id: str, k: int = 3) -> List[Dict[str, Any]]:
+        """Likely next actions for a user, most likely first"""
+        self.stats["predictions"] += 1
+        with self._lock:
+            return self._model_for(user_id).predict(k)
+
+    def top_sequences(self, user_id: str, k: int = 5, min_count: int = 2) -> List[Tuple[Tuple[str, ...], int]]:
+        with self._lock:
+            return self._model_for(user_id).top_sequences(k, min_count)
+
+    def action_counts(self, user_id: str) -> Counter:
+        with self._lock:
+            return Counter(self._model_for(user_id).unigrams)
+
+    def events_observed(self, user_id: str) -> int:
+        with self._lock:
+            return self._model_for(user_id).events
+
+    # ── Snapshots ─────────────────────────────────────────────────
+
+    def _read_snapshot(self) -> Optional[Tuple[CountMinSketch, Dict[str, UserSequenceModel]]]:
+        """Parse the snapshot file (blocking, no lock held); None when there is none"""
+        if not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path) as f:
+                data = json.load(f)
+            return CountMinSketch.from_dict(data["sketch"]), {
+                user_id: UserSequenceModel.from_dict(state, self.order, self.max_followers, self.max_contexts)
+                for user_id, state in data.get("users", {}).items()
+            }
+        except Exception as e:
+            print(f"⚠️ Next action model snapshot could not be loaded: {e}")
+            return None
+
+    def _install(self, state: Optional[Tuple[CountMinSketch, Dict[str, UserSequenceModel]]]):
+        # Nothing was observed before this point, so models created meanwhile are empty
+        with self._lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            if state is not None:
+                self.sketch, self.models = state
+
+    def load(self):
+        """Read and install the snapshot inline (blocking)"""
+        self._install(self._read_snapshot())
+
+    def _request_load(self):
+        """Load the snapshot in a worker thread, or inline without a running event loop"""
+        if self._loader is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.load()
+            return
+        self._loader = loop.create_task(self._load_in_thread())
+
+    async def _load_in_thread(self):
+        self._install(await asyncio.to_thread(self._read_snapshot))
+
+    def snapshot(self):
+        """Write all models atomically (temp file + rename).
+
+        Only the copy of the state happens under the lock; compression and
+        JSON encoding run outside it so observe() is not held up.
+        """
+        with self._lock:
+            if not self.loaded:
+                return
+            sketch = self.sketch.copy()
+            users = {user_id: model.to_dict() for user_id, model in self.models.items()}
+            self.dirty = False
+        payload = json.dumps({
+            "saved_at": time.time(),
+            "order": self.order,
+            "sketch": sketch.to_dict(),
+            "users": users
+        })
+        directory = os.path.dirname(self.snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.snapshot_path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(payload)
+        os.replace(temp_path, self.snapshot_path)
+        self.stats["snapshots"] += 1
+
+    def start(self):
+        """Load the snapshot and start periodic snapshots once an event loop is running"""
+        if not self.loaded:
+            with self._lock:
+                self._request_load()
+        if self._snapshotter and not self._snapshotter.done():
+            return
+        try:
+            self._snapshotter = asyncio.get_running_loop().create_task(self._snapshot_loop())
+        except RuntimeError:
+            pass
+
+    async def stop(self):
+        if self._snapshotter:
+            self._snapshotter.cancel()
+            try:
+                await self._snapshotter
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._snapshotter = None
+        if self.dirty:
+            self.snapshot()
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            if self.dirty:
+                try:
+                    await asyncio.to_thread(self.snapshot)
+                except Exception as e:
+                    self.dirty = True
+                    print(f"⚠️ Next action model snapshot failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "users": len(self.models),
+            "contexts": sum(len(model.transitions) for model in self.models.values()),
+            "dirty": self.dirty
+        }
+
+
+next_action_model = NextActionModel()
@@ -0,0 +1,251 @@
+"""
+Shared Page Fetcher
+One pooled HTTP client and one byte-bounded, TTL'd page cache for every
+service that downloads web pages (analysis, context extraction, prefetch)
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from bs4 import BeautifulSoup
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+
+@dataclass
+class FetchedPage:
+    url: str
+    final_url: str
+    status_code: int
+    content_type: str
+    html: str
+    fetched_at: float = field(default_factory=time.time)
+    prefetched: bool = False
+    hits: int = 0
+    extracted: Dict[str, str] = field(default_factory=dict)  # extraction mode -> text
+
+    @property
+    def size(self) -> int:
+        return len(self.html) + sum(len(text) for text in self.extracted.values())
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 300
+
+
+def extract_text(html: str, mode: str = "full") -> str:
+    """Visible text of a page.
+
+    "full" drops scripts and styles and joins every line; "main" also drops
+    navigation chrome and prefers <main>/<article>/content containers.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    if mode == "main":
+        for element in soup(["script", "style", "nav", "header", "footer"]):
+            element.decompose()
+        root = (
+            soup.find('main') or
+            soup.find('article') or
+            soup.find('div', class_=lambda x: x and 'content' in x.lower()) or
+            soup.find('body')
+        )
+        if not root:
+            return ""
+        lines = (line.strip() for line in root.get_text().splitlines())
+        return ' '.join(line for line in lines if line and len(line) > 10)
+
+    for element in soup(["script", "style"]):
+        element.decompose()
+    lines = (line.strip() for line in soup.get_text().splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return ' '.join(chunk for chunk in chunks if chunk)
+
+
+class PageCache:
+    """LRU page cache bounded by entry count and bytes, with a TTL"""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024, ttl: float = 600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, FetchedPage]" = OrderedDict()
+        self.total_bytes = 0
+        self.on_evict: Optional[Callable[[FetchedPage], None]] = None
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, url: str) -> Optional[FetchedPage]:
+        page = self.entries.get(url)
+        if page is None:
+            self.stats["misses"] += 1
+            return None
+        if time.time() - page.fetched_at > self.ttl:
+            self._remove(url)
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(url)
+        self.stats["hits"] += 1
+        return page
+
+    def peek(self, url: str) -> Optional[FetchedPage]:
+        """Fresh entry without touching LRU order or stats"""
+        page = self.entries.get(url)
+        if page is not None and time.time() - page.fetched_at <= self.ttl:
+            return page
+        return None
+
+    def set(self, url: str, page: FetchedPage):
+        if url in self.entries:
+            self._remove(url, evicted=False)
+        self.entries[url] = page
+        self.total_bytes += page.size
+        while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def resize(self, page: FetchedPage, previous_size: int):
+        """Re-account a page whose extracted text grew, if it is still the cached one"""
+        if self.entries.get(page.url) is page:
+            self.total_bytes += page.size - previous_size
+
+    def _remove(self, url: str, evicted: bool = True):
+        page = self.entries.pop(url)
+        self.total_bytes -= page.size
+        if evicted and self.on_evict:
+            self.on_evict(page)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "size_mb": round(self.total_bytes / (1024 * 1024), 2),
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0
+        }
+
+
+class PageFetcher:
+    """Fetch pages through one keep-alive client and the shared page cache.
+
+    Concurrent requests for the same URL share one download, which runs in
+    its own task so cancelling the request that started it does not fail
+    the others. Text extraction runs in a worker thread. Listeners are
+    told when a prefetched page is served for the first time, which is how
+    the speculative prefetcher learns its hit rate.
+    """
+
+    def __init__(self, cache: PageCache = None, timeout: float = 15.0, max_connections: int = 20,
+                 max_page_bytes: int = 5 * 1024 * 1024):
+        self.cache = cache or PageCache()
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_page_bytes = max_page_bytes
+        self.client: Optional[httpx.AsyncClient] = None
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.hit_listeners: List[Callable[[FetchedPage], None]] = []
+        self.stats = {"fetches": 0, "bytes_fetched": 0, "errors": 0, "coalesced": 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                headers=DEFAULT_HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+        return self.client
+
+    def add_hit_listener(self, callback: Callable[[FetchedPage], None]):
+        if callback not in self.hit_listeners:
+            self.hit_listeners.append(callback)
+
+    def _served(self, page: FetchedPage):
+        page.hits += 1
+        if page.prefetched and page.hits == 1:
+            for listener in self.hit_listeners:
+                try:
+                    listener(page)
+                except Exception as e:
+                    print(f"⚠️ Page hit listener failed: {e}")
+
+    async def fetch(self, url: str, use_cache: bool = True, prefetch: bool = False) -> FetchedPage:
+        """Cached page for `url`, downloading it once if needed (raises on HTTP errors)"""
+        if use_cache:
+            page = self.cache.peek(url) if prefetch else self.cache.get(url)
+            if page is not None:
+                if not prefetch:
+                    self._served(page)
+                return page
+
+        pending = self.inflight.get(url)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+        else:
+            pending = self.inflight[url] = asyncio.ensure_future(self._load(url, prefetch))
+            # Nobody else may be awaiting; mark a failure retrieved
+            pending.add_done_callback(lambda done: done.cancelled() or done.exception())
+        page = await asyncio.shield(pending)
+
+        if not prefetch:
+            # A real request joining an in-flight prefetch still counts as a hit
+            self._served(page)
+        return page
+
+    async def _load(self, url: str, prefetch: bool) -> FetchedPage:
+        try:
+            page = await self._download(url, prefetch)
+            self.cache.set(url, page)
+            return page
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.inflight.pop(url, None)
+
+    async def _download(self, url: str, prefetch: bool) -> FetchedPage:
+        response = await self._get_client().get(url)
+        response.raise_for_status()
+        html = response.text[:self.max_page_bytes]
+        self.stats["fetches"] += 1
+        self.stats["bytes_fetched"] += len(html)
+        return FetchedPage(
+            url=url,
+            final_url=str(response.url),
+            status_code=response.status_code,
+            content_type=response.headers.get("content-type", ""),
+            html=html,
+            prefetched=prefetch
+        )
+
+    async def fetch_text(self, url: str, mode: str = "full", max_chars: int = None, prefetch: bool = False) -> str:
+        """Extracted text for `url`; extraction is cached with the page"""
+        page = await self.fetch(url, prefetch=prefetch)
+        text = page.extracted.get(mode)
+        if text is None:
+            # BeautifulSoup over up to max_page_bytes of HTML: keep it off the event loop
+            extracted = await asyncio.to_thread(extract_text, page.html, mode)
+            text = page.extracted.get(mode)
+            if text is None:
+                previous_size = page.size
+                text = page.extracted[mode] = extracted
+                self.cache.resize(page, previous_size)
+        return text[:max_chars] if max_chars else text
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "inflight": len(self.inflight), "cache": self.cache.get_stats()}
+
+
+page_fetcher = PageFetcher()
@@ -6,11 +6,12 @@ import asyncio
 import json
 import logging
 import time
-import psutil
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import uuid
 
+from services.system_metrics_sampler import system_metrics_sampler
+
 logger = logging.getLogger(__name__)
 
 class PerformanceOptimizationService:
@@ -219,10 +220,9 @@ class PerformanceOptimizationService:
     async def _analyze_current_performance(self) -> Dict:
         """Analyze current system performance"""
         try:
-            # Get system metrics
-            cpu_percent = psutil.cpu_percent(interval=1)
-            memory = psutil.virtual_memory()
-            disk = psutil.disk_usage('/')
+            # Get system metrics from the background sampler
+            sample = system_metrics_sampler.snapshot()
+            cpu_percent = sample["cpu_percent"]
             
             # Simulate additional performance metrics
             api_response_time = 150  # ms (simulated)
@@ -232,10 +232,10 @@ class PerformanceOptimizationService:
             performance = {
                 'system_metrics': {
                     'cpu_usage': f"{cpu_percent:.1f}%",
-                    'memory_usage': f"{memory.percent:.1f}%",
-                    'memory_available': f"{memory.available / (1024**3):.1f}GB",
-                    'disk_usage': f"{disk.percent:.1f}%",
-                    'disk_free': f"{disk.free / (1024**3):.1f}GB"
+                    'memory_usage': f"{sample['memory_percent']:.1f}%",
+                    'memory_available': f"{sample['memory_available'] / (1024**3):.1f}GB",
+                    'disk_usage': f"{sample['disk_percent']:.1f}%",
+                    'disk_free': f"{sample['disk_free'] / (1024**3):.1f}GB"
                 },
                 'application_metrics': {
                     'avg_api_response_time': f"{api_response_time}ms",
@@ -244,7 +244,7 @@ class PerformanceOptimizationService:
                     'error_rate': '2.3%',
                     'throughput': '450 req/min'
                 },
-                'performance_score': await self._calculate_performance_score(cpu_percent, memory.percent, api_response_time)
+                'performance_score': await self._calculate_performance_score(cpu_percent, sample["memory_percent"], api_response_time)
             }
             
             return performance
@@ -453,38 +453,36 @@ class PerformanceOptimizationService:
         metrics = {}
         
         try:
+            sample = system_metrics_sampler.snapshot()
             if 'cpu' in scope:
                 metrics['cpu'] = {
-                    'usage_percent': psutil.cpu_percent(interval=1),
-                    'core_count': psutil.cpu_count(),
-                    'load_average': psutil.getloadavg() if hasattr(psutil, 'getloadavg') else [0.5, 0.6, 0.7]
+                    'usage_percent': sample['cpu_percent'],
+                    'core_count': sample['cpu_count'],
+                    'load_average': sample['load_average']
                 }
             
             if 'memory' in scope:
-                memory = psutil.virtual_memory()
                 metrics['memory'] = {
-                    'total_gb': memory.total / (1024**3),
-                    'available_gb': memory.available / (1024**3),
-                    'used_percent': memory.percent,
-                    'free_gb': memory.free / (1024**3)
+                    'total_gb': sample['memory_total'] / (1024**3),
+                    'available_gb': sample['memory_available'] / (1024**3),
+                    'used_percent': sample['memory_percent'],
+                    'free_gb': sample['memory_available'] / (1024**3)
                 }
             
             if 'disk' in scope:
-                disk = psutil.disk_usage('/')
                 metrics['disk'] = {
-                    'total_gb': disk.total / (1024**3),
-                    'used_gb': disk.used / (1024**3),
-                    'free_gb': disk.free / (1024**3),
-                    'used_percent': (disk.used / disk.total) * 100
+                    'total_gb': sample['disk_total'] / (1024**3),
+                    'used_gb': (sample['disk_total'] - sample['disk_free']) / (1024**3),
+                    'free_gb': sample['disk_free'] / (1024**3),
+                    'used_percent': sample['disk_percent']
                 }
             
             if 'network' in scope:
-                net_io = psutil.net_io_counters()
                 metrics['network'] = {
-                    'bytes_sent': net_io.bytes_sent,
-                    'bytes_received': net_io.bytes_recv,
-                    'packets_sent': net_io.packets_sent,
-                    'packets_received': net_io.packets_recv
+                    'bytes_sent': sample['net_sent_bytes'],
+                    'bytes_received': sample['net_recv_bytes'],
+                    'bytes_sent_per_sec': sample['net_sent_bytes_per_sec'],
+                    'bytes_received_per_sec': sample['net_recv_bytes_per_sec']
                 }
             
             # Simulate database metrics
@@ -11,6 +11,9 @@ import hashlib
 import uuid
 import numpy as np
 
+from services.behavior_event_store import behavior_event_store
+from services.next_action_model import next_action_model
+
 logger = logging.getLogger(__name__)
 
 class PredictiveIntelligenceService:
@@ -23,7 +26,11 @@ class PredictiveIntelligenceService:
     - Learning-based recommendations
     """
 
-    def __init__(self):
+    def __init__(self, history_window: int = 200):
+        # Raw actions live in the shared behavior event store; profiles hold derived state
+        self.behavior_store = behavior_event_store
+        self.next_action_model = next_action_model
+        self.history_window = history_window
         self.user_behaviors = {}
         self.action_patterns = {}
         self.workflow_templates = {}
@@ -38,33 +45,19 @@ class PredictiveIntelligenceService:
             action_data = request_data.get('action_data', {})
             context = request_data.get('context', {})
             
-            # Initialize user behavior tracking
-            if user_id not in self.user_behaviors:
-                self.user_behaviors[user_id] = {
-                    'action_history': [],
-                    'patterns': {},
-                    'preferences': {},
-                    'behavioral_score': 0.0,
-                    'learning_progression': [],
-                    'created_at': datetime.now().isoformat()
-                }
-            
-            user_profile = self.user_behaviors[user_id]
-            
             # Record current action
-            action_record = {
-                'action_type': action_type,
-                'action_data': action_data,
-                'context': context,
-                'timestamp': datetime.now().isoformat(),
-                'session_id': context.get('session_id', str(uuid.uuid4())[:8])
-            }
+            self.behavior_store.append(
+                user_id, action_type, data=action_data, context=context,
+                session_id=context.get('session_id')
+            )
             
-            user_profile['action_history'].append(action_record)
+            user_profile = self._get_user_profile(user_id)
+            action_history = self._action_history(user_id)
             
             # Analyze behavioral patterns
-            patterns = await self._analyze_behavior_patterns(user_profile['action_history'])
+            patterns = await self._analyze_behavior_patterns(user_id, action_history)
             user_profile['patterns'] = patterns
+            user_profile['action_count'] = self.behavior_store.get_aggregates(user_id).total
             
             # Generate predictive insights
             predictions = await self._generate_behavior_predictions(user_id, patterns)
@@ -77,7 +70,7 @@ class PredictiveIntelligenceService:
                 "success": True,
                 "user_behavior_analysis": {
                     "user_id": user_id,
-                    "total_actions": len(user_profile['action_history']),
+                    "total_actions": user_profile['action_count'],
                     "behavioral_score": learning_score,
                     "dominant_patterns": patterns.get('dominant_patterns', []),
                     "activity_frequency": patterns.get('activity_frequency', {}),
@@ -93,7 +86,7 @@ class PredictiveIntelligenceService:
                 "predictions": predictions,
                 "personalization_insights": {
                     "user_type": await self._classify_user_type(patterns),
-                    "interaction_style": await self._determine_interaction_style(user_profile['action_history']),
+                    "interaction_style": await self._determine_interaction_style(action_history),
                     "optimization_opportunities": await self._identify_optimization_opportunities(patterns),
                     "next_likely_actions": predictions.get('next_actions', [])
                 },
@@ -116,18 +109,24 @@ class PredictiveIntelligenceService:
     async def get_action_suggestions(self, user_id: str) -> Dict:
         """Generate predictive action suggestions based on learned behavior"""
         try:
-            if user_id not in self.user_behaviors:
+            await self.behavior_store.ensure_loaded(user_id)
+            if user_id not in self.user_behaviors and not self.behavior_store.has_user(user_id):
                 return {
                     "success": True,
                     "suggestions": "Learning your preferences - continue using the browser to get personalized suggestions",
                     "learning_status": "Initial phase - Building behavioral profile"
                 }
             
-            user_profile = self.user_behaviors[user_id]
+            user_profile = self._get_user_profile(user_id)
+            if not user_profile['patterns']:
+                # Warm restart: rebuild derived state from the event store
+                user_profile['patterns'] = await self._analyze_behavior_patterns(user_id, self._action_history(user_id))
+                user_profile['action_count'] = self.behavior_store.get_aggregates(user_id).total
+                user_profile['behavioral_score'] = await self._calculate_learning_progression(user_profile)
             patterns = user_profile['patterns']
             
-            # Generate contextual action suggestions
-            action_suggestions = await self._generate_action_suggestions(patterns, user_profile['action_history'])
+            # Generate contextual action suggestions from the incremental next-action model
+            action_suggestions = await self._generate_action_suggestions(user_id, patterns)
             
             # Generate workflow optimizations
             workflow_suggestions = await self._generate_workflow_suggestions(user_id, patterns)
@@ -136,7 +135,7 @@ class PredictiveIntelligenceService:
             shortcuts = await self._generate_personalized_shortcuts(patterns)
             
             # Predict optimal timing for actions
-            timing_predictions = await self._predict_optimal_timing(user_profile['action_history'])
+            timing_predictions = await self._predict_optimal_timing(user_id)
             
             return {
                 "success": True,
@@ -153,7 +152,7 @@ class PredictiveIntelligenceService:
                     "behavioral_adaptation": "Real-time learning from interactions"
                 },
                 "automation_opportunities": {
-                    "repeatable_tasks": await self._identify_repeatable_tasks(user_profile['action_history']),
+                    "repeatable_tasks": await self._identify_repeatable_tasks(user_id),
                     "workflow_patterns": await self._identify_workflow_patterns(patterns),
                     "time_saving_suggestions": await self._generate_time_saving_suggestions(patterns),
                     "smart_defaults": await self._suggest_smart_defaults(patterns)
@@ -246,48 +245,58 @@ class PredictiveIntelligenceService:
             return {"success": False, "error": str(e)}
 
     # Helper methods for behavioral analysis and prediction
-    async def _analyze_behavior_patterns(self, action_history: List[Dict]) -> Dict:
+    def _get_user_profile(self, user_id: str) -> Dict:
+        """Derived behavior state for a user, created on first use"""
+        if user_id not in self.user_behaviors:
+            self.user_behaviors[user_id] = {
+                'action_count': 0,
+                'patterns': {},
+                'preferences': {},
+                'behavioral_score': 0.0,
+                'learning_progression': [],
+                'created_at': datetime.now().isoformat()
+            }
+        return self.user_behaviors[user_id]
+
+    def _action_history(self, user_id: str) -> List[Dict]:
+        """Recent actions from the event store, oldest first"""
+        return [
+            {
+                'action_type': event.action_type,
+                'action_data': event.data,
+                'context': event.context,
+                'timestamp': event.isoformat,
+                'session_id': event.session_id
+            }
+            for event in self.behavior_store.recent(user_id, limit=self.history_window)
+        ]
+
+    async def _analyze_behavior_patterns(self, user_id: str, action_history: List[Dict]) -> Dict:
         """Analyze user behavioral patterns using advanced analytics"""
-        if not action_history:
+        aggregates = self.behavior_store.get_aggregates(user_id)
+        if not aggregates.total:
             return {'dominant_patterns': [], 'confidence_score': 0.0}
         
-        # Analyze action type frequency
-        action_counts = {}
-        context_patterns = {}
-        time_patterns = {}
+        # Action frequencies and hour-of-day histogram come precomputed from the store
+        action_counts = dict(aggregates.action_counts)
+        time_patterns = {hour: count for hour, count in enumerate(aggregates.hour_histogram) if count}
         
+        # Context patterns over the recent window
+        context_patterns = {}
         for action in action_history:
-            action_type = action['action_type']
-            timestamp = action['timestamp']
-            context = action.get('context', {})
-            
-            # Count action types
-            action_counts[action_type] = action_counts.get(action_type, 0) + 1
-            
-            # Analyze context patterns
-            for key, value in context.items():
+            for key, value in action.get('context', {}).items():
                 if key not in context_patterns:
                     context_patterns[key] = {}
                 context_patterns[key][str(value)] = context_patterns[key].get(str(value), 0) + 1
-            
-            # Analyze time patterns (hour of day)
-            try:
-                dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                hour = dt.hour
-                time_patterns[hour] = time_patterns.get(hour, 0) + 1
-            except:
-                pass
         
         # Identify dominant patterns
-        dominant_actions = sorted(action_counts.items(), key=lambda x: x[1], reverse=True)[:5]
-        dominant_patterns = [action[0] for action in dominant_actions]
+        dominant_patterns = [action for action, _ in aggregates.top_actions(5)]
         
         # Calculate pattern confidence
-        total_actions = len(action_history)
-        confidence_score = min(total_actions / 50.0, 1.0)  # Higher confidence with more data
+        confidence_score = min(aggregates.total / 50.0, 1.0)  # Higher confidence with more data
         
-        # Analyze workflow preferences
-        workflow_sequences = await self._extract_workflow_sequences(action_history)
+        # Workflow preferences come from the incrementally maintained n-gram model
+        workflow_sequences = await self._extract_workflow_sequences(user_id)
         
         return {
             'dominant_patterns': dominant_patterns,
@@ -296,7 +305,7 @@ class PredictiveIntelligenceService:
             'time_patterns': time_patterns,
             'workflow_sequences': workflow_sequences,
             'confidence_score': confidence_score,
-            'consistency_score': await self._calculate_consistency_score(action_history),
+            'consistency_score': await self._calculate_consistency_score(user_id),
             'preferred_workflows': await self._identify_preferred_workflows(workflow_sequences)
         }
 
@@ -305,8 +314,9 @@ class PredictiveIntelligenceService:
         dominant_patterns = patterns.get('dominant_patterns', [])
         action_frequency = patterns.get('action_frequency', {})
         
-        # Predict next likely actions
-        next_actions = dominant_patterns[:3] if dominant_patterns else ['browse', 'search', 'navigate']
+        # Predict next likely actions from the user's recent context
+        predicted = self.next_action_model.predict(user_id, k=3)
+        next_actions = [p['action_type'] for p in predicted] or dominant_patterns[:3] or ['browse', 'search', 'navigate']
         
         # Calculate prediction accuracy based on pattern strength
         accuracy_score = patterns.get('confidence_score', 0.5)
@@ -321,7 +331,7 @@ class PredictiveIntelligenceService:
 
     async def _calculate_learning_progression(self, user_profile: Dict) -> float:
         """Calculate how well the system has learned user behavior"""
-        action_count = len(user_profile['action_history'])
+        action_count = user_profile['action_count']
         pattern_diversity = len(user_profile['patterns'].get('dominant_patterns', []))
         
         # Learning score based on data quantity and diversity
@@ -377,9 +387,9 @@ class PredictiveIntelligenceService:
         
         return opportunities
 
-    async def _generate_action_suggestions(self, patterns: Dict, action_history: List[Dict]) -> Dict:
+    async def _generate_action_suggestions(self, user_id: str, patterns: Dict) -> Dict:
         """Generate contextual action suggestions"""
-        recent_actions = action_history[-5:] if len(action_history) >= 5 else action_history
+        recent_actions = self.behavior_store.get_aggregates(user_id).recent
         dominant_patterns = patterns.get('dominant_patterns', [])
         
         suggestions = {
@@ -391,12 +401,18 @@ class PredictiveIntelligenceService:
         
         # Immediate suggestions based on recent activity
         if recent_actions:
-            last_action = recent_actions[-1]['action_type']
+            last_action = recent_actions[-1]
             if last_action == 'search':
                 suggestions['immediate'].append("🔍 Refine your search with advanced filters")
             elif last_action == 'navigation':
                 suggestions['immediate'].append("📚 Bookmark this page for quick access")
         
+        for prediction in self.next_action_model.predict(user_id, k=3):
+            if prediction['context_length'] and prediction['confidence'] >= 0.3:
+                suggestions['immediate'].append(
+                    f"➡️ Next up: {prediction['action_type']} ({prediction['confidence'] * 100:.0f}% likely)"
+                )
+        
         # Contextual suggestions based on patterns
         if 'question' in dominant_patterns:
             suggestions['contextual'].append("💡 Try the AI assistant for instant answers")
@@ -450,58 +466,46 @@ class PredictiveIntelligenceService:
         
         return shortcuts
 
-    async def _predict_optimal_timing(self, action_history: List[Dict]) -> Dict:
+    async def _predict_optimal_timing(self, user_id: str) -> Dict:
         """Predict optimal timing for different actions"""
+        peak_hours = self.behavior_store.get_aggregates(user_id).peak_hours()
         return {
-            "peak_activity_hours": "Based on your patterns: 10 AM - 12 PM, 2 PM - 4 PM",
+            "peak_activity_hours": (
+                "Based on your patterns: " + ", ".join(f"{hour:02d}:00" for hour in sorted(peak_hours))
+                if peak_hours else "Based on your patterns: 10 AM - 12 PM, 2 PM - 4 PM"
+            ),
             "best_focus_time": "Morning hours show higher task completion rates",
             "optimal_break_intervals": "Every 45 minutes based on your activity patterns",
             "suggested_workflow_timing": "Complex tasks: Morning, Browsing: Afternoon"
         }
 
     # Additional helper methods
-    async def _extract_workflow_sequences(self, action_history: List[Dict]) -> List[List[str]]:
-        """Extract common workflow sequences from user actions"""
-        sequences = []
-        current_sequence = []
-        
-        for action in action_history:
-            current_sequence.append(action['action_type'])
-            if len(current_sequence) > 5:  # Limit sequence length
-                sequences.append(current_sequence[:])
-                current_sequence = current_sequence[1:]  # Sliding window
-        
-        return sequences
+    async def _extract_workflow_sequences(self, user_id: str) -> List[Dict]:
+        """Most frequent action sequences from the next-action model"""
+        return [
+            {'sequence': list(sequence), 'count': count}
+            for sequence, count in self.next_action_model.top_sequences(user_id, k=10)
+        ]
 
-    async def _calculate_consistency_score(self, action_history: List[Dict]) -> float:
+    async def _calculate_consistency_score(self, user_id: str) -> float:
         """Calculate behavioral consistency score"""
-        if len(action_history) < 10:
+        recent_window = list(self.behavior_store.get_aggregates(user_id).recent)
+        if len(recent_window) < 10:
             return 0.5  # Neutral score for insufficient data
         
-        # Analyze pattern consistency over time
-        recent_actions = [action['action_type'] for action in action_history[-10:]]
-        overall_actions = [action['action_type'] for action in action_history]
-        
-        recent_patterns = set(recent_actions)
-        overall_patterns = set(overall_actions)
-        
-        # Consistency based on pattern overlap
+        # Consistency based on overlap between the last 10 actions and the rolling window
+        recent_patterns = set(recent_window[-10:])
+        overall_patterns = set(recent_window)
         consistency = len(recent_patterns & overall_patterns) / len(overall_patterns)
         return min(consistency, 1.0)
 
-    async def _identify_preferred_workflows(self, sequences: List[List[str]]) -> List[str]:
+    async def _identify_preferred_workflows(self, sequences: List[Dict]) -> List[str]:
         """Identify user's preferred workflow patterns"""
         if not sequences:
             return ["Exploring workflow preferences - continue using the browser"]
         
-        # Find most common sequences
-        sequence_counts = {}
-        for seq in sequences:
-            seq_str = " -> ".join(seq[-3:])  # Last 3 actions
-            sequence_counts[seq_str] = sequence_counts.get(seq_str, 0) + 1
-        
-        top_workflows = sorted(sequence_counts.items(), key=lambda x: x[1], reverse=True)[:3]
-        return [workflow[0] for workflow in top_workflows]
+        top_workflows = sorted(sequences, key=lambda s: (len(s['sequence']) > 2, s['count']), reverse=True)[:3]
+        return [" -> ".join(workflow['sequence']) for workflow in top_workflows]
 
     async def _analyze_behavioral_trends(self, patterns: Dict) -> Dict:
         """Analyze trends in user behavior"""
@@ -523,7 +527,7 @@ class PredictiveIntelligenceService:
 
     async def _determine_learning_stage(self, user_profile: Dict) -> str:
         """Determine what learning stage the user is in"""
-        action_count = len(user_profile['action_history'])
+        action_count = user_profile['action_count']
         behavioral_score = user_profile['behavioral_score']
         
         if action_count < 20:
@@ -601,21 +605,18 @@ class PredictiveIntelligenceService:
             "user_interaction": "Minimal - Autonomous execution with progress updates"
         }
 
-    async def _identify_repeatable_tasks(self, action_history: List[Dict]) -> List[str]:
+    async def _identify_repeatable_tasks(self, user_id: str) -> List[str]:
         """Identify tasks that could be automated"""
-        task_patterns = {}
-        
-        for action in action_history:
-            if action['action_type'] == 'task':
-                task_data = str(action.get('action_data', ''))
-                task_patterns[task_data] = task_patterns.get(task_data, 0) + 1
-        
-        repeatable = [task for task, count in task_patterns.items() if count > 2]
+        repeatable = [
+            f"{' -> '.join(sequence)} ({count}x)"
+            for sequence, count in self.next_action_model.top_sequences(user_id, k=5, min_count=3)
+            if len(sequence) > 2
+        ]
         
         if not repeatable:
             return ["Continue using the browser - system will identify automation opportunities"]
         
-        return repeatable[:5]  # Top 5 repeatable tasks
+        return repeatable
 
     async def _identify_workflow_patterns(self, patterns: Dict) -> List[str]:
         """Identify workflow patterns suitable for automation"""
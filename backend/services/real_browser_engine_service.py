@@ -12,6 +12,8 @@ from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 import aiofiles
 import os
 
+from services.tab_hibernation import TabHibernationManager
+
 
 class RealBrowserEngineService:
     """Service for managing real Chromium browser instances and navigation"""
@@ -22,6 +24,7 @@ class RealBrowserEngineService:
         self.pages: Dict[str, Page] = {}
         self.session_data: Dict[str, Dict] = {}
         self.playwright = None
+        self.hibernation = TabHibernationManager("Real Browser Engine", self.pages, self.contexts.get)
         
     async def initialize_browser(self):
         """Initialize the Playwright browser instance"""
@@ -91,6 +94,8 @@ class RealBrowserEngineService:
             
             tab_id = str(uuid.uuid4())
             self.pages[tab_id] = page
+            self.hibernation.track(tab_id, session_id)
+            await self.hibernation.enforce(protect={tab_id})
             
             # Navigate to URL if provided
             if url and url != 'about:blank':
@@ -121,58 +126,57 @@ class RealBrowserEngineService:
     async def navigate_to_url(self, tab_id: str, url: str) -> Dict[str, Any]:
         """Navigate a tab to the specified URL"""
         try:
-            if tab_id not in self.pages:
-                return {
-                    'success': False,
-                    'error': 'Tab not found'
-                }
-                
-            page = self.pages[tab_id]
+            async with self.hibernation.lease(tab_id) as page:
+                if page is None:
+                    return {
+                        'success': False,
+                        'error': 'Tab not found'
+                    }
             
-            # Add protocol if missing
-            if not url.startswith(('http://', 'https://', 'about:', 'file:')):
-                if '.' in url and ' ' not in url:
-                    url = f'https://{url}'
-                else:
-                    # Treat as search query
-                    url = f'https://www.google.com/search?q={url.replace(" ", "+")}'
+                # Add protocol if missing
+                if not url.startswith(('http://', 'https://', 'about:', 'file:')):
+                    if '.' in url and ' ' not in url:
+                        url = f'https://{url}'
+                    else:
+                        # Treat as search query
+                        url = f'https://www.google.com/search?q={url.replace(" ", "+")}'
             
-            # Navigate
-            response = await page.goto(url, wait_until='networkidle', timeout=30000)
+                # Navigate
+                response = await page.goto(url, wait_until='networkidle', timeout=30000)
             
-            # Update tab info
-            final_url = page.url
-            title = await page.title()
+                # Update tab info
+                final_url = page.url
+                title = await page.title()
             
-            # Find session for this tab
-            session_id = None
-            for sid, data in self.session_data.items():
-                if tab_id in data['tabs']:
-                    session_id = sid
-                    break
+                # Find session for this tab
+                session_id = None
+                for sid, data in self.session_data.items():
+                    if tab_id in data['tabs']:
+                        session_id = sid
+                        break
                     
-            if session_id:
-                self.session_data[session_id]['tabs'][tab_id].update({
-                    'url': final_url,
-                    'title': title,
-                    'last_navigated': datetime.now().isoformat()
-                })
+                if session_id:
+                    self.session_data[session_id]['tabs'][tab_id].update({
+                        'url': final_url,
+                        'title': title,
+                        'last_navigated': datetime.now().isoformat()
+                    })
                 
-                # Add to history
-                self.session_data[session_id]['history'].append({
+                    # Add to history
+                    self.session_data[session_id]['history'].append({
+                        'url': final_url,
+                        'title': title,
+                        'timestamp': datetime.now().isoformat(),
+                        'tab_id': tab_id
+                    })
+            
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
                     'url': final_url,
                     'title': title,
-                    'timestamp': datetime.now().isoformat(),
-                    'tab_id': tab_id
-                })
-            
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'url': final_url,
-                'title': title,
-                'status_code': response.status if response else 200
-            }
+                    'status_code': response.status if response else 200
+                }
             
         except Exception as e:
             return {
@@ -183,24 +187,39 @@ class RealBrowserEngineService:
     async def get_tab_info(self, tab_id: str) -> Dict[str, Any]:
         """Get information about a specific tab"""
         try:
+            snapshot = self.hibernation.get_snapshot(tab_id)
+            if snapshot is not None:
+                # Answer from the snapshot so listing tabs does not wake them
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'url': snapshot.url,
+                    'title': snapshot.title,
+                    'can_go_back': False,
+                    'can_go_forward': False,
+                    'is_loading': False,
+                    'favicon': None,
+                    'hibernated': True,
+                    'placeholder': snapshot.summary()['placeholder']
+                }
+                
             if tab_id not in self.pages:
                 return {
                     'success': False,
                     'error': 'Tab not found'
                 }
                 
-            page = self.pages[tab_id]
-            
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'url': page.url,
-                'title': await page.title(),
-                'can_go_back': len(await page.evaluate('() => window.history.length')) > 1,
-                'can_go_forward': False,  # Playwright doesn't expose this directly
-                'is_loading': await page.evaluate('() => document.readyState !== "complete"'),
-                'favicon': await page.evaluate('() => { const link = document.querySelector("link[rel*=\'icon\']"); return link ? link.href : null; }')
-            }
+            async with self.hibernation.lease(tab_id) as page:
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'url': page.url,
+                    'title': await page.title(),
+                    'can_go_back': len(await page.evaluate('() => window.history.length')) > 1,
+                    'can_go_forward': False,  # Playwright doesn't expose this directly
+                    'is_loading': await page.evaluate('() => document.readyState !== "complete"'),
+                    'favicon': await page.evaluate('() => { const link = document.querySelector("link[rel*=\'icon\']"); return link ? link.href : null; }')
+                }
             
         except Exception as e:
             return {
@@ -211,17 +230,18 @@ class RealBrowserEngineService:
     async def close_tab(self, tab_id: str) -> Dict[str, Any]:
         """Close a browser tab"""
         try:
-            if tab_id not in self.pages:
+            if tab_id not in self.pages and not self.hibernation.is_hibernated(tab_id):
                 return {
                     'success': False,
                     'error': 'Tab not found'
                 }
                 
-            page = self.pages[tab_id]
-            await page.close()
+            page = self.pages.pop(tab_id, None)
+            if page is not None:
+                await page.close()
             
             # Remove from tracking
-            del self.pages[tab_id]
+            self.hibernation.forget(tab_id)
             
             # Remove from session data
             for session_id, data in self.session_data.items():
@@ -244,95 +264,126 @@ class RealBrowserEngineService:
     async def tab_go_back(self, tab_id: str) -> Dict[str, Any]:
         """Navigate back in tab history"""
         try:
-            if tab_id not in self.pages:
-                return {'success': False, 'error': 'Tab not found'}
-                
-            page = self.pages[tab_id]
-            await page.go_back()
+            async with self.hibernation.lease(tab_id) as page:
+                if page is None:
+                    return {'success': False, 'error': 'Tab not found'}
+                await page.go_back()
             
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'url': page.url,
-                'title': await page.title()
-            }
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'url': page.url,
+                    'title': await page.title()
+                }
         except Exception as e:
             return {'success': False, 'error': f'Failed to go back: {str(e)}'}
     
     async def tab_go_forward(self, tab_id: str) -> Dict[str, Any]:
         """Navigate forward in tab history"""
         try:
-            if tab_id not in self.pages:
-                return {'success': False, 'error': 'Tab not found'}
-                
-            page = self.pages[tab_id]
-            await page.go_forward()
+            async with self.hibernation.lease(tab_id) as page:
+                if page is None:
+                    return {'success': False, 'error': 'Tab not found'}
+                await page.go_forward()
             
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'url': page.url,
-                'title': await page.title()
-            }
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'url': page.url,
+                    'title': await page.title()
+                }
         except Exception as e:
             return {'success': False, 'error': f'Failed to go forward: {str(e)}'}
     
     async def tab_reload(self, tab_id: str) -> Dict[str, Any]:
         """Reload a tab"""
         try:
-            if tab_id not in self.pages:
-                return {'success': False, 'error': 'Tab not found'}
-                
-            page = self.pages[tab_id]
-            await page.reload()
+            async with self.hibernation.lease(tab_id) as page:
+                if page is None:
+                    return {'success': False, 'error': 'Tab not found'}
+                await page.reload()
             
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'url': page.url,
-                'title': await page.title()
-            }
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'url': page.url,
+                    'title': await page.title()
+                }
         except Exception as e:
             return {'success': False, 'error': f'Failed to reload: {str(e)}'}
     
     async def get_page_content(self, tab_id: str) -> Dict[str, Any]:
         """Get the HTML content of a page"""
         try:
-            if tab_id not in self.pages:
-                return {'success': False, 'error': 'Tab not found'}
-                
-            page = self.pages[tab_id]
-            content = await page.content()
+            async with self.hibernation.lease(tab_id) as page:
+                if page is None:
+                    return {'success': False, 'error': 'Tab not found'}
+                content = await page.content()
             
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'content': content,
-                'url': page.url
-            }
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'content': content,
+                    'url': page.url
+                }
         except Exception as e:
             return {'success': False, 'error': f'Failed to get content: {str(e)}'}
     
     async def take_screenshot(self, tab_id: str) -> Dict[str, Any]:
         """Take a screenshot of a tab"""
         try:
-            if tab_id not in self.pages:
-                return {'success': False, 'error': 'Tab not found'}
-                
-            page = self.pages[tab_id]
-            screenshot_path = f'/tmp/screenshot_{tab_id}_{int(datetime.now().timestamp())}.png'
+            async with self.hibernation.lease(tab_id) as page:
+                if page is None:
+                    return {'success': False, 'error': 'Tab not found'}
+                screenshot_path = f'/tmp/screenshot_{tab_id}_{int(datetime.now().timestamp())}.png'
             
-            await page.screenshot(path=screenshot_path)
+                await page.screenshot(path=screenshot_path)
             
-            return {
-                'success': True,
-                'tab_id': tab_id,
-                'screenshot_path': screenshot_path,
-                'url': page.url
-            }
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'screenshot_path': screenshot_path,
+                    'url': page.url
+                }
         except Exception as e:
             return {'success': False, 'error': f'Failed to take screenshot: {str(e)}'}
     
+    async def hibernate_tab(self, tab_id: str) -> Dict[str, Any]:
+        """Snapshot a tab and close its page; it is restored on next access"""
+        try:
+            if self.hibernation.is_hibernated(tab_id):
+                return {'success': True, 'tab_id': tab_id, 'hibernated': True, 'message': 'Tab already hibernated'}
+                
+            snapshot = await self.hibernation.hibernate(tab_id)
+            if snapshot is None:
+                if self.hibernation.in_use(tab_id):
+                    return {'success': False, 'error': 'Tab is in use'}
+                return {'success': False, 'error': 'Tab not found'}
+                
+            return {'success': True, 'hibernated': True, **snapshot.summary()}
+        except Exception as e:
+            return {'success': False, 'error': f'Failed to hibernate tab: {str(e)}'}
+    
+    async def restore_tab(self, tab_id: str) -> Dict[str, Any]:
+        """Restore a hibernated tab ahead of its next use"""
+        try:
+            async with self.hibernation.lease(tab_id) as page:
+                if page is None:
+                    return {'success': False, 'error': 'Tab not found'}
+                
+                return {
+                    'success': True,
+                    'tab_id': tab_id,
+                    'url': page.url,
+                    'title': await page.title()
+                }
+        except Exception as e:
+            return {'success': False, 'error': f'Failed to restore tab: {str(e)}'}
+    
+    async def get_hibernation_status(self) -> Dict[str, Any]:
+        """Live/hibernated page counts, policy and stats"""
+        return {'success': True, **self.hibernation.get_status()}
+    
     async def get_browser_sessions(self) -> Dict[str, Any]:
         """Get all active browser sessions"""
         return {
@@ -341,6 +392,7 @@ class RealBrowserEngineService:
                 session_id: {
                     'created_at': data['created_at'],
                     'tabs_count': len(data['tabs']),
+                    'hibernated_tabs': sum(1 for tab_id in data['tabs'] if self.hibernation.is_hibernated(tab_id)),
                     'history_count': len(data['history'])
                 }
                 for session_id, data in self.session_data.items()
@@ -358,6 +410,7 @@ class RealBrowserEngineService:
             if session_id in self.session_data:
                 # Close all pages in this session
                 for tab_id in list(self.session_data[session_id]['tabs'].keys()):
+                    self.hibernation.forget(tab_id)
                     if tab_id in self.pages:
                         try:
                             await self.pages[tab_id].close()
@@ -382,6 +435,8 @@ class RealBrowserEngineService:
     async def shutdown(self):
         """Shutdown the browser engine"""
         try:
+            await self.hibernation.stop()
+            
             # Close all pages
             for page in self.pages.values():
                 try:
@@ -0,0 +1,361 @@
+"""
+Request Metrics
+ASGI middleware recording per-route latency histograms, in-flight requests,
+payload sizes and upstream (LLM / fetch / DB) time via context-local spans,
+rendered in the Prometheus text format
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+# Hosts whose calls count as LLM time; every other outbound HTTP call is "fetch"
+LLM_HOSTS = {"api.groq.com", "api.openai.com", "api.anthropic.com"}
+
+# Spans of the request being handled in the current task
+_current_spans: contextvars.ContextVar[Optional[Dict[str, List[float]]]] = contextvars.ContextVar(
+    "request_spans", default=None
+)
+
+
+class LogLinearHistogram:
+    """Histogram with `sub_buckets` linear buckets per power of two (HDR style).
+
+    Relative error is bounded by 1/sub_buckets at every scale, so one layout
+    covers sub-millisecond handlers and minute-long LLM calls alike. Powers of
+    two are bucket boundaries, which is what the Prometheus export uses.
+    """
+
+    def __init__(self, min_value: float, max_value: float, sub_buckets: int = 4):
+        self.sub_buckets = sub_buckets
+        self.bounds: List[float] = []
+        base = min_value
+        while base < max_value:
+            self.bounds.extend(base * (1 + step / sub_buckets) for step in range(sub_buckets))
+            base *= 2
+        self.bounds.append(base)
+        self.counts = [0] * (len(self.bounds) + 1)  # last slot: above the top bound
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th value (capped at the max seen)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def export_buckets(self) -> List[Tuple[float, int]]:
+        """Cumulative (le, count) pairs at power-of-two boundaries"""
+        buckets = []
+        cumulative = 0
+        for index, bound in enumerate(self.bounds):
+            cumulative += self.counts[index]
+            if index % self.sub_buckets == 0:
+                buckets.append((bound, cumulative))
+        return buckets
+
+    def summary(self, scale: float = 1.0, digits: int = 1) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count * scale, digits) if self.count else 0.0,
+            "p50": round(self.quantile(0.5) * scale, digits),
+            "p95": round(self.quantile(0.95) * scale, digits),
+            "p99": round(self.quantile(0.99) * scale, digits),
+            "max": round(self.max * scale, digits)
+        }
+
+
+def _latency_histogram() -> LogLinearHistogram:
+    return LogLinearHistogram(0.0005, 120.0)  # 0.5ms .. ~2min
+
+
+def _size_histogram() -> LogLinearHistogram:
+    return LogLinearHistogram(64, 64 * 1024 * 1024)  # 64B .. 64MB
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency = _latency_histogram()
+        self.request_bytes = _size_histogram()
+        self.response_bytes = _size_histogram()
+        self.statuses: Dict[int, int] = {}
+        self.upstream: Dict[str, Dict[str, float]] = {}  # kind -> {calls, seconds}
+
+    @property
+    def errors(self) -> int:
+        return sum(count for status, count in self.statuses.items() if status >= 500)
+
+
+class RequestMetrics:
+    """Process-wide request and upstream-call statistics"""
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.upstream: Dict[str, LogLinearHistogram] = {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    # ── Recording ─────────────────────────────────────────────────
+
+    def request_started(self):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float,
+                         request_bytes: int, response_bytes: int, spans: Dict[str, List[float]]):
+        self.in_flight -= 1
+        with self._lock:
+            stats = self.routes.get((method, route))
+            if stats is None:
+                stats = self.routes[(method, route)] = RouteStats()
+            stats.latency.record(seconds)
+            stats.request_bytes.record(request_bytes)
+            stats.response_bytes.record(response_bytes)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            for kind, durations in spans.items():
+                totals = stats.upstream.setdefault(kind, {"calls": 0, "seconds": 0.0})
+                totals["calls"] += len(durations)
+                totals["seconds"] += sum(durations)
+
+    def observe_upstream(self, kind: str, seconds: float):
+        """Record one upstream call, attributing it to the current request if any"""
+        with self._lock:
+            histogram = self.upstream.get(kind)
+            if histogram is None:
+                histogram = self.upstream[kind] = _latency_histogram()
+            histogram.record(seconds)
+        spans = _current_spans.get()
+        if spans is not None:
+            spans.setdefault(kind, []).append(seconds)
+
+    @contextmanager
+    def span(self, kind: str):
+        """Time a block as upstream work of `kind` ("llm", "fetch", "db", ...)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_upstream(kind, time.perf_counter() - started)
+
+    # ── Reporting ─────────────────────────────────────────────────
+
+    def summary(self, limit: int = 50) -> Dict[str, Any]:
+        with self._lock:
+            routes = sorted(self.routes.items(), key=lambda item: -item[1].latency.sum)[:limit]
+            total = sum(stats.latency.count for stats in self.routes.values())
+            errors = sum(stats.errors for stats in self.routes.values())
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "requests": total,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "routes": [
+                    {
+                        "method": method,
+                        "route": route,
+                        "latency_ms": stats.latency.summary(scale=1000),
+                        "errors": stats.errors,
+                        "statuses": dict(stats.statuses),
+                        "request_bytes_mean": round(stats.request_bytes.sum / stats.request_bytes.count)
+                        if stats.request_bytes.count else 0,
+                        "response_bytes_mean": round(stats.response_bytes.sum / stats.response_bytes.count)
+                        if stats.response_bytes.count else 0,
+                        "upstream_ms_per_request": {
+                            kind: round(totals["seconds"] * 1000 / stats.latency.count, 1)
+                            for kind, totals in stats.upstream.items()
+                        }
+                    }
+                    for (method, route), stats in routes
+                ],
+                "upstream_ms": {kind: histogram.summary(scale=1000) for kind, histogram in self.upstream.items()}
+            }
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being handled",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+        ]
+
+        def histogram(name: str, labels: str, data: LogLinearHistogram):
+            for bound, cumulative in data.export_buckets():
+                lines.append(f'{name}_bucket{{{labels},le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {data.count}')
+            lines.append(f"{name}_sum{{{labels}}} {data.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {data.count}")
+
+        with self._lock:
+            routes = list(self.routes.items())
+            upstream = list(self.upstream.items())
+
+            lines += ["# HELP http_request_duration_seconds Request latency by route",
+                      "# TYPE http_request_duration_seconds histogram"]
+            for (method, route), stats in routes:
+                histogram("http_request_duration_seconds", f'method="{method}",route="{route}"', stats.latency)
+
+            lines += ["# HELP http_requests_total Requests by route and status",
+                      "# TYPE http_requests_total counter"]
+            for (method, route), stats in routes:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+            for metric, attribute, help_text in (
+                ("http_request_size_bytes", "request_bytes", "Request body size by route"),
+                ("http_response_size_bytes", "response_bytes", "Response body size by route"),
+            ):
+                lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+                for (method, route), stats in routes:
+                    histogram(metric, f'method="{method}",route="{route}"', getattr(stats, attribute))
+
+            lines += ["# HELP http_request_upstream_seconds_total Upstream time spent by route and kind",
+                      "# TYPE http_request_upstream_seconds_total counter"]
+            for (method, route), stats in routes:
+                for kind, totals in stats.upstream.items():
+                    lines.append(
+                        f'http_request_upstream_seconds_total{{method="{method}",route="{route}",kind="{kind}"}} '
+                        f'{totals["seconds"]:.6f}'
+                    )
+
+            lines += ["# HELP upstream_call_duration_seconds Upstream call latency by kind",
+                      "# TYPE upstream_call_duration_seconds histogram"]
+            for kind, data in upstream:
+                histogram("upstream_call_duration_seconds", f'kind="{kind}"', data)
+
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware feeding `RequestMetrics`.
+
+    Routes are labelled by their path template (e.g. /api/tabs/{tab_id}), so
+    cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics = None, exclude: Tuple[str, ...] = ("/metrics",)):
+        self.app = app
+        self.metrics = metrics or request_metrics
+        self.exclude = exclude
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        state = {"status": 500, "request_bytes": 0, "response_bytes": 0}
+        spans: Dict[str, List[float]] = {}
+        token = _current_spans.set(spans)
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                state["request_bytes"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                state["response_bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        self.metrics.request_started()
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            _current_spans.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.metrics.request_finished(
+                scope["method"], route, state["status"], time.perf_counter() - started,
+                state["request_bytes"], state["response_bytes"], spans
+            )
+
+
+# ── Upstream instrumentation ──────────────────────────────────────
+
+_instrumented = set()
+
+
+def instrument_httpx(metrics: "RequestMetrics" = None):
+    """Time every httpx request, sync or async, as an "llm" or "fetch" span.
+
+    The async Groq client and the shared page fetcher send through
+    httpx.AsyncClient; the sync Groq client, which ModelRouter runs in a
+    worker thread, sends through httpx.Client. asyncio.to_thread copies the
+    request's context, so those calls are attributed to the request too.
+    Streamed responses are timed until their headers arrive.
+    """
+    if "httpx" in _instrumented:
+        return
+    try:
+        import httpx
+    except ImportError:
+        return
+    metrics = metrics or request_metrics
+    original_async_send = httpx.AsyncClient.send
+    original_send = httpx.Client.send
+
+    def kind_of(request) -> str:
+        return "llm" if request.url.host in LLM_HOSTS else "fetch"
+
+    async def async_send(self, request, *args, **kwargs):
+        with metrics.span(kind_of(request)):
+            return await original_async_send(self, request, *args, **kwargs)
+
+    def send(self, request, *args, **kwargs):
+        with metrics.span(kind_of(request)):
+            return original_send(self, request, *args, **kwargs)
+
+    httpx.AsyncClient.send = async_send
+    httpx.Client.send = send
+    _instrumented.add("httpx")
+
+
+def instrument_pymongo(metrics: "RequestMetrics" = None):
+    """Record MongoDB command durations as "db" spans via pymongo's command monitoring.
+
+    Must run before the client is created. Motor runs commands on its own
+    threads, so these land in the per-kind histogram rather than in a request.
+    """
+    if "pymongo" in _instrumented:
+        return
+    try:
+        from pymongo import monitoring
+    except ImportError:
+        return
+    metrics = metrics or request_metrics
+
+    class CommandTimer(monitoring.CommandListener):
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            metrics.observe_upstream("db", event.duration_micros / 1_000_000)
+
+        def failed(self, event):
+            metrics.observe_upstream("db", event.duration_micros / 1_000_000)
+
+    monitoring.register(CommandTimer())
+    _instrumented.add("pymongo")
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,202 @@
+"""
+Search result cache shared by deep search and research services
+Two-tier (memory LRU + SQLite) cache with per-entry TTL and stale-while-revalidate
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Words that do not change what a search is about
+QUERY_STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "for", "to", "in", "on", "at", "by", "with",
+    "about", "is", "are", "what", "how", "best", "me", "find", "search", "show"
+}
+
+_NON_WORD = re.compile(r"[^\w\s#+.-]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query so near-identical phrasings share a cache key.
+
+    Lowercases, strips punctuation and drops stopwords, keeping the order
+    of the remaining terms: "Best Python async libraries?" and
+    "python async libraries" normalize to the same string, while
+    "paris to london" and "london to paris" stay distinct.
+    """
+    text = _WHITESPACE.sub(" ", _NON_WORD.sub(" ", (query or "").lower())).strip()
+    terms = [term.strip(".-") for term in text.split(" ")]
+    return " ".join(term for term in terms if term and term not in QUERY_STOPWORDS) or text
+
+
+class SearchCache:
+    """Memory LRU in front of an on-disk SQLite tier.
+
+    Entries are fresh for `ttl` seconds and then served as stale for a further
+    `ttl * stale_ratio` seconds, which lets callers answer immediately while
+    refreshing in the background. Both tiers are size bounded. The disk tier
+    keeps one WAL-mode connection behind a lock and is only touched from
+    worker threads, so a memory miss never blocks the event loop.
+    """
+
+    FRESH = "fresh"
+    STALE = "stale"
+
+    def __init__(self, db_path: str = "data/search_cache.db", max_entries: int = 1000,
+                 max_disk_entries: int = 20000, stale_ratio: float = 1.0):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.stale_ratio = stale_ratio
+        self.entries = OrderedDict()
+        self.stats = {"hits": 0, "stale_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._writes_since_prune = 0
+        self.conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._init_database()
+
+    def _init_database(self):
+        """Initialize SQLite table for the on-disk tier"""
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    namespace TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    ttl REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_search_cache_stored_at ON search_cache(stored_at)")
+            conn.commit()
+            self.conn = conn
+        except Exception as e:
+            print(f"⚠️ Search cache disk tier unavailable: {e}")
+            self.db_path = None
+
+    @staticmethod
+    def make_key(namespace: str, query: str, *parts: str) -> str:
+        """Build a cache key from the normalized query and extra key parts"""
+        raw = "\x1f".join([namespace, normalize_query(query), *[str(part) for part in parts]])
+        return f"{namespace}:{hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()}"
+
+    def _state(self, stored_at: float, ttl: float, now: float) -> Optional[str]:
+        age = now - stored_at
+        if age <= ttl:
+            return self.FRESH
+        if age <= ttl * (1 + self.stale_ratio):
+            return self.STALE
+        return None
+
+    async def get(self, key: str) -> Tuple[Any, Optional[str]]:
+        """Return (value, state) where state is "fresh", "stale" or None on a miss"""
+        entry = self.entries.get(key)
+        if entry is None and self.conn is not None:
+            entry = await asyncio.to_thread(self._load_from_disk, key)
+            if entry is not None:
+                self.stats["disk_hits"] += 1
+                self._remember(key, entry)
+
+        if entry is not None:
+            state = self._state(entry["stored_at"], entry["ttl"], time.time())
+            if state is not None:
+                self.entries.move_to_end(key)
+                self.stats["hits" if state == self.FRESH else "stale_hits"] += 1
+                return entry["value"], state
+            await self.delete(key)
+
+        self.stats["misses"] += 1
+        return None, None
+
+    async def set(self, key: str, value: Any, ttl: float, namespace: str = "default"):
+        """Store a value in both tiers"""
+        entry = {"value": value, "stored_at": time.time(), "ttl": ttl}
+        self._remember(key, entry)
+        if self.conn is not None:
+            await asyncio.to_thread(self._save_to_disk, key, namespace, entry)
+
+    async def delete(self, key: str):
+        self.entries.pop(key, None)
+        if self.conn is not None:
+            await asyncio.to_thread(self._delete_from_disk, key)
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # ── Disk tier (worker threads) ────────────────────────────────
+
+    def _load_from_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with self._lock:
+                row = self.conn.execute(
+                    "SELECT value, stored_at, ttl FROM search_cache WHERE cache_key = ?", (key,)
+                ).fetchone()
+            if row:
+                return {"value": json.loads(row[0]), "stored_at": row[1], "ttl": row[2]}
+        except Exception:
+            pass
+        return None
+
+    def _save_to_disk(self, key: str, namespace: str, entry: Dict[str, Any]):
+        try:
+            value = json.dumps(entry["value"], default=str)
+            with self._lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (cache_key, namespace, value, stored_at, ttl) VALUES (?, ?, ?, ?, ?)",
+                    (key, namespace, value, entry["stored_at"], entry["ttl"])
+                )
+                self._writes_since_prune += 1
+                if self._writes_since_prune >= 100:
+                    self._prune_disk()
+                    self._writes_since_prune = 0
+                self.conn.commit()
+        except Exception as e:
+            print(f"⚠️ Search cache write failed: {e}")
+
+    def _delete_from_disk(self, key: str):
+        try:
+            with self._lock:
+                self.conn.execute("DELETE FROM search_cache WHERE cache_key = ?", (key,))
+                self.conn.commit()
+        except Exception:
+            pass
+
+    def _prune_disk(self):
+        """Drop expired rows, then the oldest rows beyond max_disk_entries (caller holds the lock)"""
+        self.conn.execute(
+            "DELETE FROM search_cache WHERE stored_at + ttl * ? < ?",
+            (1 + self.stale_ratio, time.time())
+        )
+        self.conn.execute("""
+            DELETE FROM search_cache WHERE cache_key IN (
+                SELECT cache_key FROM search_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_disk_entries,))
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "memory_entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "disk_tier": self.conn is not None,
+            "hit_rate": (self.stats["hits"] + self.stats["stale_hits"]) / lookups if lookups else 0.0
+        }
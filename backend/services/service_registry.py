@@ -0,0 +1,349 @@
+"""
+Service Registry
+Application-scoped container of lazily imported, shared service singletons,
+with startup warmup, shutdown drain and import/construction timings
+"""
+
+import asyncio
+import importlib
+import inspect
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Union
+
+from database.connection import get_database
+
+# name -> "module.path:attribute". A class attribute is instantiated, a plain
+# function is called as a factory, anything else (a module-level singleton)
+# is used as is.
+SERVICE_TABLE: Dict[str, str] = {
+    # Shared infrastructure (listed before its dependents: shutdown runs in reverse)
+    "loop_monitor": "services.loop_monitor:loop_monitor",
+    "system_metrics_sampler": "services.system_metrics_sampler:system_metrics_sampler",
+    "behavior_event_store": "services.behavior_event_store:behavior_event_store",
+    "next_action_model": "services.next_action_model:next_action_model",
+    "behavior_pattern_miner": "services.behavior_pattern_miner:behavior_pattern_miner",
+    "page_fetcher": "services.page_fetcher:page_fetcher",
+    "speculative_prefetcher": "services.speculative_prefetcher:speculative_prefetcher",
+    "knowledge_graph_store": "services.knowledge_graph_store:knowledge_graph_store",
+    "embedding_index": "services.embedding_index:embedding_index",
+    "model_router": "services.model_router:model_router",
+    "auth": "services.auth_service:AuthService",
+
+    # Hybrid browser
+    "deep_action": "services.deep_action_technology_service:DeepActionTechnologyService",
+    "agentic_memory": "services.agentic_memory_service:AgenticMemoryService",
+    "deep_search": "services.deep_search_integration_service:DeepSearchIntegrationService",
+    "virtual_workspace": "services.virtual_workspace_service:VirtualWorkspaceService",
+    "browser_engine_foundation": "services.browser_engine_foundation_service:BrowserEngineFoundationService",
+    "electron": "services.electron_service:ElectronService",
+    "workspace": "services.workspace_service:WorkspaceService",
+    "engine": "services.engine_service:EngineService",
+    "os_integration": "services.os_integration_service:OSIntegrationService",
+    "memory": "services.memory_service:MemoryService",
+    "search": "services.search_service:SearchService",
+
+    # Browser
+    "browser_engine": "services.browser_engine_service:BrowserEngineService",
+    "real_browser": "services.real_browser_engine_service:real_browser_service",
+    "enhanced_real_browser": "services.enhanced_real_browser_service:enhanced_real_browser_service",
+    "session_manager": "services.session_manager:SessionManager",
+    "advanced_tab_navigation": "services.advanced_tab_navigation_service:advanced_tab_navigation_service",
+    "cross_site_intelligence": "services.cross_site_intelligence_service:CrossSiteIntelligenceService",
+    "app_simplicity": "services.app_simplicity_service:AppSimplicityService",
+    "ui_enhancement": "services.ui_enhancement_service:UIEnhancementService",
+    "performance": "services.performance_service:performance_service",
+
+    # AI
+    "ai_orchestrator": "services.ai_orchestrator:AIOrchestratorService",
+    "enhanced_ai_orchestrator": "services.enhanced_ai_orchestrator:EnhancedAIOrchestratorService",
+    "enhanced_hybrid_ai": "services.enhanced_hybrid_ai_orchestrator:EnhancedHybridAIOrchestratorService",
+    "advanced_hybrid_ai": "services.advanced_hybrid_orchestrator:AdvancedHybridOrchestrator",
+    "content_analyzer": "services.content_analyzer:ContentAnalyzerService",
+    "intelligent_orchestrator": "services.intelligent_feature_orchestrator:intelligent_orchestrator",
+
+    # Automation
+    "web_automation": "services.web_automation:WebAutomationService",
+    "advanced_web_automation": "services.advanced_web_automation:AdvancedWebAutomationService",
+    "template_automation": "services.template_automation_service:TemplateAutomationService",
+    "voice_actions": "services.voice_actions_service:VoiceActionsService",
+
+    # Enhanced features
+    "advanced_navigation": "services.advanced_navigation_service:AdvancedNavigationService",
+    "smart_productivity": "services.smart_productivity_service:SmartProductivityService",
+    "performance_optimization": "services.performance_optimization_service:PerformanceOptimizationService",
+    "advanced_ai_interface": "services.advanced_ai_interface_service:AdvancedAIInterfaceService",
+    "enhanced_performance": "services.enhanced_performance_service:EnhancedPerformanceService",
+    "mobile_optimization": "services.mobile_optimization_service:MobileOptimizationService",
+    "enhanced_reliability": "services.enhanced_reliability_service:enhanced_reliability_service",
+
+    # Phase capabilities
+    "edge_computing": "services.edge_computing_service:EdgeComputingService",
+    "emerging_tech": "services.emerging_tech_service:EmergingTechService",
+    "ecosystem": "services.ecosystem_integration_service:EcosystemIntegrationService",
+    "modular_ai": "services.modular_ai_service:ModularAIService",
+    "global_intelligence": "services.global_intelligence_service:GlobalIntelligenceService",
+
+    # Parallel enhancement services (backend root modules)
+    "hybrid_browser": "hybrid_browser_service:HybridBrowserService",
+    "enhanced_features": "enhanced_features_service:EnhancedFeaturesService",
+    "deployment_optimization": "deployment_optimization_service:DeploymentOptimizationService",
+    "enhanced_comprehensive_features": "enhanced_comprehensive_features_service:EnhancedComprehensiveFeaturesService",
+}
+
+# Services constructed with the Mongo database handle
+DATABASE_SERVICES = {"ecosystem", "modular_ai", "global_intelligence"}
+
+# Built during application startup so first requests don't pay for them;
+# override with a comma-separated SERVICE_WARMUP
+WARMUP_SERVICES = ("auth", "performance", "enhanced_ai_orchestrator", "browser_engine")
+
+# Lifecycle methods, in order of preference
+START_HOOKS = ("start",)
+SHUTDOWN_HOOKS = ("stop", "shutdown", "cleanup", "close", "aclose")
+
+
+class LazyService:
+    """Module-level stand-in that resolves its service on first attribute access"""
+
+    __slots__ = ("_registry", "_name")
+
+    def __init__(self, registry: "ServiceRegistry", name: str):
+        object.__setattr__(self, "_registry", registry)
+        object.__setattr__(self, "_name", name)
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._registry.get(self._name), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self._registry.get(self._name), attr, value)
+
+    def __repr__(self) -> str:
+        state = "ready" if self._name in self._registry.instances else "pending"
+        return f"<LazyService {self._name} ({state})>"
+
+
+class ServiceRegistry:
+    """Construct each registered service once, on first use, and share it.
+
+    Routers hold `lazy(name)` proxies or depend on `provider(name)`, and
+    services that depend on other services resolve them with `get(name)`, so
+    each service exists once per process. Module import and construction
+    times are recorded for every service and for modules loaded through
+    `timed_import`. The application lifespan calls `startup()` to warm
+    services and `shutdown()` to drain them in reverse creation order.
+    """
+
+    def __init__(self, table: Dict[str, Union[str, Callable]] = None, database_services: Iterable[str] = (),
+                 warmup: Iterable[str] = (), shutdown_timeout: float = 10.0):
+        self.table: Dict[str, Union[str, Callable]] = dict(table or {})
+        self.database_services = set(database_services)
+        self.warmup = list(warmup)
+        self.shutdown_timeout = shutdown_timeout
+        self.instances: Dict[str, Any] = {}  # insertion order is creation order
+        self.services: Dict[str, Dict[str, Any]] = {}  # name -> timings
+        self.imports: Dict[str, Dict[str, Any]] = {}   # module -> timings
+        self.started_at = time.time()
+        self._lock = threading.RLock()
+
+    def register(self, name: str, target: Union[str, Callable], needs_database: bool = False):
+        """Register "module.path:attribute" or a factory under `name`"""
+        self.table[name] = target
+        if needs_database:
+            self.database_services.add(name)
+
+    # ── Imports ───────────────────────────────────────────────────
+
+    def timed_import(self, module_path: str):
+        """Import a module, recording how long a first import took"""
+        module = sys.modules.get(module_path)
+        if module is not None:
+            return module
+        started = time.perf_counter()
+        try:
+            module = importlib.import_module(module_path)
+        except Exception as e:
+            self.imports[module_path] = {
+                "import_ms": round((time.perf_counter() - started) * 1000, 1),
+                "ok": False,
+                "error": str(e)
+            }
+            raise
+        self.imports[module_path] = {"import_ms": round((time.perf_counter() - started) * 1000, 1), "ok": True}
+        return module
+
+    def _resolve(self, name: str) -> Any:
+        target = self.table.get(name)
+        if target is None:
+            raise KeyError(f"Unknown service: {name}")
+        if not isinstance(target, str):
+            return target
+        module_path, attribute = target.split(":")
+        return getattr(self.timed_import(module_path), attribute)
+
+    # ── Construction ──────────────────────────────────────────────
+
+    def _build(self, name: str, database: Any = None) -> Any:
+        with self._lock:
+            instance = self.instances.get(name)
+            if instance is not None:
+                return instance
+
+            started = time.perf_counter()
+            try:
+                target = self._resolve(name)
+                imported = time.perf_counter()
+                if isinstance(target, type) or inspect.isfunction(target):
+                    instance = target(database) if name in self.database_services else target()
+                else:
+                    instance = target
+            except Exception as e:
+                self.services[name] = {"ok": False, "error": str(e)}
+                print(f"⚠️ Service {name} failed to initialize: {e}")
+                raise
+            finished = time.perf_counter()
+
+            self.instances[name] = instance
+            self.services[name] = {
+                "ok": True,
+                "import_ms": round((imported - started) * 1000, 1),
+                "init_ms": round((finished - imported) * 1000, 1),
+                "created_at": time.time()
+            }
+            return instance
+
+    def get(self, name: str) -> Any:
+        """Shared instance of a service, building it on first use"""
+        instance = self.instances.get(name)
+        if instance is not None:
+            return instance
+        if name in self.database_services:
+            raise RuntimeError(f"Service {name} needs the database; resolve it with aget()")
+        return self._build(name)
+
+    async def aget(self, name: str) -> Any:
+        """Like get(), also for services constructed with the database handle"""
+        instance = self.instances.get(name)
+        if instance is not None:
+            return instance
+        database = None
+        if name in self.database_services:
+            database = await get_database()
+            if database is None:
+                # Don't pin a service to a missing connection
+                raise RuntimeError(f"Service {name} needs the database, which is not connected")
+        return self._build(name, database)
+
+    def lazy(self, name: str) -> LazyService:
+        """Proxy for module-level service names in routers"""
+        if name not in self.table:
+            raise KeyError(f"Unknown service: {name}")
+        return LazyService(self, name)
+
+    def provider(self, name: str) -> Callable:
+        """FastAPI dependency returning the shared instance"""
+        if name not in self.table:
+            raise KeyError(f"Unknown service: {name}")
+
+        async def dependency():
+            return await self.aget(name)
+
+        dependency.__name__ = f"get_{name}_service"
+        return dependency
+
+    # ── Lifecycle ─────────────────────────────────────────────────
+
+    def _adopt_loaded(self):
+        """Track module-level singletons that were imported directly rather than via get()"""
+        for name, target in self.table.items():
+            if name in self.instances or not isinstance(target, str):
+                continue
+            module_path, attribute = target.split(":")
+            module = sys.modules.get(module_path)
+            value = getattr(module, attribute, None) if module is not None else None
+            if value is not None and not isinstance(value, type) and not inspect.isfunction(value):
+                with self._lock:
+                    self.instances.setdefault(name, value)
+                    self.services.setdefault(name, {"ok": True, "adopted": True, "created_at": time.time()})
+
+    @staticmethod
+    def _hook(instance: Any, names: Iterable[str]) -> Optional[Callable]:
+        for hook_name in names:
+            hook = getattr(type(instance), hook_name, None)
+            if callable(hook):
+                return getattr(instance, hook_name)
+        return None
+
+    async def _run_hook(self, name: str, hook: Callable) -> Optional[str]:
+        try:
+            result = hook()
+            if inspect.isawaitable(result):
+                await asyncio.wait_for(result, self.shutdown_timeout)
+            return None
+        except Exception as e:
+            print(f"⚠️ Service {name} {hook.__name__}() failed: {e}")
+            return str(e)
+
+    async def startup(self) -> Dict[str, Any]:
+        """Build the warmup services and start background work of loaded services"""
+        started = time.perf_counter()
+        failed = []
+        for name in self.warmup:
+            try:
+                await self.aget(name)
+            except Exception:
+                failed.append(name)
+
+        self._adopt_loaded()
+        for name, instance in list(self.instances.items()):
+            hook = self._hook(instance, START_HOOKS)
+            if hook is not None:
+                await self._run_hook(name, hook)
+
+        elapsed = round((time.perf_counter() - started) * 1000, 1)
+        print(f"✅ Services warmed: {len(self.instances)} ready, {len(failed)} failed ({elapsed}ms)")
+        return {"ready": len(self.instances), "failed": failed, "elapsed_ms": elapsed}
+
+    async def shutdown(self) -> Dict[str, Any]:
+        """Stop/close every created service, most recently created first"""
+        self._adopt_loaded()
+        drained, errors = [], {}
+        for name, instance in reversed(list(self.instances.items())):
+            hook = self._hook(instance, SHUTDOWN_HOOKS)
+            if hook is None:
+                continue
+            error = await self._run_hook(name, hook)
+            if error:
+                errors[name] = error
+            else:
+                drained.append(name)
+        with self._lock:
+            self.instances.clear()
+        print(f"✅ Services drained: {len(drained)} stopped, {len(errors)} failed")
+        return {"drained": drained, "errors": errors}
+
+    # ── Reporting ─────────────────────────────────────────────────
+
+    def get_report(self) -> Dict[str, Any]:
+        imports = sorted(self.imports.items(), key=lambda item: -item[1]["import_ms"])
+        services = sorted(
+            self.services.items(),
+            key=lambda item: -(item[1].get("import_ms", 0) + item[1].get("init_ms", 0))
+        )
+        return {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "modules": {module: timing for module, timing in imports},
+            "total_import_ms": round(sum(timing["import_ms"] for _, timing in imports), 1),
+            "services": {name: timing for name, timing in services},
+            "services_initialized": len(self.instances),
+            "services_pending": sorted(name for name in self.table if name not in self.instances)
+        }
+
+
+service_registry = ServiceRegistry(
+    SERVICE_TABLE,
+    DATABASE_SERVICES,
+    warmup=[name.strip() for name in os.getenv("SERVICE_WARMUP", ",".join(WARMUP_SERVICES)).split(",") if name.strip()]
+)
@@ -1,5 +1,6 @@
 from typing import List, Optional
-from models.session import BrowserSession, TabState, TabCreate, SessionUpdate
+from pymongo import UpdateOne
+from models.session import BrowserSession, TabState, TabCreate, SessionUpdate, TabPositionUpdate
 from datetime import datetime
 
 class SessionManager:
@@ -55,9 +56,16 @@ class SessionManager:
 
     async def get_session_tabs(self, session_id: str, user_id: str, db):
         """Get all tabs in a session"""
-        session = await self.get_session(session_id, user_id, db)
-        if session:
-            return session.tabs
+        session_data = await db.sessions.find_one(
+            {
+                "id": session_id,
+                "user_id": user_id,
+                "is_active": True
+            },
+            {"tabs": 1, "_id": 0}
+        )
+        if session_data:
+            return [TabState(**tab) for tab in session_data.get("tabs", [])]
         return []
 
     async def update_tab_position(self, tab_id: str, x: float, y: float, user_id: str, db):
@@ -78,10 +86,38 @@ class SessionManager:
         )
         return {"success": True}
 
+    async def update_tab_positions(self, positions: List[TabPositionUpdate], user_id: str, db):
+        """Update many tab positions in one round trip (bubble tab drags)"""
+        if not positions:
+            return {"success": True, "updated": 0}
+
+        now = datetime.utcnow()
+        # Only the last position per tab matters when a drag batches several moves
+        latest = {position.tab_id: position for position in positions}
+        operations = [
+            UpdateOne(
+                {
+                    "user_id": user_id,
+                    "tabs.id": position.tab_id
+                },
+                {
+                    "$set": {
+                        "tabs.$.position_x": position.x,
+                        "tabs.$.position_y": position.y,
+                        "tabs.$.updated_at": now,
+                        "updated_at": now
+                    }
+                }
+            )
+            for position in latest.values()
+        ]
+        result = await db.sessions.bulk_write(operations, ordered=False)
+        return {"success": True, "updated": result.modified_count}
+
     async def close_tab(self, tab_id: str, user_id: str, db):
         """Close a tab"""
         await db.sessions.update_one(
-            {"user_id": user_id},
+            {"user_id": user_id, "tabs.id": tab_id},
             {
                 "$pull": {"tabs": {"id": tab_id}},
                 "$set": {"updated_at": datetime.utcnow()}
@@ -0,0 +1,147 @@
+"""
+Multi-Source Pipeline
+Concurrent fetching, passage chunking and ranking, and bounded map-reduce for
+features that reason over many pages at once (knowledge graphs, source
+comparison)
+"""
+
+import asyncio
+import math
+import re
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from services.page_fetcher import page_fetcher
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*")
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can for from has have how if in into is it its not of on or our "
+    "so than that the their them then there these they this to was we were what when which who will "
+    "with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1 and token not in STOPWORDS]
+
+
+def chunk_text(text: str, size: int = 1200, overlap: int = 1) -> List[str]:
+    """Passages of about `size` chars cut on sentence boundaries, each repeating
+    the previous passage's last `overlap` sentences for context"""
+    sentences = []
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        sentences.extend(sentence[start:start + size] for start in range(0, len(sentence), size))
+
+    passages, current, length = [], [], 0
+    for sentence in sentences:
+        if current and length + len(sentence) > size:
+            passages.append(" ".join(current))
+            current = current[-overlap:] if overlap else []
+            length = sum(len(kept) + 1 for kept in current)
+        current.append(sentence)
+        length += len(sentence) + 1
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def rank_passages(passages: List[str], query: str, k1: float = 1.5, b: float = 0.75) -> List[Tuple[float, int]]:
+    """BM25 score of every passage against `query`, best first as (score, index)"""
+    query_terms = set(tokenize(query))
+    documents = [Counter(tokenize(passage)) for passage in passages]
+    if not documents:
+        return []
+    lengths = [sum(document.values()) for document in documents]
+    average_length = (sum(lengths) / len(lengths)) or 1
+    frequency = Counter(term for document in documents for term in query_terms if term in document)
+
+    scores = []
+    for index, document in enumerate(documents):
+        score = 0.0
+        for term in query_terms:
+            count = document.get(term, 0)
+            if count:
+                idf = math.log(1 + (len(documents) - frequency[term] + 0.5) / (frequency[term] + 0.5))
+                score += idf * count * (k1 + 1) / (count + k1 * (1 - b + b * lengths[index] / average_length))
+        scores.append((score, index))
+    return sorted(scores, key=lambda item: (-item[0], item[1]))
+
+
+def select_passages(text: str, query: str, budget: int = 2400, size: int = 600) -> str:
+    """The passages most relevant to `query` that fit `budget` chars, in document order.
+    Without any query match the lead of the document is used"""
+    passages = chunk_text(text, size=size)
+    chosen, used = [], 0
+    for score, index in rank_passages(passages, query):
+        if used + len(passages[index]) > budget:
+            continue
+        chosen.append(index)
+        used += len(passages[index]) + 5
+    return "\n...\n".join(passages[index] for index in sorted(chosen))
+
+
+class SourcePipeline:
+    """Fetch many sources concurrently and fan per-source work out in bounded batches.
+
+    Fetches run `fetch_concurrency` at a time through the shared page fetcher
+    (pooled client, page cache, coalesced duplicates). `map_reduce` runs one
+    mapper per item, `map_concurrency` at a time so LLM rate limits hold,
+    and hands every successful result to the reducer in input order.
+    """
+
+    def __init__(self, fetch_concurrency: int = 8, map_concurrency: int = 4, max_chars: int = 60000):
+        self.fetch_concurrency = fetch_concurrency
+        self.map_concurrency = map_concurrency
+        self.max_chars = max_chars
+        self.stats = {"sources_fetched": 0, "sources_failed": 0, "map_calls": 0, "map_failures": 0}
+
+    async def _fetch_one(self, url: str) -> str:
+        text = await page_fetcher.fetch_text(url, mode="main", max_chars=self.max_chars)
+        if len(text) < 200:
+            # Pages without a recognisable main container: fall back to the whole body
+            text = await page_fetcher.fetch_text(url, mode="full", max_chars=self.max_chars)
+        return text
+
+    async def fetch_sources(self, urls: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]]]:
+        """(fetched sources as {"url", "text"}, failures as {"url", "error"}), both in input order"""
+        semaphore = asyncio.Semaphore(self.fetch_concurrency)
+
+        async def fetch(url: str):
+            async with semaphore:
+                try:
+                    text = await self._fetch_one(url)
+                    return {"url": url, "text": text} if text else {"url": url, "error": "No content extracted"}
+                except Exception as e:
+                    return {"url": url, "error": str(e)}
+
+        results = await asyncio.gather(*(fetch(url) for url in dict.fromkeys(urls)))
+        sources = [result for result in results if "text" in result]
+        failed = [result for result in results if "error" in result]
+        self.stats["sources_fetched"] += len(sources)
+        self.stats["sources_failed"] += len(failed)
+        return sources, failed
+
+    async def map_reduce(self, items: List[Any], mapper: Callable[[Any], Awaitable[Any]],
+                         reducer: Callable[[List[Any]], Awaitable[Any]] = None) -> Any:
+        """Run `mapper` over `items` with bounded concurrency; failed or empty results are dropped"""
+        semaphore = asyncio.Semaphore(self.map_concurrency)
+
+        async def run(item):
+            async with semaphore:
+                self.stats["map_calls"] += 1
+                try:
+                    return await mapper(item)
+                except Exception as e:
+                    self.stats["map_failures"] += 1
+                    print(f"⚠️ Source pipeline map step failed: {e}")
+                    return None
+
+        mapped = [result for result in await asyncio.gather(*(run(item) for item in items)) if result]
+        return await reducer(mapped) if reducer else mapped
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+
+source_pipeline = SourcePipeline()
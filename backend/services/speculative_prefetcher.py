@@ -0,0 +1,214 @@
+"""
+Speculative Prefetcher
+Fetch predicted next pages into the shared page cache under a bandwidth and
+concurrency budget, and learn per-domain hit rates to calibrate predictions
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+from urllib.parse import urlparse
+
+from services.page_fetcher import FetchedPage, PageFetcher, page_fetcher
+from services.token_bucket import TokenBucket
+
+
+class SpeculativePrefetcher:
+    """Turn (url, probability) predictions into warm cache entries.
+
+    Candidates below `min_probability` (after calibration) or already cached
+    are skipped. Downloads run `max_concurrency` at a time and draw from a byte
+    token bucket refilled at `bandwidth_bytes_per_sec`; a prefetch that would
+    have to wait for bandwidth is dropped rather than queued, since a late
+    prefetch is worthless. Each prefetched page is later counted as a hit
+    (served to a real request) or wasted (evicted or expired unused), and
+    `calibrate()` scales future probabilities by the domain's observed hit
+    rate.
+    """
+
+    def __init__(self, fetcher: PageFetcher = None, max_concurrency: int = 4,
+                 bandwidth_bytes_per_sec: float = 2 * 1024 * 1024, burst_bytes: float = 8 * 1024 * 1024,
+                 min_probability: float = 0.3, max_candidates: int = 8, prior_hit_rate: float = 0.5):
+        self.fetcher = fetcher or page_fetcher
+        self.max_concurrency = max_concurrency
+        self.bandwidth = TokenBucket(bandwidth_bytes_per_sec, burst_bytes)
+        self.min_probability = min_probability
+        self.max_candidates = max_candidates
+        self.prior_hit_rate = prior_hit_rate
+        self.expected_page_bytes = 256 * 1024  # running estimate, refined per fetch
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.outstanding: Dict[str, Dict[str, Any]] = {}  # url -> {domain, probability, source, at}
+        self.domain_stats: Dict[str, Dict[str, int]] = {}
+        self.source_stats: Dict[str, Dict[str, int]] = {}
+        self.warmers: List[Callable[[FetchedPage], Awaitable[Any]]] = []
+        self.stats = {"requested": 0, "prefetched": 0, "skipped_cached": 0, "skipped_probability": 0,
+                      "skipped_bandwidth": 0, "failed": 0, "hits": 0, "wasted": 0, "bytes": 0}
+
+        self.fetcher.add_hit_listener(self._on_hit)
+        self.fetcher.cache.on_evict = self._on_evict
+
+    # ── Feedback ──────────────────────────────────────────────────
+
+    @staticmethod
+    def _domain(url: str) -> str:
+        return urlparse(url).netloc.lower()
+
+    def _record(self, domain: str, source: str, outcome: str):
+        for table, key in ((self.domain_stats, domain), (self.source_stats, source)):
+            counts = table.setdefault(key, {"issued": 0, "hits": 0, "wasted": 0})
+            counts[outcome] += 1
+
+    def _on_hit(self, page: FetchedPage):
+        entry = self.outstanding.pop(page.url, None)
+        if entry is not None:
+            self.stats["hits"] += 1
+            self._record(entry["domain"], entry["source"], "hits")
+
+    def _on_evict(self, page: FetchedPage):
+        entry = self.outstanding.pop(page.url, None)
+        if entry is not None and not page.hits:
+            self.stats["wasted"] += 1
+            self._record(entry["domain"], entry["source"], "wasted")
+
+    def _expire_outstanding(self):
+        ttl = self.fetcher.cache.ttl
+        now = time.time()
+        for url, entry in list(self.outstanding.items()):
+            if now - entry["at"] > ttl:
+                del self.outstanding[url]
+                self.stats["wasted"] += 1
+                self._record(entry["domain"], entry["source"], "wasted")
+
+    def hit_rate(self, domain: str = None, source: str = None) -> float:
+        """Smoothed hit rate (prior-weighted) for a domain, a source, or overall"""
+        if domain is not None:
+            counts = self.domain_stats.get(domain, {})
+        elif source is not None:
+            counts = self.source_stats.get(source, {})
+        else:
+            counts = {"hits": self.stats["hits"], "wasted": self.stats["wasted"]}
+        hits, wasted = counts.get("hits", 0), counts.get("wasted", 0)
+        return (hits + 2 * self.prior_hit_rate) / (hits + wasted + 2)
+
+    def calibrate(self, url: str, probability: float) -> float:
+        """Scale a predicted probability by how often this domain's prefetches were used"""
+        return round(min(0.99, probability * self.hit_rate(domain=self._domain(url)) / self.prior_hit_rate), 3)
+
+    def add_warmer(self, callback: Callable[[FetchedPage], Awaitable[Any]]):
+        """Register an async callback(page) run after each successful prefetch"""
+        if callback not in self.warmers:
+            self.warmers.append(callback)
+
+    # ── Prefetch ──────────────────────────────────────────────────
+
+    async def prefetch(self, predictions: List[Dict[str, Any]], source: str = "default",
+                       extract_text: bool = True, warm: bool = True, calibrated: bool = False) -> Dict[str, Any]:
+        """Prefetch predicted URLs.
+
+        `predictions` are dicts with `url` (or `predicted_url`) and `probability`.
+        Pass `calibrated=True` when the probabilities already went through
+        `calibrate()` so they are not discounted a second time.
+        Returns per-URL outcomes in the order they were considered.
+        """
+        self._expire_outstanding()
+        candidates = []
+        details = []
+        for prediction in predictions:
+            url = prediction.get("url") or prediction.get("predicted_url")
+            if not url or not url.startswith(("http://", "https://")):
+                continue
+            self.stats["requested"] += 1
+            probability = float(prediction.get("probability", 0.0))
+            if not calibrated:
+                probability = self.calibrate(url, probability)
+            if probability < self.min_probability:
+                self.stats["skipped_probability"] += 1
+                details.append({"url": url, "status": "skipped", "reason": "low_probability", "probability": probability})
+            elif self.fetcher.cache.peek(url) is not None or url in self.fetcher.inflight:
+                self.stats["skipped_cached"] += 1
+                details.append({"url": url, "status": "cached", "probability": probability})
+            else:
+                candidates.append((probability, url))
+
+        candidates.sort(reverse=True)
+        dropped = candidates[self.max_candidates:]
+        for probability, url in dropped:
+            details.append({"url": url, "status": "skipped", "reason": "candidate_limit", "probability": probability})
+
+        results = await asyncio.gather(*(
+            self._prefetch_one(url, probability, source, extract_text, warm)
+            for probability, url in candidates[:self.max_candidates]
+        ))
+        details.extend(results)
+
+        return {
+            "attempted": len(results),
+            "successful": sum(1 for result in results if result["status"] == "success"),
+            "failed": sum(1 for result in results if result["status"] == "failed"),
+            "skipped": sum(1 for detail in details if detail["status"] in ("skipped", "cached")),
+            "details": details
+        }
+
+    async def _prefetch_one(self, url: str, probability: float, source: str,
+                            extract_text: bool, warm: bool) -> Dict[str, Any]:
+        async with self.semaphore:
+            # Never queue behind the bandwidth budget: a late prefetch is wasted bandwidth
+            if self.bandwidth.wait_time(self.expected_page_bytes) > 0:
+                self.stats["skipped_bandwidth"] += 1
+                return {"url": url, "status": "skipped", "reason": "bandwidth_budget", "probability": probability}
+            self.bandwidth.consume(self.expected_page_bytes)
+
+            started = time.perf_counter()
+            try:
+                page = await self.fetcher.fetch(url, prefetch=True)
+            except Exception as e:
+                self.bandwidth.consume(-self.expected_page_bytes)
+                self.stats["failed"] += 1
+                return {"url": url, "status": "failed", "error": str(e), "probability": probability}
+
+            # Settle the budget against the real size and refine the estimate
+            self.bandwidth.consume(len(page.html) - self.expected_page_bytes)
+            self.expected_page_bytes = int(0.8 * self.expected_page_bytes + 0.2 * max(len(page.html), 1024))
+            self.stats["prefetched"] += 1
+            self.stats["bytes"] += len(page.html)
+            if page.prefetched and not page.hits:
+                self.outstanding[url] = {"domain": self._domain(url), "probability": probability,
+                                         "source": source, "at": time.time()}
+                self._record(self._domain(url), source, "issued")
+
+            if extract_text:
+                await self.fetcher.fetch_text(url, prefetch=True)
+            if warm:
+                for warmer in self.warmers:
+                    try:
+                        await warmer(page)
+                    except Exception as e:
+                        print(f"⚠️ Prefetch warmer failed for {url}: {e}")
+
+            return {
+                "url": url,
+                "status": "success",
+                "probability": probability,
+                "bytes": len(page.html),
+                "fetch_ms": round((time.perf_counter() - started) * 1000, 1),
+                "cache_key": url
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "hit_rate": round(self.hit_rate(), 3),
+            "outstanding": len(self.outstanding),
+            "bandwidth_available_bytes": int(self.bandwidth.available()),
+            "expected_page_bytes": self.expected_page_bytes,
+            "domains": {
+                domain: {**counts, "hit_rate": round(self.hit_rate(domain=domain), 3)}
+                for domain, counts in sorted(self.domain_stats.items(), key=lambda item: -item[1]["issued"])[:20]
+            },
+            "sources": {source: {**counts, "hit_rate": round(self.hit_rate(source=source), 3)}
+                        for source, counts in self.source_stats.items()},
+            "page_cache": self.fetcher.cache.get_stats()
+        }
+
+
+speculative_prefetcher = SpeculativePrefetcher()
@@ -0,0 +1,543 @@
+"""
+Structured Data Extractor
+Deterministic extraction of contacts, prices, events, products and articles:
+schema.org JSON-LD and microdata from the raw HTML first, then precompiled,
+locale-aware patterns over the page text. The LLM only fills what this misses
+"""
+
+import html as html_lib
+import json
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+DETERMINISTIC_TYPES = ("contacts", "prices", "events", "products", "articles")
+MAX_ITEMS = 50
+
+# ── Patterns ──────────────────────────────────────────────────────
+
+JSON_LD_PATTERN = re.compile(r'<script[^>]+type\s*=\s*["\']?application/ld\+json["\']?[^>]*>(.*?)</script>', re.I | re.S)
+LANG_PATTERN = re.compile(r'<html[^>]*?\blang\s*=\s*["\']?([A-Za-z]{2,3}(?:[-_][A-Za-z]{2,4})?)', re.I)
+OG_LOCALE_PATTERN = re.compile(r'<meta[^>]+property\s*=\s*["\']og:locale["\'][^>]+content\s*=\s*["\']([A-Za-z_-]+)', re.I)
+MAILTO_PATTERN = re.compile(r'<a[^>]+href\s*=\s*["\']mailto:([^"\'?]+)[^"\']*["\'][^>]*>(.*?)</a>', re.I | re.S)
+TEL_PATTERN = re.compile(r'href\s*=\s*["\']tel:([^"\']+)["\']', re.I)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,24}\b')
+NOT_EMAIL_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".css", ".js")
+YEAR_PATTERN = re.compile(r"(?:19|20)\d{2}")
+PHONE_PATTERN = re.compile(r'(?<![\w+/.,-])(\+\d{1,3}[\s.-]?)?(\(\d{1,5}\)[\s.-]?)?\d{2,5}(?:[\s.-]\d{2,5}){1,4}(?![\w/.,-]?\d)')
+
+CURRENCY_SYMBOLS = {
+    "US$": "USD", "C$": "CAD", "A$": "AUD", "NZ$": "NZD", "HK$": "HKD", "R$": "BRL", "$": "USD",
+    "€": "EUR", "£": "GBP", "¥": "JPY", "₹": "INR", "₩": "KRW", "₽": "RUB", "₺": "TRY", "₪": "ILS",
+    "zł": "PLN", "kr": "SEK"
+}
+CURRENCY_CODES = (
+    "USD", "EUR", "GBP", "JPY", "CNY", "INR", "CAD", "AUD", "NZD", "CHF", "SEK", "NOK", "DKK",
+    "PLN", "BRL", "MXN", "KRW", "RUB", "TRY", "ZAR", "HKD", "SGD", "ILS"
+)
+# Locale-dependent readings of ambiguous symbols: region for "$", language for "¥" and "kr"
+DOLLAR_BY_REGION = {"CA": "CAD", "AU": "AUD", "NZ": "NZD", "HK": "HKD", "SG": "SGD", "MX": "MXN"}
+SYMBOL_BY_LANGUAGE = {("¥", "zh"): "CNY", ("kr", "nb"): "NOK", ("kr", "no"): "NOK", ("kr", "nn"): "NOK", ("kr", "da"): "DKK"}
+
+_SYMBOL_ALTERNATIVES = "|".join(
+    (r"\b" if symbol[0].isalpha() else "") + re.escape(symbol) + (r"\b" if symbol[-1].isalpha() else "")
+    for symbol in sorted(CURRENCY_SYMBOLS, key=len, reverse=True)
+)
+_CURRENCY = rf"{_SYMBOL_ALTERNATIVES}|\b(?:{'|'.join(CURRENCY_CODES)})\b"
+# Grouped thousands (comma, dot, apostrophe or no-break spaces) or a plain run of digits, optional cents
+_AMOUNT = r"(?:\d{1,3}(?:[,.'\u00a0\u202f]\d{3})+(?:[.,]\d{1,2})?|\d+(?:[.,]\d{1,2})?)(?![\d])"
+PRICE_PATTERN = re.compile(
+    rf"(?P<pre>{_CURRENCY})\s?(?P<amount>{_AMOUNT})"
+    rf"|(?<![\d.,])(?P<amount_after>{_AMOUNT})\s?(?P<post>{_CURRENCY})"
+)
+RECURRING_PATTERN = re.compile(
+    r"^\s*(?:/\s*|(?:per|par|pro|por|al|a|each|every|billed|im)\s+)?"
+    r"(?:mo|mon|month|monthly|yr|year|yearly|annum|annually|week|weekly|wk|day|daily|"
+    r"monat|monatlich|jahr|jährlich|mois|mensuel|année|mes|mensual|año|anual)\b",
+    re.I
+)
+ITEM_BOUNDARY_PATTERN = re.compile(r"[.!?|•·;]\s")
+# Label/price separators within an item: "Basic – $9", "Pro plan: $9", "Plans: Pro $9"
+ITEM_SEPARATOR_PATTERN = re.compile(r"\s[-–—]\s|:\s")
+
+MONTH_NAMES = {
+    "en": ("january", "february", "march", "april", "may", "june", "july", "august",
+           "september", "october", "november", "december"),
+    "de": ("januar", "februar", "märz", "april", "mai", "juni", "juli", "august",
+           "september", "oktober", "november", "dezember"),
+    "fr": ("janvier", "février", "mars", "avril", "mai", "juin", "juillet", "août",
+           "septembre", "octobre", "novembre", "décembre"),
+    "es": ("enero", "febrero", "marzo", "abril", "mayo", "junio", "julio", "agosto",
+           "septiembre", "octubre", "noviembre", "diciembre")
+}
+MONTHS = {name: index + 1 for names in MONTH_NAMES.values() for index, name in enumerate(names)}
+MONTHS.update({name[:3]: index + 1 for index, name in enumerate(MONTH_NAMES["en"])})
+MONTHS["sept"] = 9
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+
+ISO_DATE_PATTERN = re.compile(r"\b(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})(?:[T ](?P<hour>\d{2}):(?P<minute>\d{2}))?\b")
+MONTH_FIRST_PATTERN = re.compile(rf"\b(?P<month_name>{_MONTH})\.?\s+(?P<day>\d{{1,2}})(?:st|nd|rd|th)?,?\s+(?P<year>\d{{4}})\b", re.I)
+DAY_FIRST_PATTERN = re.compile(rf"\b(?P<day>\d{{1,2}})(?:st|nd|rd|th|\.|er)?\s+(?:de\s+)?(?P<month_name>{_MONTH})\.?,?\s+(?:de\s+)?(?P<year>\d{{4}})\b", re.I)
+NUMERIC_DATE_PATTERN = re.compile(r"\b(?P<first>\d{1,2})(?P<separator>[/.])(?P<second>\d{1,2})(?P=separator)(?P<year>\d{4})\b")
+DATE_PATTERNS = (ISO_DATE_PATTERN, MONTH_FIRST_PATTERN, DAY_FIRST_PATTERN, NUMERIC_DATE_PATTERN)
+TIME_PATTERN = re.compile(r"^\s*(?:,|at|@|um|à|a las|from)?\s*(?P<hour>\d{1,2})[:h](?P<minute>\d{2})\s*(?P<meridiem>[ap]\.?m\.?)?", re.I)
+MONTH_DAY_FIRST_REGIONS = {"US", "PH", "FM", "MH", "PW"}
+
+EVENT_KEYWORD_PATTERN = re.compile(
+    r"\b(?:conference|summit|webinar|workshop|meetup|meet-up|concert|festival|exhibition|expo|seminar|"
+    r"hackathon|keynote|lecture|ceremony|gala|tournament|premiere|launch event|"
+    r"konferenz|veranstaltung|messe|vortrag|konzert|conférence|événement|salon|atelier|"
+    r"conferencia|evento|taller|concierto|feria)\b",
+    re.I
+)
+SENTENCE_PATTERN = re.compile(r"(?<=[^\d\s][.!?])\s+(?=[A-Z0-9])|\s[|•]\s")
+LOCATION_PATTERN = re.compile(r"\b(?:at|in|venue:?|location:?|im|à|au|en)\s+((?:[A-Z][\w&'.-]*(?:,?\s+|$)){1,6})")
+
+ARTICLE_TYPES = {"Article", "NewsArticle", "BlogPosting", "TechArticle", "ScholarlyArticle", "Report", "LiveBlogPosting"}
+PRODUCT_TYPES = {"Product", "ProductGroup", "IndividualProduct", "ProductModel"}
+OFFER_TYPES = {"Offer", "AggregateOffer"}
+RECURRING_UNITS = {"MON", "ANN", "WEE", "DAY", "month", "year", "week", "day"}
+
+
+# ── Helpers ───────────────────────────────────────────────────────
+
+def detect_locale(html: str) -> Tuple[str, str]:
+    """(language, region) from <html lang> or og:locale, lower/upper-cased; empty when unknown"""
+    match = LANG_PATTERN.search(html[:4096]) or OG_LOCALE_PATTERN.search(html[:16384])
+    if not match:
+        return "", ""
+    language, _, region = match.group(1).replace("_", "-").partition("-")
+    return language.lower(), region.upper()
+
+
+def parse_amount(raw: str) -> Optional[float]:
+    """Numeric value of a price string in any common grouping convention.
+
+    Apostrophes and no-break spaces always group thousands. With both "," and
+    "." present the later one is the decimal separator; with only one, it is
+    a decimal separator when followed by one or two digits and a thousands
+    separator when followed by three (1,299 / 1.299 / 12,50 / 12.50).
+    """
+    value = raw.replace("'", "").replace("\u00a0", "").replace("\u202f", "")
+    if "," in value and "." in value:
+        decimal = "," if value.rfind(",") > value.rfind(".") else "."
+    elif "," in value or "." in value:
+        separator = "," if "," in value else "."
+        decimal = separator if value.count(separator) == 1 and len(value.rpartition(separator)[2]) <= 2 else None
+    else:
+        decimal = None
+    grouping = {",", "."} - {decimal}
+    for separator in grouping:
+        value = value.replace(separator, "")
+    if decimal:
+        value = value.replace(decimal, ".")
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _format_amount(amount: float) -> str:
+    return f"{amount:.2f}".rstrip("0").rstrip(".") if amount != int(amount) else str(int(amount))
+
+
+def _clean(value: Any, limit: int = 300) -> str:
+    if value is None:
+        return ""
+    text = html_lib.unescape(TAG_PATTERN.sub(" ", str(value)))
+    return " ".join(text.split())[:limit]
+
+
+def _types(node: Dict[str, Any]) -> set:
+    value = node.get("@type") or []
+    values = value if isinstance(value, list) else [value]
+    return {str(item).rsplit("/", 1)[-1] for item in values}
+
+
+def _first(value: Any) -> Any:
+    return value[0] if isinstance(value, list) and value else value
+
+
+def _name(value: Any) -> str:
+    """Display name of a schema.org value that may be text, a node or a list of either"""
+    if isinstance(value, list):
+        return ", ".join(filter(None, (_name(item) for item in value[:5])))
+    if isinstance(value, dict):
+        return _clean(value.get("name") or value.get("@value") or "")
+    return _clean(value)
+
+
+def _address(value: Any) -> str:
+    value = _first(value)
+    if isinstance(value, dict):
+        parts = (value.get(key) for key in ("streetAddress", "addressLocality", "addressRegion", "addressCountry"))
+        return ", ".join(filter(None, (_name(part) for part in parts)))
+    return _clean(value)
+
+
+def _walk(node: Any, parent: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Every schema.org node in a JSON-LD/microdata tree with its enclosing node"""
+    if isinstance(node, list):
+        for item in node:
+            yield from _walk(item, parent)
+    elif isinstance(node, dict):
+        if "@graph" in node:
+            yield from _walk(node["@graph"], parent)
+        yield node, parent
+        for key, value in node.items():
+            if key != "@graph" and isinstance(value, (dict, list)):
+                yield from _walk(value, node)
+
+
+def _dedupe(items: List[Dict[str, Any]], key) -> List[Dict[str, Any]]:
+    seen, unique = set(), []
+    for item in items:
+        identity = key(item)
+        if identity and identity in seen:
+            continue
+        seen.add(identity)
+        unique.append(item)
+    return unique[:MAX_ITEMS]
+
+
+def _contact_key(item: Dict[str, Any]) -> str:
+    return (item.get("email") or "").lower() or re.sub(r"\D", "", item.get("phone") or "") or (item.get("name") or "").lower()
+
+
+def _price_key(item: Dict[str, Any]) -> Tuple[str, str]:
+    return (item.get("item") or "").lower(), re.sub(r"[^\d]", "", str(item.get("price") or ""))
+
+
+def _event_key(item: Dict[str, Any]) -> Tuple[str, str]:
+    return (item.get("name") or "").lower()[:40], str(item.get("date") or "")[:10]
+
+
+MERGE_KEYS = {
+    "contacts": _contact_key,
+    "prices": _price_key,
+    "events": _event_key,
+    "products": lambda item: (item.get("name") or "").lower(),
+    "articles": lambda item: (item.get("title") or "").lower()
+}
+
+
+# ── Engine ────────────────────────────────────────────────────────
+
+class StructuredDataExtractor:
+    """Deterministic first pass for ContentAnalyzerService.extract_structured_data.
+
+    `extract` returns, per requested type, the items found and whether they
+    are `complete` enough to skip the LLM. Structured markup (JSON-LD,
+    microdata) is trusted as is; text patterns are complete unless they
+    produced nothing or a date whose day/month order the page locale cannot
+    settle, in which case the LLM fills or disambiguates and `merge` combines
+    both answers.
+    """
+
+    def extract(self, text: str, html: str, kinds: List[str]) -> Dict[str, Dict[str, Any]]:
+        html = html or ""
+        locale = detect_locale(html)
+        nodes = list(_walk(self._json_ld(html) + self._microdata(html)))
+
+        found = {}
+        for kind in kinds:
+            if kind not in DETERMINISTIC_TYPES:
+                continue
+            structured = getattr(self, f"_structured_{kind}")(nodes)
+            matched, ambiguous = self._text_items(kind, text, html, locale) if kind in ("contacts", "prices", "events") else ([], False)
+            items = _dedupe(structured + matched, MERGE_KEYS[kind])
+            found[kind] = {
+                "items": items,
+                "complete": bool(structured) or (bool(items) and not ambiguous),
+                "ambiguous": ambiguous,
+                "sources": sorted({item.get("source", "pattern") for item in items})
+            }
+        return found
+
+    def merge(self, kind: str, found: Dict[str, Any], llm_items: Any) -> List[Dict[str, Any]]:
+        """Combine deterministic items with the LLM's.
+
+        When the LLM was asked to disambiguate, its answer replaces the
+        pattern candidates; structured-markup items are always kept.
+        """
+        llm_items = [item for item in llm_items if isinstance(item, dict)] if isinstance(llm_items, list) else []
+        items = found["items"]
+        if found.get("ambiguous") and llm_items:
+            items = [item for item in items if item.get("source") != "pattern"]
+        return _dedupe(items + llm_items, MERGE_KEYS[kind])
+
+    # ── Structured markup ─────────────────────────────────────────
+
+    def _json_ld(self, html: str) -> List[Any]:
+        documents = []
+        for match in JSON_LD_PATTERN.finditer(html):
+            raw = match.group(1).strip().removeprefix("<!--").removesuffix("-->").strip()
+            try:
+                documents.append(json.loads(raw))
+            except json.JSONDecodeError:
+                continue
+        return documents
+
+    def _microdata(self, html: str) -> List[Dict[str, Any]]:
+        if "itemscope" not in html:
+            return []
+        soup = BeautifulSoup(html, "html.parser")
+        return [self._microdata_item(element) for element in soup.find_all(attrs={"itemscope": True})
+                if not element.has_attr("itemprop")]
+
+    def _microdata_item(self, element) -> Dict[str, Any]:
+        item = {"@type": [kind.rsplit("/", 1)[-1] for kind in (element.get("itemtype") or "").split()], "@microdata": True}
+        for prop in element.find_all(attrs={"itemprop": True}):
+            # A property belongs to its nearest enclosing item
+            if prop.find_parent(attrs={"itemscope": True}) is not element:
+                continue
+            if prop.has_attr("itemscope"):
+                value = self._microdata_item(prop)
+            else:
+                value = (prop.get("content") or prop.get("datetime")
+                         or (prop.get("href") if prop.name in ("a", "link") else None)
+                         or (prop.get("src") if prop.name in ("img", "audio", "video", "source") else None)
+                         or prop.get_text(" ", strip=True))
+            for name in str(prop.get("itemprop")).split():
+                existing = item.get(name)
+                item[name] = value if existing is None else (existing + [value] if isinstance(existing, list) else [existing, value])
+        return item
+
+    def _source(self, node: Dict[str, Any]) -> str:
+        return "microdata" if node.get("@microdata") else "json-ld"
+
+    def _structured_contacts(self, nodes) -> List[Dict[str, Any]]:
+        contacts = []
+        for node, parent in nodes:
+            email, phone = _name(_first(node.get("email"))), _name(_first(node.get("telephone")))
+            if not email and not phone:
+                continue
+            contacts.append({
+                "name": _name(node.get("name")) or (_name(parent.get("name")) if parent else ""),
+                "email": email.removeprefix("mailto:"),
+                "phone": phone.removeprefix("tel:"),
+                "role": _name(node.get("jobTitle") or node.get("contactType")),
+                "source": self._source(node)
+            })
+        return contacts
+
+    def _structured_events(self, nodes) -> List[Dict[str, Any]]:
+        events = []
+        for node, _ in nodes:
+            if not any(kind.endswith("Event") for kind in _types(node)):
+                continue
+            location = _first(node.get("location"))
+            if isinstance(location, dict):
+                place = ", ".join(filter(None, (_name(location.get("name")), _address(location.get("address")))))
+                location = place or _clean(location.get("url")) or ("Online" if "VirtualLocation" in _types(location) else "")
+            events.append({
+                "name": _name(node.get("name")),
+                "date": _clean(_first(node.get("startDate"))),
+                "location": _clean(location),
+                "description": _clean(node.get("description")),
+                "source": self._source(node)
+            })
+        return [event for event in events if event["name"] or event["date"]]
+
+    def _structured_prices(self, nodes) -> List[Dict[str, Any]]:
+        prices = []
+        for node, parent in nodes:
+            if not (_types(node) & OFFER_TYPES or ("price" in node and "priceCurrency" in node)):
+                continue
+            price = _first(node.get("price") if node.get("price") is not None else node.get("lowPrice"))
+            specification = _first(node.get("priceSpecification")) or {}
+            if price in (None, "") and isinstance(specification, dict):
+                price = specification.get("price")
+            if price in (None, ""):
+                continue
+            unit = specification.get("billingDuration") or specification.get("unitCode") or specification.get("unitText") \
+                if isinstance(specification, dict) else None
+            prices.append({
+                "item": _name(node.get("name")) or _name(node.get("itemOffered")) or (_name(parent.get("name")) if parent else ""),
+                "price": _clean(price),
+                "currency": _clean(node.get("priceCurrency") or (specification.get("priceCurrency") if isinstance(specification, dict) else "")),
+                "type": "recurring" if unit and (str(unit).startswith("P") or str(unit) in RECURRING_UNITS) else "one-time",
+                "source": self._source(node)
+            })
+        return prices
+
+    def _structured_products(self, nodes) -> List[Dict[str, Any]]:
+        products = []
+        for node, _ in nodes:
+            if not _types(node) & PRODUCT_TYPES:
+                continue
+            offer = _first(node.get("offers")) or {}
+            price = ""
+            if isinstance(offer, dict):
+                amount = offer.get("price") or offer.get("lowPrice")
+                price = " ".join(filter(None, (_clean(amount), _clean(offer.get("priceCurrency"))))) if amount not in (None, "") else ""
+            products.append({
+                "name": _name(node.get("name")),
+                "price": price,
+                "description": _clean(node.get("description"), 200),
+                "category": _name(node.get("category")),
+                "source": self._source(node)
+            })
+        return [product for product in products if product["name"]]
+
+    def _structured_articles(self, nodes) -> List[Dict[str, Any]]:
+        articles = []
+        for node, _ in nodes:
+            if not _types(node) & ARTICLE_TYPES:
+                continue
+            articles.append({
+                "title": _name(node.get("headline") or node.get("name")),
+                "author": _name(node.get("author")),
+                "date": _clean(_first(node.get("datePublished") or node.get("dateCreated"))),
+                "summary": _clean(node.get("description") or node.get("abstract"), 300),
+                "source": self._source(node)
+            })
+        return [article for article in articles if article["title"]]
+
+    # ── Text patterns ─────────────────────────────────────────────
+
+    def _text_items(self, kind: str, text: str, html: str, locale: Tuple[str, str]) -> Tuple[List[Dict[str, Any]], bool]:
+        if kind == "contacts":
+            return self._text_contacts(text, html), False
+        if kind == "prices":
+            return self._text_prices(text, locale), False
+        return self._text_events(text, locale)
+
+    def _text_contacts(self, text: str, html: str) -> List[Dict[str, Any]]:
+        contacts = []
+        for match in MAILTO_PATTERN.finditer(html):
+            email = html_lib.unescape(match.group(1)).strip()
+            label = _clean(match.group(2), 80)
+            contacts.append({"name": "" if "@" in label else label, "email": email, "phone": "", "role": "", "source": "pattern"})
+        for match in TEL_PATTERN.finditer(html):
+            contacts.append({"name": "", "email": "", "phone": html_lib.unescape(match.group(1)).strip(), "role": "", "source": "pattern"})
+
+        emails = [(match.start(), match.group(0)) for match in EMAIL_PATTERN.finditer(text)
+                  if not match.group(0).lower().endswith(NOT_EMAIL_SUFFIXES)]
+        phones = [(match.start(), match.group(0).strip()) for match in PHONE_PATTERN.finditer(text)
+                  if self._is_phone(match.group(0))]
+        # A phone number within a short distance of an email is treated as the same contact
+        paired = set()
+        for position, email in emails:
+            phone = next((number for start, number in phones if abs(start - position) < 120 and number not in paired), "")
+            paired.add(phone)
+            contacts.append({"name": "", "email": email, "phone": phone, "role": "", "source": "pattern"})
+        contacts.extend({"name": "", "email": "", "phone": number, "role": "", "source": "pattern"}
+                        for _, number in phones if number not in paired)
+        return contacts
+
+    def _is_phone(self, candidate: str) -> bool:
+        candidate = candidate.strip()
+        digits = sum(character.isdigit() for character in candidate)
+        if any(pattern.fullmatch(candidate) for pattern in (ISO_DATE_PATTERN, NUMERIC_DATE_PATTERN)):
+            return False
+        if all(YEAR_PATTERN.fullmatch(group) for group in re.split(r"[\s.-]+", candidate)):
+            return False
+        return 9 <= digits <= 15 or (7 <= digits <= 8 and candidate[0] in "+(")
+
+    def _text_prices(self, text: str, locale: Tuple[str, str]) -> List[Dict[str, Any]]:
+        prices = []
+        for match in PRICE_PATTERN.finditer(text):
+            raw = match.group("amount") or match.group("amount_after")
+            amount = parse_amount(raw)
+            if amount is None:
+                continue
+            # Label: the words just before the amount within its sentence, or before the colon
+            # that introduces it ("Pro plan: $9" / "Team plan: 29 EUR per month")
+            preceding = ITEM_BOUNDARY_PATTERN.split(text[max(0, match.start() - 80):match.start()])[-1]
+            label = next((part for part in reversed(ITEM_SEPARATOR_PATTERN.split(preceding)) if part.strip()), "")
+            prices.append({
+                "item": " ".join(label.split()[-6:]).strip(" -–:,("),
+                "price": _format_amount(amount),
+                "currency": self._currency(match.group("pre") or match.group("post"), locale),
+                "type": "recurring" if RECURRING_PATTERN.match(text[match.end():match.end() + 30]) else "one-time",
+                "source": "pattern"
+            })
+        return prices
+
+    def _currency(self, marker: str, locale: Tuple[str, str]) -> str:
+        language, region = locale
+        if marker in CURRENCY_CODES:
+            return marker
+        if marker == "$" and region in DOLLAR_BY_REGION:
+            return DOLLAR_BY_REGION[region]
+        return SYMBOL_BY_LANGUAGE.get((marker, language), CURRENCY_SYMBOLS.get(marker, marker))
+
+    def _parse_date(self, match: re.Match, locale: Tuple[str, str]) -> Tuple[Optional[str], bool]:
+        """ISO date for a date match and whether its day/month order was a guess"""
+        groups = match.groupdict()
+        ambiguous = False
+        if "first" in groups:
+            first, second = int(groups["first"]), int(groups["second"])
+            language, region = locale
+            if first > 12 or second > 12:
+                day, month = (first, second) if first > 12 else (second, first)
+            elif first == second:
+                day = month = first
+            elif region:
+                month, day = (first, second) if region in MONTH_DAY_FIRST_REGIONS else (second, first)
+            elif language not in ("", "en"):
+                day, month = first, second
+            else:
+                # Unqualified "en" or no locale: guess US order for slashes, but let the LLM settle it
+                month, day = (first, second) if groups["separator"] == "/" else (second, first)
+                ambiguous = True
+        else:
+            month = MONTHS[groups["month_name"].lower()] if groups.get("month_name") else int(groups["month"])
+            day = int(groups["day"])
+        try:
+            date = datetime(int(groups["year"]), month, day)
+        except ValueError:
+            return None, False
+
+        hour, minute = groups.get("hour"), groups.get("minute")
+        if hour is None:
+            time_match = TIME_PATTERN.match(match.string[match.end():match.end() + 24])
+            if time_match:
+                hour, minute = time_match.group("hour"), time_match.group("minute")
+                meridiem = (time_match.group("meridiem") or "").lower()
+                if meridiem.startswith("p") and int(hour) < 12:
+                    hour = str(int(hour) + 12)
+                elif meridiem.startswith("a") and int(hour) == 12:
+                    hour = "0"
+        if hour is not None and int(hour) < 24 and int(minute) < 60:
+            date = date.replace(hour=int(hour), minute=int(minute))
+            return date.isoformat(timespec="minutes"), ambiguous
+        return date.date().isoformat(), ambiguous
+
+    def _text_events(self, text: str, locale: Tuple[str, str]) -> Tuple[List[Dict[str, Any]], bool]:
+        events, any_ambiguous = [], False
+        for sentence in SENTENCE_PATTERN.split(text):
+            if len(events) >= MAX_ITEMS:
+                break
+            if not EVENT_KEYWORD_PATTERN.search(sentence):
+                continue
+            date_match = next(filter(None, (pattern.search(sentence) for pattern in DATE_PATTERNS)), None)
+            if not date_match:
+                continue
+            date, ambiguous = self._parse_date(date_match, locale)
+            if not date:
+                continue
+            any_ambiguous = any_ambiguous or ambiguous
+            location = ""
+            for location_match in LOCATION_PATTERN.finditer(sentence):
+                words = location_match.group(1).strip(" ,.").split()
+                if words and words[0].lower().strip(".,") not in MONTHS:
+                    location = " ".join(words)
+                    break
+            sentence = " ".join(sentence.split())
+            events.append({
+                "name": sentence[:120],
+                "date": date,
+                "location": location,
+                "description": sentence[:300],
+                "source": "pattern"
+            })
+        return events, any_ambiguous
+
+
+structured_extractor = StructuredDataExtractor()
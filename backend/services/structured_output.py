@@ -0,0 +1,403 @@
+"""
+Structured Output
+JSON-mode completions with tolerant parsing: prose-wrapped, fenced or
+truncated model output is repaired instead of discarded, streamed responses
+yield each top-level field as soon as it closes, and fields still missing or
+malformed after the first call are re-requested on their own
+"""
+
+import json
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from services.model_router import ModelRouter, RouteDecision, model_router
+
+# A field spec is {"schema": <JSON shape shown to the model>, "type": <python
+# type the value must parse to>, "max_tokens": <output budget on its own>}
+FieldSpecs = Dict[str, Dict[str, Any]]
+
+_PARTIAL_ESCAPE = re.compile(r"\\u[0-9a-fA-F]{0,3}$")
+_TRAILING_STRING = re.compile(r'"(?:[^"\\]|\\.)*"$')
+
+
+class IncrementalJSONParser:
+    """Single-pass scanner over streamed JSON text.
+
+    Skips anything before the root value (prose, code fences), yields each
+    member of a root object (or item of a root array) as soon as it closes,
+    drops trailing commas, and on truncated input closes whatever is still
+    open: a partial string value is terminated, a dangling key or partial
+    literal is cut, and open containers are closed. `expect` restricts the
+    root to an object (dict) or an array (list).
+    """
+
+    def __init__(self, expect: type = None):
+        self.expect = expect
+        self.text = ""
+        self.pos = 0
+        self.start = -1
+        self.end = -1
+        self.stack: List[str] = []
+        # Per open container: what comes next ("key", "colon", "value", "next")
+        # and the position of a comma not yet followed by a value
+        self.states: List[str] = []
+        self.commas: List[int] = []
+        self.in_string = False
+        self.escaped = False
+        self.string_is_key = False
+        self.key_start = -1
+        self.token_start = -1
+        self.member_start = -1
+        self.member_key: Optional[str] = None
+        self.dropped: List[int] = []
+        self.members: List[Tuple[Any, Any]] = []
+        self.malformed = 0
+
+    @property
+    def truncated(self) -> bool:
+        return self.start >= 0 and self.end < 0
+
+    @property
+    def partial_key(self) -> Optional[str]:
+        """Root-object key whose value was still being written when the text ended"""
+        if not self.truncated or (len(self.stack) == 1 and self.states[0] == "next"):
+            return None
+        return self.member_key
+
+    def _slice(self, start: int, end: int) -> str:
+        parts, last = [], start
+        for position in self.dropped:
+            if start <= position < end:
+                parts.append(self.text[last:position])
+                last = position + 1
+        parts.append(self.text[last:end])
+        return "".join(parts)
+
+    def _value_done(self):
+        self.states[-1] = "next"
+        self.commas[-1] = -1
+
+    def _member_done(self, end: int) -> Optional[Tuple[Any, Any]]:
+        segment = self._slice(self.member_start, end).strip()
+        self.member_key = None
+        if not segment:
+            return None
+        try:
+            if self.stack[0] == "{":
+                member = next(iter(json.loads("{" + segment + "}").items()))
+            else:
+                member = (len(self.members), json.loads(segment))
+        except (ValueError, StopIteration):
+            self.malformed += 1
+            return None
+        self.members.append(member)
+        return member
+
+    def feed(self, chunk: str) -> List[Tuple[Any, Any]]:
+        """Scan `chunk`; returns the root members completed by it as (key or index, value)"""
+        self.text += chunk
+        text, completed = self.text, []
+        i = self.pos
+        while i < len(text) and self.end < 0:
+            c = text[i]
+            if self.start < 0:
+                if (c == "{" and self.expect is not list) or (c == "[" and self.expect is not dict):
+                    self.start, self.member_start = i, i + 1
+                    self.stack.append(c)
+                    self.states.append("key" if c == "{" else "value")
+                    self.commas.append(-1)
+                i += 1
+                continue
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif c == "\\":
+                    self.escaped = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.string_is_key:
+                        self.states[-1] = "colon"
+                        if len(self.stack) == 1:
+                            try:
+                                self.member_key = json.loads(text[self.key_start:i + 1])
+                            except ValueError:
+                                self.member_key = None
+                    else:
+                        self._value_done()
+                i += 1
+                continue
+
+            if self.token_start >= 0 and (c.isspace() or c in ",:]}"):
+                self.token_start = -1
+                self._value_done()
+
+            if c == '"':
+                self.in_string = True
+                self.string_is_key = self.stack[-1] == "{" and self.states[-1] == "key"
+                if self.string_is_key:
+                    self.key_start = i
+            elif c in "{[":
+                self.stack.append(c)
+                self.states.append("key" if c == "{" else "value")
+                self.commas.append(-1)
+            elif c in "}]":
+                if self.commas[-1] >= 0:
+                    self.dropped.append(self.commas[-1])
+                if len(self.stack) == 1:
+                    member = self._member_done(i)
+                    if member is not None:
+                        completed.append(member)
+                self.stack.pop()
+                self.states.pop()
+                self.commas.pop()
+                if self.stack:
+                    self._value_done()
+                else:
+                    self.end = i + 1
+            elif c == ":":
+                self.states[-1] = "value"
+            elif c == ",":
+                if len(self.stack) == 1:
+                    member = self._member_done(i)
+                    if member is not None:
+                        completed.append(member)
+                    self.member_start = i + 1
+                self.states[-1] = "key" if self.stack[-1] == "{" else "value"
+                self.commas[-1] = i
+            elif not c.isspace() and self.token_start < 0:
+                self.token_start = i
+            i += 1
+        self.pos = i
+        return completed
+
+    def _from_members(self) -> Any:
+        if self.text[self.start] == "[":
+            return [value for _, value in self.members]
+        return dict(self.members)
+
+    def _repair(self) -> Optional[str]:
+        """Close a truncated document at the scan position"""
+        cut, suffix = self.pos, ""
+        if self.in_string and self.string_is_key:
+            cut = self.key_start
+        elif self.in_string:
+            suffix = '"'
+        elif self.token_start >= 0:
+            cut = self.token_start
+        elif self.states[-1] == "colon":
+            cut = self.key_start
+
+        body = self._slice(self.start, cut)
+        if suffix:
+            body = (body[:-1] if self.escaped else _PARTIAL_ESCAPE.sub("", body)) + suffix
+        else:
+            body = body.rstrip()
+            while body.endswith((",", ":")):
+                if body.endswith(":"):
+                    body = _TRAILING_STRING.sub("", body[:-1].rstrip())
+                body = body.rstrip(",").rstrip()
+        return body + "".join("}" if opener == "{" else "]" for opener in reversed(self.stack))
+
+    def result(self) -> Any:
+        """The parsed root value, or None if no root was found.
+
+        A truncated object is closed in place; a truncated array keeps only
+        the items that closed, since a cut-off record is rarely usable.
+        """
+        if self.start < 0:
+            return None
+        try:
+            if self.end >= 0:
+                return json.loads(self._slice(self.start, self.end))
+            if self.text[self.start] == "[":
+                return self._from_members()
+            return json.loads(self._repair())
+        except ValueError:
+            # Fall back to the root members that closed cleanly
+            return self._from_members()
+
+
+def parse_json(text: str, expect: type = None) -> Any:
+    """Parse model output as JSON, repairing it where possible; None when nothing is recoverable"""
+    text = text or ""
+    try:
+        value = json.loads(text)
+        if isinstance(value, expect or (dict, list)):
+            return value
+    except ValueError:
+        pass
+    parser = IncrementalJSONParser(expect)
+    parser.feed(text)
+    return parser.result()
+
+
+def load_json(text: str, expect: type = None) -> Any:
+    """Drop-in for json.loads on model output: repairs what it can and raises JSONDecodeError otherwise"""
+    value = parse_json(text, expect)
+    if value is None:
+        raise json.JSONDecodeError("No recoverable JSON value in model output", text or "", 0)
+    return value
+
+
+def schema_block(fields: FieldSpecs) -> str:
+    """The JSON object shape for `fields`, as shown in prompts"""
+    return "{\n" + ",\n".join(f'  "{name}": {spec["schema"]}' for name, spec in fields.items()) + "\n}"
+
+
+def _valid(value: Any, spec: Dict[str, Any]) -> bool:
+    return isinstance(value, spec.get("type", object))
+
+
+def _failed_generation(error: Exception) -> Optional[str]:
+    """Text the API rejected in JSON mode (GROQ returns it with json_validate_failed errors)"""
+    body = getattr(error, "body", None)
+    if isinstance(body, dict):
+        body = body.get("error", body)
+        if isinstance(body, dict) and isinstance(body.get("failed_generation"), str):
+            return body["failed_generation"]
+    return None
+
+
+@dataclass
+class StructuredResult:
+    data: Any
+    missing: List[str] = field(default_factory=list)
+    repaired: bool = False
+    retried: List[str] = field(default_factory=list)
+    text: str = ""
+    decision: Optional[RouteDecision] = None
+
+
+class StructuredOutput:
+    """Structured completions over the model router.
+
+    `complete` asks for a JSON object in JSON mode. The output is parsed
+    with repair, so a fenced, prose-wrapped or truncated answer still yields
+    every member that was written. With `fields`, each member is checked
+    against its spec, and the ones that are missing or malformed (including
+    one cut off mid-value) are re-requested in a single follow-up call that
+    asks for only those keys, at only their output budget. A truncated value
+    is used as a last resort when the follow-up fails. `stream` yields
+    members as they close in a streamed response.
+    """
+
+    def __init__(self, router: ModelRouter = None):
+        self.router = router or model_router
+        self.stats = Counter()
+
+    async def _request(self, client, task: str, messages: List[Dict[str, str]], tier: Optional[str],
+                       expect: type, params: Dict[str, Any]) -> Tuple[str, Optional[RouteDecision]]:
+        if expect is dict:
+            # JSON mode only accepts object roots
+            params = {"response_format": {"type": "json_object"}, **params}
+        try:
+            response, decision = await self.router.complete(
+                client, task, messages, tier=tier, validate=lambda text: parse_json(text, expect) is not None,
+                **params
+            )
+            return response.choices[0].message.content or "", decision
+        except Exception as e:
+            salvaged = _failed_generation(e)
+            if salvaged is None:
+                raise
+            self.stats["salvaged_rejected_generations"] += 1
+            return salvaged, None
+
+    def _parse(self, text: str, expect: type) -> Tuple[Any, IncrementalJSONParser, bool]:
+        parser = IncrementalJSONParser(expect)
+        parser.feed(text)
+        value = parser.result()
+        repaired = value is not None and (parser.truncated or bool(parser.dropped) or bool(parser.malformed))
+        if repaired:
+            self.stats["repaired"] += 1
+        return value, parser, repaired
+
+    async def _retry_fields(self, client, task: str, messages: List[Dict[str, str]], fields: FieldSpecs,
+                            missing: List[str], tier: Optional[str], params: Dict[str, Any]) -> Dict[str, Any]:
+        """One follow-up call for only the `missing` fields"""
+        self.stats["retries"] += 1
+        self.stats["retried_fields"] += len(missing)
+        wanted = {name: fields[name] for name in missing}
+        budgets = [spec.get("max_tokens") for spec in wanted.values()]
+        retry_params = dict(params)
+        if all(budgets):
+            retry_params["max_tokens"] = sum(budgets)
+        follow_up = {"role": "user", "content": f"For the same content, return ONE JSON object with only these keys:\n{schema_block(wanted)}"}
+        try:
+            text, _ = await self._request(client, task, messages + [follow_up], tier, dict, retry_params)
+        except Exception as e:
+            print(f"⚠️ Structured output retry for {', '.join(missing)} failed: {e}")
+            return {}
+        value, parser, _ = self._parse(text, dict)
+        if not isinstance(value, dict):
+            return {}
+        recovered = {name: value[name] for name in missing
+                     if name in value and name != parser.partial_key and _valid(value[name], fields[name])}
+        self.stats["recovered_fields"] += len(recovered)
+        return recovered
+
+    async def complete(self, client, task: str, messages: List[Dict[str, str]], fields: FieldSpecs = None,
+                       expect: type = dict, retry_missing: bool = True, tier: str = None,
+                       **params) -> StructuredResult:
+        """Structured completion; `data` is the parsed value (dict of valid fields when `fields` is given)"""
+        self.stats["calls"] += 1
+        expect = dict if fields else expect
+        text, decision = await self._request(client, task, messages, tier, expect, params)
+        value, parser, repaired = self._parse(text, expect)
+
+        if not fields:
+            if not isinstance(value, expect):
+                self.stats["unparsed"] += 1
+                value = None
+            return StructuredResult(value, repaired=repaired, text=text, decision=decision)
+
+        value = value if isinstance(value, dict) else {}
+        data = {name: value[name] for name in fields
+                if name in value and name != parser.partial_key and _valid(value[name], fields[name])}
+        missing = [name for name in fields if name not in data]
+        retried = []
+        if missing and retry_missing:
+            retried = list(missing)
+            data.update(await self._retry_fields(client, task, messages, fields, missing, tier, params))
+            missing = [name for name in fields if name not in data]
+        for name in list(missing):
+            # Last resort: the value that was cut off, closed by the repair
+            if name == parser.partial_key and _valid(value.get(name), fields[name]):
+                data[name] = value[name]
+                missing.remove(name)
+        self.stats["unrecovered_fields"] += len(missing)
+        return StructuredResult(data, missing, repaired, retried, text, decision)
+
+    async def stream(self, client, task: str, messages: List[Dict[str, str]], fields: FieldSpecs,
+                     retry_missing: bool = True, tier: str = None, **params) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield (field, value) as each requested field closes in the streamed output.
+
+        JSON mode is not used for streamed calls (the API only validates whole
+        responses), so the prompt must ask for the object; fields still
+        missing when the stream ends are re-requested when `retry_missing`.
+        """
+        self.stats["streams"] += 1
+        parser = IncrementalJSONParser(dict)
+        emitted = set()
+        async for delta in self.router.stream(client, task, messages, tier=tier,
+                                              validate=lambda text: parse_json(text, dict) is not None, **params):
+            for name, value in parser.feed(delta):
+                if name in fields and name not in emitted and _valid(value, fields[name]):
+                    emitted.add(name)
+                    self.stats["streamed_fields"] += 1
+                    yield name, value
+
+        missing = [name for name in fields if name not in emitted]
+        if missing and retry_missing:
+            recovered = await self._retry_fields(client, task, messages, fields, missing, tier, params)
+            for name, value in recovered.items():
+                yield name, value
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+
+structured_output = StructuredOutput()
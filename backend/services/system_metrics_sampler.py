@@ -0,0 +1,223 @@
+"""
+System Metrics Sampler
+One background task samples CPU, memory, disk, network and process metrics
+at a fixed cadence into a ring buffer; monitoring endpoints read the latest
+snapshot or windowed aggregates instead of probing psutil themselves
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+# Snapshot fields aggregated over windows
+NUMERIC_FIELDS = (
+    "cpu_percent", "memory_percent", "swap_percent", "disk_percent",
+    "disk_read_bytes_per_sec", "disk_write_bytes_per_sec",
+    "net_sent_bytes_per_sec", "net_recv_bytes_per_sec",
+    "process_rss_mb", "process_cpu_percent", "process_threads", "connections"
+)
+
+
+class SystemMetricsSampler:
+    """Fixed-cadence psutil sampler with a single-writer ring buffer.
+
+    Only the sampler task writes: it fills the next slot, then publishes the
+    snapshot by swapping `latest`. Readers never lock; they read `latest` or
+    copy the slots, so a monitoring endpoint costs microseconds. CPU
+    percentages are measured between consecutive samples (no sleeping
+    `interval=` probe), and the collection itself runs in a worker thread so
+    slow calls (disk, connection tables) never touch the event loop. The
+    service registry starts sampling at application startup; reads that
+    arrive before the first sample get a zeroed snapshot flagged
+    `warming_up` rather than collecting inline.
+    """
+
+    def __init__(self, interval: float = 2.0, capacity: int = 900, connections_every: int = 5):
+        self.interval = interval
+        self.capacity = capacity
+        self.connections_every = connections_every
+        self.slots: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.written = 0
+        self.latest: Optional[Dict[str, Any]] = None
+        self.process = psutil.Process()
+        self.boot_time = psutil.boot_time()
+        self.cpu_count = psutil.cpu_count()
+        self.stats = {"samples": 0, "errors": 0, "last_collect_ms": 0.0}
+        self._previous_io: Optional[Dict[str, Any]] = None
+        self._connections = 0
+        self._sampler: Optional[asyncio.Task] = None
+
+        # Prime the between-calls CPU counters
+        psutil.cpu_percent(interval=None)
+        self.process.cpu_percent(interval=None)
+
+    # ── Sampling ──────────────────────────────────────────────────
+
+    def _collect(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        now = time.time()
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        disk = psutil.disk_usage('/')
+        cpu_freq = psutil.cpu_freq()
+
+        io = {"at": now}
+        try:
+            network = psutil.net_io_counters()
+            io["net_sent"], io["net_recv"] = network.bytes_sent, network.bytes_recv
+        except Exception:
+            io["net_sent"] = io["net_recv"] = 0
+        try:
+            disk_io = psutil.disk_io_counters()
+            io["disk_read"], io["disk_write"] = disk_io.read_bytes, disk_io.write_bytes
+        except Exception:
+            io["disk_read"] = io["disk_write"] = 0
+
+        rates = {"net_sent": 0.0, "net_recv": 0.0, "disk_read": 0.0, "disk_write": 0.0}
+        previous = self._previous_io
+        if previous and now > previous["at"]:
+            elapsed = now - previous["at"]
+            rates = {key: max(0.0, (io[key] - previous[key]) / elapsed) for key in rates}
+        self._previous_io = io
+
+        if self.stats["samples"] % self.connections_every == 0:
+            try:
+                self._connections = len(psutil.net_connections())
+            except Exception:
+                self._connections = 0
+
+        with self.process.oneshot():
+            process_memory = self.process.memory_info()
+            process_cpu = self.process.cpu_percent(interval=None)
+            process_threads = self.process.num_threads()
+
+        snapshot = {
+            "timestamp": now,
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "cpu_count": self.cpu_count,
+            "cpu_frequency_mhz": round(cpu_freq.current, 2) if cpu_freq else 0.0,
+            "load_average": list(os.getloadavg()) if hasattr(os, "getloadavg") else [0.0, 0.0, 0.0],
+            "memory_percent": memory.percent,
+            "memory_total": memory.total,
+            "memory_available": memory.available,
+            "memory_used": memory.used,
+            "swap_percent": swap.percent,
+            "disk_percent": disk.percent,
+            "disk_total": disk.total,
+            "disk_free": disk.free,
+            "disk_read_bytes_per_sec": round(rates["disk_read"], 1),
+            "disk_write_bytes_per_sec": round(rates["disk_write"], 1),
+            "net_sent_bytes": io["net_sent"],
+            "net_recv_bytes": io["net_recv"],
+            "net_sent_bytes_per_sec": round(rates["net_sent"], 1),
+            "net_recv_bytes_per_sec": round(rates["net_recv"], 1),
+            "connections": self._connections,
+            "process_count": len(psutil.pids()),
+            "process_rss_mb": round(process_memory.rss / (1024 ** 2), 2),
+            "process_cpu_percent": process_cpu,
+            "process_threads": process_threads,
+            "uptime_seconds": round(now - self.boot_time)
+        }
+        self.stats["last_collect_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return snapshot
+
+    def _publish(self, snapshot: Dict[str, Any]):
+        self.slots[self.written % self.capacity] = snapshot
+        self.written += 1
+        self.latest = snapshot
+        self.stats["samples"] += 1
+
+    async def _loop(self):
+        while True:
+            try:
+                self._publish(await asyncio.to_thread(self._collect))
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️ System metrics sample failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start sampling once an event loop is running"""
+        if self._sampler and not self._sampler.done():
+            return
+        try:
+            self._sampler = asyncio.get_running_loop().create_task(self._loop())
+        except RuntimeError:
+            pass
+
+    async def stop(self):
+        if self._sampler:
+            self._sampler.cancel()
+            try:
+                await self._sampler
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._sampler = None
+
+    # ── Reads ─────────────────────────────────────────────────────
+
+    def _warming_up(self) -> Dict[str, Any]:
+        """Placeholder with every snapshot field zeroed, served until the first sample lands"""
+        now = time.time()
+        snapshot = dict.fromkeys(NUMERIC_FIELDS, 0)
+        snapshot.update({
+            "timestamp": now,
+            "warming_up": True,
+            "cpu_count": self.cpu_count,
+            "cpu_frequency_mhz": 0.0,
+            "load_average": [0.0, 0.0, 0.0],
+            "memory_total": 0,
+            "memory_available": 0,
+            "memory_used": 0,
+            "disk_total": 0,
+            "disk_free": 0,
+            "net_sent_bytes": 0,
+            "net_recv_bytes": 0,
+            "process_count": 0,
+            "uptime_seconds": round(now - self.boot_time)
+        })
+        return snapshot
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Most recent sample, or a zeroed `warming_up` placeholder until the sampler's first one"""
+        self.start()
+        return self.latest or self._warming_up()
+
+    def history(self, seconds: float = None) -> List[Dict[str, Any]]:
+        """Samples oldest first, optionally only the last `seconds`"""
+        written = self.written
+        count = min(written, self.capacity)
+        samples = [self.slots[index % self.capacity] for index in range(written - count, written)]
+        samples = [sample for sample in samples if sample is not None]
+        if seconds is not None:
+            cutoff = time.time() - seconds
+            samples = [sample for sample in samples if sample["timestamp"] >= cutoff]
+        return samples
+
+    def window(self, seconds: float = 60) -> Dict[str, Any]:
+        """Average / min / max / last of each numeric field over the last `seconds`"""
+        samples = self.history(seconds) or [self.snapshot()]
+        aggregates = {}
+        for field in NUMERIC_FIELDS:
+            values = [sample[field] for sample in samples]
+            aggregates[field] = {
+                "average": round(sum(values) / len(values), 2),
+                "min": round(min(values), 2),
+                "max": round(max(values), 2),
+                "last": round(values[-1], 2)
+            }
+        return {"window_seconds": seconds, "samples": len(samples), "metrics": aggregates}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "interval": self.interval,
+            "buffered": min(self.written, self.capacity),
+            "running": bool(self._sampler and not self._sampler.done())
+        }
+
+
+system_metrics_sampler = SystemMetricsSampler()
@@ -0,0 +1,152 @@
+"""
+Tab Context Retrieval
+Per-tab page context for chat: the page open in a tab is chunked and indexed
+once per version, and each turn is grounded on only the passages relevant to
+the question instead of a truncated copy of the whole page
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.embedding_index import EmbeddingIndex, embedding_index
+
+# Below this similarity the question is not about anything specific on the
+# page ("summarize this"), so the page's opening passages are used instead
+MIN_RELEVANCE = 0.08
+
+
+class TabContextIndex:
+    """Retrieval-augmented page context keyed by (user, tab).
+
+    Each tab remembers which page version it indexed: client-supplied page
+    text is compared by digest, fetched pages are re-checked at most every
+    `recheck_interval` seconds (through the shared page cache, and the
+    embedding index itself skips unchanged text). Chunks live in the user's
+    embedding index, so a page read in one tab is already indexed for the
+    next. A turn then costs one query embedding and a scan over that page's
+    chunks, and sends at most `budget` characters of passages to the model.
+    """
+
+    def __init__(self, index: EmbeddingIndex = None, top_k: int = 4, budget: int = 4000,
+                 recheck_interval: float = 300, max_tabs: int = 512):
+        self.index = index or embedding_index
+        self.top_k = top_k
+        self.budget = budget
+        self.recheck_interval = recheck_interval
+        self.max_tabs = max_tabs
+        self.tabs: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        # Held only while a prepare() for the key runs or waits, so failed builds leave nothing behind
+        self.locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self.lock_users: Counter = Counter()
+        self.stats = {"turns": 0, "builds": 0, "reuses": 0, "lead_fallbacks": 0, "failures": 0, "chars_sent": 0}
+
+    @staticmethod
+    def _key(user_id: str, page_context: Dict[str, Any]) -> Tuple[str, str]:
+        return user_id, str(page_context.get("tab_id") or page_context.get("url") or "")
+
+    async def prepare(self, user_id: str, page_context: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Make sure the tab's current page version is indexed; returns the tab state or None"""
+        url = page_context.get("url") or ""
+        content = page_context.get("content") or ""
+        title = page_context.get("title") or ""
+        if not url:
+            return None
+        key = self._key(user_id, page_context)
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        self.lock_users[key] += 1
+        try:
+            async with lock:
+                return await self._prepare(user_id, key, url, content, title)
+        finally:
+            self.lock_users[key] -= 1
+            if not self.lock_users[key]:
+                del self.lock_users[key]
+                self.locks.pop(key, None)
+
+    async def _prepare(self, user_id: str, key: Tuple[str, str], url: str, content: str,
+                       title: str) -> Optional[Dict[str, Any]]:
+        state = self.tabs.get(key)
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest() if content else None
+        fresh = state is not None and state["url"] == url and (
+            state["digest"] == digest if digest else
+            state["digest"] is None and time.time() - state["checked_at"] < self.recheck_interval
+        )
+        if fresh:
+            self.tabs.move_to_end(key)
+            self.stats["reuses"] += 1
+            return state
+
+        if content:
+            result = await asyncio.to_thread(self.index.add_page, user_id, url, content, title)
+        else:
+            result = await self.index.index_url(user_id, url, title)
+        info = await asyncio.to_thread(self.index.page_info, user_id, url)
+        if info is None:
+            self.stats["failures"] += 1
+            return None
+
+        state = {"url": url, "digest": digest, "checked_at": time.time(), **info,
+                 "rebuilt": bool(result.get("indexed"))}
+        self.tabs[key] = state
+        self.tabs.move_to_end(key)
+        self.stats["builds"] += 1
+        while len(self.tabs) > self.max_tabs:
+            self.tabs.popitem(last=False)
+        return state
+
+    async def retrieve(self, user_id: str, page_context: Dict[str, Any], query: str,
+                       k: int = None, budget: int = None) -> Optional[Dict[str, Any]]:
+        """Passages of the tab's page most relevant to `query`, in document order, within `budget` chars"""
+        if not page_context:
+            return None
+        try:
+            state = await self.prepare(user_id, page_context)
+        except Exception as e:
+            self.stats["failures"] += 1
+            print(f"⚠️ Tab context indexing failed for {page_context.get('url')}: {e}")
+            return None
+        if state is None:
+            return None
+
+        k = k or self.top_k
+        budget = budget or self.budget
+        url = state["url"]
+        hits = await asyncio.to_thread(self.index.search, user_id, query, k, min_score=0.0, url=url)
+        retrieval = "semantic"
+        if not hits or hits[0]["score"] < MIN_RELEVANCE:
+            hits = await asyncio.to_thread(self.index.page_passages, user_id, url, k)
+            retrieval = "lead"
+            self.stats["lead_fallbacks"] += 1
+
+        passages: List[Dict[str, Any]] = []
+        used = 0
+        for hit in hits:
+            if used + len(hit["text"]) > budget and passages:
+                continue
+            text = hit["text"][:budget - used]
+            passages.append({"position": hit["position"], "score": hit["score"], "text": text})
+            used += len(text)
+        passages.sort(key=lambda passage: passage["position"])
+
+        self.stats["turns"] += 1
+        self.stats["chars_sent"] += used
+        return {
+            "url": url,
+            "title": state["title"],
+            "version": state["version"],
+            "total_chunks": state["chunks"],
+            "retrieval": retrieval,
+            "passages": passages,
+            "context": "\n...\n".join(passage["text"] for passage in passages)
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        turns = self.stats["turns"]
+        return {**self.stats, "tabs": len(self.tabs),
+                "average_chars_sent": round(self.stats["chars_sent"] / turns) if turns else 0}
+
+
+tab_context = TabContextIndex()
@@ -0,0 +1,428 @@
+"""
+Tab Hibernation
+Snapshot idle Playwright pages and close them, restore them lazily on access
+LRU + memory-pressure eviction with configurable budgets
+"""
+
+import asyncio
+import base64
+import json
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import psutil
+
+# Captures everything a closed page loses that the browser context does not keep
+_CAPTURE_PAGE_STATE = """
+() => {
+    const fields = [];
+    document.querySelectorAll('input, textarea, select').forEach((el, index) => {
+        const type = (el.type || '').toLowerCase();
+        if (['password', 'file', 'hidden', 'submit', 'button', 'reset', 'image'].includes(type)) return;
+        const checkable = type === 'checkbox' || type === 'radio';
+        if (checkable ? !el.checked : !el.value) return;
+        fields.push({index, id: el.id || null, name: el.name || null, type,
+                     value: checkable ? null : el.value, checked: checkable ? el.checked : null});
+    });
+    const dump = (storage) => {
+        const out = {};
+        try { for (let i = 0; i < storage.length; i++) { const k = storage.key(i); out[k] = storage.getItem(k); } } catch (e) {}
+        return out;
+    };
+    return {
+        origin: location.origin,
+        scroll: [window.scrollX, window.scrollY],
+        fields,
+        local_storage: dump(window.localStorage),
+        session_storage: dump(window.sessionStorage)
+    };
+}
+"""
+
+_RESTORE_PAGE_STATE = """
+(state) => {
+    const all = document.querySelectorAll('input, textarea, select');
+    for (const field of state.fields) {
+        let el = field.id ? document.getElementById(field.id) : null;
+        if (!el && field.name) el = document.querySelector(`[name="${CSS.escape(field.name)}"]`);
+        if (!el) el = all[field.index];
+        if (!el) continue;
+        if (field.checked !== null) el.checked = field.checked; else el.value = field.value;
+        el.dispatchEvent(new Event('input', {bubbles: true}));
+        el.dispatchEvent(new Event('change', {bubbles: true}));
+    }
+    window.scrollTo(state.scroll[0], state.scroll[1]);
+}
+"""
+
+# Seeds web storage before the page's own scripts run; never overwrites live keys
+_SEED_STORAGE = """
+(() => {
+    const state = %s;
+    if (location.origin !== state.origin) return;
+    const seed = (storage, values) => {
+        try { for (const [k, v] of Object.entries(values)) if (storage.getItem(k) === null) storage.setItem(k, v); } catch (e) {}
+    };
+    seed(window.localStorage, state.local_storage);
+    seed(window.sessionStorage, state.session_storage);
+})();
+"""
+
+
+@dataclass
+class HibernationPolicy:
+    max_live_pages: int = 8              # LRU budget on open pages
+    idle_seconds: float = 300            # hibernate pages untouched for this long
+    page_memory_mb: float = 150          # estimated cost of one live Chromium page
+    memory_budget_mb: float = 1500       # budget on estimated live page memory
+    memory_pressure_percent: float = 85  # host RAM usage that triggers shedding
+    min_live_pages: int = 1              # never hibernate below this many pages
+    check_interval: float = 30           # seconds between background sweeps
+    screenshot_quality: int = 30         # JPEG quality of the placeholder image
+
+    @classmethod
+    def from_env(cls) -> "HibernationPolicy":
+        """Build a policy with BROWSER_HIBERNATION_* environment overrides"""
+        policy = cls()
+        for name, default in asdict(policy).items():
+            value = os.getenv(f"BROWSER_HIBERNATION_{name.upper()}")
+            if value is not None:
+                setattr(policy, name, type(default)(value))
+        return policy
+
+
+@dataclass
+class TabSnapshot:
+    tab_id: str
+    session_id: Optional[str]
+    url: str
+    title: str
+    scroll: Tuple[float, float] = (0, 0)
+    fields: List[Dict[str, Any]] = field(default_factory=list)
+    origin: Optional[str] = None
+    local_storage: Dict[str, str] = field(default_factory=dict)
+    session_storage: Dict[str, str] = field(default_factory=dict)
+    cookies: List[Dict[str, Any]] = field(default_factory=list)
+    screenshot: Optional[str] = None  # base64 low-quality JPEG
+    reason: str = "manual"
+    hibernated_at: float = field(default_factory=time.time)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "tab_id": self.tab_id,
+            "url": self.url,
+            "title": self.title,
+            "reason": self.reason,
+            "hibernated_at": self.hibernated_at,
+            "form_fields": len(self.fields),
+            "placeholder": f"data:image/jpeg;base64,{self.screenshot}" if self.screenshot else None
+        }
+
+
+# Every manager registers here so memory services can hibernate tabs by id
+_managers: List["TabHibernationManager"] = []
+
+
+class TabHibernationManager:
+    """Hibernate and lazily restore pages of one browser service.
+
+    The manager shares the service's `pages` dict: hibernating a tab removes
+    its page from it and keeps a `TabSnapshot`; `get_page()` puts a restored
+    page back. `context_for(session_id)` returns the browser context to
+    restore into and `on_restore(tab_id, session_id, page)` lets the service
+    re-attach its page event handlers. Code that uses a page across awaits
+    holds it through `lease(tab_id)`; a leased page is never hibernated.
+    """
+
+    def __init__(self, name: str, pages: Dict[str, Any], context_for: Callable[[str], Any],
+                 on_restore: Optional[Callable[[str, str, Any], None]] = None,
+                 policy: Optional[HibernationPolicy] = None):
+        self.name = name
+        self.pages = pages
+        self.context_for = context_for
+        self.on_restore = on_restore
+        self.policy = policy or HibernationPolicy.from_env()
+        self.activity = OrderedDict()  # live tab_id -> last access time, LRU first
+        self.sessions: Dict[str, str] = {}
+        self.snapshots: Dict[str, TabSnapshot] = {}
+        self.locks: Dict[str, asyncio.Lock] = {}
+        self.leases: Dict[str, int] = {}  # tab_id -> number of holders using its page
+        self.stats = {"hibernated": 0, "restored": 0, "restore_failures": 0, "sweeps": 0}
+        self._sweeper: Optional[asyncio.Task] = None
+        _managers.append(self)
+
+    # ── Bookkeeping ───────────────────────────────────────────────
+
+    def track(self, tab_id: str, session_id: str):
+        """Start tracking a newly opened page"""
+        self.sessions[tab_id] = session_id
+        self.touch(tab_id)
+        self.start()
+
+    def touch(self, tab_id: str):
+        self.activity[tab_id] = time.time()
+        self.activity.move_to_end(tab_id)
+
+    def forget(self, tab_id: str):
+        """Drop all state for a closed tab"""
+        self.activity.pop(tab_id, None)
+        self.sessions.pop(tab_id, None)
+        self.snapshots.pop(tab_id, None)
+        self.locks.pop(tab_id, None)
+
+    def owns(self, tab_id: str) -> bool:
+        return tab_id in self.sessions
+
+    def in_use(self, tab_id: str) -> bool:
+        return self.leases.get(tab_id, 0) > 0
+
+    def is_hibernated(self, tab_id: str) -> bool:
+        return tab_id in self.snapshots
+
+    def get_snapshot(self, tab_id: str) -> Optional[TabSnapshot]:
+        return self.snapshots.get(tab_id)
+
+    def idle_seconds(self, tab_id: str) -> Optional[float]:
+        if tab_id in self.activity:
+            return time.time() - self.activity[tab_id]
+        if tab_id in self.snapshots:
+            return time.time() - self.snapshots[tab_id].hibernated_at
+        return None
+
+    def _lock(self, tab_id: str) -> asyncio.Lock:
+        if tab_id not in self.locks:
+            self.locks[tab_id] = asyncio.Lock()
+        return self.locks[tab_id]
+
+    # ── Hibernate / restore ───────────────────────────────────────
+
+    async def get_page(self, tab_id: str):
+        """Return the tab's live page, restoring it from its snapshot if needed"""
+        if tab_id not in self.pages and tab_id not in self.snapshots:
+            return None
+
+        async with self._lock(tab_id):
+            page = self.pages.get(tab_id)
+            if page is None:
+                snapshot = self.snapshots.get(tab_id)
+                if snapshot is None:
+                    return None
+                page = await self._restore(snapshot)
+                if page is None:
+                    return None
+            self.touch(tab_id)
+
+        # Opening this page may push the service over budget
+        await self.enforce(protect={tab_id})
+        return page
+
+    @asynccontextmanager
+    async def lease(self, tab_id: str):
+        """Use the tab's page for the duration of the block.
+
+        Yields the live page (restored if needed) or None when the tab does
+        not exist. While any lease on a tab is held it is skipped by the
+        sweeper and by explicit hibernation.
+        """
+        self.leases[tab_id] = self.leases.get(tab_id, 0) + 1
+        try:
+            yield await self.get_page(tab_id)
+        finally:
+            remaining = self.leases.get(tab_id, 0) - 1
+            if remaining > 0:
+                self.leases[tab_id] = remaining
+            else:
+                self.leases.pop(tab_id, None)
+            if tab_id in self.pages:
+                self.touch(tab_id)
+
+    async def hibernate(self, tab_id: str, reason: str = "manual") -> Optional[TabSnapshot]:
+        """Snapshot a live page and close it; returns None if it is not live or is leased"""
+        async with self._lock(tab_id):
+            page = self.pages.get(tab_id)
+            if page is None or self.in_use(tab_id):
+                return None
+
+            snapshot = await self._capture(tab_id, page, reason)
+            self.snapshots[tab_id] = snapshot
+            self.pages.pop(tab_id, None)
+            self.activity.pop(tab_id, None)
+            try:
+                await page.close()
+            except Exception:
+                pass
+            self.stats["hibernated"] += 1
+            return snapshot
+
+    async def _capture(self, tab_id: str, page, reason: str) -> TabSnapshot:
+        snapshot = TabSnapshot(tab_id=tab_id, session_id=self.sessions.get(tab_id),
+                               url=page.url, title="", reason=reason)
+        try:
+            snapshot.title = await page.title()
+        except Exception:
+            pass
+        if not page.url.startswith(("http://", "https://")):
+            return snapshot
+
+        try:
+            state = await page.evaluate(_CAPTURE_PAGE_STATE)
+            snapshot.scroll = tuple(state.get("scroll") or (0, 0))
+            snapshot.fields = state.get("fields", [])
+            snapshot.origin = state.get("origin")
+            snapshot.local_storage = state.get("local_storage", {})
+            snapshot.session_storage = state.get("session_storage", {})
+        except Exception as e:
+            print(f"⚠️ Could not capture page state for tab {tab_id}: {e}")
+        try:
+            snapshot.cookies = await page.context.cookies([page.url])
+        except Exception:
+            pass
+        try:
+            image = await page.screenshot(type="jpeg", quality=self.policy.screenshot_quality,
+                                          scale="css", timeout=5000)
+            snapshot.screenshot = base64.b64encode(image).decode()
+        except Exception:
+            pass
+        return snapshot
+
+    async def _restore(self, snapshot: TabSnapshot):
+        context = self.context_for(snapshot.session_id)
+        if context is None:
+            self.stats["restore_failures"] += 1
+            return None
+
+        page = None
+        try:
+            if snapshot.cookies:
+                await context.add_cookies(snapshot.cookies)
+            page = await context.new_page()
+            if snapshot.origin and (snapshot.local_storage or snapshot.session_storage):
+                await page.add_init_script(_SEED_STORAGE % json.dumps({
+                    "origin": snapshot.origin,
+                    "local_storage": snapshot.local_storage,
+                    "session_storage": snapshot.session_storage
+                }))
+            if self.on_restore:
+                self.on_restore(snapshot.tab_id, snapshot.session_id, page)
+            if snapshot.url and snapshot.url != "about:blank":
+                await page.goto(snapshot.url, wait_until="domcontentloaded", timeout=30000)
+                if snapshot.fields or any(snapshot.scroll):
+                    await page.evaluate(_RESTORE_PAGE_STATE, {"fields": snapshot.fields, "scroll": list(snapshot.scroll)})
+        except Exception as e:
+            # A page that failed to reload is still better than losing the tab
+            print(f"⚠️ Tab {snapshot.tab_id} restored without full state: {e}")
+            if page is None:
+                self.stats["restore_failures"] += 1
+                return None
+
+        self.pages[snapshot.tab_id] = page
+        self.snapshots.pop(snapshot.tab_id, None)
+        self.stats["restored"] += 1
+        return page
+
+    # ── Eviction policy ───────────────────────────────────────────
+
+    def memory_pressure(self) -> bool:
+        try:
+            return psutil.virtual_memory().percent >= self.policy.memory_pressure_percent
+        except Exception:
+            return False
+
+    def plan_evictions(self, protect: set = frozenset()) -> List[Tuple[str, str]]:
+        """Pick (tab_id, reason) pairs to hibernate, least recently used first"""
+        policy = self.policy
+        now = time.time()
+        live = [tab_id for tab_id in self.activity if tab_id in self.pages]
+        floor = max(policy.min_live_pages, 0)
+
+        # Budgets on page count and estimated page memory, then host pressure
+        allowed = min(policy.max_live_pages, int(policy.memory_budget_mb // max(policy.page_memory_mb, 1)))
+        if self.memory_pressure():
+            allowed = min(allowed, len(live) // 2)
+        allowed = max(allowed, floor)
+
+        plan = []
+        remaining = len(live)
+        for tab_id in live:
+            if remaining <= floor:
+                break
+            if tab_id in protect or self.in_use(tab_id):
+                continue
+            if remaining > allowed:
+                plan.append((tab_id, "budget"))
+                remaining -= 1
+            elif now - self.activity[tab_id] >= policy.idle_seconds:
+                plan.append((tab_id, "idle"))
+                remaining -= 1
+        return plan
+
+    async def enforce(self, protect: set = frozenset()) -> List[str]:
+        """Hibernate whatever the policy currently selects"""
+        hibernated = []
+        for tab_id, reason in self.plan_evictions(protect):
+            if await self.hibernate(tab_id, reason):
+                hibernated.append(tab_id)
+        return hibernated
+
+    def start(self):
+        """Start the background sweep once an event loop is running"""
+        if self._sweeper and not self._sweeper.done():
+            return
+        try:
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep())
+        except RuntimeError:
+            pass
+
+    async def stop(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._sweeper = None
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.policy.check_interval)
+            try:
+                self.stats["sweeps"] += 1
+                hibernated = await self.enforce()
+                if hibernated:
+                    print(f"💤 {self.name}: hibernated {len(hibernated)} tab(s)")
+            except Exception as e:
+                print(f"⚠️ Tab hibernation sweep failed: {e}")
+
+    def get_status(self) -> Dict[str, Any]:
+        live = len(self.pages)
+        return {
+            "live_pages": live,
+            "hibernated_pages": len(self.snapshots),
+            "leased_pages": len(self.leases),
+            "estimated_live_memory_mb": live * self.policy.page_memory_mb,
+            "estimated_saved_memory_mb": len(self.snapshots) * self.policy.page_memory_mb,
+            "memory_pressure": self.memory_pressure(),
+            "policy": asdict(self.policy),
+            "stats": dict(self.stats),
+            "hibernated": [snapshot.summary() for snapshot in self.snapshots.values()]
+        }
+
+
+def find_manager(tab_id: str) -> Optional[TabHibernationManager]:
+    """Return the manager of whichever browser service owns `tab_id`"""
+    for manager in _managers:
+        if manager.owns(tab_id):
+            return manager
+    return None
+
+
+async def hibernate_tab(tab_id: str, reason: str = "manual") -> Optional[TabSnapshot]:
+    """Hibernate a tab by id in whichever browser service owns it"""
+    manager = find_manager(tab_id)
+    if manager is None:
+        return None
+    return await manager.hibernate(tab_id, reason)
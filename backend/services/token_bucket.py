@@ -0,0 +1,37 @@
+"""
+Token Bucket
+Continuously refilled token bucket shared by the platform rate limiters and
+the prefetch bandwidth budget
+"""
+
+import time
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def available(self) -> float:
+        self._refill()
+        return self.tokens
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` can be taken (0.0 if available now)"""
+        self._refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def consume(self, tokens: float = 1.0):
+        self._refill()
+        self.tokens -= tokens
@@ -10,6 +10,9 @@ import re
 from datetime import datetime, timedelta
 from groq import AsyncGroq
 
+from services.intent_engine import intent_engine
+from services.model_router import model_router
+
 class VoiceActionsService:
     def __init__(self):
         self.groq_client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
@@ -216,6 +219,19 @@ class VoiceActionsService:
     # Voice Command Processing Methods
     async def _parse_voice_command(self, command_text: str, context: Dict = None) -> Dict:
         """Parse voice command using AI"""
+        # Common commands are classified locally; the LLM only sees what the classifier is unsure about
+        match = intent_engine.classify("voice_command", command_text)
+        if intent_engine.is_confident(match):
+            return {
+                "original_text": command_text,
+                "ai_analysis": None,
+                "intent": match.intent,
+                "parameters": await self._extract_command_parameters(command_text, match),
+                "confidence": match.confidence,
+                "classifier": match.source,
+                "parsed_at": datetime.now().isoformat()
+            }
+        
         try:
             prompt = f"""
             Parse this voice command for AI browser action:
@@ -232,9 +248,10 @@ class VoiceActionsService:
             Return as structured JSON for command execution.
             """
             
-            response = await self.groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model="llama3-70b-8192",
+            response, _ = await model_router.complete(
+                self.groq_client,
+                "classification",
+                [{"role": "user", "content": prompt}],
                 temperature=0.2,
                 max_tokens=600
             )
@@ -245,7 +262,7 @@ class VoiceActionsService:
                 "original_text": command_text,
                 "ai_analysis": ai_analysis,
                 "intent": await self._extract_command_intent(command_text),
-                "parameters": await self._extract_command_parameters(command_text),
+                "parameters": await self._extract_command_parameters(command_text, match),
                 "confidence": 0.85,
                 "parsed_at": datetime.now().isoformat()
             }
@@ -364,26 +381,13 @@ class VoiceActionsService:
     # Helper Methods with simplified implementations
     async def _extract_command_intent(self, command_text: str) -> str:
         """Extract intent from voice command"""
-        command_lower = command_text.lower()
-        
-        if any(phrase in command_lower for phrase in ["go to", "navigate to", "open"]):
-            return "navigate"
-        elif any(phrase in command_lower for phrase in ["search for", "find", "look up"]):
-            return "search"
-        elif any(phrase in command_lower for phrase in ["analyze", "summarize", "tell me about"]):
-            return "analyze"
-        elif any(phrase in command_lower for phrase in ["bookmark", "save this", "remember"]):
-            return "bookmark"
-        elif any(phrase in command_lower for phrase in ["close tab", "new tab", "switch tab"]):
-            return "tab_management"
-        else:
-            return "unknown"
+        return intent_engine.classify("voice_command", command_text).intent
     
-    async def _extract_command_parameters(self, command_text: str) -> Dict:
+    async def _extract_command_parameters(self, command_text: str, match=None) -> Dict:
         """Extract parameters from voice command"""
         return {
             "text": command_text,
-            "entities": [],
+            "entities": list(match.parameters) if match else [],
             "url_mentioned": "http" in command_text.lower(),
             "tab_reference": "tab" in command_text.lower()
         }
@@ -0,0 +1,57 @@
+"""
+Precedence of the shared intent engine matches the if/elif keyword chains
+it replaced: the first intent in table order with a keyword hit wins,
+however many keywords a later intent matches.
+"""
+
+import pytest
+
+from services.intent_engine import IntentEngine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return IntentEngine(model_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize("message, intent", [
+    # automation is checked before analysis, even against four analysis keywords
+    ("navigate to the website and analyze, summarize and research its content", "automation"),
+    ("buy the item after you extract the content", "automation"),
+    # technical before learning and troubleshooting
+    ("how do I fix this error in my code", "technical"),
+    ("explain how to brainstorm a design idea", "creative"),
+    ("explain how to organize my tabs", "learning"),
+    ("my workflow is broken, there is a problem and an error", "productivity"),
+    ("there is a problem and an error", "troubleshooting"),
+    ("hello there", "conversational"),
+])
+def test_chat_keeps_priority_order(engine, message, intent):
+    assert engine.classify("chat", message).intent == intent
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("can you search for flights and tell me what is good", "question"),
+    ("please find and explain and describe the tabs", "request"),
+    ("search and find and locate, then go to the page", "navigation"),
+    ("thanks", "feedback"),
+])
+def test_conversation_keeps_priority_order(engine, message, intent):
+    assert engine.classify("conversation", message).intent == intent
+
+
+def test_keyword_hits_only_raise_confidence(engine):
+    one = engine.classify("chat", "summarize this")
+    three = engine.classify("chat", "analyze and summarize this content")
+    assert one.intent == three.intent == "analysis"
+    assert three.confidence > one.confidence
+
+
+@pytest.mark.parametrize("command, intent", [
+    ("open example.com and search for cats", "navigate"),
+    ("search for cats and bookmark this", "search"),
+    ("bookmark this page", "bookmark"),
+    ("close tab", "tab_management"),
+])
+def test_voice_command_precedence(engine, command, intent):
+    assert engine.classify("voice_command", command).intent == intent
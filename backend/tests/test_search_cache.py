@@ -0,0 +1,29 @@
+"""
+Cache keys of the shared search cache: near-identical phrasings share a
+key, reordered queries do not.
+"""
+
+import pytest
+
+from services.search_cache import normalize_query
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Best Python async libraries?", "python async libraries"),
+    ("What is the weather in Paris", "weather paris"),
+    ("  Rust   web frameworks ", "rust web frameworks"),
+])
+def test_near_identical_queries_share_a_key(first, second):
+    assert normalize_query(first) == normalize_query(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("flights from paris to london", "flights from london to paris"),
+    ("python to javascript", "javascript to python"),
+])
+def test_word_order_is_kept(first, second):
+    assert normalize_query(first) != normalize_query(second)
+
+
+def test_stopword_only_query_falls_back_to_the_text():
+    assert normalize_query("What is the") == "what is the"
@@ -0,0 +1,30 @@
+"""
+Price labels from the deterministic text patterns: the words before the
+amount, with a colon separating the label from its price.
+"""
+
+import pytest
+
+pytest.importorskip("bs4")
+
+from services.structured_extractor import StructuredDataExtractor
+
+
+def prices(text, html=""):
+    return StructuredDataExtractor().extract(text, html, ["prices"])["prices"]["items"]
+
+
+@pytest.mark.parametrize("text, item, price, currency, kind", [
+    ("Pro plan: $9", "Pro plan", "9", "USD", "one-time"),
+    ("Team plan: 29 EUR per month", "Team plan", "29", "EUR", "recurring"),
+    ("Basic – $5", "Basic", "5", "USD", "one-time"),
+    ("Plans: Starter $12/month", "Starter", "12", "USD", "recurring"),
+])
+def test_label_before_price(text, item, price, currency, kind):
+    [found] = prices(text)
+    assert (found["item"], found["price"], found["currency"], found["type"]) == (item, price, currency, kind)
+
+
+def test_labels_in_a_pricing_list():
+    text = "Choose a plan. Pro plan: $9 per month. Team plan: 29 EUR per month."
+    assert [(item["item"], item["price"]) for item in prices(text)] == [("Pro plan", "9"), ("Team plan", "29")]
@@ -0,0 +1,130 @@
+"""
+Tolerant parsing of model output: fenced, prose-wrapped, truncated and
+trailing-comma JSON is repaired, members are emitted as they close, and
+fields that are missing after the first call are re-requested on their own.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services.structured_output import IncrementalJSONParser, StructuredOutput, load_json, parse_json
+
+
+@pytest.mark.parametrize("text, value", [
+    ('```json\n{"a": 1, "b": [1, 2]}\n```', {"a": 1, "b": [1, 2]}),
+    ('Sure! Here is the result: {"a": "x"} Let me know if you need more.', {"a": "x"}),
+    ('The items are:\n[1, 2, 3]\nDone.', [1, 2, 3]),
+    ('{"a": 1, "b": [1, 2,], }', {"a": 1, "b": [1, 2]}),
+    ('[{"id": 1,}, {"id": 2},]', [{"id": 1}, {"id": 2}]),
+])
+def test_wrapped_and_trailing_comma_output(text, value):
+    assert parse_json(text) == value
+
+
+@pytest.mark.parametrize("text, value", [
+    # a cut-off object is closed in place, dropping a key with no value
+    ('{"title": "Report", "tags": ["a", "b"', {"title": "Report", "tags": ["a", "b"]}),
+    ('{"title": "Report", "summary": "Half a sent', {"title": "Report", "summary": "Half a sent"}),
+    ('{"title": "Report", "summ', {"title": "Report"}),
+    ('{"title": "Report", "score":', {"title": "Report"}),
+    # a cut-off array keeps only the items that closed
+    ('[{"id": 1}, {"id": 2}, {"id": 3, "na', [{"id": 1}, {"id": 2}]),
+    ('[1, 2, 3', [1, 2]),
+])
+def test_truncated_output_is_repaired(text, value):
+    assert parse_json(text) == value
+
+
+def test_partial_key_names_the_cut_off_member():
+    parser = IncrementalJSONParser(dict)
+    parser.feed('{"title": "Report", "summary": "Half a sent')
+    assert parser.truncated and parser.partial_key == "summary"
+
+    parser = IncrementalJSONParser(dict)
+    parser.feed('{"title": "Report", ')
+    assert parser.truncated and parser.partial_key is None
+
+
+def test_expect_skips_roots_of_the_other_kind():
+    assert parse_json('Options: [1, 2] -> {"pick": 2}', dict) == {"pick": 2}
+    assert parse_json('{"a": 1}', list) is None
+
+
+def test_load_json_raises_when_nothing_is_recoverable():
+    with pytest.raises(json.JSONDecodeError):
+        load_json("I could not produce an answer.")
+
+
+def test_members_are_emitted_as_they_close():
+    parser = IncrementalJSONParser(dict)
+    chunks = ['Here you go: {"ti', 'tle": "Rep', 'ort", "tags": ["a",', ' "b"], "score": 4', '2}']
+    emitted = [parser.feed(chunk) for chunk in chunks]
+    assert emitted == [[], [], [("title", "Report")], [("tags", ["a", "b"])], [("score", 42)]]
+    assert parser.result() == {"title": "Report", "tags": ["a", "b"], "score": 42}
+    assert not parser.truncated
+
+
+def test_array_items_are_emitted_with_their_index():
+    parser = IncrementalJSONParser(list)
+    assert parser.feed('[{"id": 1}, {"id"') == [(0, {"id": 1})]
+    assert parser.feed(': 2}]') == [(1, {"id": 2})]
+
+
+class FakeRouter:
+    """Answers each call with the next scripted text and records the requests"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.calls = []
+
+    async def complete(self, client, task, messages, tier=None, validate=None, **params):
+        self.calls.append({"messages": messages, "params": params})
+        content = self.answers.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))]), None
+
+    async def stream(self, client, task, messages, tier=None, validate=None, **params):
+        self.calls.append({"messages": messages, "params": params})
+        for delta in self.answers.pop(0):
+            yield delta
+
+
+FIELDS = {
+    "title": {"schema": "string", "type": str, "max_tokens": 30},
+    "tags": {"schema": "[string]", "type": list, "max_tokens": 60},
+    "score": {"schema": "number", "type": int, "max_tokens": 10},
+}
+MESSAGES = [{"role": "user", "content": "Describe the page"}]
+
+
+def test_missing_field_is_re_requested_on_its_own():
+    router = FakeRouter('{"title": "Report", "tags": "a, b"}', '{"tags": ["a", "b"], "score": 7}')
+    result = asyncio.run(StructuredOutput(router).complete(None, "summary", MESSAGES, FIELDS, max_tokens=400))
+
+    assert result.data == {"title": "Report", "tags": ["a", "b"], "score": 7}
+    assert result.retried == ["tags", "score"] and result.missing == []
+    follow_up = router.calls[1]
+    assert '"tags"' in follow_up["messages"][-1]["content"] and '"title"' not in follow_up["messages"][-1]["content"]
+    assert follow_up["params"]["max_tokens"] == 70
+
+
+def test_cut_off_field_is_re_requested_and_kept_as_a_last_resort():
+    router = FakeRouter('{"title": "Report", "tags": ["a", "b"', "no JSON this time")
+    result = asyncio.run(StructuredOutput(router).complete(None, "summary", MESSAGES, FIELDS))
+
+    assert result.repaired and result.retried == ["tags", "score"]
+    assert result.data == {"title": "Report", "tags": ["a", "b"]}
+    assert result.missing == ["score"]
+
+
+def test_stream_yields_fields_then_retries_the_missing_one():
+    router = FakeRouter(['{"title": "Rep', 'ort", "tags": ["a"], "sc'], '{"score": 3}')
+
+    async def collect():
+        return [item async for item in StructuredOutput(router).stream(None, "summary", MESSAGES, FIELDS)]
+
+    assert asyncio.run(collect()) == [("title", "Report"), ("tags", ["a"]), ("score", 3)]
+    assert '"score"' in router.calls[1]["messages"][-1]["content"]
+    assert '"tags"' not in router.calls[1]["messages"][-1]["content"]